@@ -0,0 +1,64 @@
+"""
+ChatHistoryManager 流式更新微基准
+
+测量历史记录从 100 条增长到 100k 条时，每个流式 chunk 调用
+update_message 的耗时，验证其不随历史记录规模增长。
+
+用法:
+    python benchmarks/bench_chat_history.py
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.chat_history import ChatHistoryManager
+
+SIZES = [100, 1_000, 10_000, 100_000]
+CHUNKS = 2_000
+
+
+def build_manager(size: int, path: str) -> ChatHistoryManager:
+    ChatHistoryManager.reset_instance()
+    manager = ChatHistoryManager(path, backend="json")
+    manager.set_auto_save(False)
+    manager.set_max_messages(size + 1)
+    for i in range(size):
+        manager.add_message("user" if i % 2 else "assistant", f"message {i}")
+    return manager
+
+
+def bench(manager: ChatHistoryManager, message_id: str) -> float:
+    """返回每个 chunk 的平均耗时（微秒）"""
+    content = ""
+
+    def _update():
+        nonlocal content
+        content += "x"
+        manager.update_message(message_id, content)
+
+    best = min(timeit.repeat(_update, number=CHUNKS, repeat=5))
+    return best / CHUNKS * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "chat_history.json")
+        print(f"{'history':>10} {'last msg (us)':>15} {'middle msg (us)':>17}")
+        for size in SIZES:
+            manager = build_manager(size, path)
+            last = manager.add_message("assistant", "")
+            middle = manager.get_messages()[size // 2]
+            print(
+                f"{size:>10} {bench(manager, last.id):>15.2f} "
+                f"{bench(manager, middle.id):>17.2f}"
+            )
+        ChatHistoryManager.reset_instance()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+ChatMessage 内存与序列化基准
+
+对比旧版普通 dataclass（每条消息独立的 metadata dict、未驻留的 role/msg_type）
+与当前 __slots__ 实现：
+- 从 JSON 加载 100k 条消息后的内存占用
+- 保存时 to_dict + json.dump 与 write_messages_json 直接写入的耗时和峰值内存
+
+用法:
+    python benchmarks/bench_chat_message.py
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.chat_message import ChatMessage, write_messages_json
+
+COUNT = 100_000
+
+
+@dataclass
+class LegacyChatMessage:
+    """旧版聊天消息（对照组）"""
+
+    id: str = ""
+    role: str = "user"
+    content: str = ""
+    msg_type: str = "text"
+    timestamp: float = 0.0
+    file_path: str = ""
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LegacyChatMessage":
+        return cls(
+            id=data.get("id", ""),
+            role=data.get("role", "user"),
+            content=data.get("content", ""),
+            msg_type=data.get("msg_type", "text"),
+            timestamp=data.get("timestamp", 0.0),
+            file_path=data.get("file_path", ""),
+            metadata=data.get("metadata", {}),
+        )
+
+
+def build_document() -> str:
+    messages = [
+        ChatMessage(
+            role="user" if i % 2 else "assistant", content=f"message {i}"
+        ).to_dict()
+        for i in range(COUNT)
+    ]
+    return json.dumps({"version": 1, "messages": messages}, ensure_ascii=False)
+
+
+def measure_load(cls, document: str):
+    """返回 (内存占用 MB, 消息列表)"""
+    # 每条消息的字段都是从 JSON 解析出的独立字符串，与真实加载一致
+    data = json.loads(document)["messages"]
+    tracemalloc.start()
+    messages = [cls.from_dict(d) for d in data]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1024 / 1024, messages
+
+
+def measure_save(save):
+    """返回 (耗时 ms, 峰值内存 MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    save()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024
+
+
+def main():
+    document = build_document()
+
+    legacy_mb, legacy = measure_load(LegacyChatMessage, document)
+    slotted_mb, slotted = measure_load(ChatMessage, document)
+
+    def save_legacy():
+        data = {"version": 1, "messages": [m.to_dict() for m in legacy]}
+        with open(os.devnull, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def save_slotted():
+        with open(os.devnull, "w", encoding="utf-8") as f:
+            write_messages_json(f, {"version": 1}, slotted)
+
+    legacy_ms, legacy_peak = measure_save(save_legacy)
+    slotted_ms, slotted_peak = measure_save(save_slotted)
+
+    print(f"{COUNT} messages")
+    print(f"{'':>10} {'load (MB)':>10} {'save (ms)':>10} {'save peak (MB)':>15}")
+    print(f"{'dataclass':>10} {legacy_mb:>10.1f} {legacy_ms:>10.0f} {legacy_peak:>15.1f}")
+    print(f"{'slots':>10} {slotted_mb:>10.1f} {slotted_ms:>10.0f} {slotted_peak:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+截图缩放与编码基准
+
+合成类似桌面截图的画面（渐变背景、窗口、文字行），在不同分辨率下对比：
+- legacy: 旧版实现，LANCZOS 直接缩小 + PNG optimize
+- 编码格式 × 质量预设：ImagePipeline 两阶段缩小 + 编码
+
+输出每种组合的耗时（毫秒，取多次运行的中位数）和编码后大小（KB）。
+
+用法:
+    python benchmarks/bench_image_pipeline.py [--repeat 3] [--max-width 800] [--max-height 600]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.image_pipeline import CODECS, PRESETS, ImagePipeline
+
+RESOLUTIONS = [(1920, 1080), (2560, 1440), (3840, 2160), (7680, 2160)]
+
+
+def build_screen(width: int, height: int) -> Image.Image:
+    """合成桌面截图"""
+    rng = random.Random(0)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", (gradient, gradient.rotate(90).resize((width, height)), gradient))
+    draw = ImageDraw.Draw(image)
+    for _ in range(width * height // 200_000):
+        left, top = rng.randrange(width - 200), rng.randrange(height - 150)
+        right = min(width, left + rng.randint(200, 1200))
+        bottom = min(height, top + rng.randint(150, 800))
+        draw.rectangle((left, top, right, bottom), fill=(250, 250, 250), outline=(80, 80, 80))
+        draw.rectangle((left, top, right, top + 24), fill=(60, 90, 160))
+        for y in range(top + 34, bottom - 12, 16):
+            x = left + 8
+            while x < right - 40:
+                word = rng.randint(12, 60)
+                draw.rectangle((x, y, min(x + word, right - 8), y + 8), fill=(30, 30, 30))
+                x += word + 6
+    return image
+
+
+def measure(run, repeat: int):
+    times = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, size / 1024
+
+
+def legacy(image: Image.Image, max_width: int, max_height: int) -> int:
+    ratio = min(max_width / image.width, max_height / image.height)
+    if ratio < 1:
+        image = image.resize(
+            (int(image.width * ratio), int(image.height * ratio)), Image.Resampling.LANCZOS
+        )
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return len(buffer.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-width", type=int, default=800)
+    parser.add_argument("--max-height", type=int, default=600)
+    args = parser.parse_args()
+
+    print(f"downscale to fit {args.max_width}x{args.max_height}, median of {args.repeat} runs")
+    print(f"{'resolution':>11} {'codec':>6} {'preset':>9} {'ms':>8} {'KB':>8}")
+    for width, height in RESOLUTIONS:
+        image = build_screen(width, height)
+        rows = [("png", "legacy", lambda: legacy(image, args.max_width, args.max_height))]
+        for codec in CODECS:
+            for preset in PRESETS:
+                pipeline = ImagePipeline(codec, preset, args.max_width, args.max_height)
+                rows.append((codec, preset, lambda p=pipeline: len(p.process(image).data)))
+        for codec, preset, run in rows:
+            ms, kb = measure(run, args.repeat)
+            print(f"{width}x{height:<6} {codec:>6} {preset:>9} {ms:>8.1f} {kb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
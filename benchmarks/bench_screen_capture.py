@@ -0,0 +1,114 @@
+"""
+截图吞吐量基准
+
+对比：
+- per-call: 旧版实现，每次截图创建并关闭 mss 实例，每帧新分配 PIL 图片
+- session: CaptureSession，复用同一个 mss 实例和缓冲池中的图片
+
+分两部分：
+1. 转换：合成的 4K BGRA 数据转换为 RGB 图片（新分配 vs 复用缓冲池），不需要显示器
+2. 截图：真实截图（需要图形环境），区域为 --width x --height 与屏幕大小的较小者
+
+用法:
+    python benchmarks/bench_screen_capture.py [--frames 30] [--width 3840] [--height 2160]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.capture_session import MSS_FACTORY, CaptureSession
+
+
+class SyntheticShot:
+    """与 mss 截图结果接口一致的合成数据"""
+
+    def __init__(self, width: int, height: int):
+        self.size = (width, height)
+        self.bgra = bytes(range(256)) * (width * height * 4 // 256)
+
+
+def bench_convert(frames: int, width: int, height: int):
+    shot = SyntheticShot(width, height)
+    session = CaptureSession()
+    rows = []
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+    rows.append(("allocate", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        session.release(session._to_image(shot, pooled=True))
+    rows.append(("pooled", time.perf_counter() - start))
+    session.close()
+
+    print(f"convert {width}x{height} BGRA -> RGB, {frames} frames")
+    print(f"{'mode':>10} {'time (s)':>9} {'frames/s':>9}")
+    for name, elapsed in rows:
+        print(f"{name:>10} {elapsed:>9.2f} {frames / elapsed:>9.1f}")
+
+
+def bench_capture(frames: int, width: int, height: int):
+    try:
+        with MSS_FACTORY() as sct:
+            screen = sct.monitors[0]
+    except Exception as e:
+        print(f"capture: 跳过（无法连接显示器: {e}）")
+        return
+
+    region = {
+        "left": screen["left"],
+        "top": screen["top"],
+        "width": min(width, screen["width"]),
+        "height": min(height, screen["height"]),
+    }
+    rows = []
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        with MSS_FACTORY() as sct:
+            shot = sct.grab(region)
+            Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+    rows.append(("per-call", time.perf_counter() - start))
+
+    session = CaptureSession()
+    session.grab(region)  # 创建 mss 实例，不计入时间
+    start = time.perf_counter()
+    for _ in range(frames):
+        with session.frame(region):
+            pass
+    rows.append(("session", time.perf_counter() - start))
+    stats = session.get_stats()
+    session.close()
+
+    print(f"capture {region['width']}x{region['height']}, {frames} frames")
+    print(f"{'mode':>10} {'time (s)':>9} {'frames/s':>9}")
+    for name, elapsed in rows:
+        print(f"{name:>10} {elapsed:>9.2f} {frames / elapsed:>9.1f}")
+    print(
+        f"session: opened={stats['sessions_opened']} reused={stats['frames_reused']} "
+        f"avg_grab_ms={stats['avg_grab_ms']:.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    args = parser.parse_args()
+
+    bench_convert(args.frames, args.width, args.height)
+    print()
+    bench_capture(args.frames, args.width, args.height)
+
+
+if __name__ == "__main__":
+    main()
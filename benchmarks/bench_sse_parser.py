@@ -0,0 +1,145 @@
+"""
+SSE 解析吞吐量基准
+
+在内存中构造约 10 MB 的合成 SSE 流（流式 token 事件为主，夹杂 MessageBridge
+不处理的大体积事件），按网络读取常见的字节块大小送入 httpx 响应，对比：
+- lines: 旧版实现，aiter_lines 逐行解码、每行去 BOM、每个 data 行 json.loads、
+  构造 SSEEvent、格式化调试日志并 await asyncio.sleep(0)
+- bytes: aiter_bytes + SSEParser，按事件类型跳过不需要的 JSON 解析
+
+用法:
+    python benchmarks/bench_sse_parser.py [--size-mb 10] [--chunk 4096]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.api_client import AstrBotApiClient, SSEEvent
+from desktop_client.bridge import MessageBridge
+from desktop_client.sse_parser import SSEParser
+
+logger = logging.getLogger("bench_sse_parser")
+
+
+def build_stream(size: int) -> bytes:
+    """构造合成 SSE 流"""
+    rng = random.Random(0)
+    words = ["你好", "世界", "hello", "stream", "token", "，", "。", "SSE", "解析"]
+    stats = json.dumps({"tokens": list(range(200)), "note": "x" * 200})
+    parts = []
+    total = 0
+    i = 0
+    while total < size:
+        if i % 20 == 19:
+            payload = f'{{"type": "agent_stats", "data": {stats}}}'
+        else:
+            text = "".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+            payload = json.dumps(
+                {"type": "plain", "data": text, "streaming": True, "chain_type": "normal"},
+                ensure_ascii=False,
+            )
+        line = f"data: {payload}\n\n".encode("utf-8")
+        parts.append(line)
+        total += len(line)
+        i += 1
+    parts.append(b'data: {"type": "end", "data": ""}\n\n')
+    return b"".join(parts)
+
+
+def make_response(stream: bytes, chunk_size: int) -> httpx.Response:
+    async def chunks():
+        for i in range(0, len(stream), chunk_size):
+            yield stream[i : i + chunk_size]
+
+    return httpx.Response(200, content=chunks())
+
+
+async def parse_lines(response: httpx.Response) -> int:
+    """旧版逐行解析"""
+    count = 0
+    async for line in response.aiter_lines():
+        if not line:
+            continue
+        if line.startswith("\ufeff"):
+            line = line[1:]
+        if line.startswith("data: "):
+            data_str = line[6:]
+            try:
+                event_data = json.loads(data_str)
+                event_type = event_data.get("type", "plain")
+                raw_data = event_data.get("data")
+                if raw_data is None:
+                    data_value = ""
+                elif not isinstance(raw_data, str):
+                    data_value = str(raw_data)
+                else:
+                    data_value = raw_data
+                event = SSEEvent(
+                    event_type=event_type,
+                    data=data_value,
+                    streaming=event_data.get("streaming", False),
+                    chain_type=event_data.get("chain_type", "normal"),
+                    raw=event_data,
+                )
+                logger.debug(
+                    f"[SSE] 收到事件: type={event_type}, streaming={event.streaming}, data_len={len(event.data)}"
+                )
+                count += 1
+                await asyncio.sleep(0)
+                if event.event_type == "end":
+                    break
+            except json.JSONDecodeError:
+                continue
+    return count
+
+
+async def parse_bytes(response: httpx.Response) -> int:
+    """字节级增量解析"""
+    client = AstrBotApiClient("http://stub")
+    event_types = MessageBridge.SSE_EVENT_TYPES
+    parser = SSEParser()
+    count = 0
+    async for chunk in response.aiter_bytes():
+        for frame in parser.feed(chunk):
+            event = client._decode_sse_frame(frame, "req", event_types)
+            if event is None:
+                continue
+            count += 1
+            if event.event_type == "end":
+                return count
+    return count
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--chunk", type=int, default=4096)
+    args = parser.parse_args()
+
+    stream = build_stream(int(args.size_mb * 1024 * 1024))
+    frames = stream.count(b"\n\n")
+    print(f"{len(stream) / 1024 / 1024:.1f} MB, {frames} events, {args.chunk} B chunks")
+    print(f"{'parser':>8} {'time (s)':>9} {'events/s':>10} {'MB/s':>7} {'yielded':>8}")
+    for name, run in (("lines", parse_lines), ("bytes", parse_bytes)):
+        response = make_response(stream, args.chunk)
+        start = time.perf_counter()
+        yielded = await run(response)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>8} {elapsed:>9.2f} {frames / elapsed:>10.0f} "
+            f"{len(stream) / 1024 / 1024 / elapsed:>7.1f} {yielded:>8}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
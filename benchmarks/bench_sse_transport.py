@@ -0,0 +1,149 @@
+"""
+SSE 传输首字延迟（TTFT）基准
+
+在本地启动一个模拟 /api/chat/send 的 SSE 服务器，对比两种传输模式下
+从调用 send_message 到收到第一个 plain 事件的耗时：
+- isolated: 每条消息创建独立客户端并发送 Connection: close（旧版行为）
+- pooled: 复用连接池中的连接
+
+服务器在每个新连接上先等待 --handshake 毫秒再处理请求，用于模拟真实网络中
+TCP + TLS 握手的往返开销（本地回环的握手几乎没有开销）。
+
+用法:
+    python benchmarks/bench_sse_transport.py [--messages 50] [--handshake 30]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.api_client import (
+    REQUEST_ID_HEADER,
+    SSE_TRANSPORT_ISOLATED,
+    SSE_TRANSPORT_POOLED,
+    AstrBotApiClient,
+)
+
+TOKENS_PER_REPLY = 20
+
+
+class StubSSEServer:
+    """最小的 HTTP/1.1 SSE 服务器，支持 keep-alive 和 Connection: close"""
+
+    def __init__(self, handshake_delay: float):
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        # 模拟新连接的握手往返
+        await asyncio.sleep(self.handshake_delay)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                headers = {}
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                await reader.readexactly(int(headers.get("content-length", "0")))
+
+                close = headers.get("connection", "").lower() == "close"
+                writer.write(
+                    (
+                        "HTTP/1.1 200 OK\r\n"
+                        "Content-Type: text/event-stream\r\n"
+                        "Transfer-Encoding: chunked\r\n"
+                        f"{REQUEST_ID_HEADER}: {headers.get(REQUEST_ID_HEADER.lower(), '')}\r\n"
+                        f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n"
+                    ).encode()
+                )
+                for i in range(TOKENS_PER_REPLY):
+                    data = {"type": "plain", "data": f"token{i} ", "streaming": True}
+                    self._write_chunk(writer, f"data: {json.dumps(data)}\n\n".encode())
+                    await writer.drain()
+                self._write_chunk(writer, b'data: {"type": "end", "data": ""}\n\n')
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+                if close:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_chunk(writer: asyncio.StreamWriter, data: bytes):
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+async def measure(url: str, transport: str, messages: int):
+    """返回每条消息的 (首字延迟, 总耗时)，单位毫秒"""
+    client = AstrBotApiClient(url, token="token", sse_transport=transport)
+    results = []
+    try:
+        for i in range(messages + 1):
+            start = time.perf_counter()
+            first = None
+            async for event in client.send_message("session", f"message {i}"):
+                if first is None and event.event_type == "plain":
+                    first = time.perf_counter()
+                if event.event_type == "error":
+                    raise RuntimeError(event.data)
+            end = time.perf_counter()
+            if i > 0:  # 第一条消息用于预热
+                results.append(((first - start) * 1000, (end - start) * 1000))
+    finally:
+        await client.close()
+    return results
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--handshake", type=float, default=30.0, help="模拟握手耗时（毫秒）")
+    args = parser.parse_args()
+
+    print(f"{args.messages} messages, simulated handshake {args.handshake:.0f} ms")
+    print(
+        f"{'transport':>10} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>10} {'connections':>12}"
+    )
+    for transport in (SSE_TRANSPORT_ISOLATED, SSE_TRANSPORT_POOLED):
+        server = StubSSEServer(args.handshake / 1000)
+        url = await server.start()
+        try:
+            results = await measure(url, transport, args.messages)
+        finally:
+            await server.stop()
+        ttft = [r[0] for r in results]
+        total = [r[1] for r in results]
+        print(
+            f"{transport:>10} {statistics.median(ttft):>9.2f} {percentile(ttft, 0.95):>9.2f} "
+            f"{statistics.median(total):>10.2f} {server.connections:>12}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
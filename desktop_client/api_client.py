@@ -9,21 +9,84 @@ AstrBot HTTP API 客户端
 """
 
 import asyncio
+import base64
 import hashlib
-import json
 import logging
 import os
+import re
 import time
+import uuid
 import warnings
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Callable, AsyncGenerator, Any
+from typing import (
+    Optional,
+    Callable,
+    AsyncGenerator,
+    AsyncIterator,
+    Any,
+    Collection,
+    Dict,
+    List,
+    Set,
+    Tuple,
+)
 
 import httpx
 import websockets
 
+from . import binary_frames
+from .sse_parser import SSEFrame, SSEParser, peek_payload_type
+from .utils import fast_json
+from .utils.file_hash import hash_file
+
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# SSE 传输模式
+# - pooled: 复用连接池中的连接（HTTP/2 时多个请求复用同一连接的不同流）
+# - isolated: 每个请求创建独立客户端，请求结束后关闭连接
+SSE_TRANSPORT_POOLED = "pooled"
+SSE_TRANSPORT_ISOLATED = "isolated"
+SSE_TRANSPORTS = (SSE_TRANSPORT_POOLED, SSE_TRANSPORT_ISOLATED)
+
+# 请求 ID 头：服务器回显时用于校验响应流归属
+REQUEST_ID_HEADER = "X-Request-Id"
+
+# 文件下载：按块写入磁盘，连接中断时用 Range 请求从已下载的位置继续
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_MAX_ATTEMPTS = 3
+PARTIAL_SUFFIX = ".part"  # 未下载完成的文件后缀
+# 与 .part 文件放在一起，记录其内容对应的 ETag / Last-Modified，续传时用 If-Range 校验
+VALIDATOR_SUFFIX = ".validator"
+
+_CONTENT_RANGE_START = re.compile(r"bytes\s+(\d+)-")
+
+# 超过该大小的数据在线程中做 Base64 编码，避免阻塞事件循环
+BASE64_THREAD_THRESHOLD = 256 * 1024
+
+# 文件上传：多个附件同时上传的数量上限
+UPLOAD_CONCURRENCY = 3
+
+# 上传文件的 MIME 类型
+UPLOAD_MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+}
+
 # 忽略 httpcore 的异步生成器清理警告（这是 httpcore 的已知问题）
 warnings.filterwarnings("ignore", message="async generator ignored GeneratorExit")
 # 忽略 cancel scope 相关的警告
@@ -49,6 +112,7 @@ class SSEEvent:
     streaming: bool = False
     chain_type: str = "normal"  # normal, reasoning
     raw: Optional[dict] = None
+    request_id: str = ""  # 产生该事件的请求 ID
 
 
 class WebSocketClient:
@@ -210,10 +274,27 @@ class WebSocketClient:
         # 服务端配置（连接后从服务端获取）
         self._server_timeout_config: Optional[dict] = None
 
+        # 二进制帧传输：服务端支持时为数据块大小，否则为 None（使用 Base64）
+        self._binary_chunk_size: Optional[int] = None
+        self._binary_transfers: int = 0  # 以二进制帧发送的数据数量
+        self._binary_bytes: int = 0  # 以二进制帧发送的字节数
+        self._base64_fallbacks: int = 0  # 以 Base64 发送的数据数量
+
         # 忙碌状态追踪
         self._is_busy: bool = False
         self._busy_operation: str = ""
 
+        # 消息分发表：消息类型 -> (处理函数, 是否在后台任务中执行)
+        self._handlers: Dict[str, Tuple[Callable[[dict], Any], bool]] = {}
+        self._background_tasks: Set[asyncio.Task] = set()
+        self.register_handler("heartbeat_ack", self._on_heartbeat_ack)
+        self.register_handler("server_config", self._on_server_config)
+        self.register_handler("connection_status", self._on_connection_status)
+        self.register_handler("server_ping", self._on_server_ping)
+        self.register_handler("busy_state_ack", self._on_busy_state_ack)
+        # 命令（截图、文件操作等）可能执行很久，在后台任务中执行
+        self.register_handler("command", self._handle_command, background=True)
+
     async def start(self):
         """启动 WebSocket 客户端"""
         if self._running:
@@ -258,6 +339,12 @@ class WebSocketClient:
                 pass
             self._pong_monitor_task = None
 
+        # 取消正在执行的后台处理任务
+        for task in list(self._background_tasks):
+            task.cancel()
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
         # 关闭 WebSocket 连接
         if self.ws:
             try:
@@ -340,7 +427,8 @@ class WebSocketClient:
                     else:
                         logger.info("✅ 连接成功")
 
-                    # 尝试获取服务端超时配置
+                    # 尝试获取服务端超时配置（同时协商二进制帧传输，协商完成前使用 Base64）
+                    self._binary_chunk_size = None
                     await self._request_server_config()
 
                     # 启动应用层心跳
@@ -358,83 +446,8 @@ class WebSocketClient:
                         self._last_message_time = time.time()
 
                         try:
-                            data = json.loads(message)
-
-                            # 处理心跳响应 - 更新心跳状态
-                            if data.get("type") == "heartbeat_ack":
-                                current_time = time.time()
-                                latency = current_time - self._last_heartbeat_sent
-                                self._last_heartbeat_ack = current_time
-                                self._heartbeat_failures = 0  # 收到响应，重置失败计数
-                                self._successful_pings += 1
-
-                                # 记录延迟
-                                self._record_latency(latency)
-
-                                # 检查延迟是否过高
-                                if latency > self.HIGH_LATENCY_THRESHOLD:
-                                    self._high_latency_count += 1
-                                    logger.warning(
-                                        f"⚠️ 心跳延迟过高: {latency:.2f}s ({self._high_latency_count}/{self.MAX_HIGH_LATENCY_COUNT})"
-                                    )
-                                else:
-                                    self._high_latency_count = 0
-                                continue
-
-                            # 处理服务端配置响应
-                            if data.get("type") == "server_config":
-                                self._server_timeout_config = data.get("config", {})
-                                logger.debug(
-                                    f"收到服务端配置: {self._server_timeout_config}"
-                                )
-                                continue
-
-                            # 处理连接状态广播（包含服务端配置）
-                            if data.get("type") == "connection_status":
-                                status = data.get("status")
-                                config = data.get("config", {})
-                                logger.debug(f"服务端确认连接状态: {status}")
-                                if config:
-                                    self._server_timeout_config = config
-                                    logger.debug(f"服务端配置: {config}")
-                                continue
-
-                            # 处理服务端主动探测（server_ping）- 立即响应
-                            if data.get("type") == "server_ping":
-                                server_timestamp = data.get("timestamp", 0)
-                                # 发送 server_pong 响应
-                                pong_msg = {
-                                    "type": "server_pong",
-                                    "client_timestamp": server_timestamp,
-                                    "response_time": time.time(),
-                                    "session_id": self.session_id,
-                                }
-                                await self.ws.send(json.dumps(pong_msg))
-                                # 更新活跃时间
-                                self._last_message_time = time.time()
-                                continue
-
-                            # 处理忙碌状态确认
-                            if data.get("type") == "busy_state_ack":
-                                is_busy = data.get("is_busy", False)
-                                operation = data.get("operation", "")
-                                logger.debug(
-                                    f"忙碌状态确认: is_busy={is_busy}, operation={operation}"
-                                )
-                                continue
-
-                            # 处理服务端下发的命令
-                            if data.get("type") == "command":
-                                await self._handle_command(data)
-                                continue
-
-                            if self.on_message:
-                                # 在主线程/事件循环中调用回调
-                                if asyncio.iscoroutinefunction(self.on_message):
-                                    await self.on_message(data)
-                                else:
-                                    self.on_message(data)
-                        except json.JSONDecodeError:
+                            await self._dispatch(fast_json.loads(message))
+                        except fast_json.JSONDecodeError:
                             logger.warning(f"收到无效 JSON 消息: {message[:100]}...")
                         except Exception as e:
                             logger.error(f"处理消息出错: {e}")
@@ -549,6 +562,122 @@ class WebSocketClient:
                 )
                 await asyncio.sleep(delay)
 
+    def register_handler(
+        self, msg_type: str, handler: Callable[[dict], Any], background: bool = False
+    ):
+        """
+        注册消息处理函数（同一类型重复注册时替换）
+
+        Args:
+            msg_type: 消息的 type 字段
+            handler: 处理函数，参数为消息 dict，可以是协程函数
+            background: 是否在后台任务中执行。执行时间长的处理函数应设为 True，
+                        否则会阻塞接收循环，server_ping 得不到及时响应，
+                        服务端会误判客户端断线
+        """
+        self._handlers[msg_type] = (handler, background)
+
+    async def _dispatch(self, data: Any):
+        """按消息类型分发消息，未注册的类型交给 on_message"""
+        if not isinstance(data, dict):
+            logger.warning(f"收到无效消息: {str(data)[:100]}")
+            return
+
+        handler, background = self._handlers.get(
+            data.get("type"), (self._on_other_message, False)
+        )
+        if background:
+            task = asyncio.create_task(self._run_background_handler(handler, data))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+            return
+
+        if asyncio.iscoroutinefunction(handler):
+            await handler(data)
+        else:
+            handler(data)
+
+    async def _run_background_handler(self, handler: Callable[[dict], Any], data: dict):
+        """在后台任务中执行处理函数"""
+        try:
+            if asyncio.iscoroutinefunction(handler):
+                await handler(data)
+            else:
+                handler(data)
+        except Exception as e:
+            logger.error(f"处理消息出错: {e}")
+
+    def _on_heartbeat_ack(self, data: dict):
+        """处理心跳响应 - 更新心跳状态"""
+        current_time = time.time()
+        latency = current_time - self._last_heartbeat_sent
+        self._last_heartbeat_ack = current_time
+        self._heartbeat_failures = 0  # 收到响应，重置失败计数
+        self._successful_pings += 1
+
+        # 记录延迟
+        self._record_latency(latency)
+
+        # 检查延迟是否过高
+        if latency > self.HIGH_LATENCY_THRESHOLD:
+            self._high_latency_count += 1
+            logger.warning(
+                f"⚠️ 心跳延迟过高: {latency:.2f}s ({self._high_latency_count}/{self.MAX_HIGH_LATENCY_COUNT})"
+            )
+        else:
+            self._high_latency_count = 0
+
+    def _on_server_config(self, data: dict):
+        """处理服务端配置响应"""
+        self._apply_server_config(data.get("config", {}))
+        logger.debug(f"收到服务端配置: {self._server_timeout_config}")
+
+    def _on_connection_status(self, data: dict):
+        """处理连接状态广播（包含服务端配置）"""
+        status = data.get("status")
+        config = data.get("config", {})
+        logger.debug(f"服务端确认连接状态: {status}")
+        if config:
+            self._apply_server_config(config)
+            logger.debug(f"服务端配置: {config}")
+
+    def _apply_server_config(self, config: dict):
+        """保存服务端配置，并根据其中的 binary_frames 决定二进制数据的发送方式"""
+        self._server_timeout_config = config
+        self._binary_chunk_size = binary_frames.negotiate(config)
+        logger.debug(
+            f"二进制帧传输: {'启用' if self._binary_chunk_size else '未启用（使用 Base64）'}"
+        )
+
+    async def _on_server_ping(self, data: dict):
+        """处理服务端主动探测（server_ping）- 立即响应"""
+        server_timestamp = data.get("timestamp", 0)
+        # 发送 server_pong 响应
+        pong_msg = {
+            "type": "server_pong",
+            "client_timestamp": server_timestamp,
+            "response_time": time.time(),
+            "session_id": self.session_id,
+        }
+        await self.send(pong_msg)
+        # 更新活跃时间
+        self._last_message_time = time.time()
+
+    def _on_busy_state_ack(self, data: dict):
+        """处理忙碌状态确认"""
+        is_busy = data.get("is_busy", False)
+        operation = data.get("operation", "")
+        logger.debug(f"忙碌状态确认: is_busy={is_busy}, operation={operation}")
+
+    async def _on_other_message(self, data: dict):
+        """未注册类型的消息交给 on_message 回调"""
+        if self.on_message:
+            # 在主线程/事件循环中调用回调
+            if asyncio.iscoroutinefunction(self.on_message):
+                await self.on_message(data)
+            else:
+                self.on_message(data)
+
     async def _heartbeat_loop(self):
         """应用层心跳循环 - 确保连接活跃，并监控连接质量"""
         consecutive_send_failures = 0
@@ -569,7 +698,7 @@ class WebSocketClient:
                     },
                 }
                 self._last_heartbeat_sent = current_time
-                await self.ws.send(json.dumps(heartbeat_msg))
+                await self.ws.send(fast_json.dumps(heartbeat_msg))
                 consecutive_send_failures = 0  # 发送成功，重置计数
 
                 # 等待心跳间隔
@@ -647,8 +776,9 @@ class WebSocketClient:
                 config_request = {
                     "type": "get_config",
                     "timestamp": time.time(),
+                    "capabilities": {"binary_frames": binary_frames.capability()},
                 }
-                await self.ws.send(json.dumps(config_request))
+                await self.ws.send(fast_json.dumps(config_request))
                 logger.debug("已请求服务端配置")
         except Exception as e:
             logger.debug(f"请求服务端配置失败: {e}")
@@ -735,12 +865,68 @@ class WebSocketClient:
         logger.debug(f"已发送命令结果: {command}, request_id={request_id}")
 
     async def send(self, data: dict):
-        """发送消息"""
+        """
+        发送消息
+
+        消息中 bytes 类型的字段（如截图数据）：服务端支持二进制帧时先以二进制帧发送，
+        字段替换为 <字段>_transfer 引用；否则替换为 <字段>_base64
+        """
         if self.ws:
-            await self.ws.send(json.dumps(data))
+            data = await self._encode_binary_fields(data)
+            await self.ws.send(fast_json.dumps(data))
         else:
             logger.debug("⚠️ 未连接，无法发送消息")
 
+    async def _encode_binary_fields(self, value: Any) -> Any:
+        """递归替换消息中的 bytes 字段（返回新对象，不修改原消息）"""
+        if isinstance(value, dict):
+            encoded = {}
+            for key, item in value.items():
+                if isinstance(item, (bytes, bytearray)):
+                    if self._binary_chunk_size:
+                        encoded[f"{key}_transfer"] = await self.send_binary(item)
+                    else:
+                        encoded[f"{key}_base64"] = await self._to_base64(item)
+                else:
+                    encoded[key] = await self._encode_binary_fields(item)
+            return encoded
+        if isinstance(value, list):
+            return [await self._encode_binary_fields(item) for item in value]
+        return value
+
+    async def _to_base64(self, data: bytes) -> str:
+        """Base64 编码（数据较大时在线程中执行）"""
+        self._base64_fallbacks += 1
+        if len(data) > BASE64_THREAD_THRESHOLD:
+            encoded = await asyncio.to_thread(base64.b64encode, data)
+        else:
+            encoded = base64.b64encode(data)
+        return encoded.decode("ascii")
+
+    async def send_binary(self, data: bytes) -> dict:
+        """
+        以二进制帧发送数据（需要服务端支持，见 binary_frames 模块）
+
+        Args:
+            data: 原始数据
+
+        Returns:
+            传输引用，放入随后发送的 JSON 消息中
+        """
+        transfer, frames = binary_frames.encode_frames(
+            data, self._binary_chunk_size or binary_frames.DEFAULT_CHUNK_SIZE
+        )
+        for frame in frames:
+            await self.ws.send(frame)
+        self._binary_transfers += 1
+        self._binary_bytes += transfer.size
+        return transfer.to_dict()
+
+    @property
+    def binary_frames_enabled(self) -> bool:
+        """服务端是否支持二进制帧传输"""
+        return self._binary_chunk_size is not None
+
     async def send_desktop_state(self, state_data: dict):
         """
         发送桌面状态上报
@@ -840,6 +1026,12 @@ class WebSocketClient:
             "server_config": self._server_timeout_config,
             "is_busy": self._is_busy,
             "busy_operation": self._busy_operation,
+            "background_tasks": len(self._background_tasks),
+            "json_backend": "orjson" if fast_json.ORJSON_AVAILABLE else "json",
+            "binary_frames": self.binary_frames_enabled,
+            "binary_transfers": self._binary_transfers,
+            "binary_bytes": self._binary_bytes,
+            "base64_fallbacks": self._base64_fallbacks,
         }
 
 
@@ -871,6 +1063,7 @@ class AstrBotApiClient:
         token: Optional[str] = None,
         timeout: int = 30,
         on_state_change: Optional[Callable[[ConnectionState], None]] = None,
+        sse_transport: str = SSE_TRANSPORT_POOLED,
     ):
         self.server_url = server_url.rstrip("/")
         self.username = username
@@ -878,10 +1071,22 @@ class AstrBotApiClient:
         self.token = token
         self.timeout = timeout
         self.on_state_change = on_state_change
+        if sse_transport not in SSE_TRANSPORTS:
+            logger.warning(f"未知的 SSE 传输模式: {sse_transport}，使用 {SSE_TRANSPORT_POOLED}")
+            sse_transport = SSE_TRANSPORT_POOLED
+        self.sse_transport = sse_transport
 
         self._state = ConnectionState.DISCONNECTED
         self._client: Optional[httpx.AsyncClient] = None
         self._sse_client: Optional[httpx.AsyncClient] = None
+        # 正在接收响应流的请求 ID（同一 ID 同时只能有一个流）
+        self._active_sse_requests: Set[str] = set()
+        # 本次运行中已上传的文件：内容哈希 -> 服务器返回的附件信息
+        self._uploaded: Dict[str, dict] = {}
+        self._uploads_inflight: Dict[str, "asyncio.Future[Optional[dict]]"] = {}
+        # 文件哈希缓存：(路径, 大小, 修改时间) -> 内容哈希，避免重复读取同一个文件
+        self._file_digests: Dict[Tuple[str, int, int], str] = {}
+        self._upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
         self.ws_client: Optional[WebSocketClient] = None
 
         # WebSocket 连接状态（独立于 HTTP API 状态）
@@ -972,12 +1177,11 @@ class AstrBotApiClient:
 
     def _create_sse_client(self) -> httpx.AsyncClient:
         """
-        为每个SSE请求创建独立的客户端（不复用连接）
+        为每个SSE请求创建独立的客户端（isolated 模式，不复用连接）
 
-        这是解决消息错位问题的关键：
         - 每个消息请求使用独立的HTTP连接
-        - 避免连接复用导致的响应流混淆
         - 请求完成后立即关闭连接，释放资源
+        - 每次请求都需要重新建立 TCP / TLS 连接，首字延迟更高
         """
         # SSE 流式请求需要更长的读取超时
         return httpx.AsyncClient(
@@ -995,10 +1199,13 @@ class AstrBotApiClient:
 
     async def _ensure_sse_client(self) -> httpx.AsyncClient:
         """
-        确保 SSE 客户端已创建（单例复用，更长超时）
+        确保池化的 SSE 客户端已创建（pooled 模式，单例复用，更长超时）
 
-        注意：此方法保留用于向后兼容，但建议使用 _create_sse_client()
-        创建独立客户端以避免消息错位问题
+        连接复用不会造成响应流混淆：
+        - HTTP/2 下每个请求是独立的流，帧按流 ID 分发
+        - HTTP/1.1 下一个连接同一时间只承载一个请求，
+          响应未读完就结束的连接会被直接关闭，不会放回连接池
+        send_message 另外为每个请求附带请求 ID，并校验服务器回显的 ID。
         """
         if self._sse_client is None or self._sse_client.is_closed:
             # SSE 流式请求需要更长的读取超时
@@ -1010,11 +1217,105 @@ class AstrBotApiClient:
                     pool=10.0,
                 ),
                 follow_redirects=True,
-                http2=False,  # SSE 保持禁用 HTTP/2，避免流控制问题
-                limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_keepalive_connections=5,
+                    max_connections=10,
+                    keepalive_expiry=60.0,
+                ),
             )
         return self._sse_client
 
+    # 无论调用方是否需要都会解析的事件类型
+    SSE_REQUIRED_EVENT_TYPES = frozenset({"end", "error"})
+
+    def _decode_sse_frame(
+        self,
+        frame: SSEFrame,
+        request_id: str,
+        event_types: Optional[Collection[str]] = None,
+    ) -> Optional[SSEEvent]:
+        """
+        将 SSE 事件数据解析为 SSEEvent
+
+        Args:
+            frame: 解析器输出的事件
+            request_id: 当前请求 ID
+            event_types: 需要的事件类型，为空表示全部
+
+        Returns:
+            SSEEvent；数据无效或类型不需要时返回 None
+        """
+        if not frame.data.strip():
+            # 只有空 data 字段的事件（如保活），没有可解析的内容
+            return None
+
+        if event_types is not None:
+            # 从数据开头读取 type，不需要的事件不做 JSON 解析
+            payload_type = peek_payload_type(frame.data)
+            if (
+                payload_type is not None
+                and payload_type not in event_types
+                and payload_type not in self.SSE_REQUIRED_EVENT_TYPES
+            ):
+                return None
+
+        try:
+            event_data = fast_json.loads(frame.data.decode("utf-8"))
+        except (fast_json.JSONDecodeError, UnicodeDecodeError):
+            logger.warning(f"[SSE] JSON 解析失败: {frame.text[:100]}")
+            return None
+        if not isinstance(event_data, dict):
+            logger.warning(f"[SSE] 无效的事件数据: {frame.text[:100]}")
+            return None
+
+        event_type = event_data.get("type", "plain")
+        if event_types is not None and not (
+            event_type in event_types or event_type in self.SSE_REQUIRED_EVENT_TYPES
+        ):
+            return None
+
+        raw_data = event_data.get("data")
+        if raw_data is None:
+            data_value = ""
+        elif not isinstance(raw_data, str):
+            data_value = str(raw_data)
+        else:
+            data_value = raw_data
+
+        return SSEEvent(
+            event_type=event_type,
+            data=data_value,
+            streaming=event_data.get("streaming", False),
+            chain_type=event_data.get("chain_type", "normal"),
+            raw=event_data,
+            request_id=request_id,
+        )
+
+    # 收到 end 事件后等待响应结束的最长时间（秒）
+    SSE_DRAIN_TIMEOUT = 1.0
+
+    async def _drain_sse_response(self, stream: AsyncIterator[Any]):
+        """
+        读完 end 事件之后的剩余响应（pooled 模式）
+
+        响应没有读完就关闭时，HTTP/1.1 连接会被直接断开而不能放回连接池，
+        下一条消息又要重新建立连接。服务器迟迟不结束响应时放弃复用该连接。
+
+        Args:
+            stream: 正在读取的响应迭代器
+        """
+        async def _drain():
+            async for _ in stream:
+                pass
+
+        try:
+            await asyncio.wait_for(_drain(), self.SSE_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.debug("[SSE] 等待响应结束超时，该连接不再复用")
+        except Exception as e:
+            logger.debug(f"[SSE] 读取剩余响应失败: {e}")
+
     async def close(self):
         """关闭所有客户端连接"""
         # 停止健康检测
@@ -1032,6 +1333,9 @@ class AstrBotApiClient:
             await self.ws_client.stop()
             self.ws_client = None
 
+        # 附件 ID 只在当前连接的服务器上有效
+        self._uploaded.clear()
+
         self.state = ConnectionState.DISCONNECTED
 
     async def start_health_check(self):
@@ -1467,6 +1771,9 @@ class AstrBotApiClient:
         """
         上传文件
 
+        文件内容从磁盘流式发送，不整体读入内存；本次运行中已上传过的内容
+        （按 SHA-256 判断）直接返回之前的附件信息，同一内容的并发上传只执行一次。
+
         Returns:
             (success, {"attachment_id": str, "filename": str, "type": str} or None)
         """
@@ -1474,52 +1781,29 @@ class AstrBotApiClient:
             if not os.path.exists(file_path):
                 return False, None
 
-            client = await self._ensure_client()
-
-            filename = os.path.basename(file_path)
-
-            # 读取文件
-            with open(file_path, "rb") as f:
-                file_content = f.read()
-
-            # 根据扩展名确定 MIME 类型
-            ext = os.path.splitext(filename)[1].lower()
-            mime_types = {
-                ".png": "image/png",
-                ".jpg": "image/jpeg",
-                ".jpeg": "image/jpeg",
-                ".gif": "image/gif",
-                ".webp": "image/webp",
-                ".bmp": "image/bmp",
-                ".wav": "audio/wav",
-                ".mp3": "audio/mpeg",
-                ".ogg": "audio/ogg",
-            }
-            content_type = mime_types.get(ext, "application/octet-stream")
-
-            # 构建 multipart 表单
-            files = {"file": (filename, file_content, content_type)}
-
-            # 不使用 JSON 头，使用 multipart
-            headers = {}
-            if self.token:
-                headers["Authorization"] = f"Bearer {self.token}"
+            digest = await self._file_digest(file_path)
+            uploaded = self._uploaded.get(digest)
+            if uploaded is not None:
+                logger.debug(f"文件已上传过，复用附件: {uploaded.get('attachment_id')}")
+                return True, uploaded
 
-            response = await client.post(
-                f"{self.api_base}/chat/post_file",
-                files=files,
-                headers=headers,
-            )
-
-            if response.status_code != 200:
-                return False, None
-
-            data = response.json()
+            pending = self._uploads_inflight.get(digest)
+            if pending is not None:
+                result = await asyncio.shield(pending)
+                return result is not None, result
 
-            if data.get("status") == "ok":
-                return True, data.get("data")
-            else:
-                return False, None
+            future: "asyncio.Future[Optional[dict]]" = asyncio.get_running_loop().create_future()
+            self._uploads_inflight[digest] = future
+            result = None
+            try:
+                async with self._upload_semaphore:
+                    result = await self._post_file(file_path)
+                if result is not None:
+                    self._uploaded[digest] = result
+            finally:
+                del self._uploads_inflight[digest]
+                future.set_result(result)
+            return result is not None, result
 
         except httpx.ConnectError:
             self.state = ConnectionState.DISCONNECTED
@@ -1528,25 +1812,73 @@ class AstrBotApiClient:
             logger.debug(f"上传文件失败: {e}")
             return False, None
 
-    async def download_file(self, filename: str, save_path: str) -> bool:
-        """下载文件"""
-        try:
-            client = await self._ensure_client()
+    async def upload_files(self, file_paths: List[str]) -> List[tuple[bool, Optional[dict]]]:
+        """
+        并发上传多个文件（同时上传的数量不超过 UPLOAD_CONCURRENCY）
 
-            response = await client.get(
-                f"{self.api_base}/chat/get_file",
-                params={"filename": filename},
-                headers=self._get_headers(),
+        Returns:
+            与 file_paths 顺序一致的 upload_file 结果
+        """
+        return list(await asyncio.gather(*(self.upload_file(path) for path in file_paths)))
+
+    async def _file_digest(self, file_path: str) -> str:
+        """计算文件内容哈希（在线程中读取文件，结果按路径、大小和修改时间缓存）"""
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._file_digests.get(key)
+        if digest is None:
+            digest, _ = await asyncio.to_thread(hash_file, file_path)
+            self._file_digests[key] = digest
+        return digest
+
+    async def _post_file(self, file_path: str) -> Optional[dict]:
+        """
+        以 multipart 表单上传文件
+
+        httpx 按块读取文件对象并根据文件大小设置 Content-Length，
+        内存占用与文件大小无关。
+
+        Raises:
+            httpx.ConnectError: 无法连接服务器
+        """
+        client = await self._ensure_client()
+        filename = os.path.basename(file_path)
+
+        # 根据扩展名确定 MIME 类型
+        ext = os.path.splitext(filename)[1].lower()
+        content_type = UPLOAD_MIME_TYPES.get(ext, "application/octet-stream")
+
+        # 不使用 JSON 头，使用 multipart
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        with open(file_path, "rb") as f:
+            response = await client.post(
+                f"{self.api_base}/chat/post_file",
+                files={"file": (filename, f, content_type)},
+                headers=headers,
             )
 
-            if response.status_code != 200:
-                return False
+        if response.status_code != 200:
+            return None
 
-            with open(save_path, "wb") as f:
-                f.write(response.content)
+        data = response.json()
+        if data.get("status") == "ok":
+            return data.get("data")
+        return None
 
-            return True
+    async def download_file(self, filename: str, save_path: str) -> bool:
+        """
+        下载文件
 
+        流式写入 save_path + ".part"，完成后重命名为 save_path；
+        下载中断时保留 .part 文件，重试（包括下一次调用）时从断点继续。
+        """
+        try:
+            return await self._download_to_file(
+                f"{self.api_base}/chat/get_file", {"filename": filename}, save_path
+            )
         except httpx.ConnectError:
             self.state = ConnectionState.DISCONNECTED
             return False
@@ -1555,27 +1887,138 @@ class AstrBotApiClient:
             return False
 
     async def get_attachment(self, attachment_id: str, save_path: str) -> bool:
-        """下载附件"""
+        """下载附件（流式写入磁盘，支持断点续传）"""
         try:
-            client = await self._ensure_client()
-
-            response = await client.get(
+            return await self._download_to_file(
                 f"{self.api_base}/chat/get_attachment",
-                params={"attachment_id": attachment_id},
-                headers=self._get_headers(),
+                {"attachment_id": attachment_id},
+                save_path,
             )
+        except Exception as e:
+            logger.debug(f"下载附件失败: {e}")
+            return False
 
-            if response.status_code != 200:
-                return False
+    async def _download_to_file(self, url: str, params: dict, save_path: str) -> bool:
+        """
+        流式下载到文件
+
+        每次只在内存中保留一个数据块。传输出错时最多重试 DOWNLOAD_MAX_ATTEMPTS 次，
+        每次通过 Range 请求从 .part 文件的当前大小继续；服务器不支持 Range
+        （返回 200）时从头下载。
 
-            with open(save_path, "wb") as f:
-                f.write(response.content)
+        .part 文件可能是之前的调用留下的（如媒体缓存使用固定的临时文件名），
+        续传时用旁边 .validator 文件中保存的 ETag / Last-Modified 作为 If-Range，
+        并检查 Content-Range 的起始位置，服务器上的文件已改变时从头下载，
+        不会把新旧两个版本拼接在一起。
+
+        Raises:
+            httpx.ConnectError: 无法连接服务器
+        """
+        client = await self._ensure_client()
+        partial_path = save_path + PARTIAL_SUFFIX
+        validator_path = partial_path + VALIDATOR_SUFFIX
+        validator = self._read_validator(validator_path)
+        owned = False  # .part 文件是否由本次调用写入
+
+        for attempt in range(DOWNLOAD_MAX_ATTEMPTS):
+            offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            if offset and not (validator or owned):
+                # 无法确认来源的 .part 文件，从头下载
+                self._discard_partial(partial_path)
+                offset = 0
+            headers = self._get_headers()
+            # 压缩编码下 Range 和 Content-Length 都针对压缩后的数据，下载时不压缩
+            headers["Accept-Encoding"] = "identity"
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                if validator:
+                    headers["If-Range"] = validator
 
+            try:
+                async with client.stream("GET", url, params=params, headers=headers) as response:
+                    if response.status_code == 416 and offset:
+                        # 已下载的部分与服务器上的文件不一致，从头下载
+                        self._discard_partial(partial_path)
+                        validator, owned = "", False
+                        continue
+                    if response.status_code not in (200, 206):
+                        return False
+
+                    resumed = response.status_code == 206
+                    if resumed:
+                        match = _CONTENT_RANGE_START.match(
+                            response.headers.get("Content-Range", "")
+                        )
+                        if match is None or int(match.group(1)) != offset:
+                            logger.debug(
+                                f"续传位置不一致: {response.headers.get('Content-Range')}，从头下载"
+                            )
+                            self._discard_partial(partial_path)
+                            validator, owned = "", False
+                            continue
+                    else:
+                        offset = 0
+                        validator = response.headers.get("ETag") or response.headers.get(
+                            "Last-Modified", ""
+                        )
+                        self._write_validator(validator_path, validator)
+                    owned = True
+                    expected = response.headers.get("Content-Length")
+
+                    with open(partial_path, "ab" if resumed else "wb") as f:
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+
+                    received = response.num_bytes_downloaded
+                    if expected is not None and received != int(expected):
+                        raise httpx.ReadError(
+                            f"下载不完整: {received}/{expected} 字节", request=response.request
+                        )
+            except httpx.ConnectError:
+                raise
+            except httpx.TransportError as e:
+                logger.debug(f"下载中断（第 {attempt + 1} 次），将从断点继续: {e}")
+                continue
+
+            os.replace(partial_path, save_path)
+            self._discard_partial(partial_path)
+            if resumed:
+                logger.debug(f"断点续传完成: {save_path}（从 {offset} 字节继续）")
             return True
 
-        except Exception as e:
-            logger.debug(f"下载附件失败: {e}")
-            return False
+        return False
+
+    @staticmethod
+    def _read_validator(path: str) -> str:
+        """读取 .part 文件对应的 ETag / Last-Modified"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+    @staticmethod
+    def _write_validator(path: str, validator: str):
+        """保存 .part 文件对应的 ETag / Last-Modified（服务器没有提供时删除）"""
+        try:
+            if validator:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(validator)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.debug(f"保存下载校验信息失败: {e}")
+
+    @staticmethod
+    def _discard_partial(partial_path: str):
+        """删除 .part 文件及其校验信息（不存在时忽略）"""
+        for path in (partial_path, partial_path + VALIDATOR_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"删除未完成的下载失败: {e}")
 
     # ========== 消息发送 ==========
 
@@ -1586,6 +2029,8 @@ class AstrBotApiClient:
         selected_provider: Optional[str] = None,
         selected_model: Optional[str] = None,
         enable_streaming: bool = True,
+        request_id: str = "",
+        event_types: Optional[Collection[str]] = None,
     ) -> AsyncGenerator[SSEEvent, None]:
         """
         发送消息并接收 SSE 流式响应
@@ -1596,13 +2041,17 @@ class AstrBotApiClient:
             selected_provider: 选择的 LLM 提供者
             selected_model: 选择的模型
             enable_streaming: 是否启用流式响应
+            request_id: 请求 ID，为空则自动生成；产生的事件都带有该 ID
+            event_types: 需要的事件类型，为空表示全部；其他类型的事件不做 JSON 解析，
+                直接跳过（end / error 总是返回）
 
         Yields:
             SSEEvent 对象
 
-        重要变更：
-            为避免消息错位问题，每个请求使用独立的HTTP客户端连接，
-            确保响应流完全隔离，不会被其他请求干扰。
+        响应流隔离：
+            每个请求使用独立的响应流（pooled 模式下为连接池中的独立连接或
+            HTTP/2 流，isolated 模式下为独立客户端），并通过请求 ID 头标记；
+            服务器回显的请求 ID 不一致时丢弃该响应，避免消息错位。
         """
         # 构建请求体
         body = {
@@ -1616,11 +2065,27 @@ class AstrBotApiClient:
         if selected_model:
             body["selected_model"] = selected_model
 
-        # 为每个请求创建独立的客户端（关键：避免消息错位）
-        # 使用独立连接确保响应流不会混淆
-        client = self._create_sse_client()
-        
-        logger.info(f"[SSE] 发送消息请求: session_id={session_id}, streaming={enable_streaming}")
+        request_id = request_id or uuid.uuid4().hex
+        if request_id in self._active_sse_requests:
+            yield SSEEvent(
+                event_type="error",
+                data=f"请求 {request_id} 已有正在接收的响应流",
+                request_id=request_id,
+            )
+            return
+
+        pooled = self.sse_transport == SSE_TRANSPORT_POOLED
+        if pooled:
+            client = await self._ensure_sse_client()
+        else:
+            # isolated 模式：为每个请求创建独立的客户端
+            client = self._create_sse_client()
+        self._active_sse_requests.add(request_id)
+
+        logger.info(
+            f"[SSE] 发送消息请求: session_id={session_id}, request_id={request_id}, "
+            f"streaming={enable_streaming}, transport={self.sse_transport}"
+        )
         logger.debug(f"[SSE] 请求体: {body}")
 
         try:
@@ -1628,8 +2093,10 @@ class AstrBotApiClient:
             # SSE 特定头
             headers["Accept"] = "text/event-stream"
             headers["Cache-Control"] = "no-cache"
-            # 强制不复用连接
-            headers["Connection"] = "close"
+            headers[REQUEST_ID_HEADER] = request_id
+            if not pooled:
+                # 强制不复用连接
+                headers["Connection"] = "close"
 
             logger.debug(f"[SSE] 开始发送请求到 {self.api_base}/chat/send")
             async with client.stream(
@@ -1638,83 +2105,82 @@ class AstrBotApiClient:
                 json=body,
                 headers=headers,
             ) as response:
-                logger.info(f"[SSE] 收到响应: HTTP {response.status_code}")
+                logger.info(
+                    f"[SSE] 收到响应: HTTP {response.status_code} ({response.http_version})"
+                )
                 if response.status_code != 200:
                     logger.error(f"[SSE] 请求失败: HTTP {response.status_code}")
                     yield SSEEvent(
                         event_type="error",
                         data=f"HTTP {response.status_code}",
+                        request_id=request_id,
                     )
                     return
 
-                # 手动处理 SSE 流
-                logger.debug("[SSE] 开始处理 SSE 流")
-                async for line in response.aiter_lines():
-                    if not line:
-                        continue
-
-                    # 移除可能的 BOM
-                    if line.startswith("\ufeff"):
-                        line = line[1:]
-
-                    # 只处理 data: 开头的行
-                    if line.startswith("data: "):
-                        data_str = line[6:]  # 去掉 'data: ' 前缀
+                echoed_id = response.headers.get(REQUEST_ID_HEADER)
+                if echoed_id and echoed_id != request_id:
+                    logger.error(
+                        f"[SSE] 响应流请求 ID 不匹配: 期望 {request_id}, 实际 {echoed_id}"
+                    )
+                    yield SSEEvent(
+                        event_type="error",
+                        data="响应流与请求不匹配",
+                        request_id=request_id,
+                    )
+                    return
 
-                        try:
-                            event_data = json.loads(data_str)
-                            event_type = event_data.get("type", "plain")
-
-                            raw_data = event_data.get("data")
-                            if raw_data is None:
-                                data_value = ""
-                            elif not isinstance(raw_data,str):
-                                data_value = str(raw_data)
-                            else:
-                                data_value = raw_data
-
-                            event = SSEEvent(
-                                event_type=event_type,
-                                data=data_value,
-                                streaming=event_data.get("streaming", False),
-                                chain_type=event_data.get("chain_type", "normal"),
-                                raw=event_data,
+                # 按字节块增量解析 SSE 流
+                parser = SSEParser()
+                debug = logger.isEnabledFor(logging.DEBUG)
+                chunks = response.aiter_bytes()
+                async for chunk in chunks:
+                    for frame in parser.feed(chunk):
+                        event = self._decode_sse_frame(frame, request_id, event_types)
+                        if event is None:
+                            continue
+                        if debug:
+                            logger.debug(
+                                f"[SSE] 收到事件: type={event.event_type}, "
+                                f"streaming={event.streaming}, data_len={len(event.data)}"
                             )
-                            logger.debug(f"[SSE] 收到事件: type={event_type}, streaming={event.streaming}, data_len={len(event.data)}")
-                            yield event
+                        yield event
 
-                            # 让出控制权 - 关键！
-                            await asyncio.sleep(0)
-
-                            if event.event_type == "end":
-                                return
-                        except json.JSONDecodeError:
-                            logger.warning(f"[SSE] JSON 解析失败: {data_str[:100]}")
-                            continue
+                        if event.event_type == "end":
+                            if pooled:
+                                await self._drain_sse_response(chunks)
+                            return
 
         except httpx.ConnectError as e:
             logger.error(f"[SSE] 连接失败: {e}")
             self.state = ConnectionState.DISCONNECTED
-            yield SSEEvent(event_type="error", data=f"连接失败: {e}")
+            yield SSEEvent(event_type="error", data=f"连接失败: {e}", request_id=request_id)
         except httpx.TimeoutException as e:
             # 如果是连接超时，也标记为断开
             if isinstance(e, (httpx.ConnectTimeout, httpx.PoolTimeout)):
                 self.state = ConnectionState.DISCONNECTED
-                yield SSEEvent(event_type="error", data=f"连接超时: {e}")
+                yield SSEEvent(
+                    event_type="error", data=f"连接超时: {e}", request_id=request_id
+                )
             else:
                 yield SSEEvent(
-                    event_type="error", data=f"请求超时（服务器响应时间过长）: {e}"
+                    event_type="error",
+                    data=f"请求超时（服务器响应时间过长）: {e}",
+                    request_id=request_id,
                 )
         except GeneratorExit:
             pass
         except Exception as e:
-            yield SSEEvent(event_type="error", data=f"发送消息异常: {e}")
+            yield SSEEvent(
+                event_type="error", data=f"发送消息异常: {e}", request_id=request_id
+            )
         finally:
-            # 确保客户端连接被关闭，释放资源
-            try:
-                await client.aclose()
-            except Exception:
-                pass
+            self._active_sse_requests.discard(request_id)
+            if not pooled:
+                # isolated 模式：确保客户端连接被关闭，释放资源
+                try:
+                    await client.aclose()
+                except Exception:
+                    pass
 
     async def send_text_message(
         self,
@@ -1757,6 +2223,45 @@ class AstrBotApiClient:
         async for event in self.send_message(session_id, message_parts, **kwargs):
             yield event
 
+    async def send_attachments_message(
+        self,
+        session_id: str,
+        attachments: List[Tuple[str, str]],
+        text: str = "",
+        **kwargs,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """
+        发送带多个附件的消息（附件并发上传）
+
+        Args:
+            session_id: 会话 ID
+            attachments: [(消息段类型 image / record / file, 文件路径), ...]
+            text: 附带的文本
+        """
+        results = await self.upload_files([path for _, path in attachments])
+
+        # 构建消息段
+        message_parts = []
+
+        if text:
+            message_parts.append({"type": "plain", "text": text})
+
+        for (segment_type, path), (success, result) in zip(attachments, results):
+            if not success or not result:
+                yield SSEEvent(
+                    event_type="error", data=f"附件上传失败: {os.path.basename(path)}"
+                )
+                return
+            message_parts.append(
+                {
+                    "type": segment_type,
+                    "attachment_id": result["attachment_id"],
+                }
+            )
+
+        async for event in self.send_message(session_id, message_parts, **kwargs):
+            yield event
+
     async def send_voice_message(
         self,
         session_id: str,
@@ -26,6 +26,7 @@ from qasync import QEventLoop, asyncSlot
 
 from .config import ClientConfig, load_config, save_config
 from .bridge import MessageBridge, InputMessage
+from .services.capture_session import close_capture_session, refresh_capture_session
 from .services.proactive_dialog import ProactiveDialogService
 from .services import get_chat_history_manager, UpdateService
 from .handlers import (
@@ -34,6 +35,7 @@ from .handlers import (
     ProactiveHandler,
     MediaHandler,
     RemoteCommandHandler,
+    StreamAggregator,
 )
 from .controllers import SettingsController
 from .logger import get_logger
@@ -87,6 +89,9 @@ class DesktopClientApp(QObject):
         # 更新服务
         self._update_service = None
 
+        # 聊天记录管理器（GUI 初始化后设置）
+        self._chat_history_manager = None
+
         # 重连计时器
         self._reconnect_timer: Optional[QTimer] = None
         self._reconnect_attempts = 0
@@ -133,8 +138,14 @@ class DesktopClientApp(QObject):
             config=self.config, bridge=self._bridge, parent=self
         )
 
+        # 流式响应聚合器：合并流式 chunk，每帧最多更新一次界面
+        self._stream_aggregator = StreamAggregator(
+            interval_ms=self.config.chat_window.stream_flush_interval_ms, parent=self
+        )
+
         # 连接信号
-        self._bridge.message_received.connect(
+        self._bridge.message_received.connect(self._stream_aggregator.push)
+        self._stream_aggregator.message_ready.connect(
             self._message_handler.handle_output_message
         )
         self._bridge.connection_state_changed.connect(self._on_connection_state_changed)
@@ -190,6 +201,7 @@ class DesktopClientApp(QObject):
             self._app = QApplication(sys.argv)
         if self._app:
             self._app.setQuitOnLastWindowClosed(False)
+            self._watch_screens()
 
         # 2. 启用 QSS 主题系统并从配置加载主题
         logger.info("启用 QSS 主题系统")
@@ -229,6 +241,21 @@ class DesktopClientApp(QObject):
         with loop:
             loop.run_forever()
 
+    def _watch_screens(self):
+        """显示器增减或分辨率变化时刷新截图会话（mss 实例缓存了显示器列表）"""
+        self._app.screenAdded.connect(self._on_screen_added)
+        self._app.screenRemoved.connect(self._on_screens_changed)
+        for screen in self._app.screens():
+            screen.geometryChanged.connect(self._on_screens_changed)
+
+    def _on_screen_added(self, screen):
+        screen.geometryChanged.connect(self._on_screens_changed)
+        self._on_screens_changed()
+
+    def _on_screens_changed(self, *args):
+        logger.debug("显示器配置变化，刷新截图会话")
+        refresh_capture_session()
+
     async def _startup(self):
         """启动时异步任务"""
         if self.config.server.auto_reconnect:
@@ -509,7 +536,14 @@ class DesktopClientApp(QObject):
 
         # 初始化聊天记录管理器
         chat_history_path = self.config.storage.chat_history_path
-        chat_history_manager = get_chat_history_manager(chat_history_path)
+        chat_history_manager = get_chat_history_manager(
+            chat_history_path, self.config.storage.chat_history_backend
+        )
+        chat_history_manager.set_save_policy(
+            self.config.storage.chat_history_save_debounce_ms / 1000,
+            self.config.storage.chat_history_save_max_latency_ms / 1000,
+        )
+        self._chat_history_manager = chat_history_manager
         self._message_handler.set_chat_history_manager(chat_history_manager)
         self._media_handler.set_chat_history_manager(chat_history_manager)
         self._settings_controller.set_chat_history_manager(chat_history_manager)
@@ -753,12 +787,18 @@ class DesktopClientApp(QObject):
         if save_config(self.config):
             logger.debug("配置已保存")
 
+        if self._chat_history_manager:
+            self._chat_history_manager.close()
+
         if self._hotkey_manager:
             self._hotkey_manager.cleanup()
 
         if self._proactive_service:
             self._proactive_service.stop()
 
+        self._media_handler.close()
+        close_capture_session()
+
         python = sys.executable
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -790,6 +830,13 @@ class DesktopClientApp(QObject):
         if self._hotkey_manager:
             self._hotkey_manager.cleanup()
 
+        # 写入未保存的聊天记录
+        if self._chat_history_manager:
+            self._chat_history_manager.close()
+
+        self._media_handler.close()
+        close_capture_session()
+
         asyncio.ensure_future(self._bridge.disconnect_server())
 
         if self._app:
@@ -0,0 +1,161 @@
+"""
+WebSocket 二进制帧传输
+
+截图等二进制数据放在 JSON 中需要 Base64 编码，体积增加 1/3，发送前还要在事件循环中
+序列化很大的 JSON 字符串，4K PNG 截图还可能超过服务端的消息大小上限。
+服务端支持时改用二进制帧发送原始数据：
+
+- 连接后客户端在 get_config 请求中声明 capabilities.binary_frames，
+  服务端在返回的配置中包含 binary_frames 时启用，否则继续使用 Base64
+- 原始数据按块拆分为多个二进制帧，每帧的格式为：
+  4 字节大端序头部长度 + UTF-8 JSON 头部 + 数据块
+  头部：{"type": "binary_chunk", "transfer_id": ..., "index": 0, "count": 3, "size": 总字节数}
+- 所有数据块发送完后再发送 JSON 消息，原来的 <字段>_base64 替换为
+  <字段>_transfer: {"transfer_id": ..., "size": ..., "chunks": ...}，服务端按 transfer_id 拼接
+"""
+
+import struct
+import uuid
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .utils import fast_json
+
+PROTOCOL_VERSION = 1
+
+# 每帧数据块大小上限，远小于双方的 WebSocket 消息大小上限（10MB）
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MIN_CHUNK_SIZE = 16 * 1024
+
+CHUNK_TYPE = "binary_chunk"
+
+_HEADER_LENGTH = struct.Struct(">I")
+
+
+@dataclass
+class BinaryTransfer:
+    """一次二进制传输，放入 JSON 消息中引用已发送的数据块"""
+
+    transfer_id: str
+    size: int  # 总字节数
+    chunks: int  # 数据块数量
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+def capability() -> Dict[str, Any]:
+    """客户端在 get_config 请求中声明的能力"""
+    return {"version": PROTOCOL_VERSION, "max_chunk_size": DEFAULT_CHUNK_SIZE}
+
+
+def negotiate(config: Optional[dict]) -> Optional[int]:
+    """
+    根据服务端配置确定是否使用二进制帧
+
+    Args:
+        config: 服务端配置，binary_frames 为 true 或 {"version": 1, "max_chunk_size": ...}
+
+    Returns:
+        数据块大小；服务端不支持时返回 None（使用 Base64）
+    """
+    value = (config or {}).get("binary_frames")
+    if value is True:
+        return DEFAULT_CHUNK_SIZE
+    if not isinstance(value, dict) or value.get("version", PROTOCOL_VERSION) != PROTOCOL_VERSION:
+        return None
+
+    chunk_size = value.get("max_chunk_size") or DEFAULT_CHUNK_SIZE
+    return max(MIN_CHUNK_SIZE, min(int(chunk_size), DEFAULT_CHUNK_SIZE))
+
+
+def encode_frames(
+    payload: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE, transfer_id: Optional[str] = None
+) -> Tuple[BinaryTransfer, List[bytes]]:
+    """
+    把数据拆分为二进制帧
+
+    Args:
+        payload: 原始数据
+        chunk_size: 每帧数据块大小
+        transfer_id: 传输 ID，不指定则随机生成
+
+    Returns:
+        (传输引用, 二进制帧列表)
+    """
+    view = memoryview(payload)
+    count = max(1, -(-len(view) // chunk_size))
+    transfer = BinaryTransfer(transfer_id or uuid.uuid4().hex, len(view), count)
+
+    frames = []
+    for index in range(count):
+        header = fast_json.dumps(
+            {
+                "type": CHUNK_TYPE,
+                "transfer_id": transfer.transfer_id,
+                "index": index,
+                "count": count,
+                "size": transfer.size,
+            }
+        ).encode("utf-8")
+        chunk = view[index * chunk_size : (index + 1) * chunk_size]
+        frames.append(b"".join((_HEADER_LENGTH.pack(len(header)), header, chunk)))
+    return transfer, frames
+
+
+def decode_frame(frame: bytes) -> Tuple[dict, bytes]:
+    """
+    解析一个二进制帧
+
+    Returns:
+        (头部, 数据块)
+
+    Raises:
+        ValueError: 帧格式错误
+    """
+    if len(frame) < _HEADER_LENGTH.size:
+        raise ValueError("二进制帧长度不足")
+    (length,) = _HEADER_LENGTH.unpack_from(frame)
+    end = _HEADER_LENGTH.size + length
+    if end > len(frame):
+        raise ValueError("二进制帧头部长度超出帧长度")
+    try:
+        header = fast_json.loads(frame[_HEADER_LENGTH.size : end])
+    except (fast_json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"二进制帧头部无效: {e}") from e
+    if not isinstance(header, dict) or header.get("type") != CHUNK_TYPE:
+        raise ValueError("不是二进制数据块")
+    return header, frame[end:]
+
+
+class FrameAssembler:
+    """按 transfer_id 拼接收到的二进制帧（接收端使用）"""
+
+    def __init__(self):
+        self._parts: Dict[str, Dict[int, bytes]] = {}
+
+    def feed(self, frame: bytes) -> Optional[Tuple[str, bytes]]:
+        """
+        接收一个二进制帧
+
+        Returns:
+            传输的数据块全部到达时返回 (transfer_id, 完整数据)，否则返回 None
+        """
+        header, chunk = decode_frame(frame)
+        transfer_id = header["transfer_id"]
+        parts = self._parts.setdefault(transfer_id, {})
+        parts[header["index"]] = chunk
+        if len(parts) < header["count"]:
+            return None
+
+        del self._parts[transfer_id]
+        data = b"".join(parts[i] for i in range(header["count"]))
+        if len(data) != header["size"]:
+            raise ValueError(f"传输 {transfer_id} 大小不一致: {len(data)} != {header['size']}")
+        return transfer_id, data
+
+    @property
+    def pending(self) -> int:
+        """未接收完整的传输数量"""
+        return len(self._parts)
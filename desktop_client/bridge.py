@@ -11,12 +11,13 @@ import logging
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Optional, Any
+from typing import Dict, Optional, Any
 
 from PySide6.QtCore import QObject, Signal
 
 from .api_client import AstrBotApiClient, SSEEvent, ConnectionState
 from .config import ClientConfig
+from .request_scheduler import RequestPriority, RequestScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +26,8 @@ logger = logging.getLogger(__name__)
 class InputMessage:
     """输入消息（GUI -> 服务器）"""
 
-    msg_type: str  # text, image, voice, file, screenshot
-    content: Any
+    msg_type: str  # text, image, voice, file, screenshot, attachments
+    content: Any  # attachments 类型为 [(消息段类型, 文件路径), ...]
     session_id: str
     timestamp: float = field(default_factory=time.time)
     metadata: dict = field(default_factory=dict)
@@ -52,12 +53,18 @@ class MessageBridge(QObject):
     1. 管理与 AstrBot 服务器的连接
     2. 处理消息传递（直接通过 asyncio 和 Signal）
     3. 请求-响应匹配（通过 request_id）
+    4. 请求调度：不同会话的请求并发执行，同一会话的请求按优先级依次执行
     """
 
     # 信号
     message_received = Signal(object)  # 发送 OutputMessage
     connection_state_changed = Signal(object)  # 发送 ConnectionState
 
+    # _handle_sse_event 处理的事件类型，其他类型的事件在 API 客户端中直接跳过
+    SSE_EVENT_TYPES = frozenset(
+        {"plain", "image", "record", "file", "end", "complete", "break", "message_saved", "error"}
+    )
+
     def __init__(self, config: ClientConfig):
         super().__init__()
         self.config = config
@@ -70,12 +77,13 @@ class MessageBridge(QObject):
             token=config.server.token,
             timeout=config.server.request_timeout,
             on_state_change=self._on_api_state_change,
+            sse_transport=config.server.sse_transport,
         )
 
-        # 请求追踪：当前活跃的请求ID
-        self._current_request_id: Optional[str] = None
-        # 请求锁：确保同一时间只有一个请求在处理
-        self._request_lock = asyncio.Lock()
+        # 请求追踪：正在执行的请求 ID -> 会话 ID
+        self._active_requests: Dict[str, str] = {}
+        # 请求调度器：按会话排队，代替全局请求锁
+        self._scheduler = RequestScheduler()
 
     def _on_api_state_change(self, state: ConnectionState):
         """API 客户端状态变化回调"""
@@ -144,8 +152,45 @@ class MessageBridge(QObject):
         """生成唯一的请求ID"""
         return f"req_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
 
+    @property
+    def active_request_ids(self) -> list:
+        """正在执行的请求 ID"""
+        return list(self._active_requests)
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        """请求调度器"""
+        return self._scheduler
+
+    @staticmethod
+    def _request_priority(msg: InputMessage) -> int:
+        """
+        请求优先级：metadata 中指定的优先级，否则主动对话最低、用户输入最高
+
+        metadata 中的优先级可以是整数或 RequestPriority 名称（如 "proactive"），
+        无法识别时按 NORMAL 处理。
+        """
+        if "priority" in msg.metadata:
+            priority = msg.metadata["priority"]
+            if isinstance(priority, str):
+                name = priority.strip().upper()
+                if name in RequestPriority.__members__:
+                    return RequestPriority[name]
+            try:
+                return int(priority)
+            except (TypeError, ValueError):
+                logger.warning(f"无效的请求优先级: {priority!r}，按 NORMAL 处理")
+                return RequestPriority.NORMAL
+        if msg.metadata.get("proactive"):
+            return RequestPriority.PROACTIVE
+        return RequestPriority.USER
+
     async def send_input(self, msg: InputMessage):
-        """发送输入消息（使用请求锁确保顺序处理）"""
+        """
+        发送输入消息
+
+        同一会话的请求依次执行（等待中的请求按优先级排序），不同会话的请求并发执行。
+        """
         if not self.is_connected:
             self.message_received.emit(
                 OutputMessage(
@@ -156,13 +201,16 @@ class MessageBridge(QObject):
             )
             return
 
-        # 使用锁确保同一时间只有一个请求在处理
-        # 这样可以避免多个并发请求导致的响应混淆
-        async with self._request_lock:
-            await self._send_input_internal(msg)
+        session_id = msg.session_id or self.config.session_id or ""
+        await self._scheduler.submit(
+            session_id,
+            lambda: self._send_input_internal(msg),
+            priority=self._request_priority(msg),
+        )
 
     async def _send_input_internal(self, msg: InputMessage):
         """内部发送消息实现"""
+        request_id = ""
         try:
             session_id = msg.session_id or self.config.session_id
 
@@ -178,9 +226,12 @@ class MessageBridge(QObject):
 
             # 生成唯一请求ID
             request_id = self._generate_request_id()
-            self._current_request_id = request_id
+            self._active_requests[request_id] = session_id
             logger.debug(f"发送请求: {request_id}, 类型: {msg.msg_type}")
 
+            # 每个请求的响应都带上自己的路由信息，并发请求的响应不会混淆
+            route = {"proactive": bool(msg.metadata.get("proactive"))}
+
             # 根据消息类型发送
             streaming = self.config.server.enable_streaming
 
@@ -190,9 +241,11 @@ class MessageBridge(QObject):
                     session_id=session_id,
                     text=msg.content,
                     enable_streaming=streaming,
+                    request_id=request_id,
+                    event_types=self.SSE_EVENT_TYPES,
                 ):
                     logger.debug(f"收到 SSE 事件: type={event.event_type}")
-                    self._handle_sse_event(event, session_id, request_id)
+                    self._handle_sse_event(event, session_id, request_id, route)
                     await asyncio.sleep(0)
 
             elif msg.msg_type in ("image", "screenshot"):
@@ -201,8 +254,10 @@ class MessageBridge(QObject):
                     image_path=msg.content,
                     text=msg.metadata.get("text", ""),
                     enable_streaming=streaming,
+                    request_id=request_id,
+                    event_types=self.SSE_EVENT_TYPES,
                 ):
-                    self._handle_sse_event(event, session_id, request_id)
+                    self._handle_sse_event(event, session_id, request_id, route)
                     await asyncio.sleep(0)
 
             elif msg.msg_type == "voice":
@@ -210,8 +265,10 @@ class MessageBridge(QObject):
                     session_id=session_id,
                     audio_path=msg.content,
                     enable_streaming=streaming,
+                    request_id=request_id,
+                    event_types=self.SSE_EVENT_TYPES,
                 ):
-                    self._handle_sse_event(event, session_id, request_id)
+                    self._handle_sse_event(event, session_id, request_id, route)
                     await asyncio.sleep(0)
 
             elif msg.msg_type == "file":
@@ -220,8 +277,22 @@ class MessageBridge(QObject):
                     file_path=msg.content,
                     text=msg.metadata.get("text", ""),
                     enable_streaming=streaming,
+                    request_id=request_id,
+                    event_types=self.SSE_EVENT_TYPES,
                 ):
-                    self._handle_sse_event(event, session_id, request_id)
+                    self._handle_sse_event(event, session_id, request_id, route)
+                    await asyncio.sleep(0)
+
+            elif msg.msg_type == "attachments":
+                async for event in self.api_client.send_attachments_message(
+                    session_id=session_id,
+                    attachments=msg.content,
+                    text=msg.metadata.get("text", ""),
+                    enable_streaming=streaming,
+                    request_id=request_id,
+                    event_types=self.SSE_EVENT_TYPES,
+                ):
+                    self._handle_sse_event(event, session_id, request_id, route)
                     await asyncio.sleep(0)
 
             logger.debug(f"请求完成: {request_id}")
@@ -236,15 +307,36 @@ class MessageBridge(QObject):
                 )
             )
         finally:
-            # 清除当前请求ID
-            self._current_request_id = None
+            if request_id:
+                self._active_requests.pop(request_id, None)
 
     def _handle_sse_event(
-        self, event: SSEEvent, session_id: str, request_id: Optional[str] = None
+        self,
+        event: SSEEvent,
+        session_id: str,
+        request_id: Optional[str] = None,
+        route: Optional[dict] = None,
     ):
-        """处理 SSE 事件并发射信号"""
+        """
+        处理 SSE 事件并发射信号
+
+        Args:
+            event: SSE 事件
+            session_id: 请求所属的会话
+            request_id: 请求 ID
+            route: 请求的路由信息（例如是否为主动对话），添加到发出消息的元数据中
+        """
+        # 丢弃不属于当前请求的事件，避免响应错位
+        if event.request_id and request_id and event.request_id != request_id:
+            logger.warning(
+                f"丢弃不属于当前请求的 SSE 事件: {event.request_id} != {request_id}"
+            )
+            return
+
         # 将请求ID添加到元数据中，用于追踪
         base_metadata = {"request_id": request_id} if request_id else {}
+        if route:
+            base_metadata.update(route)
 
         if event.event_type == "plain":
             # 检查内容是否为空，避免发送空消息
@@ -13,6 +13,8 @@ from dataclasses import dataclass, field, asdict
 from typing import Optional
 from pathlib import Path
 
+from .utils.atomic_write import atomic_open
+
 
 # ============ 敏感信息加密/解密 ============
 
@@ -75,6 +77,9 @@ class ServerConfig:
     request_timeout: int = 30  # 秒
     # 是否启用流式输出
     enable_streaming: bool = True
+    # SSE 传输模式: "pooled" 复用连接（支持时使用 HTTP/2 多路复用），
+    # "isolated" 每条消息使用独立连接（旧版行为）
+    sse_transport: str = "pooled"
     # [已废弃] WebSocket 服务端口。默认为 6190，表示复用 API 端口 (统一端口模式)。
     # 如果设置为其他值，将尝试连接该特定端口 (兼容旧版插件)。
     ws_port: int = 6190
@@ -147,6 +152,7 @@ class ChatWindowConfig:
     window_height: int = 600
     font_size: int = 14
     show_timestamp: bool = True
+    stream_flush_interval_ms: int = 0  # 流式响应刷新间隔（毫秒），0 表示每个显示帧刷新一次
 
 
 @dataclass
@@ -253,6 +259,15 @@ class StorageConfig:
     image_save_path: str = ""
     # 聊天记录保存路径
     chat_history_path: str = ""
+    # 聊天记录存储后端: "journal" = 快照 + 追加写日志, "json" = 旧版单文件 JSON,
+    # "sqlite" = SQLite 数据库（适合上万条消息的大量历史记录）
+    chat_history_backend: str = "journal"
+    # 聊天记录自动保存的防抖时间（毫秒），流式响应期间的多次修改合并为一次写入
+    chat_history_save_debounce_ms: int = 500
+    # 聊天记录自动保存的最大延迟（毫秒），持续修改时最多等待该时间就写入一次
+    chat_history_save_max_latency_ms: int = 3000
+    # 媒体文件缓存大小上限（MB），超出时淘汰最久未使用的文件
+    media_cache_max_mb: int = 1024
 
     @property
     def resolved_image_save_path(self) -> Path:
@@ -311,6 +326,10 @@ class ProactiveDialogConfig:
     screenshot_width: int = 800
     # 截图压缩高度
     screenshot_height: int = 600
+    # 截图编码格式: "jpeg" / "webp" / "png"
+    screenshot_format: str = "jpeg"
+    # 截图质量预设: "fast" = 最快, "balanced" = 平衡, "quality" = 画质优先（更慢、更大）
+    screenshot_quality: str = "balanced"
     # AI响应最大token数
     max_response_tokens: int = 50
     # 主动对话提示词模板
@@ -558,7 +577,8 @@ class ClientConfig:
                 if data["server"].get("token"):
                     data["server"]["token"] = _obfuscate(data["server"]["token"])
 
-                with open(path, "w", encoding="utf-8") as f:
+                # 先写临时文件再替换，写入中途崩溃不会留下截断的配置文件
+                with atomic_open(str(path), "w", encoding="utf-8") as f:
                     json.dump(data, f, indent=2, ensure_ascii=False)
 
                 logger.debug(f"配置已成功保存到: {path}")
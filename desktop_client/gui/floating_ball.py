@@ -9,12 +9,15 @@
 - 双击打开对话窗口
 - 右键菜单
 - 聊天记录持久化和跨窗口同步
+- 聊天记录全文搜索
 """
 
-from typing import Optional, Set
+from typing import List, Optional, Set
+import html
 import os
 import sys
 import math
+import time
 from enum import Enum
 
 from PySide6.QtCore import (
@@ -39,6 +42,8 @@ from PySide6.QtGui import (
     QPainterPath,
     QImage,
     QCursor,
+    QKeySequence,
+    QShortcut,
 )
 from PySide6.QtWidgets import (
     QWidget,
@@ -52,6 +57,9 @@ from PySide6.QtWidgets import (
     QSizePolicy,
     QScrollArea,
     QFileDialog,
+    QLineEdit,
+    QListWidget,
+    QListWidgetItem,
 )
 from ..services.screen_capture import ScreenCaptureService
 from .themes import theme_manager, Theme
@@ -65,6 +73,8 @@ from .chat_widgets import (
 )
 from .markdown_utils import MarkdownLabel
 from ..services import get_chat_history_manager, ChatMessage
+from ..services.chat_export import ChatExportTask
+from ..services.chat_search import SearchResult
 
 
 # macOS 窗口置顶支持
@@ -162,6 +172,14 @@ class CompactChatWindow(QWidget):
     window_moved = Signal(int, int)  # delta_x, delta_y - 窗口移动时发射
     window_resized = Signal()  # 窗口大小改变时发射
 
+    # 历史记录分页：每页消息数，以及滚动到距顶部多少像素内时加载更早的消息
+    HISTORY_PAGE_SIZE = 20
+    HISTORY_LOAD_THRESHOLD = 40
+
+    # 搜索：输入停顿多久后开始搜索（毫秒）、最大结果数
+    SEARCH_DELAY_MS = 200
+    SEARCH_RESULT_LIMIT = 20
+
     def __init__(self, parent=None, max_history: int = 50, config=None):
         super().__init__(parent)
         self._config = config
@@ -201,8 +219,23 @@ class CompactChatWindow(QWidget):
         self._history_loaded = False
         self._history_loading = False
 
+        # 历史记录分页状态：首次只渲染最近一页，向上滚动时再加载更早的消息
+        self._oldest_loaded_id = ""  # 已显示的最早一条历史消息 ID（分页游标）
+        self._has_older_history = False
+        self._loading_older = False
+        # 跳转到搜索结果后显示的是较早的一段消息，向下滚动时继续加载更晚的消息
+        self._newest_loaded_id = ""  # 已显示的最晚一条消息 ID（仅 _has_newer_history 时使用）
+        self._has_newer_history = False
+        self._loading_newer = False
+        self._display_limit = max_history  # 当前最多显示的消息数，加载更早消息时扩大
+        self._insert_index: Optional[int] = None  # 非 None 时消息插入到该位置
+        self._scroll_anchor: Optional[int] = None  # 插入后需要保持的距底部距离
+        self._rendering_message_id = ""  # 正在渲染的历史消息 ID
+
         # 聊天记录管理器
-        self._chat_history = get_chat_history_manager()
+        self._chat_history = get_chat_history_manager(
+            backend=config.storage.chat_history_backend if config else ""
+        )
 
         # 自定义头像路径
         self._user_avatar_path = ""
@@ -257,6 +290,15 @@ class CompactChatWindow(QWidget):
 
         title_bar_layout.addStretch()
 
+        # 搜索按钮
+        self._search_btn = QPushButton()
+        self._search_btn.setObjectName("compactSearchBtn")
+        self._search_btn.setFixedSize(24, 24)
+        self._search_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self._search_btn.setToolTip("搜索聊天记录 (Ctrl+F)")
+        self._search_btn.clicked.connect(self._toggle_search)
+        title_bar_layout.addWidget(self._search_btn)
+
         # 清空对话按钮
         self._clear_btn = QPushButton()
         self._clear_btn.setObjectName("compactClearBtn")
@@ -281,6 +323,41 @@ class CompactChatWindow(QWidget):
         content_layout.setContentsMargins(12, 4, 12, 12)
         content_layout.setSpacing(8)
 
+        # 搜索栏（隐藏）：搜索框 + 结果列表
+        self._search_frame = QFrame()
+        self._search_frame.setVisible(False)
+        search_layout = QVBoxLayout(self._search_frame)
+        search_layout.setContentsMargins(0, 4, 0, 0)
+        search_layout.setSpacing(4)
+
+        self._search_input = QLineEdit()
+        self._search_input.setObjectName("compactSearchInput")
+        self._search_input.setPlaceholderText("搜索聊天记录...")
+        self._search_input.setClearButtonEnabled(True)
+        self._search_input.textChanged.connect(self._on_search_text_changed)
+        self._search_input.returnPressed.connect(self._on_search_submitted)
+        search_layout.addWidget(self._search_input)
+
+        self._search_results = QListWidget()
+        self._search_results.setObjectName("compactSearchResults")
+        self._search_results.setMaximumHeight(180)
+        self._search_results.setVisible(False)
+        self._search_results.setHorizontalScrollBarPolicy(
+            Qt.ScrollBarPolicy.ScrollBarAlwaysOff
+        )
+        self._search_results.itemClicked.connect(self._on_search_result_clicked)
+        search_layout.addWidget(self._search_results)
+
+        content_layout.addWidget(self._search_frame)
+
+        # 输入停顿后再搜索，避免每个按键都查询
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.timeout.connect(self._run_search)
+
+        self._search_shortcut = QShortcut(QKeySequence(QKeySequence.StandardKey.Find), self)
+        self._search_shortcut.activated.connect(self._toggle_search)
+
         # 2. 消息历史区域
         self._scroll_area = QScrollArea()
         self._scroll_area.setObjectName("compactScroll")
@@ -292,6 +369,9 @@ class CompactChatWindow(QWidget):
         self._scroll_area.setVerticalScrollBarPolicy(
             Qt.ScrollBarPolicy.ScrollBarAsNeeded
         )
+        scrollbar = self._scroll_area.verticalScrollBar()
+        scrollbar.valueChanged.connect(self._on_history_scrolled)
+        scrollbar.rangeChanged.connect(self._on_history_range_changed)
 
         # 设置初始大小，不限制最小尺寸
         # self.setMinimumWidth(300)
@@ -402,6 +482,7 @@ class CompactChatWindow(QWidget):
         self._chat_history.message_updated.connect(self._on_history_message_updated)
         self._chat_history.messages_cleared.connect(self._on_history_cleared)
         self._chat_history.history_loaded.connect(self._on_history_loaded)
+        self._chat_history.search_index_ready.connect(self._on_search_index_ready)
 
         # 历史记录将由 FloatingBallWindow 在头像设置完成后统一加载
         # 移除这里的延迟加载，避免与 FloatingBallWindow 中的 reload_history_display 产生竞态条件
@@ -473,6 +554,53 @@ class CompactChatWindow(QWidget):
         self._close_btn.setIcon(icon_manager.get_icon("close", c.text_secondary, 14))
         self._close_btn.setIconSize(QSize(14, 14))
 
+        # 搜索按钮
+        self._search_btn.setStyleSheet(f"""
+            QPushButton#compactSearchBtn {{
+                background: transparent;
+                border: none;
+                border-radius: 12px;
+            }}
+            QPushButton#compactSearchBtn:hover {{
+                background-color: {c.bg_hover};
+            }}
+        """)
+        self._search_btn.setIcon(icon_manager.get_icon("search", c.text_secondary, 14))
+        self._search_btn.setIconSize(QSize(14, 14))
+
+        # 搜索框和结果列表
+        self._search_input.setStyleSheet(f"""
+            QLineEdit#compactSearchInput {{
+                background-color: {c.bg_secondary};
+                border: 1px solid {c.border_light};
+                border-radius: {t.border_radius}px;
+                padding: 4px 8px;
+                font-family: {t.font_family};
+                font-size: {t.font_size_base}px;
+                color: {c.text_primary};
+            }}
+            QLineEdit#compactSearchInput:focus {{
+                border: 1px solid {c.primary};
+            }}
+        """)
+        self._search_results.setStyleSheet(f"""
+            QListWidget#compactSearchResults {{
+                background-color: {c.bg_secondary};
+                border: 1px solid {c.border_light};
+                border-radius: {t.border_radius}px;
+                outline: none;
+            }}
+            QListWidget#compactSearchResults::item {{
+                border-bottom: 1px solid {c.border_light};
+            }}
+            QListWidget#compactSearchResults::item:hover,
+            QListWidget#compactSearchResults::item:selected {{
+                background-color: {c.bg_hover};
+            }}
+        """)
+        if self._search_results.count():
+            self._run_search()
+
         # 清空对话按钮
         self._clear_btn.setStyleSheet(f"""
             QPushButton#compactClearBtn {{
@@ -766,24 +894,10 @@ class CompactChatWindow(QWidget):
         self._history_loading = True
 
         try:
-            # 清空当前显示（保留索引 0 的 stretch）
-            while self._history_layout.count() > 1:
-                item = self._history_layout.itemAt(1)  # 从索引 1 开始删除，保留 stretch
-                if item and item.widget():
-                    w = item.widget()
-                    if w is not None:
-                        self._history_layout.removeWidget(w)
-                        w.deleteLater()
-
-            self._displayed_message_ids.clear()
-            self._message_labels.clear()
-
-            # 重新加载显示
-            messages = self._chat_history.get_messages()
-            print(f"[CompactChatWindow] 加载 {len(messages)} 条历史记录")
+            self._clear_history_widgets()
 
-            for msg in messages:
-                self._display_message_from_history(msg)
+            # 重新加载显示（只渲染最近一页）
+            self._display_latest_page()
 
             self._history_loaded = True
             self._scroll_to_bottom()
@@ -804,25 +918,166 @@ class CompactChatWindow(QWidget):
         self._history_loading = True
 
         try:
-            # 显示已有的消息
-            messages = self._chat_history.get_messages()
-            print(f"[CompactChatWindow] _load_history: 加载 {len(messages)} 条消息")
+            # 显示已有的消息（只渲染最近一页）
+            self._display_latest_page()
 
+            self._history_loaded = True
+            self._scroll_to_bottom()
+
+        finally:
+            self._history_loading = False
+
+    def _clear_history_widgets(self):
+        """清空当前显示的消息（保留索引 0 的 stretch）"""
+        while self._history_layout.count() > 1:
+            item = self._history_layout.itemAt(1)  # 从索引 1 开始删除，保留 stretch
+            if item and item.widget():
+                w = item.widget()
+                if w is not None:
+                    self._history_layout.removeWidget(w)
+                    w.deleteLater()
+
+        self._displayed_message_ids.clear()
+        self._message_labels.clear()
+
+    def _display_latest_page(self):
+        """显示最近一页历史记录，并重置分页状态"""
+        messages = self._chat_history.get_messages(self.HISTORY_PAGE_SIZE)
+        print(f"[CompactChatWindow] 加载最近 {len(messages)} 条历史记录")
+
+        self._display_limit = self._max_history
+        self._oldest_loaded_id = messages[0].id if messages else ""
+        self._has_older_history = len(messages) >= self.HISTORY_PAGE_SIZE
+        self._newest_loaded_id = ""
+        self._has_newer_history = False
+
+        for msg in messages:
+            self._display_message_from_history(msg)
+
+    def _load_older_history(self):
+        """加载并在顶部插入更早的一页历史记录"""
+        if (
+            self._loading_older
+            or self._history_loading
+            or not self._has_older_history
+            or not self._oldest_loaded_id
+        ):
+            return
+
+        self._loading_older = True
+        try:
+            messages = self._chat_history.get_messages_before(
+                self._oldest_loaded_id, self.HISTORY_PAGE_SIZE
+            )
+            self._has_older_history = len(messages) >= self.HISTORY_PAGE_SIZE
+            if not messages:
+                return
+
+            # 记录插入前距底部的距离，插入后恢复，避免视图跳动
+            scrollbar = self._scroll_area.verticalScrollBar()
+            self._scroll_anchor = scrollbar.maximum() - scrollbar.value()
+
+            self._insert_index = 1  # 索引 0 是 stretch
             for msg in messages:
                 self._display_message_from_history(msg)
 
-            self._history_loaded = True
-            self._scroll_to_bottom()
+            self._oldest_loaded_id = messages[0].id
+            self._display_limit = max(
+                self._display_limit, self._history_layout.count() - 1
+            )
+        finally:
+            self._insert_index = None
+            self._loading_older = False
+
+    def _load_newer_history(self):
+        """在底部追加更晚的一页历史记录（跳转到较早的消息之后）"""
+        if (
+            self._loading_newer
+            or self._history_loading
+            or not self._has_newer_history
+            or not self._newest_loaded_id
+        ):
+            return
+
+        self._loading_newer = True
+        try:
+            messages = self._chat_history.get_messages_after(
+                self._newest_loaded_id, self.HISTORY_PAGE_SIZE
+            )
+            self._has_newer_history = len(messages) >= self.HISTORY_PAGE_SIZE
+            if not messages:
+                return
 
+            # 按插入方式追加到末尾：不裁剪顶部的消息，也不自动滚动到底部
+            self._insert_index = self._history_layout.count()
+            for msg in messages:
+                self._display_message_from_history(msg)
+
+            self._newest_loaded_id = messages[-1].id
+            self._display_limit = max(
+                self._display_limit, self._history_layout.count() - 1
+            )
         finally:
+            self._insert_index = None
+            self._loading_newer = False
+
+    def _display_history_window(self, messages: List[ChatMessage]):
+        """替换当前显示为一段较早的消息（跳转到不在当前显示范围内的搜索结果）"""
+        self._history_loading = True
+        try:
+            self._clear_history_widgets()
+
+            latest = self._chat_history.get_last_message()
+            self._display_limit = max(self._max_history, len(messages))
+            self._oldest_loaded_id = messages[0].id
+            self._has_older_history = True  # 已到最早的消息时，下次加载得到空页
+            self._newest_loaded_id = messages[-1].id
+            self._has_newer_history = latest is not None and latest.id != messages[-1].id
+
+            self._insert_index = 1  # 索引 0 是 stretch
+            for msg in messages:
+                self._display_message_from_history(msg)
+        finally:
+            self._insert_index = None
             self._history_loading = False
 
+    def _on_history_scrolled(self, value: int):
+        """滚动到顶部附近时加载更早的消息，跳转后滚动到底部附近时加载更晚的消息"""
+        if not self._history_loaded:
+            return
+        maximum = self._scroll_area.verticalScrollBar().maximum()
+        if (
+            value <= self.HISTORY_LOAD_THRESHOLD
+            and self._has_older_history
+            and maximum > 0
+        ):
+            QTimer.singleShot(0, self._load_older_history)
+        elif value >= maximum - self.HISTORY_LOAD_THRESHOLD and self._has_newer_history:
+            QTimer.singleShot(0, self._load_newer_history)
+
+    def _on_history_range_changed(self, minimum: int, maximum: int):
+        """在顶部插入消息后保持原来的可见位置"""
+        if self._scroll_anchor is not None:
+            self._scroll_area.verticalScrollBar().setValue(maximum - self._scroll_anchor)
+            self._scroll_anchor = None
+
     def _display_message_from_history(self, msg: ChatMessage):
         """从历史记录中显示消息（不会再次添加到历史记录）"""
         if msg.id in self._displayed_message_ids:
             return  # 已经显示过了
 
         self._displayed_message_ids.add(msg.id)
+        if not self._oldest_loaded_id:
+            self._oldest_loaded_id = msg.id
+
+        self._rendering_message_id = msg.id
+        try:
+            self._render_history_message(msg)
+        finally:
+            self._rendering_message_id = ""
+
+    def _render_history_message(self, msg: ChatMessage):
+        """根据消息类型创建对应的消息组件"""
 
         if msg.role == "user":
             # 用户消息
@@ -1013,7 +1268,7 @@ class CompactChatWindow(QWidget):
         layout.addStretch()
         container.adjustSize()
 
-        self._add_to_history(container)
+        self._add_to_history(container, message_id=message_id)
 
         return md_label
 
@@ -1214,10 +1469,13 @@ class CompactChatWindow(QWidget):
 
     def _on_history_message_added(self, msg: ChatMessage):
         """处理历史记录管理器发出的消息添加信号"""
-        if msg.id in self._displayed_message_ids:
+        if self._has_newer_history:
+            # 正在查看跳转到的较早消息，回到最新的消息（已包含这条新消息）
+            self.reload_history_display()
+        elif msg.id in self._displayed_message_ids:
             return
-
-        self._display_message_from_history(msg)
+        else:
+            self._display_message_from_history(msg)
         self._scroll_to_bottom()
 
         # 自动播放语音逻辑
@@ -1273,6 +1531,11 @@ class CompactChatWindow(QWidget):
         self._message_labels.clear()
         self._current_ai_label = None
         self._current_ai_message_id = ""
+        self._oldest_loaded_id = ""
+        self._has_older_history = False
+        self._newest_loaded_id = ""
+        self._has_newer_history = False
+        self._display_limit = self._max_history
         self._update_geometry()
 
     def _on_history_loaded(self):
@@ -1300,6 +1563,136 @@ class CompactChatWindow(QWidget):
         self.hide()
         self.closed.emit()
 
+    def _toggle_search(self):
+        """显示 / 隐藏搜索栏"""
+        if self._search_frame.isVisible():
+            self._close_search()
+            return
+        self._search_frame.setVisible(True)
+        self._search_input.setFocus()
+        self._search_input.selectAll()
+
+    def _close_search(self):
+        self._search_timer.stop()
+        self._search_frame.setVisible(False)
+        self._search_results.clear()
+        self._search_results.setVisible(False)
+        self._input.setFocus()
+
+    def _on_search_text_changed(self, text: str):
+        self._search_timer.start(self.SEARCH_DELAY_MS)
+
+    def _run_search(self):
+        """执行搜索并显示结果"""
+        query = self._search_input.text().strip()
+        self._search_results.clear()
+        if not query:
+            self._search_results.setVisible(False)
+            return
+
+        results = self._chat_history.search_messages(query, self.SEARCH_RESULT_LIMIT)
+        self._search_results.setVisible(True)
+        for result in results:
+            self._add_search_result(result)
+
+        # 搜索索引在后台建立，完成后重新搜索（_on_search_index_ready）
+        if self._chat_history.is_search_indexing():
+            notice = "正在建立搜索索引，结果可能不完整..."
+        elif not results:
+            notice = "没有找到匹配的消息"
+        else:
+            return
+        item = QListWidgetItem(notice)
+        item.setFlags(Qt.ItemFlag.NoItemFlags)
+        self._search_results.addItem(item)
+
+    def _on_search_index_ready(self):
+        """搜索索引建立完成后刷新正在显示的搜索结果"""
+        if self._search_frame.isVisible() and self._search_input.text().strip():
+            self._run_search()
+
+    def _add_search_result(self, result: SearchResult):
+        """添加一条搜索结果（摘要中匹配的部分加粗高亮）"""
+        c = theme_manager.get_current_colors()
+        t = theme_manager.current_theme
+        msg = result.message
+
+        parts = []
+        pos = 0
+        for start, end in result.highlights:
+            parts.append(html.escape(result.snippet[pos:start]))
+            parts.append(
+                f'<b style="color: {c.primary};">'
+                f"{html.escape(result.snippet[start:end])}</b>"
+            )
+            pos = end
+        parts.append(html.escape(result.snippet[pos:]))
+
+        sender = "我" if msg.role == "user" else "AI"
+        when = time.strftime("%m-%d %H:%M", time.localtime(msg.timestamp))
+        label = QLabel(
+            f'<span style="color: {c.text_secondary}; font-size: {t.font_size_base - 2}px;">'
+            f"{sender} · {when}</span><br>"
+            f'<span style="color: {c.text_primary};">{"".join(parts)}</span>'
+        )
+        label.setTextFormat(Qt.TextFormat.RichText)
+        label.setWordWrap(True)
+        label.setContentsMargins(8, 4, 8, 4)
+        label.setStyleSheet(
+            f"background: transparent; font-family: {t.font_family}; "
+            f"font-size: {t.font_size_base}px;"
+        )
+        label.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+
+        item = QListWidgetItem()
+        item.setData(Qt.ItemDataRole.UserRole, msg.id)
+        self._search_results.addItem(item)
+        self._search_results.setItemWidget(item, label)
+        label.setFixedWidth(max(100, self._search_results.viewport().width()))
+        item.setSizeHint(label.sizeHint())
+
+    def _on_search_submitted(self):
+        """回车跳转到第一个结果"""
+        if self._search_timer.isActive():
+            self._search_timer.stop()
+            self._run_search()
+        first = self._search_results.item(0)
+        if first is not None:
+            self._on_search_result_clicked(first)
+
+    def _on_search_result_clicked(self, item: QListWidgetItem):
+        message_id = item.data(Qt.ItemDataRole.UserRole)
+        if message_id:
+            self._jump_to_message(message_id)
+
+    def _find_message_widget(self, message_id: str) -> Optional[QWidget]:
+        """查找已显示的消息组件"""
+        for i in range(1, self._history_layout.count()):
+            item = self._history_layout.itemAt(i)
+            w = item.widget() if item else None
+            if w is not None and w.property("message_id") == message_id:
+                return w
+        return None
+
+    def _jump_to_message(self, message_id: str):
+        """滚动到指定消息；消息尚未显示时改为显示它前后的一页消息"""
+        if self._find_message_widget(message_id) is None:
+            messages = self._chat_history.get_messages_around(
+                message_id, self.HISTORY_PAGE_SIZE
+            )
+            if not messages:
+                print(f"[CompactChatWindow] 未找到搜索结果对应的消息: {message_id}")
+                return
+            self._display_history_window(messages)
+
+        # 等待新插入的消息完成布局后再滚动
+        QTimer.singleShot(50, lambda: self._scroll_to_message(message_id))
+
+    def _scroll_to_message(self, message_id: str):
+        widget = self._find_message_widget(message_id)
+        if widget is not None:
+            self._scroll_area.ensureWidgetVisible(widget, 0, 40)
+
     def _on_clear_history(self):
         """清空对话记录"""
         self._chat_history.clear_history()
@@ -1623,7 +2016,9 @@ class CompactChatWindow(QWidget):
         container.adjustSize()
         self._add_to_history(container)
 
-    def _add_to_history(self, widget: QWidget, is_image: bool = False):
+    def _add_to_history(
+        self, widget: QWidget, is_image: bool = False, message_id: str = ""
+    ):
         # 设置widget的大小策略（图片消息保持 Fixed 高度）
         if not is_image:
             widget.setSizePolicy(
@@ -1632,22 +2027,53 @@ class CompactChatWindow(QWidget):
         # 如果是图片消息，保留其 Fixed 高度策略
         # widget.setMaximumWidth(340)  # 限制最大宽度，避免横向滚动条
 
+        # 记录组件对应的消息 ID，被移除时用于更新分页游标
+        message_id = message_id or self._rendering_message_id
+        if message_id:
+            widget.setProperty("message_id", message_id)
+
+        if self._insert_index is not None:
+            # 加载更早的消息：按顺序插入到顶部，不滚动到底部
+            self._history_layout.insertWidget(self._insert_index, widget)
+            self._insert_index += 1
+            QTimer.singleShot(10, self._update_geometry)
+            return
+
         # 直接添加到布局末尾（stretch 在开头，消息在后面）
         self._history_layout.addWidget(widget)
 
         # 限制历史数量（从 stretch 后的第一个 widget 开始删除，即索引 1）
-        while self._history_layout.count() > self._max_history + 1:  # +1 for stretch
+        trimmed = False
+        while self._history_layout.count() > self._display_limit + 1:  # +1 for stretch
             item = self._history_layout.itemAt(1)  # 跳过 stretch（索引 0）
             if item:
                 w = item.widget()
                 if w:
+                    removed_id = w.property("message_id")
+                    if removed_id:
+                        self._displayed_message_ids.discard(removed_id)
+                        self._message_labels.pop(removed_id, None)
                     self._history_layout.removeWidget(w)
                     w.deleteLater()
+                    trimmed = True
+        if trimmed:
+            self._update_oldest_loaded_id()
 
         # 延迟更新布局，确保widget已完成布局
         QTimer.singleShot(10, self._update_geometry)
         QTimer.singleShot(50, self._scroll_to_bottom)
 
+    def _update_oldest_loaded_id(self):
+        """旧消息组件被移除后，将分页游标更新为当前显示的最早一条消息"""
+        for i in range(1, self._history_layout.count()):
+            item = self._history_layout.itemAt(i)
+            w = item.widget() if item else None
+            message_id = w.property("message_id") if w else None
+            if message_id:
+                self._oldest_loaded_id = message_id
+                self._has_older_history = True
+                return
+
     def _update_geometry(self):
         """根据内容自适应调整窗口高度（仅在未手动调整大小时）"""
         # 如果用户已经手动调整过大小，尊重用户的选择
@@ -1823,6 +2249,10 @@ class CompactChatWindow(QWidget):
                 self._current_ai_message_id, self._current_ai_message
             )
 
+        # 增量渲染的结果替换为完整渲染的结果
+        if isinstance(self._current_ai_label, MarkdownLabel):
+            self._current_ai_label.finish_streaming()
+
         self._current_ai_label = None
         self._current_ai_message_id = ""
 
@@ -1830,7 +2260,10 @@ class CompactChatWindow(QWidget):
         self._chat_history.save_to_file()
 
     def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_Escape:
+        if event.key() == Qt.Key.Key_Escape and self._search_frame.isVisible():
+            self._close_search()
+            event.accept()
+        elif event.key() == Qt.Key.Key_Escape:
             self.hide()
             event.accept()
         else:
@@ -1944,6 +2377,9 @@ class FloatingBallWindow(QWidget):
             elif isinstance(appearance, dict) and "avatar_path" in appearance:
                 self._load_avatar(appearance["avatar_path"])
 
+        # 正在进行的聊天记录导出任务
+        self._export_task: Optional[ChatExportTask] = None
+
         # 精简版对话窗口
         self._compact_window = CompactChatWindow(config=self.config)
         self._compact_window.message_sent.connect(self.message_sent)
@@ -2490,6 +2926,15 @@ class FloatingBallWindow(QWidget):
 
         menu.addSeparator()
 
+        # 导出聊天记录（导出进行中时可以取消）
+        if self._export_task is not None and self._export_task.is_running():
+            export_action = menu.addAction("取消导出")
+            export_action.triggered.connect(self._export_task.cancel)
+        else:
+            export_action = menu.addAction("导出聊天记录")
+            export_action.triggered.connect(self._on_export_history)
+        export_action.setIcon(icon_manager.get_icon("download", c.text_primary, 16))
+
         # 主题子菜单
         theme_menu = menu.addMenu("切换主题")
         theme_menu.setIcon(icon_manager.get_icon("theme", c.text_primary, 16))
@@ -2594,6 +3039,46 @@ class FloatingBallWindow(QWidget):
         if screenshot_path:
             self.screenshot_requested.emit(screenshot_path)
 
+    def _on_export_history(self):
+        """导出聊天记录（在后台线程中写入文件）"""
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "导出聊天记录",
+            "chat_history.md",
+            "Markdown (*.md);;HTML (*.html);;JSON Lines (*.jsonl);;"
+            "JSON (*.json);;纯文本 (*.txt)",
+        )
+        if not file_path:
+            return
+
+        # 没有扩展名时按所选过滤器补全
+        if not os.path.splitext(file_path)[1]:
+            file_path += selected_filter[selected_filter.find("*") + 1 : -1]
+
+        # 在任务启动前连接信号，消息较少时导出会很快完成
+        self._export_task = self._compact_window._chat_history.start_export(
+            file_path,
+            on_progress=self._on_export_progress,
+            on_finished=self._on_export_finished,
+        )
+        self.show_system_message(f"正在导出聊天记录: {os.path.basename(file_path)}")
+
+    def _on_export_progress(self, exported: int, total: int):
+        """导出进度（显示在悬浮球提示中）"""
+        if total > 0:
+            self.setToolTip(f"正在导出聊天记录 {exported * 100 // total}%")
+        else:
+            self.setToolTip(f"正在导出聊天记录 {exported} 条")
+
+    def _on_export_finished(self, success: bool, message: str):
+        """导出结束"""
+        self._export_task = None
+        self.setToolTip("")
+        if success:
+            self.show_system_message(f"聊天记录已导出到: {message}")
+        else:
+            self.show_system_message(f"导出聊天记录失败: {message}")
+
     def show_bubble(self, text: str, duration: int = 0):
         """显示气泡 (实际显示在精简窗口中)"""
         self._update_compact_window_position()
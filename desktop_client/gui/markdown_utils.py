@@ -4,12 +4,25 @@ Markdown 渲染工具
 """
 
 import os
+import re
 import base64
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import astuple, asdict, dataclass
+from html import escape
+from typing import Any, Dict, Optional, Tuple
+import logging
 import markdown
 from PySide6.QtWidgets import QTextBrowser
 from PySide6.QtGui import QDesktopServices, QPixmap
-from PySide6.QtCore import QUrl, Qt, QTimer
+from PySide6.QtCore import QObject, QUrl, Qt, QTimer, Signal, Slot
 from .themes import theme_manager, ThemeType
+from ..utils.byte_cache import ByteLRUCache
+from ..utils.markdown_stream import IncrementalMarkdownRenderer
+
+logger = logging.getLogger(__name__)
 
 
 class MarkdownLabel(QTextBrowser):
@@ -43,6 +56,9 @@ class MarkdownLabel(QTextBrowser):
 
         self._role = role
         self._original_text = ""  # 保存原始 Markdown 文本用于主题更新
+        self._renderer: Optional[IncrementalMarkdownRenderer] = None  # 流式响应的增量渲染器
+        self._render_generation = 0  # 每次请求渲染时加 1，后台返回的旧结果直接丢弃
+        self._has_html = False  # 是否已显示渲染好的 HTML（否则显示的是纯文本占位）
         self._adjusting_height = False  # 防止递归调用
 
         # 应用主题样式（设置默认文字颜色）
@@ -51,9 +67,65 @@ class MarkdownLabel(QTextBrowser):
         self.set_markdown(text)
 
     def set_markdown(self, text: str):
-        """设置 Markdown 文本"""
+        """设置 Markdown 文本
+
+        渲染在后台线程中进行，完成前显示纯文本（已有渲染结果时保留旧的结果）。
+        文本是当前文本的延续（流式响应）时增量渲染，只重新渲染末尾未完成的块。
+        """
+        if text == self._original_text and self._original_text:
+            return
+        streaming = bool(self._original_text) and text.startswith(self._original_text)
         self._original_text = text  # 保存原始文本
-        html = MarkdownUtils.render(text, self._role)
+        if streaming:
+            if self._renderer is None:
+                self._renderer = MarkdownUtils.create_incremental_renderer(self._role)
+        else:
+            self._renderer = None
+        self._request_render(self._renderer)
+
+    def finish_streaming(self):
+        """流式响应结束：对完整文本渲染一次，结果与从历史记录重新加载时相同
+
+        增量渲染按块分别渲染，跨块的引用式链接、松散列表等与完整渲染结果不同。
+        完整渲染的结果返回前保留增量渲染的结果。
+        """
+        if self._renderer is None:
+            return
+        self._renderer = None
+        if self._original_text:
+            self._request_render()
+
+    def _request_render(self, renderer: Optional[IncrementalMarkdownRenderer] = None):
+        """请求渲染当前文本"""
+        text = self._original_text
+        self._render_generation += 1
+        worker = get_render_worker()
+
+        if renderer is None and MarkdownUtils.is_cached(text, self._role):
+            # 缓存命中（例如重新加载历史记录）直接显示
+            worker.stats.sync_hits += 1
+            self._apply_html(MarkdownUtils.render(text, self._role))
+            return
+
+        if not self._has_html:
+            self.setPlainText(text)
+            QTimer.singleShot(10, self._adjust_size)
+        worker.submit(self, self._render_generation, text, self._role, renderer)
+
+    def _apply_render(self, generation: int, html: str) -> bool:
+        """
+        显示后台渲染的结果
+
+        Returns:
+            结果是否仍是最新的（过期的结果被丢弃）
+        """
+        if generation != self._render_generation:
+            return False
+        self._apply_html(html)
+        return True
+
+    def _apply_html(self, html: str):
+        self._has_html = True
         self.setHtml(html)
         # 延迟调整尺寸，确保布局完成后再计算
         # 使用更长的延迟确保 maximumWidth 已被设置
@@ -95,16 +167,16 @@ class MarkdownLabel(QTextBrowser):
         """更新主题 - 重新渲染内容以应用新主题颜色"""
         # 先更新组件的默认文字颜色样式
         self._apply_theme_style()
+        # 代码高亮配色可能已改变，之后的流式更新重新创建增量渲染器
+        self._renderer = None
 
         if self._original_text:
-            html = MarkdownUtils.render(self._original_text, self._role)
-            self.setHtml(html)
+            # 新主题的渲染结果返回前保留旧的结果
+            self._request_render()
             # 强制刷新样式
             self.style().unpolish(self)
             self.style().polish(self)
             self.update()
-            # 延迟调整尺寸以适应内容
-            QTimer.singleShot(0, self._adjust_size)
 
     def resizeEvent(self, event):
         """窗口大小改变时重新计算尺寸"""
@@ -263,6 +335,92 @@ class MarkdownLabel(QTextBrowser):
         dialog.exec()
 
 
+# 每个线程复用各自的 Markdown 实例（实例不是线程安全的，创建时加载扩展开销较大）
+_markdown_local = threading.local()
+
+
+def _get_markdown(pygments_style: str) -> markdown.Markdown:
+    instances = getattr(_markdown_local, "instances", None)
+    if instances is None:
+        instances = _markdown_local.instances = {}
+    md = instances.get(pygments_style)
+    if md is None:
+        md = markdown.Markdown(
+            extensions=[
+                "fenced_code",
+                "codehilite",
+                "tables",
+                "nl2br",
+                "sane_lists",
+            ],
+            extension_configs={
+                "codehilite": {
+                    "noclasses": True,
+                    "pygments_style": pygments_style,
+                    "use_pygments": True,
+                    "css_class": "codehilite",
+                }
+            },
+        )
+        instances[pygments_style] = md
+    return md
+
+
+def _replace_img(match) -> str:
+    img_tag = match.group(0)
+    src_match = re.search(r'src="([^"]+)"', img_tag)
+    if src_match:
+        src = src_match.group(1)
+        return f'<a href="{src}">{img_tag}</a>'
+    return img_tag
+
+
+def _convert_markdown(text: str, pygments_style: str) -> str:
+    """Markdown 转 HTML（不缓存，用于流式响应中不断变化的末尾块）"""
+    md = _get_markdown(pygments_style)
+    try:
+        html_content = md.reset().convert(text)
+    except Exception:
+        # 出错后实例状态可能不完整，丢弃重建
+        _markdown_local.instances.pop(pygments_style, None)
+        raise
+
+    # 后处理：给图片添加链接，以便支持点击预览
+    # 查找 <img src="..."> 并替换为 <a href="..."><img src="..."></a>
+    return re.sub(r"<img[^>]+>", _replace_img, html_content)
+
+
+# 渲染缓存容量（字节）
+HTML_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 完整消息 HTML（含样式表）
+BODY_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Markdown 片段 HTML
+
+# 完整消息 HTML，键为 (内容摘要, 角色, 主题指纹)
+_html_cache = ByteLRUCache(HTML_CACHE_MAX_BYTES)
+# Markdown 片段 HTML（流式响应的已完成块、导出），键为 (内容摘要, 代码高亮样式)
+_body_cache = ByteLRUCache(BODY_CACHE_MAX_BYTES)
+
+# 每个主题、角色的样式表只生成一次，键为 (主题指纹, 角色)
+_css_cache: Dict[Tuple[str, str], str] = {}
+_CSS_CACHE_MAX_ENTRIES = 64
+
+# 上一次计算的主题指纹：(主题对象, 颜色对象, 指纹)
+_fingerprint_memo: Optional[Tuple[Any, Any, str]] = None
+
+
+def _content_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def _render_markdown(text: str, pygments_style: str, digest: Optional[bytes] = None) -> str:
+    """Markdown 转 HTML（结果只取决于文本和代码高亮样式，可以缓存）"""
+    key = (digest or _content_digest(text), pygments_style)
+    html_content = _body_cache.get(key)
+    if html_content is None:
+        html_content = _convert_markdown(text, pygments_style)
+        _body_cache.put(key, html_content)
+    return html_content
+
+
 class MarkdownUtils:
     """Markdown 工具类"""
 
@@ -271,10 +429,153 @@ class MarkdownUtils:
         """
         将 Markdown 文本转换为适合 Qt QTextBrowser 显示的 HTML
 
+        结果按 (内容摘要, 角色, 主题指纹) 缓存，重新加载历史记录或切换回
+        之前的主题时直接复用。
+
         Args:
             text: Markdown 文本
             role: 消息角色 ("user" 或 "assistant")
         """
+        digest = _content_digest(text)
+        key = (digest, role, MarkdownUtils.theme_fingerprint())
+        html = _html_cache.get(key)
+        if html is not None:
+            return html
+
+        try:
+            html_content = _render_markdown(text, MarkdownUtils._pygments_style(role), digest)
+        except Exception:
+            return f"<p>{text}</p>"
+
+        html = f"{MarkdownUtils.render_css(role)}<div>{html_content}</div>"
+        _html_cache.put(key, html)
+        return html
+
+    @staticmethod
+    def render_plain(text: str) -> str:
+        """将文本转义后按纯文本显示（渲染失败时使用）"""
+        return "<p>" + escape(text).replace("\n", "<br>") + "</p>"
+
+    @staticmethod
+    def is_cached(text: str, role: str = "assistant") -> bool:
+        """当前主题下 text 的渲染结果是否已缓存"""
+        return (_content_digest(text), role, MarkdownUtils.theme_fingerprint()) in _html_cache
+
+    @staticmethod
+    def theme_fingerprint() -> str:
+        """
+        当前主题的指纹
+
+        由主题名称、类型、字体和生效的颜色（包括自定义颜色）计算，
+        任何影响渲染结果的主题设置变化时指纹都会改变。
+        """
+        global _fingerprint_memo
+        theme = theme_manager.current_theme
+        colors = theme_manager.get_current_colors()
+        memo = _fingerprint_memo
+        if memo is not None and memo[0] is theme and memo[1] is colors:
+            return memo[2]
+
+        state = (
+            theme.name,
+            theme.type.value,
+            theme.font_family,
+            theme.font_size_base,
+            theme.font_size_large,
+            astuple(colors),
+        )
+        fingerprint = hashlib.blake2b(repr(state).encode("utf-8"), digest_size=8).hexdigest()
+        _fingerprint_memo = (theme, colors, fingerprint)
+        return fingerprint
+
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """获取渲染缓存统计（命中 / 未命中次数、占用字节数）"""
+        return {
+            "html": _html_cache.get_stats().to_dict(),
+            "body": _body_cache.get_stats().to_dict(),
+            "css_entries": len(_css_cache),
+        }
+
+    @staticmethod
+    def clear_cache():
+        """清空渲染缓存"""
+        _html_cache.clear()
+        _body_cache.clear()
+        _css_cache.clear()
+
+    @staticmethod
+    def create_incremental_renderer(role: str = "assistant") -> IncrementalMarkdownRenderer:
+        """
+        创建流式响应使用的增量渲染器（使用当前主题的代码高亮配色）
+
+        Args:
+            role: 消息角色，决定代码高亮配色
+        """
+        style = MarkdownUtils._pygments_style(role)
+        return IncrementalMarkdownRenderer(
+            render_block=lambda text: _render_markdown(text, style),
+            render_tail=lambda text: _convert_markdown(text, style),
+        )
+
+    @staticmethod
+    def render_incremental(
+        renderer: IncrementalMarkdownRenderer, text: str, role: str = "assistant"
+    ) -> str:
+        """
+        使用增量渲染器将 Markdown 文本转换为 HTML
+
+        Args:
+            renderer: create_incremental_renderer 创建的渲染器
+            text: Markdown 文本
+            role: 消息角色 ("user" 或 "assistant")
+        """
+        try:
+            html_content = renderer.render(text)
+        except Exception:
+            renderer.reset()
+            return f"<p>{text}</p>"
+
+        return f"{MarkdownUtils.render_css(role)}<div>{html_content}</div>"
+
+    @staticmethod
+    def _pygments_style(role: str) -> str:
+        theme = theme_manager.current_theme
+        return "monokai" if theme.type == ThemeType.DARK and role != "user" else "default"
+
+    @staticmethod
+    def render_body(text: str, role: str = "assistant") -> str:
+        """
+        只将 Markdown 文本转换为 HTML 片段（不含样式表），结果会被缓存
+
+        Args:
+            text: Markdown 文本
+            role: 消息角色，决定代码高亮配色
+
+        Raises:
+            Exception: Markdown 解析失败
+        """
+        return _render_markdown(text, MarkdownUtils._pygments_style(role))
+
+    @staticmethod
+    def render_css(role: str = "assistant") -> str:
+        """
+        获取当前主题下指定角色的 <style> 样式表（每个主题只生成一次）
+
+        Args:
+            role: 消息角色 ("user" 或 "assistant")
+        """
+        key = (MarkdownUtils.theme_fingerprint(), role)
+        css = _css_cache.get(key)
+        if css is None:
+            if len(_css_cache) >= _CSS_CACHE_MAX_ENTRIES:
+                _css_cache.clear()
+            css = _css_cache[key] = MarkdownUtils._build_css(role)
+        return css
+
+    @staticmethod
+    def _build_css(role: str) -> str:
+        """生成当前主题下指定角色的样式表"""
         # 获取当前主题配置
         theme = theme_manager.current_theme
         c = (
@@ -306,53 +607,8 @@ class MarkdownUtils:
                 border_color = c.border_base
                 blockquote_bg = "rgba(0, 0, 0, 0.05)"  # 半透明黑
 
-        # 配置 Markdown 扩展
-        pygments_style = (
-            "monokai" if theme.type == ThemeType.DARK and role != "user" else "default"
-        )
-
-        configs = {
-            "codehilite": {
-                "noclasses": True,
-                "pygments_style": pygments_style,
-                "use_pygments": True,
-                "css_class": "codehilite",
-            }
-        }
-
-        try:
-            # 预处理：保护一些不需要渲染的内容
-            html_content = markdown.markdown(
-                text,
-                extensions=[
-                    "fenced_code",
-                    "codehilite",
-                    "tables",
-                    "nl2br",
-                    "sane_lists",
-                ],
-                extension_configs=configs,
-            )
-
-            # 后处理：给图片添加链接，以便支持点击预览
-            # 查找 <img src="..."> 并替换为 <a href="..."><img src="..."></a>
-            import re
-
-            def replace_img(match):
-                img_tag = match.group(0)
-                src_match = re.search(r'src="([^"]+)"', img_tag)
-                if src_match:
-                    src = src_match.group(1)
-                    return f'<a href="{src}">{img_tag}</a>'
-                return img_tag
-
-            html_content = re.sub(r"<img[^>]+>", replace_img, html_content)
-
-        except Exception:
-            return f"<p>{text}</p>"
-
         # 构建 CSS 样式
-        style = f"""
+        return f"""
         <style>
             body {{
                 font-family: {theme.font_family};
@@ -442,4 +698,123 @@ class MarkdownUtils:
         </style>
         """
 
-        return f"{style}<div>{html_content}</div>"
+
+@dataclass
+class RenderStats:
+    """后台渲染统计"""
+
+    submitted: int = 0  # 提交的渲染请求数
+    coalesced: int = 0  # 被同一组件更新的请求替换（未渲染）的请求数
+    rendered: int = 0  # 显示到界面的渲染结果数
+    stale_dropped: int = 0  # 返回时已过期（或组件已销毁）被丢弃的结果数
+    sync_hits: int = 0  # 缓存命中、直接在界面线程显示的次数
+    failed: int = 0  # 渲染出错、改为显示纯文本的次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+class MarkdownRenderWorker(QObject):
+    """
+    后台 Markdown 渲染线程
+
+    MarkdownLabel 提交渲染请求，Markdown 解析和代码高亮在后台线程中执行，
+    结果通过排队连接的信号回到界面线程。每个组件只保留最新的一个待处理请求，
+    返回时请求已被更新的请求取代的结果直接丢弃。
+    """
+
+    _rendered = Signal(object)  # (组件弱引用, generation, html)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.stats = RenderStats()
+        self._pending: "OrderedDict[int, tuple]" = OrderedDict()  # id(组件) -> 请求
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        # 信号从后台线程发出，接收者在界面线程，自动使用排队连接
+        self._rendered.connect(self._deliver)
+
+    def submit(
+        self,
+        label: "MarkdownLabel",
+        generation: int,
+        text: str,
+        role: str,
+        renderer: Optional[IncrementalMarkdownRenderer] = None,
+    ):
+        """
+        提交渲染请求
+
+        Args:
+            label: 请求渲染的组件
+            generation: 组件的渲染序号，结果返回时用于判断是否过期
+            text: Markdown 文本
+            role: 消息角色
+            renderer: 流式响应的增量渲染器，为 None 时完整渲染
+        """
+        job = (weakref.ref(label), generation, text, role, renderer)
+        with self._cond:
+            key = id(label)
+            if key in self._pending:
+                self.stats.coalesced += 1
+            self._pending[key] = job
+            self.stats.submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="MarkdownRender", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取渲染统计"""
+        return self.stats.to_dict()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                _, job = self._pending.popitem(last=False)
+
+            ref, generation, text, role, renderer = job
+            if ref() is None:
+                continue
+            try:
+                if renderer is not None:
+                    html = MarkdownUtils.render_incremental(renderer, text, role)
+                else:
+                    html = MarkdownUtils.render(text, role)
+            except Exception as e:
+                # 仍然返回结果（转义后的纯文本），否则组件一直显示渲染前的占位文本
+                logger.debug(f"Markdown 渲染失败: {e}")
+                with self._cond:
+                    self.stats.failed += 1
+                html = MarkdownUtils.render_plain(text)
+            self._rendered.emit((ref, generation, html))
+
+    @Slot(object)
+    def _deliver(self, result: tuple):
+        ref, generation, html = result
+        label = ref()
+        try:
+            applied = label is not None and label._apply_render(generation, html)
+        except RuntimeError:
+            # 组件已被 Qt 销毁
+            applied = False
+        if applied:
+            self.stats.rendered += 1
+        else:
+            self.stats.stale_dropped += 1
+
+
+_render_worker: Optional[MarkdownRenderWorker] = None
+
+
+def get_render_worker() -> MarkdownRenderWorker:
+    """获取全局后台渲染线程（在界面线程中调用）"""
+    global _render_worker
+    if _render_worker is None:
+        _render_worker = MarkdownRenderWorker()
+    return _render_worker
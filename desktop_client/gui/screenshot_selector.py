@@ -351,24 +351,11 @@ if HAS_PYSIDE6:
             self, x: int, y: int, width: int, height: int
         ) -> Optional[str]:
             """捕获指定区域"""
-            import os
-            import time
-
             try:
                 from ..services.screen_capture import ScreenCaptureService
 
                 service = ScreenCaptureService(self.save_dir)
-                image = service.capture_region(x, y, width, height)
-
-                if image is None:
-                    return None
-
-                # 保存到文件
-                filename = f"region_{int(time.time() * 1000)}.png"
-                filepath = os.path.join(self.save_dir, filename)
-                image.save(filepath, "PNG")
-
-                return filepath
+                return service.capture_region_to_file(x, y, width, height)
             except Exception as e:
                 print(f"区域截图失败: {e}")
                 return None
@@ -7,6 +7,7 @@
 - ProactiveHandler: 处理主动对话逻辑
 - MediaHandler: 处理媒体文件下载和播放
 - RemoteCommandHandler: 处理服务端下发的远程命令
+- StreamAggregator: 合并流式响应 chunk，按显示帧刷新界面
 """
 
 from .message_handler import MessageHandler
@@ -14,6 +15,7 @@ from .screenshot_handler import ScreenshotHandler
 from .proactive_handler import ProactiveHandler
 from .media_handler import MediaHandler
 from .remote_command_handler import RemoteCommandHandler
+from .stream_aggregator import StreamAggregator
 
 __all__ = [
     "MessageHandler",
@@ -21,4 +23,5 @@ __all__ = [
     "ProactiveHandler",
     "MediaHandler",
     "RemoteCommandHandler",
+    "StreamAggregator",
 ]
@@ -5,6 +5,8 @@
 - 图片下载和显示
 - 语音下载和播放
 - 视频下载和播放
+
+下载的文件经过按内容寻址的媒体缓存（MediaCache），同一个文件只下载一次。
 """
 
 import asyncio
@@ -14,6 +16,8 @@ from typing import TYPE_CHECKING, Optional, Any, Dict
 
 from PySide6.QtCore import QObject, Signal
 
+from ..services.media_cache import MediaCache, materialize
+
 if TYPE_CHECKING:
     from ..config import ClientConfig
     from ..bridge import MessageBridge
@@ -58,6 +62,9 @@ class MediaHandler(QObject):
         # 存储目录
         self._storage_dirs: Dict[str, str] = {}
 
+        # 媒体缓存（在 ensure_storage_dirs 中创建）
+        self._media_cache: Optional[MediaCache] = None
+
         # 音频播放器
         self._audio_player = None
         self._audio_output = None
@@ -109,8 +116,28 @@ class MediaHandler(QObject):
         for dir_path in self._storage_dirs.values():
             os.makedirs(dir_path, exist_ok=True)
 
+        if self._media_cache is not None:
+            self._media_cache.close()
+        try:
+            self._media_cache = MediaCache(
+                os.path.join(base_dir, "cache"),
+                max_bytes=self._config.storage.media_cache_max_mb * 1024 * 1024,
+            )
+        except OSError as e:
+            logger.warning(f"创建媒体缓存失败，直接下载: {e}")
+            self._media_cache = None
+
         return self._storage_dirs
 
+    def get_media_cache(self) -> Optional[MediaCache]:
+        """获取媒体缓存"""
+        return self._media_cache
+
+    def close(self) -> None:
+        """保存媒体缓存索引（应用退出时调用）"""
+        if self._media_cache is not None:
+            self._media_cache.close()
+
     def get_save_path(self, filename: str, msg_type: str) -> str:
         """
         获取文件保存路径
@@ -177,7 +204,7 @@ class MediaHandler(QObject):
             logger.error("MessageBridge 未设置")
             return
 
-        success = await self._bridge.api_client.download_file(filename, save_path)
+        success = await self._fetch_media(filename, save_path)
 
         if success and os.path.exists(save_path):
             content = save_path
@@ -242,6 +269,28 @@ class MediaHandler(QObject):
                 self._floating_ball.set_unread_message(True)
             self.download_failed.emit(filename, error_msg)
 
+    async def _fetch_media(self, filename: str, save_path: str) -> bool:
+        """
+        获取媒体文件到 save_path（优先使用缓存）
+
+        Args:
+            filename: 服务器上的文件名
+            save_path: 保存路径
+
+        Returns:
+            是否成功
+        """
+        api_client = self._bridge.api_client
+        if self._media_cache is None:
+            return await api_client.download_file(filename, save_path)
+
+        blob_path = await self._media_cache.fetch(
+            filename, lambda path: api_client.download_file(filename, path)
+        )
+        if blob_path is None:
+            return False
+        return await asyncio.to_thread(materialize, blob_path, save_path)
+
     def play_audio(self, audio_path: str) -> None:
         """
         播放音频文件
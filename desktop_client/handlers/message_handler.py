@@ -83,8 +83,11 @@ class MessageHandler(QObject):
         msg_type = message.msg_type
         content = message.content
 
-        # 检查是否是主动对话的响应
-        is_proactive_response = self._proactive_dialog_pending
+        # 检查是否是主动对话的响应：优先使用请求自带的路由信息，
+        # 请求并发执行时不会把用户对话的响应当作主动对话处理
+        is_proactive_response = message.metadata.get(
+            "proactive", self._proactive_dialog_pending
+        )
 
         # 检查免打扰模式
         do_not_disturb = self._config.interaction.do_not_disturb
@@ -251,12 +254,21 @@ class MessageHandler(QObject):
             if is_proactive_response:
                 self._proactive_dialog_pending = False
             self._silent_response_buffer = ""
+            self._flush_chat_history()
             return
 
         # 气泡输入框完成响应
         if self._floating_ball and self._floating_ball.is_waiting_response():
             self._floating_ball.finish_response()
 
+        # 响应结束时立即写入聊天记录，不等待防抖
+        self._flush_chat_history()
+
+    def _flush_chat_history(self) -> None:
+        """立即保存聊天记录"""
+        if self._chat_history_manager:
+            self._chat_history_manager.save_to_file()
+
     def _handle_error_message(
         self, content: str, is_proactive_response: bool, should_silent: bool
     ) -> None:
@@ -5,7 +5,6 @@
 """
 
 import asyncio
-import base64
 import logging
 import time
 from typing import TYPE_CHECKING, Optional, Dict, Any, Callable
@@ -24,7 +23,7 @@ class RemoteCommandHandler(QObject):
     远程命令处理器
 
     处理服务端下发的命令，如：
-    - screenshot: 截图并返回 base64 编码的图片
+    - screenshot: 截图并返回编码后的图片（二进制帧或 Base64）
     """
 
     # 信号定义
@@ -51,6 +50,7 @@ class RemoteCommandHandler(QObject):
         self._config = config
         self._bridge = bridge
         self._floating_ball = None
+        self._screen_capture = None  # 截图服务（第一次截图时创建）
 
         # 命令处理器映射
         self._command_handlers: Dict[str, Callable] = {
@@ -135,9 +135,13 @@ class RemoteCommandHandler(QObject):
             request_id: 请求 ID
             params: 命令参数
                 - type: 截图类型 ("full" 或 "region")
+                - format: 编码格式 ("png" / "jpeg" / "webp")，默认 png
+                - quality: 质量预设 ("fast" / "balanced" / "quality")，默认 balanced
+                - max_width / max_height: 最大尺寸，默认不缩小
 
         Returns:
-            包含截图结果的字典
+            包含截图结果的字典，图片为原始字节（image 字段），
+            由 WebSocketClient 按服务端能力以二进制帧或 Base64（image_base64）发送
         """
         screenshot_type = params.get("type", "full")
 
@@ -148,6 +152,7 @@ class RemoteCommandHandler(QObject):
 
         try:
             # 导入截图服务
+            from ..services.image_pipeline import ImagePipeline
             from ..services.screen_capture import ScreenCaptureService
 
             # 隐藏悬浮球窗口（避免截到自己）
@@ -157,15 +162,18 @@ class RemoteCommandHandler(QObject):
             # 等待窗口隐藏
             await asyncio.sleep(0.15)
 
-            # 执行截图
+            # 执行截图（截图服务使用全局截图会话，跨请求复用）
             save_dir = self._config.storage.image_save_path or "./temp/screenshots"
-            service = ScreenCaptureService(save_dir=save_dir)
+            service = self._screen_capture
+            if service is None or service.save_dir != save_dir:
+                service = self._screen_capture = ScreenCaptureService(save_dir=save_dir)
 
+            # 截图和编码都在线程中执行，执行期间事件循环仍能响应 server_ping
             if screenshot_type == "full":
-                image = service.capture_full_screen()
+                image = await service.capture_full_screen_async()
             else:
                 # 区域截图暂不支持远程触发（需要用户交互）
-                image = service.capture_full_screen()
+                image = await service.capture_full_screen_async()
 
             # 恢复窗口
             if self._floating_ball:
@@ -174,24 +182,31 @@ class RemoteCommandHandler(QObject):
             if image is None:
                 return {"success": False, "error_message": "截图失败：无法捕获屏幕"}
 
-            # 将图片转换为 base64
-            image_bytes = service.capture_to_bytes(image)
-
-            if image_bytes is None:
+            # 缩放并编码
+            pipeline = ImagePipeline(
+                params.get("format", "png"),
+                params.get("quality", "balanced"),
+                params.get("max_width"),
+                params.get("max_height"),
+            )
+            try:
+                encoded = await asyncio.to_thread(pipeline.process, image)
+            except Exception as e:
+                logger.error(f"截图编码失败: {e}")
                 return {"success": False, "error_message": "截图失败：无法编码图片"}
 
-            image_base64 = base64.b64encode(image_bytes).decode("utf-8")
-
             logger.info(
-                f"远程截图成功: size={len(image_bytes)} bytes, "
-                f"resolution={image.width}x{image.height}"
+                f"远程截图成功: size={len(encoded.data)} bytes, format={encoded.codec}, "
+                f"resolution={encoded.width}x{encoded.height}"
             )
 
             return {
                 "success": True,
-                "image_base64": image_base64,
-                "width": image.width,
-                "height": image.height,
+                "image": encoded.data,
+                "format": encoded.codec,
+                "mime_type": encoded.mime_type,
+                "width": encoded.width,
+                "height": encoded.height,
                 "timestamp": time.time(),
             }
 
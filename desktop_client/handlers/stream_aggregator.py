@@ -0,0 +1,156 @@
+"""
+流式响应聚合器
+
+位于 MessageBridge 和 MessageHandler 之间，合并流式文本 chunk：
+- 同一请求（request_id / 会话 / chain_type 相同）的连续 chunk 拼接为一条消息
+- 每个显示帧（或配置的间隔）最多向界面发送一次更新
+- 非流式消息（结束、错误、图片等）到达时，先发送已缓存的 chunk，再立即转发该消息，
+  保证界面收到的消息顺序不变
+"""
+
+from dataclasses import dataclass, asdict, replace
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+import logging
+
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+
+if TYPE_CHECKING:
+    from ..bridge import OutputMessage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamStats:
+    """聚合统计"""
+
+    chunks_received: int = 0  # 收到的流式 chunk 数
+    updates_emitted: int = 0  # 发送给界面的流式更新数
+    passthrough: int = 0  # 直接转发的非流式消息数
+    flushes: int = 0  # 定时刷新次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["coalesce_ratio"] = (
+            self.chunks_received / self.updates_emitted if self.updates_emitted else 0.0
+        )
+        return data
+
+
+class StreamAggregator(QObject):
+    """
+    流式 chunk 聚合器
+
+    push 接收 MessageBridge.message_received 发出的消息，
+    合并后的消息通过 message_ready 信号发出。
+    """
+
+    message_ready = Signal(object)  # 发送 OutputMessage
+
+    # 无法获取屏幕刷新率时使用的刷新间隔（毫秒，约 60 帧）
+    DEFAULT_INTERVAL_MS = 16
+
+    def __init__(self, interval_ms: int = 0, parent: Optional[QObject] = None):
+        """
+        初始化聚合器
+
+        Args:
+            interval_ms: 刷新间隔（毫秒），0 表示按主屏幕刷新率每帧刷新一次
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.stats = StreamStats()
+
+        # 待发送的流式消息，按首个 chunk 到达的顺序排列
+        self._pending: Dict[Tuple[str, str, str], "OutputMessage"] = {}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timer)
+        self.set_interval(interval_ms)
+
+    @staticmethod
+    def _frame_interval_ms() -> Optional[int]:
+        """主屏幕一帧的时长（毫秒），还没有 QApplication 或无法获取时返回 None"""
+        try:
+            from PySide6.QtGui import QGuiApplication
+
+            screen = QGuiApplication.primaryScreen()
+            if screen is not None and screen.refreshRate() > 0:
+                return max(1, round(1000 / screen.refreshRate()))
+        except Exception as e:
+            logger.debug(f"获取屏幕刷新率失败: {e}")
+        return None
+
+    def set_interval(self, interval_ms: int):
+        """
+        设置刷新间隔
+
+        Args:
+            interval_ms: 刷新间隔（毫秒），0 表示按屏幕刷新率
+        """
+        # 聚合器可能在 QApplication 创建之前构造，屏幕刷新率在第一次使用时再获取
+        self._interval_ms: Optional[int] = interval_ms if interval_ms > 0 else None
+
+    def get_interval(self) -> int:
+        """获取当前刷新间隔（毫秒）"""
+        if self._interval_ms is None:
+            interval = self._frame_interval_ms()
+            if interval is None:
+                # 暂时使用默认值，之后屏幕可用时再获取
+                return self.DEFAULT_INTERVAL_MS
+            self._interval_ms = interval
+        return self._interval_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取聚合统计"""
+        return self.stats.to_dict()
+
+    def has_pending(self) -> bool:
+        """是否有尚未发送的 chunk"""
+        return bool(self._pending)
+
+    @Slot(object)
+    def push(self, message: "OutputMessage"):
+        """
+        接收一条消息
+
+        Args:
+            message: MessageBridge 发出的 OutputMessage
+        """
+        if message.msg_type == "text" and message.streaming:
+            self.stats.chunks_received += 1
+            key = (
+                message.metadata.get("request_id", ""),
+                message.session_id,
+                message.metadata.get("chain_type", "normal"),
+            )
+            pending = self._pending.get(key)
+            if pending is None:
+                # 复制一份，之后的 chunk 直接拼接到副本上
+                self._pending[key] = replace(message, metadata=dict(message.metadata))
+            else:
+                pending.content += message.content
+            if not self._timer.isActive():
+                self._timer.start(self.get_interval())
+            return
+
+        # 结束、错误等消息：先发送缓存的 chunk，再立即转发
+        self.flush()
+        self.stats.passthrough += 1
+        self.message_ready.emit(message)
+
+    def flush(self):
+        """立即发送所有缓存的 chunk"""
+        self._timer.stop()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        for message in pending.values():
+            self.stats.updates_emitted += 1
+            self.message_ready.emit(message)
+
+    def _on_timer(self):
+        self.stats.flushes += 1
+        self.flush()
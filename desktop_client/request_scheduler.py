@@ -0,0 +1,136 @@
+"""
+请求调度器
+
+MessageBridge 发送的请求按会话排队：
+- 不同会话的请求并发执行
+- 同一会话同时只执行一个请求（服务器按会话保存对话上下文，并发会打乱顺序）
+- 同一会话中等待的请求按优先级执行，优先级相同时按提交顺序；
+  已开始执行的请求不会被打断
+"""
+
+import asyncio
+import heapq
+import itertools
+from dataclasses import dataclass, asdict
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """请求优先级（数值越小越先执行）"""
+
+    USER = 0  # 用户输入
+    NORMAL = 10
+    PROACTIVE = 20  # 主动对话
+
+
+@dataclass
+class SchedulerStats:
+    """调度统计"""
+
+    submitted: int = 0  # 提交的请求数
+    completed: int = 0  # 执行完成的请求数
+    failed: int = 0  # 执行出错的请求数
+    cancelled: int = 0  # 开始执行前被取消的请求数
+    reordered: int = 0  # 因优先级更高排到更早提交的请求之前的次数
+    max_concurrent: int = 0  # 同时执行的请求数峰值
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+class RequestScheduler:
+    """按会话排队、按优先级执行的请求调度器"""
+
+    def __init__(self):
+        self.stats = SchedulerStats()
+        # 会话 ID -> 等待执行的请求堆 (优先级, 序号, future, 请求函数)
+        self._queues: Dict[str, List[Tuple[int, int, asyncio.Future, Callable]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._seq = itertools.count()
+        self._running = 0
+
+    async def submit(
+        self,
+        session_id: str,
+        run: Callable[[], Awaitable[Any]],
+        priority: int = RequestPriority.NORMAL,
+    ) -> Any:
+        """
+        提交请求并等待执行完成
+
+        Args:
+            session_id: 会话 ID，同一会话的请求依次执行
+            run: 执行请求的协程函数
+            priority: 优先级（RequestPriority）
+
+        Returns:
+            run 的返回值
+
+        Raises:
+            Exception: run 抛出的异常
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(session_id, [])
+        if any(item[0] > priority for item in queue):
+            self.stats.reordered += 1
+        heapq.heappush(queue, (int(priority), next(self._seq), future, run))
+        self.stats.submitted += 1
+
+        if session_id not in self._workers:
+            self._workers[session_id] = asyncio.ensure_future(self._drain(session_id))
+        return await future
+
+    def pending_count(self, session_id: str = "") -> int:
+        """等待执行的请求数（session_id 为空时统计所有会话）"""
+        if session_id:
+            return len(self._queues.get(session_id, ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        data = self.stats.to_dict()
+        data.update(running=self._running, pending=self.pending_count())
+        return data
+
+    async def _drain(self, session_id: str):
+        """依次执行一个会话中的请求"""
+        queue = self._queues[session_id]
+        try:
+            while queue:
+                _, _, future, run = heapq.heappop(queue)
+                if future.done():
+                    # 等待的调用方已取消
+                    self.stats.cancelled += 1
+                    continue
+
+                self._running += 1
+                self.stats.max_concurrent = max(self.stats.max_concurrent, self._running)
+                try:
+                    result = await run()
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    self.stats.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.stats.completed += 1
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    self._running -= 1
+        finally:
+            del self._workers[session_id]
+            if not queue:
+                del self._queues[session_id]
+            else:
+                # 调度器被取消时，剩余的请求也一并取消
+                for _, _, future, _ in queue:
+                    future.cancel()
+                del self._queues[session_id]
@@ -2,13 +2,18 @@
 Desktop Client Services
 """
 
+from .capture_session import CaptureSession, get_capture_session
 from .screen_capture import ScreenCaptureService
 from .proactive_dialog import ProactiveDialogService
 from .chat_history import ChatHistoryManager, ChatMessage, get_chat_history_manager
 from .desktop_monitor import DesktopMonitorService, DesktopState
+from .frame_diff import FrameDiffer
 from .update_service import UpdateService
+from .media_cache import MediaCache
 
 __all__ = [
+    "CaptureSession",
+    "get_capture_session",
     "ScreenCaptureService",
     "ProactiveDialogService",
     "ChatHistoryManager",
@@ -16,5 +21,7 @@ __all__ = [
     "get_chat_history_manager",
     "DesktopMonitorService",
     "DesktopState",
+    "FrameDiffer",
     "UpdateService",
+    "MediaCache",
 ]
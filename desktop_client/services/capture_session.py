@@ -0,0 +1,295 @@
+"""
+截图会话
+
+mss 每次创建实例都要建立新的显示连接（X11 下还要分配共享内存段），
+Windows 下设备上下文只能在创建它的线程中使用。这里维护一个长期存在的 mss 实例：
+- 所有截图都在同一个专用线程中执行，mss 实例只在该线程中创建和使用
+- 桌面监控、主动对话、远程命令共用同一个会话
+- 截图出错时重新创建 mss 实例并重试一次
+- mss 实例会缓存显示器列表，显示器增减或分辨率变化后需要调用 refresh()
+  （应用中由 QGuiApplication.screenAdded / screenRemoved / QScreen.geometryChanged 触发），
+  否则截图仍按旧的显示器范围进行且不会出错
+- 截图转换为 PIL 图片时可以复用缓冲池中同样尺寸的图片，避免每帧重新分配内存
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+import asyncio
+import logging
+
+try:
+    import mss
+
+    # mss 10.2 起 mss.mss() 已弃用，改用 mss.MSS
+    MSS_FACTORY = mss.MSS if hasattr(mss, "MSS") else mss.mss
+    HAS_MSS = True
+except ImportError:
+    MSS_FACTORY = None
+    HAS_MSS = False
+
+try:
+    from PIL import Image
+
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+# 截图区域：显示器索引（0 为所有显示器的组合）或 {"left", "top", "width", "height"}
+Region = Union[int, Dict[str, int]]
+
+# 每种尺寸在缓冲池中保留的图片数
+DEFAULT_POOL_SIZE = 2
+
+
+@dataclass
+class CaptureStats:
+    """截图统计"""
+
+    grabs: int = 0  # 成功的截图次数
+    failures: int = 0  # 失败的截图次数
+    sessions_opened: int = 0  # 创建 mss 实例的次数
+    frames_reused: int = 0  # 复用缓冲池图片的次数
+    frames_allocated: int = 0  # 新分配图片的次数
+    grab_seconds: float = 0.0  # 截图累计耗时
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["avg_grab_ms"] = self.grab_seconds * 1000 / self.grabs if self.grabs else 0.0
+        return data
+
+
+class CaptureSession:
+    """在专用线程中复用 mss 实例的截图会话"""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        factory: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        初始化截图会话（mss 实例在第一次截图时创建）
+
+        Args:
+            pool_size: 每种尺寸在缓冲池中保留的图片数
+            factory: 创建 mss 实例的函数，默认 MSS_FACTORY
+        """
+        self.pool_size = pool_size
+        self.stats = CaptureStats()
+        self._factory = factory or MSS_FACTORY
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen-capture")
+        self._thread: Optional[threading.Thread] = None
+        self._sct = None  # 只在截图线程中访问
+        self._stale = False  # 显示器配置已变化，下次截图前重新创建 mss 实例
+        self._closed = False
+
+        self._pool_lock = threading.Lock()
+        self._pool: Dict[Tuple[int, int], List["Image.Image"]] = {}
+
+    @property
+    def available(self) -> bool:
+        """是否可以截图"""
+        return self._factory is not None and HAS_PIL and not self._closed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取截图统计"""
+        data = self.stats.to_dict()
+        with self._pool_lock:
+            data["pooled_frames"] = sum(len(frames) for frames in self._pool.values())
+        return data
+
+    def monitors(self) -> List[Dict[str, int]]:
+        """
+        获取显示器列表（第 0 项为所有显示器的组合）
+
+        Returns:
+            显示器信息列表，失败返回空列表
+        """
+        try:
+            return self._call(lambda sct: [dict(m) for m in sct.monitors])
+        except Exception as e:
+            logger.debug(f"获取显示器信息失败: {e}")
+            return []
+
+    def grab(self, region: Region = 0) -> Optional["Image.Image"]:
+        """
+        截图
+
+        Args:
+            region: 显示器索引或区域
+
+        Returns:
+            PIL Image 对象（调用方持有，不会被复用），失败返回 None
+        """
+        return self._grab(region, pooled=False)
+
+    async def grab_async(self, region: Region = 0) -> Optional["Image.Image"]:
+        """在截图线程中截图，不阻塞事件循环"""
+        if not self.available:
+            return None
+        future = self._executor.submit(self._grab_in_thread, region, False)
+        return await asyncio.wrap_future(future)
+
+    @contextmanager
+    def frame(self, region: Region = 0) -> Iterator[Optional["Image.Image"]]:
+        """
+        截图并借用缓冲池中的图片，退出上下文后图片归还缓冲池
+
+        适合截图后立即缩放、编码的场景，退出上下文后不能再使用图片：
+
+            with session.frame() as image:
+                if image is not None:
+                    thumbnail = image.resize(...)
+
+        Args:
+            region: 显示器索引或区域
+        """
+        image = self._grab(region, pooled=True)
+        try:
+            yield image
+        finally:
+            if image is not None:
+                self.release(image)
+
+    def release(self, image: "Image.Image"):
+        """将图片归还缓冲池"""
+        with self._pool_lock:
+            frames = self._pool.setdefault(image.size, [])
+            if len(frames) < self.pool_size:
+                frames.append(image)
+
+    def refresh(self):
+        """
+        显示器配置变化后调用，下次截图时重新创建 mss 实例
+
+        只做标记，不等待截图线程，可以在界面线程中直接调用。
+        """
+        self._stale = True
+        # 旧尺寸的缓冲图片不会再被复用
+        with self._pool_lock:
+            self._pool.clear()
+
+    def close(self):
+        """关闭会话"""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.submit(self._close_sct).result()
+        self._executor.shutdown(wait=True)
+        with self._pool_lock:
+            self._pool.clear()
+
+    def _run(self, func: Callable, *args) -> Any:
+        """在截图线程中执行函数并等待结果"""
+        if threading.current_thread() is self._thread:
+            return func(*args)
+        return self._executor.submit(func, *args).result()
+
+    def _grab(self, region: Region, pooled: bool) -> Optional["Image.Image"]:
+        if not self.available:
+            return None
+        return self._run(self._grab_in_thread, region, pooled)
+
+    def _call(self, func: Callable[[Any], Any]) -> Any:
+        """在截图线程中使用 mss 实例执行函数"""
+        if not self.available:
+            raise RuntimeError("截图不可用")
+        return self._run(lambda: func(self._get_sct()))
+
+    def _get_sct(self):
+        """获取 mss 实例（只在截图线程中调用）"""
+        self._thread = threading.current_thread()
+        if self._stale:
+            self._stale = False
+            self._close_sct()
+        if self._sct is None:
+            self._sct = self._factory()
+            self.stats.sessions_opened += 1
+        return self._sct
+
+    def _close_sct(self):
+        if self._sct is not None:
+            try:
+                self._sct.close()
+            except Exception as e:
+                logger.debug(f"关闭截图实例失败: {e}")
+            self._sct = None
+
+    def _grab_in_thread(self, region: Region, pooled: bool) -> Optional["Image.Image"]:
+        start = time.perf_counter()
+        for attempt in range(2):
+            try:
+                sct = self._get_sct()
+                if isinstance(region, int):
+                    if region < 0 or region >= len(sct.monitors):
+                        logger.debug(f"显示器索引 {region} 无效")
+                        self.stats.failures += 1
+                        return None
+                    area = sct.monitors[region]
+                else:
+                    area = region
+                shot = sct.grab(area)
+                break
+            except Exception as e:
+                logger.debug(f"截图失败（第 {attempt + 1} 次）: {e}")
+                # 显示连接失效或显示器配置变化，重新创建实例
+                self._close_sct()
+        else:
+            self.stats.failures += 1
+            return None
+
+        image = self._to_image(shot, pooled)
+        self.stats.grabs += 1
+        self.stats.grab_seconds += time.perf_counter() - start
+        return image
+
+    def _to_image(self, shot: Any, pooled: bool) -> "Image.Image":
+        """将 BGRA 截图数据转换为 RGB 图片"""
+        size = tuple(shot.size)
+        image = None
+        if pooled:
+            with self._pool_lock:
+                frames = self._pool.get(size)
+                if frames:
+                    image = frames.pop()
+        if image is None:
+            self.stats.frames_allocated += 1
+            return Image.frombytes("RGB", size, shot.bgra, "raw", "BGRX")
+        self.stats.frames_reused += 1
+        image.frombytes(shot.bgra, "raw", "BGRX")
+        return image
+
+
+_session: Optional[CaptureSession] = None
+_session_lock = threading.Lock()
+
+
+def get_capture_session() -> CaptureSession:
+    """获取全局截图会话"""
+    global _session
+    with _session_lock:
+        if _session is None or _session._closed:
+            _session = CaptureSession()
+        return _session
+
+
+def refresh_capture_session():
+    """显示器配置变化时刷新全局截图会话（会话尚未创建时不做任何事）"""
+    with _session_lock:
+        if _session is not None:
+            _session.refresh()
+
+
+def close_capture_session():
+    """关闭全局截图会话（应用退出时调用）"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
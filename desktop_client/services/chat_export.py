@@ -0,0 +1,351 @@
+"""
+聊天记录导出
+
+逐条从消息迭代器读取并写入文件，内存占用与消息总数无关：
+- json: 与聊天记录文件相同的 version 1 格式
+- jsonl: 每行一条消息
+- txt: 纯文本
+- markdown: Markdown 文档
+- html: 独立的 HTML 页面（消息内容由 MarkdownUtils 渲染）
+
+ChatExportTask 在后台线程中执行导出，通过 Qt 信号报告进度和结果，可以随时取消。
+"""
+
+import html
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+from PySide6.QtCore import QObject, Signal
+import logging
+
+from ..utils.atomic_write import atomic_open
+from .chat_message import ChatMessage, write_messages_json
+
+logger = logging.getLogger(__name__)
+
+
+# 支持的导出格式
+EXPORT_FORMATS = ("json", "jsonl", "txt", "markdown", "html")
+
+# 常见扩展名对应的导出格式
+EXPORT_EXTENSIONS = {
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".txt": "txt",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".html": "html",
+    ".htm": "html",
+}
+
+
+class ExportCancelled(Exception):
+    """导出被取消"""
+
+
+def format_from_path(path: str, default: str = "json") -> str:
+    """根据文件扩展名推断导出格式"""
+    return EXPORT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), default)
+
+
+def _role_name(role: str) -> str:
+    return "用户" if role == "user" else "助手"
+
+
+def _time_str(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def _markdown_content(msg: ChatMessage) -> str:
+    """媒体消息在 Markdown / HTML 中显示为图片或链接"""
+    if msg.msg_type == "image":
+        path = msg.file_path or msg.content
+        return f"![图片]({Path(path).as_posix()})"
+    if msg.msg_type in ("voice", "video", "file") and msg.file_path:
+        return f"[{msg.content or os.path.basename(msg.file_path)}]({Path(msg.file_path).as_posix()})"
+    return msg.content
+
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta http-equiv="Content-Security-Policy" content="script-src 'none'">
+<title>聊天记录</title>
+<style>
+body {{ max-width: 820px; margin: 24px auto; padding: 0 16px; }}
+.message {{ margin: 12px 0; display: flex; flex-direction: column; }}
+.message.user {{ align-items: flex-end; }}
+.meta {{ color: #999; font-size: 12px; margin-bottom: 4px; }}
+.bubble {{ max-width: 85%; padding: 8px 12px; border-radius: 12px; overflow-x: auto; }}
+</style>
+{stylesheet}
+</head>
+<body>
+"""
+
+_HTML_TAIL = "</body>\n</html>\n"
+
+
+def scope_css(style: str, scope: str) -> str:
+    """
+    把样式表中的选择器限定到 scope 之内（body 选择器替换为 scope 本身）
+
+    Args:
+        style: 样式表，可以带 <style> 标签
+        scope: 限定范围的选择器，如 ".message.user .bubble"
+    """
+    css = re.sub(r"</?style>", "", style)
+
+    def _scope(match) -> str:
+        selectors = [s.strip() for s in match.group(2).split(",")]
+        return (
+            match.group(1)
+            + ", ".join(scope if s == "body" else f"{scope} {s}" for s in selectors)
+            + " {"
+        )
+
+    return "<style>" + re.sub(r"(\s*)([^{}]+)\{", _scope, css) + "</style>"
+
+
+def _default_html_stylesheet() -> str:
+    """当前主题下的导出页面样式：气泡配色 + 每个角色的 Markdown 样式（各生成一次）"""
+    from ..gui.markdown_utils import MarkdownUtils
+    from ..gui.themes import theme_manager
+
+    c = theme_manager.get_current_colors()
+    bubbles = (
+        "<style>\n"
+        f"body {{ background: {c.bg_primary}; }}\n"
+        f".message.user .bubble {{ background: {c.bubble_user_bg}; }}\n"
+        f".message.assistant .bubble {{ background: {c.bubble_ai_bg}; "
+        f"border: 1px solid {c.bubble_ai_border}; }}\n"
+        "</style>"
+    )
+    return "\n".join(
+        [bubbles]
+        + [
+            scope_css(MarkdownUtils.render_css(role), f".message.{role} .bubble")
+            for role in ("user", "assistant")
+        ]
+    )
+
+
+class ChatExporter:
+    """
+    流式导出器
+
+    Args:
+        renderer: HTML 导出时使用的 Markdown 渲染函数 (text, role) -> HTML 片段，
+            为空时使用 MarkdownUtils.render_body（带缓存）
+        stylesheet: HTML 导出页面的附加样式表，为空时根据当前主题生成
+    """
+
+    def __init__(
+        self,
+        renderer: Optional[Callable[[str, str], str]] = None,
+        stylesheet: Optional[str] = None,
+    ):
+        self._renderer = renderer
+        self._stylesheet = stylesheet
+
+    def export(
+        self,
+        messages: Iterable[ChatMessage],
+        path: str,
+        format: str = "json",
+        on_progress: Optional[Callable[[int], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> int:
+        """
+        导出消息到文件（先写入临时文件，完成后再替换目标文件）
+
+        Args:
+            messages: 消息迭代器
+            path: 导出路径
+            format: 导出格式，见 EXPORT_FORMATS
+            on_progress: 进度回调，参数为已导出的消息数
+            cancel_event: 取消事件，被设置后抛出 ExportCancelled
+
+        Returns:
+            导出的消息数
+
+        Raises:
+            ValueError: 不支持的格式
+            ExportCancelled: 导出被取消
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {format}")
+
+        def _tracked() -> Iterator[ChatMessage]:
+            for i, msg in enumerate(messages, 1):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ExportCancelled()
+                yield msg
+                count[0] = i
+                if on_progress is not None:
+                    on_progress(i)
+
+        count = [0]
+        # 取消或出错时临时文件会被删除，目标文件保持不变
+        with atomic_open(path, "w", encoding="utf-8", newline="\n") as f:
+            getattr(self, f"_write_{format}")(f, _tracked())
+        return count[0]
+
+    # ---- 各格式的写入 ----
+
+    @staticmethod
+    def _write_json(f: TextIO, messages: Iterator[ChatMessage]):
+        write_messages_json(f, {"version": 1}, messages)
+
+    @staticmethod
+    def _write_jsonl(f: TextIO, messages: Iterator[ChatMessage]):
+        for msg in messages:
+            f.write(msg.to_json())
+            f.write("\n")
+
+    @staticmethod
+    def _write_txt(f: TextIO, messages: Iterator[ChatMessage]):
+        for msg in messages:
+            f.write(f"[{_time_str(msg.timestamp)}] {_role_name(msg.role)}:\n{msg.content}\n\n")
+
+    @staticmethod
+    def _write_markdown(f: TextIO, messages: Iterator[ChatMessage]):
+        f.write("# 聊天记录\n\n")
+        for msg in messages:
+            f.write(f"### {_role_name(msg.role)} · {_time_str(msg.timestamp)}\n\n")
+            f.write(_markdown_content(msg))
+            f.write("\n\n---\n\n")
+
+    def _write_html(self, f: TextIO, messages: Iterator[ChatMessage]):
+        renderer = self._renderer
+        if renderer is None:
+            from ..gui.markdown_utils import MarkdownUtils
+
+            renderer = MarkdownUtils.render_body
+        stylesheet = self._stylesheet
+        if stylesheet is None:
+            stylesheet = _default_html_stylesheet()
+
+        f.write(_HTML_HEAD.format(stylesheet=stylesheet))
+        for msg in messages:
+            role = "user" if msg.role == "user" else "assistant"
+            try:
+                body = renderer(_markdown_content(msg), role)
+            except Exception as e:
+                logger.debug(f"渲染消息失败，按纯文本导出: {e}")
+                body = f"<p>{html.escape(msg.content)}</p>"
+            f.write(
+                f'<div class="message {role}">'
+                f'<div class="meta">{_role_name(msg.role)} · {_time_str(msg.timestamp)}</div>'
+                f'<div class="bubble">{body}</div></div>\n'
+            )
+        f.write(_HTML_TAIL)
+
+
+class ChatExportTask(QObject):
+    """
+    后台导出任务
+
+    在工作线程中执行导出，信号通过 Qt 的队列连接投递到接收者所在线程。
+    """
+
+    progress = Signal(int, int)  # (已导出消息数, 消息总数)
+    finished = Signal(bool, str)  # (是否成功, 导出路径或错误信息)
+
+    # 进度信号的最小间隔（秒），避免大量导出时信号淹没事件循环
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        messages: Iterable[ChatMessage],
+        path: str,
+        format: str = "json",
+        total: int = 0,
+        exporter: Optional[ChatExporter] = None,
+        parent: Optional[QObject] = None,
+    ):
+        """
+        初始化导出任务
+
+        Args:
+            messages: 消息迭代器（在工作线程中遍历）
+            path: 导出路径
+            format: 导出格式
+            total: 消息总数（用于进度显示，0 表示未知）
+            exporter: 导出器
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.path = path
+        self.format = format
+        self.total = total
+        self.exported = 0
+        self._messages = messages
+        self._exporter = exporter or ChatExporter()
+        self._cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_progress = 0.0
+
+    def start(self):
+        """启动导出线程"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="chat-export", daemon=True
+        )
+        self._thread.start()
+
+    def cancel(self):
+        """取消导出（已写入的临时文件会被删除）"""
+        self._cancel_event.set()
+
+    def is_running(self) -> bool:
+        """是否正在导出"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待导出线程结束
+
+        Returns:
+            线程是否已结束
+        """
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _on_progress(self, exported: int):
+        self.exported = exported
+        now = time.monotonic()
+        if now - self._last_progress >= self.PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.progress.emit(exported, self.total)
+
+    def _run(self):
+        try:
+            count = self._exporter.export(
+                self._messages,
+                self.path,
+                self.format,
+                on_progress=self._on_progress,
+                cancel_event=self._cancel_event,
+            )
+        except ExportCancelled:
+            logger.debug(f"聊天记录导出已取消: {self.path}")
+            self.finished.emit(False, "导出已取消")
+            return
+        except Exception as e:
+            logger.debug(f"导出聊天记录失败: {e}")
+            self.finished.emit(False, str(e))
+            return
+
+        self.exported = count
+        self.progress.emit(count, self.total or count)
+        logger.debug(f"已导出 {count} 条聊天记录到: {self.path}")
+        self.finished.emit(True, self.path)
@@ -3,59 +3,32 @@
 
 提供统一的消息管理，支持：
 - 单例模式确保全局唯一
-- 消息持久化到本地文件
+- 消息持久化到本地文件（可选 json / journal / sqlite 存储后端）
 - Qt 信号机制实现跨窗口同步
 """
 
 import asyncio
 import json
 import os
-import uuid
 import time
-from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict, Any
+from typing import Callable, Iterator, List, Optional, Dict, Any
 from pathlib import Path
 import logging
 
 from PySide6.QtCore import QObject, Signal
 
-logger = logging.getLogger(__name__)
-
-
-@dataclass
-class ChatMessage:
-    """聊天消息数据结构"""
-
-    id: str = ""  # UUID
-    role: str = "user"  # "user" / "assistant"
-    content: str = ""  # 消息内容
-    msg_type: str = "text"  # "text" / "image" / "voice" / "video" / "file"
-    timestamp: float = 0.0  # 时间戳
-    file_path: str = ""  # 媒体文件路径（可选）
-    metadata: Dict[str, Any] = field(default_factory=dict)  # 其他元数据
+from .chat_message import ChatMessage
+from .chat_export import ChatExporter, ChatExportTask, format_from_path
+from .chat_search import InvertedIndex, SearchResult, make_snippet, parse_query
+from .save_scheduler import SaveScheduler
+from .history_store import (
+    DEFAULT_HISTORY_BACKEND,
+    HistoryStore,
+    create_history_store,
+    write_messages_file,
+)
 
-    def __post_init__(self):
-        if not self.id:
-            self.id = str(uuid.uuid4())
-        if self.timestamp == 0.0:
-            self.timestamp = time.time()
-
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
-
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "ChatMessage":
-        """从字典创建"""
-        return cls(
-            id=data.get("id", ""),
-            role=data.get("role", "user"),
-            content=data.get("content", ""),
-            msg_type=data.get("msg_type", "text"),
-            timestamp=data.get("timestamp", 0.0),
-            file_path=data.get("file_path", ""),
-            metadata=data.get("metadata", {}),
-        )
+logger = logging.getLogger(__name__)
 
 
 class ChatHistoryManager(QObject):
@@ -64,7 +37,7 @@ class ChatHistoryManager(QObject):
 
     提供统一的消息管理接口，支持：
     - 添加、获取、清除消息
-    - 持久化到本地 JSON 文件
+    - 通过存储后端持久化到本地文件
     - Qt 信号机制实现跨窗口同步
     """
 
@@ -75,6 +48,7 @@ class ChatHistoryManager(QObject):
     )  # 消息更新时发射，参数为 (message_id, new_content)
     messages_cleared = Signal()  # 消息清除时发射
     history_loaded = Signal()  # 历史记录加载完成时发射
+    search_index_ready = Signal()  # 后台建立搜索索引完成时发射（之前的搜索结果可能不完整）
 
     # 单例实例
     _instance: Optional["ChatHistoryManager"] = None
@@ -86,28 +60,52 @@ class ChatHistoryManager(QObject):
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, history_path: str = ""):
+    def __init__(self, history_path: str = "", backend: str = ""):
         """
         初始化聊天记录管理器
 
         Args:
             history_path: 聊天记录保存路径，为空则使用默认路径
+            backend: 存储后端 ("json" / "journal" / "sqlite")，为空则使用默认后端
         """
         # 避免重复初始化
         if ChatHistoryManager._initialized:
-            # 如果已初始化但传入了新路径，更新路径
+            # 如果已初始化但传入了新路径或新后端，切换过去
+            if backend:
+                self.set_backend(backend)
             if history_path and history_path != self._history_path:
-                self._history_path = history_path
+                self.set_history_path(history_path)
             return
 
         super().__init__()
 
         self._messages: List[ChatMessage] = []
+        # 消息 ID -> 序号 的索引，与 _messages 保持同步，用于 O(1) 查找和分页
+        # 消息在 _messages 中的位置为 序号 - _base_seq
+        self._index: Dict[str, int] = {}
+        self._base_seq = 0  # _messages[0] 的序号
         self._history_path = history_path or self._get_default_history_path()
+        self._backend = backend or DEFAULT_HISTORY_BACKEND
+        self._store: HistoryStore = create_history_store(
+            self._history_path, self._backend
+        )
         self._max_messages = 1000  # 最大保存消息数
+        self._store.set_max_messages(self._max_messages)
         self._auto_save = True  # 自动保存开关
         self._dirty = False  # 是否有未保存的更改
 
+        # 全文搜索索引（文件后端使用；sqlite 后端使用数据库中的 FTS5 索引）
+        # 加载历史记录后在后台线程中建立，不阻塞界面线程
+        self._search_index = InvertedIndex(on_ready=self.search_index_ready.emit)
+
+        # 正在执行的后台导出任务
+        self._export_tasks: List[ChatExportTask] = []
+
+        # 保存调度器：合并流式响应期间的频繁保存，同一时间只有一个写入任务
+        self._saver = SaveScheduler(
+            self._prepare_history_write, on_error=self._on_save_failed
+        )
+
         # 加载历史记录
         self.load_from_file()
 
@@ -128,18 +126,23 @@ class ChatHistoryManager(QObject):
         return str(config_dir / "chat_history.json")
 
     @classmethod
-    def get_instance(cls, history_path: str = "") -> "ChatHistoryManager":
+    def get_instance(
+        cls, history_path: str = "", backend: str = ""
+    ) -> "ChatHistoryManager":
         """
         获取单例实例
 
         Args:
             history_path: 聊天记录保存路径
+            backend: 存储后端
 
         Returns:
             ChatHistoryManager 实例
         """
         if cls._instance is None:
-            cls._instance = cls(history_path)
+            cls._instance = cls(history_path, backend)
+        elif history_path or backend:
+            cls._instance.__init__(history_path, backend)
         return cls._instance
 
     @classmethod
@@ -156,11 +159,14 @@ class ChatHistoryManager(QObject):
             path: 新的保存路径
         """
         if path != self._history_path:
-            # 先保存当前数据到旧路径
-            if self._dirty:
-                self.save_to_file()
+            # 先保存当前数据到旧路径（同步保存，确保写入旧存储后端）
+            if self._dirty or self._saver.has_pending():
+                self.save_to_file_sync()
 
+            self._store.close()
             self._history_path = path
+            self._store = create_history_store(path, self._backend)
+            self._store.set_max_messages(self._max_messages)
             # 从新路径加载数据
             self.load_from_file()
 
@@ -168,6 +174,39 @@ class ChatHistoryManager(QObject):
         """获取当前聊天记录保存路径"""
         return self._history_path
 
+    def set_backend(self, backend: str):
+        """
+        切换存储后端，当前消息会以新后端的格式完整写入一次
+
+        Args:
+            backend: 存储后端名称 ("json" / "journal" / "sqlite")
+        """
+        if backend == self._backend:
+            return
+
+        messages = list(self._iter_all_messages())
+        store = create_history_store(self._history_path, backend)
+        store.set_max_messages(self._max_messages)
+        try:
+            # 同步新后端的内部状态（如日志序号），内存中的消息以当前数据为准
+            if store.exists():
+                store.load()
+        except Exception as e:
+            logger.debug(f"读取新存储后端数据失败: {e}")
+
+        self._store.close()
+        self._store = store
+        self._backend = store.name
+        self._set_messages(messages)
+        self._store.request_compaction()
+        self.save_to_file_sync()
+        self._trim_cache()
+        logger.debug(f"聊天记录存储后端已切换为: {self._backend}")
+
+    def get_backend(self) -> str:
+        """获取当前存储后端名称"""
+        return self._backend
+
     def add_message(
         self,
         role: str,
@@ -197,12 +236,15 @@ class ChatHistoryManager(QObject):
             metadata=metadata or {},
         )
 
+        self._index[message.id] = self._base_seq + len(self._messages)
         self._messages.append(message)
+        self._store.record_add(message)
+        if not self._store.queryable:
+            self._search_index.add(message)
         self._dirty = True
 
         # 限制消息数量
-        if len(self._messages) > self._max_messages:
-            self._messages = self._messages[-self._max_messages :]
+        self._trim_cache()
 
         # 自动保存 (异步)
         if self._auto_save:
@@ -224,16 +266,75 @@ class ChatHistoryManager(QObject):
         Returns:
             是否更新成功
         """
-        for msg in self._messages:
-            if msg.id == message_id:
-                msg.content = content
-                self._dirty = True
+        # 快速路径：流式响应总是在更新最后一条消息
+        if self._messages and self._messages[-1].id == message_id:
+            msg = self._messages[-1]
+        else:
+            msg = self._lookup(message_id)
+
+        if msg is not None:
+            msg.content = content
+            if not self._store.queryable:
+                self._search_index.touch(msg)
+        elif not self._store.queryable or not self._store.get_message(message_id):
+            # 不在内存缓存中的旧消息，queryable 后端直接更新到数据库
+            return False
+
+        self._store.record_update(message_id, content)
+        self._dirty = True
+
+        # 流式更新频繁，由保存调度器合并后写入
+        if self._auto_save:
+            self._schedule_save()
+
+        # 发射更新信号
+        self.message_updated.emit(message_id, content)
+        return True
+
+    def _trim_cache(self):
+        """
+        裁剪内存中的消息
 
-                # 发射更新信号
-                self.message_updated.emit(message_id, content)
-                return True
+        文件后端在内存中保存全部消息，超出最大消息数的旧消息同时从存储中删除；
+        queryable 后端只在内存中缓存最近的消息，由存储后端自行裁剪。
+        """
+        limit = self._max_messages
+        if self._store.queryable:
+            limit = min(limit, self._store.cache_size)
+
+        if len(self._messages) > limit:
+            removed = self._messages[:-limit]
+            del self._messages[:-limit]
+            self._base_seq += len(removed)
+            for msg in removed:
+                self._index.pop(msg.id, None)
+            if not self._store.queryable:
+                removed_ids = [msg.id for msg in removed]
+                self._store.record_delete(removed_ids)
+                self._search_index.remove(removed_ids)
+
+    def _set_messages(self, messages: List[ChatMessage]):
+        """替换内存中的全部消息并重建索引"""
+        self._messages = messages
+        self._base_seq = 0
+        self._index = {msg.id: i for i, msg in enumerate(messages)}
+        if self._store.queryable:
+            self._search_index.clear()
+        else:
+            self._search_index.reset(messages)
 
-        return False
+    def _lookup(self, message_id: str) -> Optional[ChatMessage]:
+        """通过索引查找内存中的消息"""
+        seq = self._index.get(message_id)
+        if seq is None:
+            return None
+        return self._messages[seq - self._base_seq]
+
+    def _iter_all_messages(self) -> Iterator[ChatMessage]:
+        """按时间顺序遍历全部消息（queryable 后端从数据库分批读取）"""
+        if self._store.queryable:
+            return self._store.iter_messages()
+        return iter(self._messages.copy())
 
     def get_last_message(self) -> Optional[ChatMessage]:
         """获取最后一条消息"""
@@ -251,10 +352,83 @@ class ChatHistoryManager(QObject):
         Returns:
             消息列表
         """
+        if self._store.queryable and (limit <= 0 or limit > len(self._messages)):
+            return self._store.query_messages(limit)
         if limit > 0:
             return self._messages[-limit:]
         return self._messages.copy()
 
+    def get_messages_before(
+        self, before_id: str = "", limit: int = 50
+    ) -> List[ChatMessage]:
+        """
+        按游标分页获取消息（用于向上滚动时加载更早的消息）
+
+        Args:
+            before_id: 游标消息 ID，返回比它更早的消息；为空则返回最新的一页
+            limit: 每页最大消息数
+
+        Returns:
+            按时间顺序排列的消息列表，数量少于 limit 表示已到最早的消息
+        """
+        if limit <= 0:
+            return []
+        if not before_id:
+            return self.get_messages(limit)
+
+        seq = self._index.get(before_id)
+        if seq is not None:
+            pos = seq - self._base_seq
+            # 内存中的消息足够一页（文件后端内存中就是全部消息）
+            if pos >= limit or not self._store.queryable:
+                return self._messages[max(0, pos - limit) : pos]
+
+        if self._store.queryable:
+            return self._store.query_messages_before(before_id, limit)
+        return []
+
+    def get_messages_after(self, after_id: str, limit: int = 50) -> List[ChatMessage]:
+        """
+        按游标分页获取更晚的消息（用于查看较早的消息后向下滚动）
+
+        Args:
+            after_id: 游标消息 ID，返回比它更晚的消息
+            limit: 每页最大消息数
+
+        Returns:
+            按时间顺序排列的消息列表，数量少于 limit 表示已到最新的消息
+        """
+        if limit <= 0:
+            return []
+
+        seq = self._index.get(after_id)
+        if seq is not None:
+            # 内存中缓存的总是最新的消息
+            pos = seq - self._base_seq + 1
+            return self._messages[pos : pos + limit]
+
+        if self._store.queryable:
+            return self._store.query_messages_after(after_id, limit)
+        return []
+
+    def get_messages_around(self, message_id: str, limit: int = 50) -> List[ChatMessage]:
+        """
+        获取指定消息及其前后的消息（用于跳转到搜索结果）
+
+        Args:
+            message_id: 目标消息 ID
+            limit: 最大消息数，目标消息前后各约一半
+
+        Returns:
+            按时间顺序排列的消息列表，未找到目标消息时返回空列表
+        """
+        message = self.get_message_by_id(message_id)
+        if message is None or limit <= 0:
+            return []
+        before = self.get_messages_before(message_id, (limit - 1) // 2)
+        after = self.get_messages_after(message_id, limit - 1 - len(before))
+        return before + [message] + after
+
     def get_message_by_id(self, message_id: str) -> Optional[ChatMessage]:
         """
         根据 ID 获取消息
@@ -265,14 +439,20 @@ class ChatHistoryManager(QObject):
         Returns:
             ChatMessage 对象，未找到返回 None
         """
-        for msg in self._messages:
-            if msg.id == message_id:
-                return msg
+        msg = self._lookup(message_id)
+        if msg is not None:
+            return msg
+        if self._store.queryable:
+            return self._store.get_message(message_id)
         return None
 
     def clear_history(self):
         """清空所有聊天记录"""
+        self._base_seq += len(self._messages)
         self._messages.clear()
+        self._index.clear()
+        self._search_index.clear()
+        self._store.record_clear()
         self._dirty = True
 
         if self._auto_save:
@@ -281,19 +461,60 @@ class ChatHistoryManager(QObject):
         # 发射信号
         self.messages_cleared.emit()
 
+    def search_messages(self, query: str, limit: int = 20) -> List[SearchResult]:
+        """
+        全文搜索聊天记录
+
+        中文按字和相邻两字匹配，英文按单词匹配，最后一个英文单词按前缀匹配。
+
+        Args:
+            query: 查询文本，多个词之间是“并且”关系
+            limit: 最大结果数
+
+        Returns:
+            按相关度排序的搜索结果（含摘要和高亮区间）；
+            后台建立索引期间（is_search_indexing）只包含已建立索引的消息
+        """
+        terms = parse_query(query)
+        if not terms:
+            return []
+
+        if self._store.queryable:
+            hits = self._store.search(terms, limit)
+        else:
+            hits = []
+            for message_id, score in self._search_index.search(terms, limit):
+                msg = self._lookup(message_id)
+                if msg is not None:
+                    hits.append((msg, score))
+
+        results = []
+        for msg, score in hits:
+            snippet, highlights = make_snippet(msg.content, terms.needles)
+            results.append(SearchResult(msg, score, snippet, highlights))
+        return results
+
+    def is_search_indexing(self) -> bool:
+        """是否正在后台建立搜索索引（完成后发射 search_index_ready）"""
+        return not self._store.queryable and self._search_index.building
+
     def _schedule_save(self):
-        """调度异步保存任务"""
-        try:
-            # 获取当前事件循环
-            loop = asyncio.get_running_loop()
-            if loop.is_running():
-                loop.create_task(self.save_to_file_async())
-            else:
-                # 如果没有运行中的循环，回退到同步保存
-                self.save_to_file_sync()
-        except RuntimeError:
-            # 如果没有事件循环，回退到同步保存
-            self.save_to_file_sync()
+        """调度保存任务（防抖合并，后台线程写入）"""
+        self._saver.request()
+
+    def set_save_policy(self, debounce: float, max_latency: float):
+        """
+        设置自动保存的合并策略
+
+        Args:
+            debounce: 防抖时间（秒），最后一次修改后等待该时间再写入
+            max_latency: 最大写入延迟（秒），持续修改时最多等待该时间
+        """
+        self._saver.set_policy(debounce, max_latency)
+
+    def get_save_stats(self) -> Dict[str, Any]:
+        """获取保存统计（请求次数、实际写入次数、写入字节数等）"""
+        return self._saver.stats.to_dict()
 
     async def save_to_file_async(self, path: str = "") -> bool:
         """
@@ -305,27 +526,15 @@ class ChatHistoryManager(QObject):
         Returns:
             是否保存成功
         """
-        save_path = path or self._history_path
+        if not path or path == self._history_path:
+            return await self._saver.flush_async()
 
         try:
             # 1. 在主线程中准备数据（避免多线程竞争）
-            # 深拷贝或转换为 dict，确保传递给线程的数据是独立的
-            data_to_save = {
-                "version": 1,
-                "messages": [msg.to_dict() for msg in self._messages],
-            }
+            write_job = self._prepare_export(path)
 
             # 2. 在线程池中执行文件写入操作
-            def _write_file():
-                # 确保目录存在
-                Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-                with open(save_path, "w", encoding="utf-8") as f:
-                    json.dump(data_to_save, f, ensure_ascii=False, indent=2)
-
-            await asyncio.to_thread(_write_file)
-
-            self._dirty = False
-            # logger.debug(f"聊天记录已异步保存到: {save_path}")
+            await asyncio.to_thread(write_job)
             return True
 
         except Exception as e:
@@ -342,25 +551,33 @@ class ChatHistoryManager(QObject):
         Returns:
             是否保存成功
         """
-        save_path = path or self._history_path
+        if not path or path == self._history_path:
+            return self._saver.flush()
 
         try:
-            # 确保目录存在
-            Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-
-            data = {"version": 1, "messages": [msg.to_dict() for msg in self._messages]}
-
-            with open(save_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-
-            self._dirty = False
-            logger.debug(f"聊天记录已保存到: {save_path}")
+            self._prepare_export(path)()
+            logger.debug(f"聊天记录已保存到: {path}")
             return True
 
         except Exception as e:
             logger.debug(f"保存聊天记录失败: {e}")
             return False
 
+    def _prepare_history_write(self):
+        """准备写入当前聊天记录路径的任务（主线程调用，由存储后端增量写入）"""
+        job = self._store.prepare_save(self._messages)
+        self._dirty = False
+        return job
+
+    def _on_save_failed(self, error: Exception):
+        """写入失败时保留未保存标记"""
+        self._dirty = True
+
+    def _prepare_export(self, path: str):
+        """准备写入其他路径的任务（如导出），写入完整的 version 1 JSON 文件"""
+        messages = list(self._iter_all_messages())
+        return lambda: write_messages_file(path, {"version": 1}, messages)
+
     def save_to_file(self, path: str = "") -> bool:
         """
         保存聊天记录到文件 (兼容旧接口，优先使用异步)
@@ -375,9 +592,20 @@ class ChatHistoryManager(QObject):
             # 如果指定了路径，通常是导出操作，使用同步保存以确保完成
             return self.save_to_file_sync(path)
 
-        self._schedule_save()
+        # 跳过防抖立即写入（如流式响应结束时）
+        self._saver.request(immediate=True)
         return True
 
+    def close(self):
+        """同步写入所有未保存的更改并关闭存储后端（应用退出时调用）"""
+        # 取消未完成的导出，避免留下写到一半的临时文件
+        for task in list(self._export_tasks):
+            task.cancel()
+            task.wait(2.0)
+        if self._dirty or self._saver.has_pending():
+            self._saver.flush()
+        self._store.close()
+
     def load_from_file(self, path: str = "") -> bool:
         """
         从文件加载聊天记录
@@ -389,69 +617,42 @@ class ChatHistoryManager(QObject):
             是否加载成功
         """
         load_path = path or self._history_path
+        if load_path == self._history_path:
+            store = self._store
+        else:
+            # 从其他文件加载时，下次保存需要写入完整快照
+            store = create_history_store(load_path, self._backend)
+            store.set_max_messages(self._max_messages)
+            self._store.request_compaction()
 
-        if not os.path.exists(load_path):
+        if not store.exists():
             logger.debug(f"聊天记录文件不存在: {load_path}，创建空历史记录文件")
-            self._messages = []
-            self._dirty = True  # 标记为需要保存
+            self._set_messages([])
             # 创建空历史记录文件
-            self.save_to_file_sync(load_path)
-            self._dirty = False
-
-            # 自动创建空的聊天记录文件
+            store.request_compaction()
             try:
-                # 确保目录存在
-                Path(load_path).parent.mkdir(parents=True, exist_ok=True)
-
-                # 创建空的聊天记录文件
-                initial_data = {"version": 1, "messages": []}
-                with open(load_path, "w", encoding="utf-8") as f:
-                    json.dump(initial_data, f, ensure_ascii=False, indent=2)
+                store.prepare_save(self._messages)()
                 logger.debug(f"空历史记录文件已创建: {load_path}")
             except Exception as e:
                 logger.debug(f"创建空历史记录文件失败: {e}")
+            self._dirty = False
 
             # 发射信号通知UI可以开始显示（空列表）
             self.history_loaded.emit()
             return True  # 不视为错误，只是没有历史记录
 
         try:
-            with open(load_path, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            # 检查文件是否为空
-            if not content.strip():
-                logger.debug(f"聊天记录文件为空: {load_path}")
-                self._messages = []
-                self._dirty = False
-                self.history_loaded.emit()
-                return True
-
-            data = json.loads(content)
-
-            # 版本检查
-            version = data.get("version", 1)
-            if version != 1:
-                logger.debug(f"警告: 聊天记录版本 {version} 可能不兼容")
-
-            # 加载消息
-            messages_data = data.get("messages", [])
-            loaded_messages = []
-
-            for i, m in enumerate(messages_data):
-                try:
-                    msg = ChatMessage.from_dict(m)
-                    loaded_messages.append(msg)
-                except Exception as e:
-                    logger.debug(f"跳过无效消息 {i}: {e}")
-                    continue
-
-            self._messages = loaded_messages
+            self._set_messages(store.load())
             self._dirty = False
             logger.debug(
                 f"成功加载 {len(self._messages)} 条聊天记录 (来自 {load_path})"
             )
 
+            # 旧格式文件在首次加载时迁移到当前存储格式
+            if store is self._store and store.needs_migration():
+                logger.debug(f"迁移聊天记录到 {self._backend} 存储格式: {load_path}")
+                self.save_to_file_sync()
+
             # 发射信号
             self.history_loaded.emit()
 
@@ -461,7 +662,8 @@ class ChatHistoryManager(QObject):
             logger.debug(f"聊天记录文件格式错误: {e}")
             # 文件损坏，备份后重置
             self._backup_corrupted_file(load_path)
-            self._messages = []
+            self._store.request_compaction()
+            self._set_messages([])
             self._dirty = False
             self.history_loaded.emit()
             return False
@@ -472,7 +674,7 @@ class ChatHistoryManager(QObject):
 
             traceback.print_exc()
             # 出错时也发射信号，让UI可以正常初始化
-            self._messages = []
+            self._set_messages([])
             self._dirty = False
             self.history_loaded.emit()
             return False
@@ -494,9 +696,12 @@ class ChatHistoryManager(QObject):
     def set_max_messages(self, max_count: int):
         """设置最大消息数"""
         self._max_messages = max(100, max_count)  # 最少保留 100 条
+        self._store.set_max_messages(self._max_messages)
 
     def get_message_count(self) -> int:
         """获取消息数量"""
+        if self._store.queryable:
+            return self._store.count()
         return len(self._messages)
 
     def has_unsaved_changes(self) -> bool:
@@ -505,36 +710,69 @@ class ChatHistoryManager(QObject):
 
     def export_to_file(self, path: str, format: str = "json") -> bool:
         """
-        导出聊天记录到指定文件
+        同步导出聊天记录到指定文件（逐条写入，不在内存中构造完整数据）
+
+        大量消息请使用 start_export 在后台线程中导出。
 
         Args:
             path: 导出路径
-            format: 导出格式 ("json" / "txt")
+            format: 导出格式 ("json" / "jsonl" / "txt" / "markdown" / "html")
 
         Returns:
             是否导出成功
         """
         try:
-            if format == "txt":
-                with open(path, "w", encoding="utf-8") as f:
-                    for msg in self._messages:
-                        role = "用户" if msg.role == "user" else "助手"
-                        time_str = time.strftime(
-                            "%Y-%m-%d %H:%M:%S", time.localtime(msg.timestamp)
-                        )
-                        f.write(f"[{time_str}] {role}:\n{msg.content}\n\n")
-            else:
-                return self.save_to_file(path)
-
-            logger.debug(f"聊天记录已导出到: {path}")
+            count = ChatExporter().export(self._iter_all_messages(), path, format)
+            logger.debug(f"已导出 {count} 条聊天记录到: {path}")
             return True
 
         except Exception as e:
             logger.debug(f"导出聊天记录失败: {e}")
             return False
 
+    def start_export(
+        self,
+        path: str,
+        format: str = "",
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_finished: Optional[Callable[[bool, str], None]] = None,
+    ) -> ChatExportTask:
+        """
+        在后台线程中导出聊天记录
+
+        任务通过 progress / finished 信号报告进度和结果，可以调用 cancel 取消。
+        消息较少时导出可能在返回前就已完成，接收者需要通过 on_progress / on_finished
+        传入，在任务启动前连接，否则会错过 finished 信号。
+
+        Args:
+            path: 导出路径
+            format: 导出格式，为空则根据扩展名推断
+            on_progress: 连接到 progress 信号的槽
+            on_finished: 连接到 finished 信号的槽
+
+        Returns:
+            已启动的导出任务
+        """
+        # 信号在工作线程中发射，接收者应连接到主线程中 QObject 的方法（队列连接）
+        task = ChatExportTask(
+            self._iter_all_messages(),
+            path,
+            format or format_from_path(path),
+            total=self.get_message_count(),
+        )
+        if on_progress is not None:
+            task.progress.connect(on_progress)
+        if on_finished is not None:
+            task.finished.connect(on_finished)
+        self._export_tasks = [t for t in self._export_tasks if t.is_running()]
+        self._export_tasks.append(task)
+        task.start()
+        return task
+
 
 # 便捷函数
-def get_chat_history_manager(history_path: str = "") -> ChatHistoryManager:
+def get_chat_history_manager(
+    history_path: str = "", backend: str = ""
+) -> ChatHistoryManager:
     """获取聊天记录管理器实例"""
-    return ChatHistoryManager.get_instance(history_path)
+    return ChatHistoryManager.get_instance(history_path, backend)
@@ -0,0 +1,173 @@
+"""
+聊天消息数据结构
+
+ChatMessage 使用 __slots__ 紧凑存储：
+- role / msg_type 取值有限，驻留（intern）后所有消息共享同一个字符串对象
+- 没有元数据的消息共享同一个只读空字典 EMPTY_METADATA
+- to_json / write_messages_json 直接生成 JSON 文本，不构造中间 dict
+"""
+
+import json
+import math
+import sys
+import uuid
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, TextIO
+
+# 所有没有元数据的消息共享的只读空字典
+EMPTY_METADATA: Mapping[str, Any] = MappingProxyType({})
+
+# 常用的角色和消息类型，加载时直接映射到同一个字符串对象
+_INTERNED = {
+    s: sys.intern(s)
+    for s in ("user", "assistant", "text", "image", "voice", "video", "file")
+}
+
+# 与 json.dumps(..., ensure_ascii=False) 相同的字符串编码
+_encode_str = json.encoder.encode_basestring
+
+
+def intern_field(value: str) -> str:
+    """驻留取值有限的字符串字段（role / msg_type）"""
+    interned = _INTERNED.get(value)
+    if interned is not None:
+        return interned
+    return sys.intern(value) if type(value) is str else value
+
+
+def _encode_text(value: Any) -> str:
+    if value is None:
+        return "null"
+    return _encode_str(value)
+
+
+def _encode_number(value: Any) -> str:
+    if type(value) is float:
+        # NaN / Infinity 不是合法的 JSON，写为 null
+        return float.__repr__(value) if math.isfinite(value) else "null"
+    return _encode_value(value)
+
+
+def _finite(value: Any) -> Any:
+    """把嵌套数据中的 NaN / Infinity 替换为 None"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, Mapping):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def _encode_value(value: Any) -> str:
+    """序列化任意 JSON 值，NaN / Infinity 写为 null"""
+    try:
+        return json.dumps(value, ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        return json.dumps(_finite(value), ensure_ascii=False, allow_nan=False)
+
+
+@dataclass(slots=True)
+class ChatMessage:
+    """聊天消息数据结构"""
+
+    id: str = ""  # UUID
+    role: str = "user"  # "user" / "assistant"
+    content: str = ""  # 消息内容
+    msg_type: str = "text"  # "text" / "image" / "voice" / "video" / "file"
+    timestamp: float = 0.0  # 时间戳
+    file_path: str = ""  # 媒体文件路径（可选）
+    # 其他元数据（创建后不应原地修改）
+    metadata: Mapping[str, Any] = field(default_factory=lambda: EMPTY_METADATA)
+
+    def __post_init__(self):
+        if not self.id:
+            self.id = str(uuid.uuid4())
+        if self.timestamp == 0.0:
+            self.timestamp = time.time()
+        self.role = intern_field(self.role)
+        self.msg_type = intern_field(self.msg_type)
+        if not self.metadata:
+            self.metadata = EMPTY_METADATA
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "id": self.id,
+            "role": self.role,
+            "content": self.content,
+            "msg_type": self.msg_type,
+            "timestamp": self.timestamp,
+            "file_path": self.file_path,
+            "metadata": dict(self.metadata),
+        }
+
+    def to_json(self) -> str:
+        """
+        序列化为单行 JSON 文本
+
+        与 json.dumps(self.to_dict(), ensure_ascii=False) 的解析结果相同，
+        但不需要构造中间 dict。NaN / Infinity 不是合法的 JSON，写为 null。
+        """
+        metadata = _encode_value(dict(self.metadata)) if self.metadata else "{}"
+        return "".join(
+            (
+                '{"id": ',
+                _encode_text(self.id),
+                ', "role": ',
+                _encode_text(self.role),
+                ', "content": ',
+                _encode_text(self.content),
+                ', "msg_type": ',
+                _encode_text(self.msg_type),
+                ', "timestamp": ',
+                _encode_number(self.timestamp),
+                ', "file_path": ',
+                _encode_text(self.file_path),
+                ', "metadata": ',
+                metadata,
+                "}",
+            )
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChatMessage":
+        """从字典创建"""
+        return cls(
+            id=data.get("id", ""),
+            role=data.get("role", "user"),
+            content=data.get("content", ""),
+            msg_type=data.get("msg_type", "text"),
+            timestamp=data.get("timestamp") or 0.0,
+            file_path=data.get("file_path") or "",
+            metadata=data.get("metadata") or EMPTY_METADATA,
+        )
+
+
+def write_messages_json(
+    fp: TextIO, header: Mapping[str, Any], messages: Iterable[ChatMessage]
+) -> None:
+    """
+    将 {**header, "messages": [...]} 逐条写入文本流
+
+    每条消息占一行，写入过程中只有单条消息的 JSON 文本驻留内存。
+
+    Args:
+        fp: 以文本模式打开的输出流
+        header: messages 之前的字段（如 version / seq）
+        messages: 消息序列（可以是生成器）
+    """
+    fp.write("{")
+    for key, value in header.items():
+        fp.write(f"{_encode_str(key)}: {_encode_value(value)}, ")
+    fp.write('"messages": [')
+
+    separator = "\n"
+    for msg in messages:
+        fp.write(separator)
+        fp.write(msg.to_json())
+        separator = ",\n"
+
+    fp.write("\n]}\n" if separator != "\n" else "]}\n")
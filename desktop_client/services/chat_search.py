@@ -0,0 +1,407 @@
+"""
+聊天记录全文搜索
+
+- 分词：拉丁字母 / 数字按单词切分并转为小写；中日韩文字没有空格分隔，
+  索引时同时记录单字和相邻两字（bigram），查询时按 bigram 匹配（单字查询按单字匹配）
+- 倒排索引（InvertedIndex）：json / journal 后端使用，在内存中增量维护，
+  流式更新只标记消息需要重建索引，搜索前再统一处理；加载历史记录后的全量建立
+  在后台线程中分批执行，不阻塞界面
+- SQLite 后端使用 FTS5 虚拟表（见 SqliteHistoryStore.search），分词结果相同
+- 结果按 BM25 排序，并生成带高亮区间的摘要
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from .chat_message import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+# 中日韩文字（汉字、假名、谚文）
+_CJK = (
+    "\u3040-\u30ff"  # 平假名、片假名
+    "\u3400-\u4dbf"  # 汉字扩展 A
+    "\u4e00-\u9fff"  # 基本汉字
+    "\uf900-\ufaff"  # 兼容汉字
+    "\uac00-\ud7af"  # 谚文音节
+)
+_TOKEN_RE = re.compile(f"([{_CJK}]+)|([^\\W{_CJK}]+)")
+
+# BM25 参数
+_K1 = 1.2
+_B = 0.75
+
+# 等待建立索引的消息不超过该数量时在搜索时直接处理，否则在后台线程中建立
+SYNC_INDEX_LIMIT = 256
+# 后台线程每次持有锁处理的消息数（搜索最多等待一批）
+INDEX_BATCH_SIZE = 256
+
+
+@dataclass
+class QueryTerms:
+    """解析后的查询"""
+
+    tokens: List[str] = field(default_factory=list)  # 必须全部匹配的词
+    prefix: str = ""  # 最后一个拉丁单词按前缀匹配（边输入边搜索）
+    needles: List[str] = field(default_factory=list)  # 用于摘要高亮的原始片段
+
+    def __bool__(self) -> bool:
+        return bool(self.tokens or self.prefix)
+
+
+@dataclass
+class SearchResult:
+    """搜索结果"""
+
+    message: ChatMessage
+    score: float  # 相关度，越大越相关
+    snippet: str  # 摘要
+    highlights: List[Tuple[int, int]]  # 摘要中需要高亮的区间 [start, end)
+
+    @property
+    def message_id(self) -> str:
+        return self.message.id
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    索引分词
+
+    Args:
+        text: 消息内容
+
+    Returns:
+        词列表（可重复，用于词频统计）
+    """
+    tokens: List[str] = []
+    for cjk, word in _TOKEN_RE.findall(text.lower()):
+        if word:
+            tokens.append(word)
+            continue
+        tokens.extend(cjk)
+        tokens.extend(cjk[i : i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def parse_query(query: str) -> QueryTerms:
+    """
+    查询分词
+
+    Args:
+        query: 用户输入的查询
+
+    Returns:
+        解析后的查询；多字中文按 bigram 匹配，单字按单字匹配
+    """
+    terms = QueryTerms()
+    matches = _TOKEN_RE.findall(query.lower())
+    for i, (cjk, word) in enumerate(matches):
+        if word:
+            terms.needles.append(word)
+            if i == len(matches) - 1 and not query[-1:].isspace():
+                terms.prefix = word
+            else:
+                terms.tokens.append(word)
+            continue
+        terms.needles.append(cjk)
+        if len(cjk) == 1:
+            terms.tokens.append(cjk)
+        else:
+            terms.tokens.extend(cjk[j : j + 2] for j in range(len(cjk) - 1))
+
+    # 去重并保持顺序
+    terms.tokens = list(dict.fromkeys(terms.tokens))
+    if terms.prefix in terms.tokens:
+        terms.prefix = ""
+    return terms
+
+
+def make_snippet(
+    content: str, needles: Iterable[str], width: int = 60
+) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    生成摘要和高亮区间
+
+    Args:
+        content: 消息内容
+        needles: 需要高亮的片段（小写）
+        width: 摘要的最大字符数
+
+    Returns:
+        (摘要, 高亮区间列表)
+    """
+    text = " ".join(content.split())
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # 极少数字符转小写后长度会变化，此时无法对应位置，不做高亮
+        lowered = ""
+
+    spans: List[Tuple[int, int]] = []
+    for needle in needles:
+        if not needle:
+            continue
+        parts = [needle]
+        if needle not in lowered and len(needle) > 2:
+            # 整段没有出现（如中文词被其他字隔开），退化为逐个 bigram 高亮
+            parts = [needle[i : i + 2] for i in range(len(needle) - 1)]
+        for part in parts:
+            start = lowered.find(part)
+            while start >= 0:
+                spans.append((start, start + len(part)))
+                start = lowered.find(part, start + len(part))
+
+    spans = _merge_spans(spans)
+
+    # 以第一个高亮位置为中心截取摘要
+    begin = 0
+    if spans and len(text) > width:
+        begin = max(0, min(spans[0][0] - width // 3, len(text) - width))
+    end = min(len(text), begin + width)
+
+    snippet = text[begin:end]
+    offset = begin
+    if begin > 0:
+        snippet = "…" + snippet
+        offset -= 1
+    if end < len(text):
+        snippet += "…"
+
+    highlights = [
+        (max(s, begin) - offset, min(e, end) - offset)
+        for s, e in spans
+        if s < end and e > begin
+    ]
+    return snippet, highlights
+
+
+def _merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class InvertedIndex:
+    """
+    内存倒排索引
+
+    add / touch 只记录需要（重新）建立索引的消息，搜索前再统一分词，
+    因此流式响应中每个 chunk 的更新开销是 O(1)。
+    等待建立索引的消息较多时（如加载历史记录后）在后台线程中分批建立，
+    建立完成前的搜索只返回已建立索引的消息，不会等待全部完成。
+    """
+
+    def __init__(self, on_ready: Optional[Callable[[], None]] = None):
+        """
+        初始化索引
+
+        Args:
+            on_ready: 后台线程建立索引完成时调用（在后台线程中调用）
+        """
+        self._postings: Dict[str, Dict[str, int]] = {}  # 词 -> {消息 ID: 词频}
+        self._doc_terms: Dict[str, Counter] = {}  # 消息 ID -> 词频
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+        self._unindexed: Dict[str, ChatMessage] = {}  # 等待建立索引的消息
+
+        self._lock = threading.Lock()
+        self._builder: Optional[threading.Thread] = None
+        self._on_ready = on_ready
+
+    @property
+    def building(self) -> bool:
+        """是否正在后台建立索引（此时搜索结果可能不完整）"""
+        return self._builder is not None
+
+    def reset(self, messages: Iterable[ChatMessage]):
+        """用给定的消息重建索引（消息较多时立即在后台线程中建立）"""
+        with self._lock:
+            self._clear()
+            self._unindexed = {msg.id: msg for msg in messages}
+            self._start_builder()
+
+    def add(self, message: ChatMessage):
+        """添加消息"""
+        with self._lock:
+            self._unindexed[message.id] = message
+
+    def touch(self, message: ChatMessage):
+        """消息内容已更新"""
+        with self._lock:
+            self._unindexed[message.id] = message
+
+    def remove(self, message_ids: Iterable[str]):
+        """删除消息"""
+        with self._lock:
+            for message_id in message_ids:
+                self._unindexed.pop(message_id, None)
+                self._drop(message_id)
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            self._clear()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待后台建立索引完成
+
+        Returns:
+            是否已完成
+        """
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+        return self._builder is None
+
+    def _clear(self):
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_len.clear()
+        self._total_len = 0
+        self._unindexed.clear()
+
+    def _drop(self, message_id: str):
+        terms = self._doc_terms.pop(message_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            docs = self._postings.get(token)
+            if docs is not None:
+                docs.pop(message_id, None)
+                if not docs:
+                    del self._postings[token]
+        self._total_len -= self._doc_len.pop(message_id, 0)
+
+    def _start_builder(self):
+        """等待建立索引的消息较多时启动后台线程（调用方持有锁）"""
+        if self._builder is None and len(self._unindexed) > SYNC_INDEX_LIMIT:
+            self._builder = threading.Thread(
+                target=self._build, name="search-index", daemon=True
+            )
+            self._builder.start()
+
+    def _build(self):
+        """后台线程：分批建立索引，每批之间释放锁让搜索和更新可以执行"""
+        while True:
+            with self._lock:
+                if not self._unindexed:
+                    self._builder = None
+                    break
+                self._flush(INDEX_BATCH_SIZE)
+        if self._on_ready is not None:
+            try:
+                self._on_ready()
+            except Exception as e:
+                logger.debug(f"通知搜索索引建立完成失败: {e}")
+
+    def _flush(self, limit: int = 0):
+        """为最多 limit 条（0 表示全部）等待中的消息建立索引（调用方持有锁）"""
+        if not self._unindexed:
+            return
+        if limit <= 0 or limit >= len(self._unindexed):
+            pending, self._unindexed = self._unindexed, {}
+        else:
+            pending = {
+                message_id: self._unindexed.pop(message_id)
+                for message_id in list(islice(self._unindexed, limit))
+            }
+        for message_id, message in pending.items():
+            self._drop(message_id)
+            tokens = tokenize(message.content)
+            if not tokens:
+                continue
+            terms = Counter(tokens)
+            self._doc_terms[message_id] = terms
+            self._doc_len[message_id] = len(tokens)
+            self._total_len += len(tokens)
+            for token, tf in terms.items():
+                self._postings.setdefault(token, {})[message_id] = tf
+
+    def search(self, terms: QueryTerms, limit: int = 20) -> List[Tuple[str, float]]:
+        """
+        搜索消息
+
+        Args:
+            terms: parse_query 的结果
+            limit: 最大结果数
+
+        Returns:
+            [(消息 ID, 相关度)]，按相关度从高到低排序；
+            后台建立索引期间只包含已建立索引的消息
+        """
+        with self._lock:
+            if self._builder is None:
+                self._start_builder()
+                if self._builder is None:
+                    self._flush()
+            return self._search(terms, limit)
+
+    def _search(self, terms: QueryTerms, limit: int) -> List[Tuple[str, float]]:
+        if not terms or not self._doc_len:
+            return []
+
+        term_docs: List[Dict[str, int]] = []
+        for token in terms.tokens:
+            docs = self._postings.get(token)
+            if not docs:
+                return []
+            term_docs.append(docs)
+
+        if terms.prefix:
+            # 前缀匹配：合并所有以该前缀开头的词
+            merged: Dict[str, int] = {}
+            for token, docs in self._postings.items():
+                if token.startswith(terms.prefix):
+                    for message_id, tf in docs.items():
+                        merged[message_id] = merged.get(message_id, 0) + tf
+            if not merged:
+                return []
+            term_docs.append(merged)
+
+        # 从最短的倒排表开始求交集
+        term_docs.sort(key=len)
+        candidates = set(term_docs[0])
+        for docs in term_docs[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                return []
+
+        total = len(self._doc_len)
+        avg_len = self._total_len / total
+        scores: Dict[str, float] = {}
+        for docs in term_docs:
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for message_id in candidates:
+                tf = docs[message_id]
+                norm = _K1 * (1 - _B + _B * self._doc_len[message_id] / avg_len)
+                scores[message_id] = (
+                    scores.get(message_id, 0.0) + idf * tf * (_K1 + 1) / (tf + norm)
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit > 0 else ranked
+
+
+def fts_match_expression(terms: QueryTerms) -> Optional[str]:
+    """
+    将查询转换为 FTS5 MATCH 表达式（每个词加引号，隐式 AND）
+
+    Returns:
+        表达式；查询为空时返回 None
+    """
+    if not terms:
+        return None
+    parts = ['"' + token.replace('"', '""') + '"' for token in terms.tokens]
+    if terms.prefix:
+        parts.append('"' + terms.prefix.replace('"', '""') + '"*')
+    return " ".join(parts)
@@ -3,13 +3,14 @@
 
 负责收集本地桌面状态（活动窗口、截图等）并通过 WebSocket 上报给服务端。
 使用平台适配器实现跨平台功能。
+
+启用变化检测时，画面未变化的截图不再编码上报，部分变化时只上报变化的区域。
+截图、缩放和编码在截图处理线程池中执行，不阻塞事件循环。
 """
 
 import asyncio
-import base64
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from io import BytesIO
 from typing import Any, Callable, List, Optional
 
 # 可选依赖
@@ -22,6 +23,9 @@ except ImportError:
 
 # 导入平台适配器
 from ..platforms import get_platform_adapter, IPlatformAdapter
+from .frame_diff import CHANGE_FULL, CHANGE_NONE, CHANGE_PARTIAL, FrameDiffer
+from .frame_worker import FrameWorker
+from .image_pipeline import ImagePipeline, downscale
 
 
 @dataclass
@@ -36,12 +40,19 @@ class DesktopState:
     active_window_process: Optional[str] = None
     # 活动窗口进程 ID
     active_window_pid: Optional[int] = None
-    # 屏幕截图（Base64 编码的 PNG）
-    screenshot_base64: Optional[str] = None
+    # 屏幕截图（编码后的原始字节，格式见 screenshot_format；
+    # 上报时由 WebSocketClient 以二进制帧或 screenshot_base64 发送）
+    screenshot: Optional[bytes] = None
+    # 截图编码格式（jpeg / webp / png）
+    screenshot_format: Optional[str] = None
     # 截图宽度
     screenshot_width: Optional[int] = None
     # 截图高度
     screenshot_height: Optional[int] = None
+    # 截图上报方式：full（完整截图）/ partial（只有变化区域）/ unchanged（画面未变化，不含截图）
+    screenshot_mode: Optional[str] = None
+    # 变化区域（partial 时），每项包含 left/top/width/height（截图坐标）和 image（原始字节）
+    screenshot_regions: Optional[List[dict]] = None
     # 运行中的应用列表
     running_apps: Optional[List[dict]] = None
     # 窗口是否发生变化
@@ -50,7 +61,7 @@ class DesktopState:
     previous_window_title: Optional[str] = None
 
     def to_dict(self) -> dict:
-        """转换为字典"""
+        """转换为字典（截图保持为 bytes）"""
         return asdict(self)
 
 
@@ -65,6 +76,12 @@ class DesktopMonitorService:
         screenshot_width: int = 800,
         screenshot_height: int = 600,
         on_state_captured: Optional[Callable[[DesktopState], Any]] = None,
+        change_detection: bool = True,
+        change_threshold: float = 6.0,
+        full_frame_ratio: float = 0.5,
+        keyframe_interval: int = 10,
+        screenshot_format: str = "jpeg",
+        screenshot_quality: str = "balanced",
     ):
         """
         初始化桌面监控服务
@@ -76,6 +93,12 @@ class DesktopMonitorService:
             screenshot_width: 截图压缩宽度
             screenshot_height: 截图压缩高度
             on_state_captured: 状态捕获回调
+            change_detection: 是否启用变化检测
+            change_threshold: 画面区域的平均灰度差（0~255）超过该值时认为发生变化
+            full_frame_ratio: 变化区域占比达到该值时上报完整截图
+            keyframe_interval: 连续上报多少次部分区域后上报一次完整截图
+            screenshot_format: 截图编码格式（jpeg / webp / png）
+            screenshot_quality: 质量预设（fast / balanced / quality）
         """
         self.screen_capture = screen_capture_service
         self.report_interval = report_interval
@@ -83,6 +106,15 @@ class DesktopMonitorService:
         self.screenshot_width = screenshot_width
         self.screenshot_height = screenshot_height
         self.on_state_captured = on_state_captured
+        self.change_detection = change_detection
+        self._pipeline = ImagePipeline(screenshot_format, screenshot_quality)
+        self._differ = FrameDiffer(
+            tile_threshold=change_threshold,
+            full_ratio=full_frame_ratio,
+            keyframe_interval=keyframe_interval,
+        )
+        # 截图处理队列：同一时间只处理一帧
+        self._frame_worker = FrameWorker()
 
         self._is_monitoring = False
         self._monitor_task: Optional[asyncio.Task] = None
@@ -102,6 +134,22 @@ class DesktopMonitorService:
         """获取最后捕获的状态"""
         return self._last_state
 
+    def get_status(self) -> dict:
+        """
+        获取服务状态
+
+        Returns:
+            状态信息字典，包含变化检测统计（跳过和上报的截图比例）
+        """
+        return {
+            "is_monitoring": self._is_monitoring,
+            "report_interval": self.report_interval,
+            "screenshot_enabled": self.screenshot_enabled,
+            "change_detection": self.change_detection,
+            "frames": self._differ.get_stats(),
+            "encoder": self._frame_worker.get_stats(),
+        }
+
     async def start(self):
         """启动监控"""
         if self._is_monitoring:
@@ -187,9 +235,12 @@ class DesktopMonitorService:
             if include_screenshot and self.screenshot_enabled and self.screen_capture:
                 screenshot_data = await self._capture_screenshot()
                 if screenshot_data:
-                    state.screenshot_base64 = screenshot_data["base64"]
-                    state.screenshot_width = screenshot_data["width"]
-                    state.screenshot_height = screenshot_data["height"]
+                    state.screenshot_mode = screenshot_data["mode"]
+                    state.screenshot_format = screenshot_data.get("format")
+                    state.screenshot = screenshot_data.get("data")
+                    state.screenshot_regions = screenshot_data.get("regions")
+                    state.screenshot_width = screenshot_data.get("width")
+                    state.screenshot_height = screenshot_data.get("height")
 
             self._last_state = state
             return state
@@ -199,52 +250,101 @@ class DesktopMonitorService:
             return None
 
     async def _capture_screenshot(self) -> Optional[dict]:
-        """捕获并压缩截图"""
+        """在截图处理线程池中捕获并压缩截图（有更新的截图请求时返回 None）"""
         if not self.screen_capture or not HAS_PIL:
             return None
 
-        try:
-            # 使用 screen_capture 服务捕获全屏
-            image = self.screen_capture.capture_full_screen()
-            if image is None:
-                return None
-
-            # 压缩图片
-            image = self._resize_image(
-                image, self.screenshot_width, self.screenshot_height
-            )
-
-            # 转换为 Base64
-            buffer = BytesIO()
-            image.save(buffer, format="PNG", optimize=True)
-            base64_data = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        return await self._frame_worker.run(self._process_frame)
 
-            return {
-                "base64": base64_data,
-                "width": image.width,
-                "height": image.height,
-            }
+    def _process_frame(self) -> Optional[dict]:
+        """捕获、检测变化、压缩并编码截图（在截图处理线程中执行）"""
+        try:
+            # 使用 screen_capture 服务捕获全屏（原图在缓冲池中复用，只在上下文中使用）
+            with self.screen_capture.capture_frame() as image:
+                if image is None:
+                    return None
+
+                # 画面未变化时不压缩、不编码
+                change = self._differ.compare(image) if self.change_detection else None
+                if change is not None and change.kind == CHANGE_NONE:
+                    return {"mode": CHANGE_NONE}
+
+                # 压缩图片
+                image = self._resize_image(
+                    image, self.screenshot_width, self.screenshot_height
+                )
+
+                # 未缩小时 image 仍是缓冲池中的原图，需要在上下文中编码完成
+                if change is not None and change.kind == CHANGE_PARTIAL:
+                    result = {
+                        "mode": CHANGE_PARTIAL,
+                        "format": self._pipeline.codec,
+                        "regions": self._encode_regions(image, change.regions),
+                        "width": image.width,
+                        "height": image.height,
+                    }
+                else:
+                    result = {
+                        "mode": CHANGE_FULL,
+                        "format": self._pipeline.codec,
+                        "data": self._encode(image),
+                        "width": image.width,
+                        "height": image.height,
+                    }
+
+                # 编码成功后才更新参考帧，编码失败时这次变化在下一帧仍会被检测到
+                if change is not None:
+                    self._differ.commit(change)
+                return result
 
         except Exception as e:
             print(f"截图失败: {e}")
             return None
 
+    def _encode_regions(self, image: "Image.Image", regions: list) -> List[dict]:
+        """
+        编码变化区域
+
+        Args:
+            image: 压缩后的截图
+            regions: 变化区域 (left, top, width, height)，以占整幅画面的比例表示
+
+        Returns:
+            区域列表，坐标为截图中的像素坐标
+        """
+        encoded = []
+        for left, top, width, height in regions:
+            box = (
+                int(left * image.width),
+                int(top * image.height),
+                round((left + width) * image.width),
+                round((top + height) * image.height),
+            )
+            encoded.append(
+                {
+                    "left": box[0],
+                    "top": box[1],
+                    "width": box[2] - box[0],
+                    "height": box[3] - box[1],
+                    "image": self._encode(image.crop(box)),
+                }
+            )
+        return encoded
+
+    def _encode(self, image: "Image.Image") -> bytes:
+        """按配置的编码格式编码"""
+        return self._pipeline.encode(image).data
+
     def _resize_image(
         self, image: "Image.Image", max_width: int, max_height: int
     ) -> "Image.Image":
-        """调整图片大小"""
-        # 计算缩放比例
-        ratio = min(max_width / image.width, max_height / image.height)
-
-        if ratio < 1:
-            new_width = int(image.width * ratio)
-            new_height = int(image.height * ratio)
-            return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        return image
+        """调整图片大小（两阶段缩小，滤镜由质量预设决定）"""
+        preset = self._pipeline.preset
+        return downscale(image, max_width, max_height, preset.resample, preset.reducing_gap)
 
     async def capture_and_report(self) -> Optional[DesktopState]:
-        """立即捕获并触发上报"""
+        """立即捕获并触发上报（上报完整截图）"""
+        self._differ.reset()
         state = await self.capture_state()
 
         if state and self.on_state_captured:
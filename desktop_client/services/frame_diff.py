@@ -0,0 +1,210 @@
+"""
+截图变化检测
+
+把截图缩小为灰度缩略图，按网格划分为若干块，与上一次上报的缩略图逐块比较平均差值：
+- 没有块超过阈值：画面未变化，不需要上报截图
+- 部分块变化：只上报变化的区域（相邻的变化块合并为矩形）
+- 变化的块超过一定比例、尺寸变化或到了关键帧间隔：上报完整截图
+
+compare 只做检测，截图编码成功后再调用 commit 更新参考缩略图，编码失败的变化在下一帧
+仍会被检测到。上报部分区域时只更新这些区域，未上报的块中缓慢的变化会逐渐累积，
+超过阈值后仍会被检测到。
+"""
+
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageChops
+
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# 检测结果
+CHANGE_NONE = "unchanged"
+CHANGE_PARTIAL = "partial"
+CHANGE_FULL = "full"
+
+# 缩略图中每块的边长（像素）
+TILE_SAMPLE = 8
+
+
+@dataclass
+class FrameChange:
+    """一帧的检测结果"""
+
+    kind: str  # unchanged / partial / full
+    # 变化区域，(left, top, width, height)，以占整幅画面的比例表示（0~1）
+    regions: List[Tuple[float, float, float, float]] = field(default_factory=list)
+    changed_ratio: float = 0.0  # 变化的块占所有块的比例
+
+    # commit 更新参考帧使用：当前缩略图、截图尺寸、变化区域（单位为块）
+    _thumbnail: Optional["Image.Image"] = field(default=None, repr=False, compare=False)
+    _size: Optional[Tuple[int, int]] = field(default=None, repr=False, compare=False)
+    _boxes: List[Tuple[int, int, int, int]] = field(
+        default_factory=list, repr=False, compare=False
+    )
+
+
+@dataclass
+class FrameDiffStats:
+    """检测统计"""
+
+    frames: int = 0
+    unchanged: int = 0
+    partial: int = 0
+    full: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        data["skipped_ratio"] = self.unchanged / self.frames if self.frames else 0.0
+        data["sent_ratio"] = (self.partial + self.full) / self.frames if self.frames else 0.0
+        return data
+
+
+class FrameDiffer:
+    """基于缩略图分块比较的截图变化检测"""
+
+    def __init__(
+        self,
+        grid: Tuple[int, int] = (16, 9),
+        tile_threshold: float = 6.0,
+        full_ratio: float = 0.5,
+        keyframe_interval: int = 10,
+    ):
+        """
+        初始化变化检测
+
+        Args:
+            grid: 网格列数和行数
+            tile_threshold: 块的平均灰度差（0~255）超过该值时认为该块变化
+            full_ratio: 变化的块占比达到该值时上报完整截图
+            keyframe_interval: 连续上报多少次部分区域后强制上报一次完整截图（0 表示不强制）
+        """
+        self.grid = grid
+        self.tile_threshold = tile_threshold
+        self.full_ratio = full_ratio
+        self.keyframe_interval = keyframe_interval
+        self.stats = FrameDiffStats()
+
+        self._reference: Optional["Image.Image"] = None
+        self._reference_size: Optional[Tuple[int, int]] = None
+        self._since_full = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取检测统计"""
+        return self.stats.to_dict()
+
+    def reset(self):
+        """丢弃参考帧，下一帧作为完整截图上报"""
+        self._reference = None
+        self._reference_size = None
+
+    def compare(self, image: "Image.Image") -> FrameChange:
+        """
+        与上一次上报的画面比较（不更新参考帧，上报的数据准备好后调用 commit）
+
+        Args:
+            image: 当前截图
+
+        Returns:
+            检测结果
+        """
+        cols, rows = self.grid
+        thumbnail = image.resize(
+            (cols * TILE_SAMPLE, rows * TILE_SAMPLE), Image.Resampling.BOX
+        ).convert("L")
+        self.stats.frames += 1
+
+        if self._reference is None or self._reference_size != image.size:
+            return FrameChange(CHANGE_FULL, changed_ratio=1.0, _thumbnail=thumbnail, _size=image.size)
+
+        # 每块的平均差值：差值图按块缩小，每个像素即一块的平均值
+        diff = ImageChops.difference(thumbnail, self._reference)
+        means = diff.resize((cols, rows), Image.Resampling.BOX).tobytes()
+        changed = {
+            (i % cols, i // cols) for i, mean in enumerate(means) if mean > self.tile_threshold
+        }
+
+        if not changed:
+            self.stats.unchanged += 1
+            return FrameChange(CHANGE_NONE)
+
+        ratio = len(changed) / (cols * rows)
+        keyframe_due = self.keyframe_interval and self._since_full + 1 >= self.keyframe_interval
+        if ratio >= self.full_ratio or keyframe_due:
+            return FrameChange(
+                CHANGE_FULL, changed_ratio=ratio, _thumbnail=thumbnail, _size=image.size
+            )
+
+        boxes = merge_tiles(changed)
+        regions = [
+            (left / cols, top / rows, width / cols, height / rows)
+            for left, top, width, height in boxes
+        ]
+        return FrameChange(
+            CHANGE_PARTIAL, regions, ratio, _thumbnail=thumbnail, _size=image.size, _boxes=boxes
+        )
+
+    def commit(self, change: FrameChange):
+        """
+        检测结果对应的截图已编码上报，更新参考帧
+
+        完整截图替换整个参考帧；部分区域只把上报的区域更新到参考帧中。
+
+        Args:
+            change: compare 的返回值
+        """
+        if change.kind == CHANGE_FULL:
+            self._reference = change._thumbnail
+            self._reference_size = change._size
+            self.stats.full += 1
+            self._since_full = 0
+            return
+        if change.kind != CHANGE_PARTIAL:
+            return
+
+        if self._reference is None or self._reference_size != change._size:
+            # 比较之后参考帧已被重置，下一帧会作为完整截图上报
+            return
+        for left, top, width, height in change._boxes:
+            box = (
+                left * TILE_SAMPLE,
+                top * TILE_SAMPLE,
+                (left + width) * TILE_SAMPLE,
+                (top + height) * TILE_SAMPLE,
+            )
+            self._reference.paste(change._thumbnail.crop(box), box)
+        self.stats.partial += 1
+        self._since_full += 1
+
+
+def merge_tiles(tiles: set) -> List[Tuple[int, int, int, int]]:
+    """
+    将相邻（上下左右）的变化块合并为包围矩形
+
+    Args:
+        tiles: 变化块的 (列, 行) 集合
+
+    Returns:
+        (左, 上, 宽, 高) 列表，单位为块，按从上到下、从左到右排列
+    """
+    remaining = set(tiles)
+    boxes = []
+    while remaining:
+        start = min(remaining, key=lambda t: (t[1], t[0]))
+        remaining.discard(start)
+        stack = [start]
+        left, top, right, bottom = start[0], start[1], start[0], start[1]
+        while stack:
+            col, row = stack.pop()
+            left, top = min(left, col), min(top, row)
+            right, bottom = max(right, col), max(bottom, row)
+            for neighbor in ((col + 1, row), (col - 1, row), (col, row + 1), (col, row - 1)):
+                if neighbor in remaining:
+                    remaining.discard(neighbor)
+                    stack.append(neighbor)
+        boxes.append((left, top, right - left + 1, bottom - top + 1))
+    return sorted(boxes, key=lambda box: (box[1], box[0]))
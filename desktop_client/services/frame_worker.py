@@ -0,0 +1,135 @@
+"""
+截图处理线程池
+
+截图、缩放、编码都是 CPU 密集的同步操作，放在事件循环或 Qt 主线程中执行会让界面卡顿。
+这里把它们放到有界线程池中执行（Pillow 在缩放和编码时释放 GIL，线程可以并行），并做背压控制：
+- 每个使用方（桌面监控、主动对话）同一时间只有一帧在处理
+- 处理期间提交的新帧只保留最新的一帧，更早等待的帧直接丢弃，不会排队堆积
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 所有使用方共用的线程数上限
+MAX_FRAME_THREADS = 2
+
+
+@dataclass
+class FrameWorkerStats:
+    """处理统计"""
+
+    submitted: int = 0  # 提交的帧数
+    completed: int = 0  # 处理完成的帧数
+    dropped: int = 0  # 被更新的帧替换、没有处理的帧数
+    failed: int = 0  # 处理出错的帧数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_frame_executor() -> ThreadPoolExecutor:
+    """获取共用的截图处理线程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=min(MAX_FRAME_THREADS, os.cpu_count() or 1),
+                thread_name_prefix="frame-encode",
+            )
+        return _executor
+
+
+class FrameWorker:
+    """一个使用方的截图处理队列：最多一帧处理中、一帧等待"""
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        初始化
+
+        Args:
+            executor: 线程池，不指定则使用共用线程池
+        """
+        self.stats = FrameWorkerStats()
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._busy = False
+        self._pending: Optional[Tuple[Callable[[], Any], Future]] = None
+
+    @property
+    def busy(self) -> bool:
+        """是否有帧正在处理"""
+        return self._busy
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取处理统计"""
+        data = self.stats.to_dict()
+        data["busy"] = self._busy
+        return data
+
+    def submit(self, job: Callable[[], Any]) -> Future:
+        """
+        提交一帧的处理函数
+
+        Args:
+            job: 在线程池中执行的处理函数
+
+        Returns:
+            Future，结果为处理函数的返回值；被更新的帧替换时结果为 None
+        """
+        future: Future = Future()
+        dropped: Optional[Future] = None
+        with self._lock:
+            self.stats.submitted += 1
+            if self._busy:
+                if self._pending is not None:
+                    dropped = self._pending[1]
+                    self.stats.dropped += 1
+                self._pending = (job, future)
+                start = False
+            else:
+                self._busy = True
+                start = True
+
+        if dropped is not None and dropped.set_running_or_notify_cancel():
+            dropped.set_result(None)
+        if start:
+            executor = self._executor or get_frame_executor()
+            executor.submit(self._drain, job, future)
+        return future
+
+    async def run(self, job: Callable[[], Any]) -> Any:
+        """提交处理函数并等待结果（不阻塞事件循环）"""
+        return await asyncio.wrap_future(self.submit(job))
+
+    def _drain(self, job: Callable[[], Any], future: Future):
+        """依次处理当前帧和等待中的最新帧"""
+        while True:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = job()
+                except Exception as e:
+                    self.stats.failed += 1
+                    logger.debug(f"截图处理失败: {e}")
+                    future.set_exception(e)
+                else:
+                    self.stats.completed += 1
+                    future.set_result(result)
+
+            with self._lock:
+                if self._pending is None:
+                    self._busy = False
+                    return
+                job, future = self._pending
+                self._pending = None
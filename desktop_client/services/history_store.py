@@ -0,0 +1,961 @@
+"""
+聊天记录存储后端
+
+ChatHistoryManager 通过存储后端完成持久化，支持：
+- json: 旧版单文件 JSON（version 1），每次保存整体重写
+- journal: 快照 + 追加写日志（JSONL），每条新消息只追加 O(1) 字节，
+  日志增长到一定规模后在后台线程中压缩为新快照
+- sqlite: SQLite 数据库（WAL 模式），按 id / 时间戳 / 角色 / 类型建立索引，
+  查询直接走索引，内存中只缓存最近的消息
+
+存储后端的调用约定：
+- record_* 方法在主线程中调用，只记录待写入的操作，开销很小
+- prepare_save 在主线程中调用，捕获需要写入的数据并返回一个写入任务
+- 写入任务可以在线程池中执行（asyncio.to_thread），也可以直接同步调用
+
+整文件写入（json 文件、快照）都通过 atomic_open 先写临时文件再替换，
+写入中途崩溃不会截断已有文件；日志追加写入的 fsync 由 FsyncBatcher 合并。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from ..utils.atomic_write import FsyncBatcher, append_text, atomic_open
+from .chat_message import ChatMessage, write_messages_json
+from .chat_search import QueryTerms, fts_match_expression, tokenize
+from .json_stream import StreamingJsonObject
+
+logger = logging.getLogger(__name__)
+
+
+# 快照文件格式版本
+# version 1: {"version": 1, "messages": [...]}（旧版整文件格式）
+# version 2: {"version": 2, "seq": N, "messages": [...]}（日志存储的快照）
+LEGACY_VERSION = 1
+SNAPSHOT_VERSION = 2
+
+# 日志文件后缀
+JOURNAL_SUFFIX = ".journal"
+# 压缩过程中被轮换出去的旧日志后缀
+JOURNAL_ROTATED_SUFFIX = ".journal.old"
+
+
+def write_messages_file(
+    path: str, header: Dict[str, Any], messages: Iterable[ChatMessage]
+) -> int:
+    """
+    将消息逐条写入 JSON 文件（原子替换），不构造中间 dict
+
+    Args:
+        path: 目标路径
+        header: messages 之前的字段（如 version / seq）
+        messages: 消息序列
+
+    Returns:
+        写入的字节数
+    """
+    with atomic_open(path, "w", encoding="utf-8") as f:
+        write_messages_json(f, header, messages)
+    return os.path.getsize(path)
+
+
+def read_snapshot(
+    path: str, max_messages: int = 0
+) -> Optional[Tuple[Dict[str, Any], List[ChatMessage]]]:
+    """
+    增量读取快照文件
+
+    messages 数组中的消息逐条解析，只保留最新的 max_messages 条，
+    峰值内存与保留的消息数成正比，而不是文件大小的数倍。
+
+    Args:
+        path: 快照路径
+        max_messages: 最多保留的消息数，0 表示全部保留
+
+    Returns:
+        (快照头部字段, 消息列表)；文件为空时返回 None
+
+    Raises:
+        json.JSONDecodeError: 文件格式损坏
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = StreamingJsonObject(f, "messages")
+        messages = parse_messages(reader.iter_items(), max_messages)
+
+    if reader.empty:
+        return None
+
+    return reader.header, messages
+
+
+def parse_messages(
+    messages_data: Iterable[Dict[str, Any]], max_messages: int = 0
+) -> List[ChatMessage]:
+    """
+    将字典序列解析为消息列表，跳过无效消息
+
+    Args:
+        messages_data: 消息字典序列（可以是生成器）
+        max_messages: 最多保留的消息数（保留最新的），0 表示全部保留
+    """
+    loaded_messages: deque = deque(maxlen=max_messages or None)
+    for i, m in enumerate(messages_data):
+        try:
+            loaded_messages.append(ChatMessage.from_dict(m))
+        except Exception as e:
+            logger.debug(f"跳过无效消息 {i}: {e}")
+            continue
+    return list(loaded_messages)
+
+
+def journal_paths(path: str) -> List[str]:
+    """返回日志文件路径（按写入先后顺序：轮换出去的旧日志在前）"""
+    return [path + JOURNAL_ROTATED_SUFFIX, path + JOURNAL_SUFFIX]
+
+
+def read_journal(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    读取日志记录，按 seq 排序
+
+    崩溃时最后一行可能只写了一半，无法解析的行直接跳过。
+    """
+    records = []
+    for journal_path in paths:
+        if not os.path.exists(journal_path):
+            continue
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.debug(f"跳过损坏的日志记录 {journal_path}:{line_no}")
+                    continue
+                if isinstance(record, dict) and "seq" in record:
+                    records.append(record)
+    records.sort(key=lambda r: r["seq"])
+    return records
+
+
+def apply_journal(
+    messages: List[ChatMessage],
+    snapshot_seq: int,
+    records: List[Dict[str, Any]],
+    max_messages: int = 0,
+) -> List[ChatMessage]:
+    """
+    在快照消息之上回放日志记录
+
+    Args:
+        messages: 快照中的消息
+        snapshot_seq: 快照包含的最后一条日志序号，序号不大于它的记录会被跳过
+        records: 按 seq 排序的日志记录
+        max_messages: 最多保留的消息数（保留最新的），0 表示全部保留
+
+    Returns:
+        回放后的消息列表
+    """
+    by_id: Dict[str, ChatMessage] = {msg.id: msg for msg in messages}
+
+    for record in records:
+        if record["seq"] <= snapshot_seq:
+            continue
+
+        op = record.get("op")
+        try:
+            if op == "add":
+                msg = ChatMessage.from_dict(record["message"])
+                by_id[msg.id] = msg
+            elif op == "update":
+                msg = by_id.get(record["id"])
+                if msg is not None:
+                    msg.content = record["content"]
+            elif op == "delete":
+                for message_id in record["ids"]:
+                    by_id.pop(message_id, None)
+            elif op == "clear":
+                by_id.clear()
+        except Exception as e:
+            logger.debug(f"跳过无效日志记录 {record.get('seq')}: {e}")
+
+    result = list(by_id.values())
+    if max_messages > 0:
+        del result[:-max_messages]
+    return result
+
+
+class HistoryStore(ABC):
+    """
+    聊天记录存储后端基类
+
+    子类需要实现 load 和 prepare_save；record_* 等方法默认不做任何事。
+    需要按条件查询的后端（如 sqlite）继承 QueryableHistoryStore。
+    """
+
+    name = "base"
+    queryable = False  # 是否为 QueryableHistoryStore
+
+    def __init__(self, path: str):
+        """
+        初始化存储后端
+
+        Args:
+            path: 聊天记录文件路径
+        """
+        self.path = path
+        self._max_messages = 0  # 最大保存消息数，0 表示不限制
+
+    def exists(self) -> bool:
+        """存储文件是否存在"""
+        return os.path.exists(self.path)
+
+    @abstractmethod
+    def load(self) -> List[ChatMessage]:
+        """
+        加载全部消息
+
+        Raises:
+            json.JSONDecodeError: 快照文件损坏
+        """
+
+    def needs_migration(self) -> bool:
+        """加载的数据是否需要迁移到当前存储格式"""
+        return False
+
+    def record_add(self, message: ChatMessage):
+        """记录新增消息"""
+
+    def record_update(self, message_id: str, content: str):
+        """记录消息内容更新"""
+
+    def record_delete(self, message_ids: List[str]):
+        """记录删除消息（如超出最大消息数被裁剪）"""
+
+    def record_clear(self):
+        """记录清空消息"""
+
+    def request_compaction(self):
+        """要求下次保存时写入完整快照"""
+
+    @abstractmethod
+    def prepare_save(self, messages: List[ChatMessage]) -> Callable[[], int]:
+        """
+        准备保存任务（主线程调用）
+
+        Args:
+            messages: 当前内存中的全部消息
+
+        Returns:
+            写入任务，执行后返回写入的字节数
+        """
+
+    def set_max_messages(self, max_count: int):
+        """
+        设置最大保存消息数
+
+        加载时只保留最新的 max_count 条消息；queryable 后端在写入时自行裁剪。
+        """
+        self._max_messages = max_count
+
+    def close(self):
+        """关闭存储后端，释放资源"""
+
+
+class QueryableHistoryStore(HistoryStore):
+    """
+    可查询的存储后端基类
+
+    load 只返回最近的 cache_size 条消息（ChatHistoryManager 在内存中缓存），
+    完整的消息通过 count / query_messages* / get_message / iter_messages 查询，
+    全文搜索由后端完成（其他后端由 ChatHistoryManager 在内存中建立索引）。
+    """
+
+    queryable = True
+    cache_size = 200  # 内存中缓存的最近消息数
+
+    @abstractmethod
+    def count(self) -> int:
+        """消息总数"""
+
+    @abstractmethod
+    def query_messages(self, limit: int = 0) -> List[ChatMessage]:
+        """
+        按时间顺序查询最近的消息
+
+        Args:
+            limit: 返回的最大消息数，0 表示返回全部
+        """
+
+    @abstractmethod
+    def query_messages_before(self, message_id: str, limit: int) -> List[ChatMessage]:
+        """
+        按时间顺序查询比指定消息更早的最多 limit 条消息
+
+        Args:
+            message_id: 游标消息 ID
+            limit: 最大消息数
+        """
+
+    @abstractmethod
+    def query_messages_after(self, message_id: str, limit: int) -> List[ChatMessage]:
+        """
+        按时间顺序查询比指定消息更晚的最多 limit 条消息
+
+        Args:
+            message_id: 游标消息 ID
+            limit: 最大消息数
+        """
+
+    @abstractmethod
+    def get_message(self, message_id: str) -> Optional[ChatMessage]:
+        """根据 ID 查询消息"""
+
+    @abstractmethod
+    def iter_messages(self) -> Iterator[ChatMessage]:
+        """按时间顺序遍历全部消息"""
+
+    @abstractmethod
+    def search(self, terms: QueryTerms, limit: int = 20) -> List[Tuple[ChatMessage, float]]:
+        """
+        全文搜索
+
+        Args:
+            terms: 解析后的查询
+            limit: 最大结果数
+
+        Returns:
+            [(消息, 相关度)]，按相关度从高到低排序
+        """
+
+
+class JsonHistoryStore(HistoryStore):
+    """旧版单文件 JSON 存储：每次保存都整体重写文件"""
+
+    name = "json"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        # 写入任务可能乱序执行，旧数据不能覆盖已写入的新数据
+        self._generation = 0
+        self._written_generation = 0
+        self._io_lock = threading.Lock()
+
+    def load(self) -> List[ChatMessage]:
+        snapshot = read_snapshot(self.path, self._max_messages)
+        if snapshot is None:
+            return []
+
+        data, messages = snapshot
+        version = data.get("version", LEGACY_VERSION)
+        if version not in (LEGACY_VERSION, SNAPSHOT_VERSION):
+            logger.debug(f"警告: 聊天记录版本 {version} 可能不兼容")
+
+        # 从日志存储切换回来时，先回放遗留的日志
+        if version == SNAPSHOT_VERSION:
+            records = read_journal(journal_paths(self.path))
+            messages = apply_journal(
+                messages, data.get("seq", 0), records, self._max_messages
+            )
+        return messages
+
+    def needs_migration(self) -> bool:
+        return any(os.path.exists(p) for p in journal_paths(self.path))
+
+    def prepare_save(self, messages: List[ChatMessage]) -> Callable[[], int]:
+        # 只在主线程中复制列表，序列化在写入线程中逐条完成；
+        # 之后的内容更新只会让写入的数据更新，不会变旧
+        messages = list(messages)
+        path = self.path
+        self._generation += 1
+        generation = self._generation
+
+        def _write_file() -> int:
+            with self._io_lock:
+                if generation < self._written_generation:
+                    return 0
+                written = write_messages_file(
+                    path, {"version": LEGACY_VERSION}, messages
+                )
+                self._written_generation = generation
+                for journal_path in journal_paths(path):
+                    if os.path.exists(journal_path):
+                        os.remove(journal_path)
+                return written
+
+        return _write_file
+
+
+class JournalHistoryStore(HistoryStore):
+    """
+    快照 + 追加写日志存储
+
+    文件布局：
+    - <path>: 快照（version 2），也兼容读取旧版 version 1 文件
+    - <path>.journal: 快照之后的操作记录，每行一个 JSON 对象
+    - <path>.journal.old: 压缩过程中被轮换出去的日志（压缩完成后删除）
+
+    每条日志记录都带有递增的 seq，快照记录它包含的最后一个 seq，
+    因此压缩中途崩溃时重复回放也是安全的。
+    """
+
+    name = "journal"
+
+    # 日志记录数超过该值时触发压缩
+    DEFAULT_COMPACT_THRESHOLD = 1000
+    # 日志追加写入的 fsync 间隔（秒），0 表示每次写入都 fsync
+    DEFAULT_FSYNC_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        path: str,
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        super().__init__(path)
+        self._compact_threshold = max(1, compact_threshold)
+        self._syncer = FsyncBatcher(fsync_interval)
+        self._journal_path = path + JOURNAL_SUFFIX
+        self._rotated_path = path + JOURNAL_ROTATED_SUFFIX
+
+        self._seq = 0  # 最后分配的日志序号
+        self._journal_records = 0  # 当前日志中的记录数
+        self._pending: List[List[Any]] = []  # 待写入的操作 [op, seq, payload]
+        self._pending_add_ids: set = set()  # 待写入的新增消息 ID
+        self._compact_requested = False
+        self._migrate = False
+
+        # 写入任务可能在不同线程中执行，文件操作需要串行化
+        self._io_lock = threading.Lock()
+
+    def load(self) -> List[ChatMessage]:
+        # 先读取日志并同步序号，即使快照损坏，后续写入的序号也不会与旧记录冲突
+        records = read_journal(journal_paths(self.path))
+        self._seq = max([self._seq] + [r["seq"] for r in records])
+        self._journal_records = len(records)
+        self._pending = []
+        self._pending_add_ids = set()
+        self._compact_requested = os.path.exists(self._rotated_path)
+
+        snapshot = None
+        if os.path.exists(self.path):
+            snapshot = read_snapshot(self.path, self._max_messages)
+        snapshot_seq = 0
+        messages: List[ChatMessage] = []
+
+        if snapshot is not None:
+            data, messages = snapshot
+            version = data.get("version", LEGACY_VERSION)
+            if version == LEGACY_VERSION:
+                # 旧版整文件格式，首次保存时迁移为快照
+                self._migrate = True
+                self._compact_requested = True
+            elif version != SNAPSHOT_VERSION:
+                logger.debug(f"警告: 聊天记录版本 {version} 可能不兼容")
+            snapshot_seq = data.get("seq", 0)
+            self._seq = max(self._seq, snapshot_seq)
+
+        return apply_journal(messages, snapshot_seq, records, self._max_messages)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or os.path.exists(self._journal_path)
+
+    def needs_migration(self) -> bool:
+        return self._migrate
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def record_add(self, message: ChatMessage):
+        # 保存消息对象引用，写入时再序列化，期间的流式更新会自动包含在内
+        self._pending.append(["add", self._next_seq(), message])
+        self._pending_add_ids.add(message.id)
+
+    def record_update(self, message_id: str, content: str):
+        if message_id in self._pending_add_ids:
+            return
+
+        # 连续更新同一条消息（流式响应）时只保留最新内容
+        if self._pending:
+            last = self._pending[-1]
+            if last[0] == "update" and last[2]["id"] == message_id:
+                last[2]["content"] = content
+                return
+
+        self._pending.append(
+            ["update", self._next_seq(), {"id": message_id, "content": content}]
+        )
+
+    def record_delete(self, message_ids: List[str]):
+        if message_ids:
+            self._pending.append(["delete", self._next_seq(), {"ids": list(message_ids)}])
+
+    def record_clear(self):
+        self._pending.append(["clear", self._next_seq(), {}])
+
+    def request_compaction(self):
+        self._compact_requested = True
+
+    def _should_compact(self) -> bool:
+        return (
+            self._compact_requested
+            or self._journal_records + len(self._pending) >= self._compact_threshold
+        )
+
+    def prepare_save(self, messages: List[ChatMessage]) -> Callable[[], int]:
+        # 在主线程中序列化待写入的操作
+        lines = []
+        for op, seq, payload in self._pending:
+            if op == "add":
+                lines.append(f'{{"seq": {seq}, "op": "add", "message": {payload.to_json()}}}\n')
+            else:
+                record = {"seq": seq, "op": op, **payload}
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        journal_data = "".join(lines)
+        compact = self._should_compact()
+
+        self._pending = []
+        self._pending_add_ids = set()
+
+        snapshot = None
+        if compact:
+            # 快照中的消息在写入线程中逐条序列化：之后发生的修改都带有更大的 seq，
+            # 回放日志时会覆盖快照中的内容，因此读到更新后的内容也是安全的
+            snapshot = ({"version": SNAPSHOT_VERSION, "seq": self._seq}, list(messages))
+            self._compact_requested = False
+            self._migrate = False
+            self._journal_records = 0
+        else:
+            self._journal_records += len(lines)
+
+        def _write_journal() -> int:
+            with self._io_lock:
+                written = 0
+                try:
+                    if journal_data:
+                        written += append_text(
+                            self._journal_path, journal_data, syncer=self._syncer
+                        )
+                    if snapshot is not None:
+                        written += self._compact(snapshot)
+                except Exception:
+                    # 写入失败时下次保存写入完整快照，避免丢失操作
+                    self._compact_requested = True
+                    raise
+                return written
+
+        return _write_journal
+
+    def _compact(self, snapshot: Tuple[Dict[str, Any], List[ChatMessage]]) -> int:
+        """
+        将快照写入磁盘并清理已包含在快照中的日志（在写入线程中调用）
+
+        先将当前日志轮换为 .journal.old，写入快照后再删除，
+        任何一步崩溃都可以在下次加载时通过 seq 正确恢复。
+        """
+        header, messages = snapshot
+        snapshot_seq = header["seq"]
+
+        if os.path.exists(self._journal_path):
+            if os.path.exists(self._rotated_path):
+                # 上次压缩未完成，合并到轮换日志中（合并结果落盘后才删除原日志）
+                with open(self._journal_path, "r", encoding="utf-8") as src:
+                    append_text(self._rotated_path, src.read(), syncer=FsyncBatcher(0))
+                os.remove(self._journal_path)
+            else:
+                os.replace(self._journal_path, self._rotated_path)
+
+        written = write_messages_file(self.path, header, messages)
+
+        # 写入任务乱序执行时，轮换日志中可能有比快照更新的记录，需要保留
+        newer = [
+            r for r in read_journal([self._rotated_path]) if r["seq"] > snapshot_seq
+        ]
+        if newer:
+            append_text(
+                self._journal_path,
+                "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in newer),
+                syncer=FsyncBatcher(0),
+            )
+            self._journal_records += len(newer)
+
+        if os.path.exists(self._rotated_path):
+            os.remove(self._rotated_path)
+
+        logger.debug(f"聊天记录日志已压缩为快照: {self.path} (seq={snapshot_seq})")
+        return written
+
+    def close(self):
+        # 被合并推迟的 fsync 在退出前执行
+        with self._io_lock:
+            self._syncer.flush()
+
+
+class SqliteHistoryStore(QueryableHistoryStore):
+    """
+    SQLite 存储
+
+    数据库文件与聊天记录文件同名，扩展名为 .db（如 chat_history.db）。
+    首次使用时自动导入同路径下已有的 JSON / 日志格式聊天记录。
+
+    写操作在主线程中直接执行（不提交），保存任务在写入线程中提交事务；
+    连续的流式更新先缓存在内存中，提交或查询前再写入数据库。
+    """
+
+    name = "sqlite"
+
+    # 内存中缓存的最近消息数
+    DEFAULT_CACHE_SIZE = 200
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            msg_type TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            file_path TEXT NOT NULL DEFAULT '',
+            metadata TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_id ON messages(id);
+        CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_messages_role ON messages(role);
+        CREATE INDEX IF NOT EXISTS idx_messages_msg_type ON messages(msg_type);
+    """
+
+    # 全文索引：FTS5 表保存分词结果（rowid = messages.seq），由触发器同步维护。
+    # 分词由 Python 函数 chat_tokens 完成，与内存倒排索引的分词规则一致
+    _FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(tokens);
+        CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, tokens) VALUES (new.seq, chat_tokens(new.content));
+        END;
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+            DELETE FROM messages_fts WHERE rowid = old.seq;
+        END;
+        CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages
+        BEGIN
+            UPDATE messages_fts SET tokens = chat_tokens(new.content) WHERE rowid = new.seq;
+        END;
+    """
+
+    _COLUMNS = "id, role, content, msg_type, timestamp, file_path, metadata"
+
+    def __init__(self, path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        super().__init__(path)
+        root, ext = os.path.splitext(path)
+        self.db_path = path if ext == ".db" else root + ".db"
+        self.cache_size = max(1, cache_size)
+
+        # 流式更新在主线程记录、在写入线程提交，单独加锁（不必等待正在执行的数据库操作）
+        self._pending_updates: Dict[str, str] = {}
+        self._updates_lock = threading.Lock()
+        self._pending_bytes = 0  # 未提交的写入数据量（近似值）
+        self._compact_requested = False
+        self._conn: Optional[sqlite3.Connection] = None
+
+        # 连接在主线程和写入线程之间共享，所有数据库操作需要串行化
+        self._db_lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # INSERT OR REPLACE 删除旧行时也要触发删除触发器，保持全文索引同步
+            conn.execute("PRAGMA recursive_triggers=ON")
+            conn.create_function("chat_tokens", 1, self._fts_tokens, deterministic=True)
+            conn.executescript(self._SCHEMA)
+            self._init_fts(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _fts_tokens(content: Optional[str]) -> str:
+        return " ".join(tokenize(content or ""))
+
+    def _init_fts(self, conn: sqlite3.Connection):
+        """创建全文索引；旧版数据库首次打开时为已有消息建立索引"""
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'"
+        ).fetchone()
+        conn.executescript(self._FTS_SCHEMA)
+        if not has_fts:
+            conn.execute(
+                "INSERT INTO messages_fts(rowid, tokens) "
+                "SELECT seq, chat_tokens(content) FROM messages"
+            )
+            conn.commit()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path) or (
+            self.db_path != self.path and os.path.exists(self.path)
+        )
+
+    @staticmethod
+    def _to_row(message: ChatMessage) -> tuple:
+        return (
+            message.id,
+            message.role,
+            message.content,
+            message.msg_type,
+            message.timestamp,
+            message.file_path,
+            json.dumps(dict(message.metadata), ensure_ascii=False)
+            if message.metadata
+            else "{}",
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> ChatMessage:
+        message_id, role, content, msg_type, timestamp, file_path, metadata = row
+        try:
+            metadata = json.loads(metadata) if metadata else {}
+        except json.JSONDecodeError:
+            metadata = {}
+        return ChatMessage(
+            id=message_id,
+            role=role,
+            content=content,
+            msg_type=msg_type,
+            timestamp=timestamp,
+            file_path=file_path,
+            metadata=metadata,
+        )
+
+    def _insert(self, conn: sqlite3.Connection, messages: Iterable[ChatMessage]):
+        conn.executemany(
+            f"INSERT OR REPLACE INTO messages ({self._COLUMNS}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self._to_row(msg) for msg in messages),
+        )
+
+    def load(self) -> List[ChatMessage]:
+        with self._db_lock:
+            is_new = not os.path.exists(self.db_path)
+            conn = self._connect()
+            if is_new and self.db_path != self.path and os.path.exists(self.path):
+                self._import_legacy(conn)
+        return self.query_messages(self.cache_size)
+
+    def _import_legacy(self, conn: sqlite3.Connection):
+        """导入同路径下已有的 JSON / 日志格式聊天记录（原文件保留不动）"""
+        legacy = JournalHistoryStore(self.path)
+        legacy.set_max_messages(self._max_messages)
+        messages = legacy.load()
+        self._insert(conn, messages)
+        conn.commit()
+        logger.debug(f"已将 {len(messages)} 条聊天记录导入 SQLite: {self.db_path}")
+
+    def record_add(self, message: ChatMessage):
+        with self._db_lock:
+            self._insert(self._connect(), [message])
+            self._pending_bytes += len(message.content.encode("utf-8"))
+
+    def record_update(self, message_id: str, content: str):
+        # 流式更新只保留最新内容，提交或查询前再写入
+        with self._updates_lock:
+            self._pending_updates[message_id] = content
+
+    def record_delete(self, message_ids: List[str]):
+        if not message_ids:
+            return
+        with self._db_lock:
+            self._connect().executemany(
+                "DELETE FROM messages WHERE id = ?", [(i,) for i in message_ids]
+            )
+
+    def record_clear(self):
+        with self._db_lock:
+            with self._updates_lock:
+                self._pending_updates.clear()
+            self._connect().execute("DELETE FROM messages")
+
+    def request_compaction(self):
+        self._compact_requested = True
+
+    def _flush_updates(self, conn: sqlite3.Connection):
+        with self._updates_lock:
+            updates, self._pending_updates = self._pending_updates, {}
+        if updates:
+            self._pending_bytes += sum(len(c.encode("utf-8")) for c in updates.values())
+            conn.executemany(
+                "UPDATE messages SET content = ? WHERE id = ?",
+                [(content, message_id) for message_id, content in updates.items()],
+            )
+
+    def _trim(self, conn: sqlite3.Connection):
+        if self._max_messages > 0:
+            conn.execute(
+                "DELETE FROM messages WHERE seq <= ("
+                "SELECT seq FROM messages ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (self._max_messages,),
+            )
+
+    def prepare_save(self, messages: List[ChatMessage]) -> Callable[[], int]:
+        # 需要写入完整数据时（如切换后端），以传入的消息为准
+        replace_all = list(messages) if self._compact_requested else None
+        self._compact_requested = False
+
+        def _commit() -> int:
+            with self._db_lock:
+                conn = self._connect()
+                if replace_all is not None:
+                    with self._updates_lock:
+                        self._pending_updates.clear()
+                    conn.execute("DELETE FROM messages")
+                    self._insert(conn, replace_all)
+                    self._pending_bytes += sum(
+                        len(msg.content.encode("utf-8")) for msg in replace_all
+                    )
+                self._flush_updates(conn)
+                self._trim(conn)
+                conn.commit()
+                written, self._pending_bytes = self._pending_bytes, 0
+                return written
+
+        return _commit
+
+    def count(self) -> int:
+        with self._db_lock:
+            return self._connect().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def query_messages(self, limit: int = 0) -> List[ChatMessage]:
+        with self._db_lock:
+            conn = self._connect()
+            self._flush_updates(conn)
+            if limit > 0:
+                rows = conn.execute(
+                    f"SELECT {self._COLUMNS} FROM ("
+                    f"SELECT seq, {self._COLUMNS} FROM messages "
+                    "ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                    (limit,),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    f"SELECT {self._COLUMNS} FROM messages ORDER BY seq"
+                ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def query_messages_before(self, message_id: str, limit: int) -> List[ChatMessage]:
+        with self._db_lock:
+            conn = self._connect()
+            self._flush_updates(conn)
+            rows = conn.execute(
+                f"SELECT {self._COLUMNS} FROM ("
+                f"SELECT seq, {self._COLUMNS} FROM messages "
+                "WHERE seq < (SELECT seq FROM messages WHERE id = ?) "
+                "ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                (message_id, limit),
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def query_messages_after(self, message_id: str, limit: int) -> List[ChatMessage]:
+        with self._db_lock:
+            conn = self._connect()
+            self._flush_updates(conn)
+            rows = conn.execute(
+                f"SELECT {self._COLUMNS} FROM messages "
+                "WHERE seq > (SELECT seq FROM messages WHERE id = ?) "
+                "ORDER BY seq LIMIT ?",
+                (message_id, limit),
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def get_message(self, message_id: str) -> Optional[ChatMessage]:
+        with self._db_lock:
+            conn = self._connect()
+            self._flush_updates(conn)
+            row = conn.execute(
+                f"SELECT {self._COLUMNS} FROM messages WHERE id = ?", (message_id,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def iter_messages(self, batch_size: int = 500) -> Iterator[ChatMessage]:
+        # 按 seq 分批读取，避免长时间持有锁或一次性加载全部消息
+        last_seq = 0
+        while True:
+            with self._db_lock:
+                conn = self._connect()
+                self._flush_updates(conn)
+                rows = conn.execute(
+                    f"SELECT seq, {self._COLUMNS} FROM messages "
+                    "WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._from_row(row[1:])
+            last_seq = rows[-1][0]
+
+    def search(self, terms: QueryTerms, limit: int = 20) -> List[Tuple[ChatMessage, float]]:
+        expression = fts_match_expression(terms)
+        if expression is None:
+            return []
+        columns = ", ".join(f"m.{c.strip()}" for c in self._COLUMNS.split(","))
+        with self._db_lock:
+            conn = self._connect()
+            self._flush_updates(conn)
+            try:
+                rows = conn.execute(
+                    f"SELECT {columns}, bm25(messages_fts) AS rank "
+                    "FROM messages_fts JOIN messages m ON m.seq = messages_fts.rowid "
+                    "WHERE messages_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (expression, limit if limit > 0 else -1),
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.debug(f"全文搜索失败: {e}")
+                return []
+        # bm25() 越小越相关，取负数与内存索引的相关度方向一致
+        return [(self._from_row(row[:-1]), -row[-1]) for row in rows]
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                try:
+                    self._flush_updates(self._conn)
+                    self._conn.commit()
+                    self._conn.close()
+                except sqlite3.Error as e:
+                    logger.debug(f"关闭聊天记录数据库失败: {e}")
+                self._conn = None
+
+
+# 可用的存储后端
+HISTORY_BACKENDS = {
+    JsonHistoryStore.name: JsonHistoryStore,
+    JournalHistoryStore.name: JournalHistoryStore,
+    SqliteHistoryStore.name: SqliteHistoryStore,
+}
+
+DEFAULT_HISTORY_BACKEND = JournalHistoryStore.name
+
+
+def create_history_store(path: str, backend: str = "") -> HistoryStore:
+    """
+    创建存储后端
+
+    Args:
+        path: 聊天记录文件路径
+        backend: 后端名称，为空或未知时使用默认后端
+
+    Returns:
+        HistoryStore 实例
+    """
+    store_cls = HISTORY_BACKENDS.get(backend or DEFAULT_HISTORY_BACKEND)
+    if store_cls is None:
+        logger.debug(f"未知的聊天记录存储后端: {backend}，使用 {DEFAULT_HISTORY_BACKEND}")
+        store_cls = HISTORY_BACKENDS[DEFAULT_HISTORY_BACKEND]
+    return store_cls(path)
@@ -0,0 +1,201 @@
+"""
+截图缩放与编码
+
+所有截图路径（桌面监控、主动对话、远程命令、手动截图）共用的处理流程：
+- 两阶段缩小：先用 Image.reduce 按整数倍快速缩小（盒式平均），
+  再对剩余的小倍数做高质量重采样，4K 截图缩小到 800 像素宽时比直接 LANCZOS 快数倍
+- 可选编码格式：JPEG、WebP、PNG
+- 质量预设在文件大小和耗时之间取舍：fast / balanced / quality
+"""
+
+import base64
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+try:
+    from PIL import Image
+
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# 编码格式 -> (PIL 格式名, MIME 类型, 扩展名)
+CODECS = {
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "png": ("PNG", "image/png", ".png"),
+}
+
+
+@dataclass(frozen=True)
+class QualityPreset:
+    """质量预设"""
+
+    resample: int  # 第二阶段的重采样滤镜
+    reducing_gap: float  # 第一阶段缩小后保留的倍数，越大画质越好、越慢
+    jpeg_quality: int
+    webp_quality: int
+    webp_method: int  # 0（最快）~ 6（最小）
+    png_compress_level: int  # 0 ~ 9
+    png_optimize: bool
+
+
+if HAS_PIL:
+    PRESETS: Dict[str, QualityPreset] = {
+        "fast": QualityPreset(Image.Resampling.BILINEAR, 1.5, 70, 70, 0, 1, False),
+        "balanced": QualityPreset(Image.Resampling.BICUBIC, 2.0, 82, 80, 4, 6, False),
+        "quality": QualityPreset(Image.Resampling.LANCZOS, 3.0, 92, 90, 6, 9, True),
+    }
+else:
+    PRESETS = {}
+
+DEFAULT_CODEC = "jpeg"
+DEFAULT_PRESET = "balanced"
+
+
+@dataclass
+class EncodedImage:
+    """编码结果"""
+
+    data: bytes
+    codec: str  # jpeg / webp / png
+    width: int
+    height: int
+
+    @property
+    def mime_type(self) -> str:
+        return CODECS[self.codec][1]
+
+    @property
+    def extension(self) -> str:
+        return CODECS[self.codec][2]
+
+    def to_base64(self) -> str:
+        """Base64 编码"""
+        return base64.b64encode(self.data).decode("ascii")
+
+
+def downscale(
+    image: "Image.Image",
+    max_width: int,
+    max_height: int,
+    resample: Optional[int] = None,
+    reducing_gap: float = 2.0,
+) -> "Image.Image":
+    """
+    等比缩小到不超过指定尺寸，图片已经足够小时原样返回
+
+    Args:
+        image: 原图
+        max_width: 最大宽度
+        max_height: 最大高度
+        resample: 重采样滤镜，默认 LANCZOS
+        reducing_gap: 先按整数倍缩小到目标尺寸的该倍数以上，再重采样
+
+    Returns:
+        缩小后的图片（可能是原图）
+    """
+    ratio = min(max_width / image.width, max_height / image.height)
+    if ratio >= 1:
+        return image
+
+    size = (max(1, int(image.width * ratio)), max(1, int(image.height * ratio)))
+    if resample is None:
+        resample = Image.Resampling.LANCZOS
+
+    # 第一阶段：整数倍盒式缩小（只读取一次像素，代价与原图大小成正比但很小）
+    factor = int(1 / ratio / reducing_gap)
+    if factor > 1:
+        image = image.reduce(factor)
+    # 第二阶段：对剩余的倍数做高质量重采样
+    return image.resize(size, resample)
+
+
+class ImagePipeline:
+    """截图缩放与编码流程"""
+
+    def __init__(
+        self,
+        codec: str = DEFAULT_CODEC,
+        preset: str = DEFAULT_PRESET,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+    ):
+        """
+        初始化处理流程
+
+        Args:
+            codec: 编码格式（jpeg / webp / png），无效时使用 jpeg
+            preset: 质量预设（fast / balanced / quality），无效时使用 balanced
+            max_width: 最大宽度，为空表示不缩小
+            max_height: 最大高度，为空表示不缩小
+        """
+        self.codec = codec.lower() if codec and codec.lower() in CODECS else DEFAULT_CODEC
+        self.preset_name = preset if preset in PRESETS else DEFAULT_PRESET
+        self.preset = PRESETS.get(self.preset_name)
+        self.max_width = max_width
+        self.max_height = max_height
+
+    @property
+    def extension(self) -> str:
+        """文件扩展名"""
+        return CODECS[self.codec][2]
+
+    def resize(self, image: "Image.Image") -> "Image.Image":
+        """缩小到最大尺寸以内"""
+        if not self.max_width and not self.max_height:
+            return image
+        return downscale(
+            image,
+            self.max_width or image.width,
+            self.max_height or image.height,
+            self.preset.resample,
+            self.preset.reducing_gap,
+        )
+
+    def encode(self, image: "Image.Image") -> EncodedImage:
+        """按编码格式和质量预设编码（不缩放）"""
+        buffer = BytesIO()
+        image = self._prepare(image)
+        image.save(buffer, **self._save_options())
+        return EncodedImage(buffer.getvalue(), self.codec, image.width, image.height)
+
+    def process(self, image: "Image.Image") -> EncodedImage:
+        """缩小并编码"""
+        return self.encode(self.resize(image))
+
+    def save(self, image: "Image.Image", path: str) -> str:
+        """
+        缩小并编码后保存到文件
+
+        Args:
+            image: 原图
+            path: 文件路径，扩展名会替换为编码格式对应的扩展名
+
+        Returns:
+            实际保存的文件路径
+        """
+        path = os.path.splitext(path)[0] + self.extension
+        image = self._prepare(self.resize(image))
+        image.save(path, **self._save_options())
+        return path
+
+    def _prepare(self, image: "Image.Image") -> "Image.Image":
+        # JPEG 不支持透明通道和调色板
+        if self.codec == "jpeg" and image.mode not in ("RGB", "L"):
+            return image.convert("RGB")
+        return image
+
+    def _save_options(self) -> Dict[str, Any]:
+        preset = self.preset
+        if self.codec == "jpeg":
+            return {"format": "JPEG", "quality": preset.jpeg_quality}
+        if self.codec == "webp":
+            return {"format": "WEBP", "quality": preset.webp_quality, "method": preset.webp_method}
+        return {
+            "format": "PNG",
+            "compress_level": preset.png_compress_level,
+            "optimize": preset.png_optimize,
+        }
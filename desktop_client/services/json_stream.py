@@ -0,0 +1,181 @@
+"""
+增量 JSON 解析
+
+按块读取 {"key": value, ..., "messages": [...]} 形式的 JSON 文件，
+逐个产出数组中的元素，不需要把整个文件读入内存再 json.loads。
+峰值内存约为读取块大小加上单个元素的大小。
+"""
+
+import json
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+# 每次读取的字符数
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+# 数字中可能出现的字符，用于判断数字是否被块边界截断
+_NUMBER_CHARS = "+-.eE0123456789"
+
+
+class StreamingJsonObject:
+    """
+    顶层 JSON 对象的增量解析器
+
+    数组字段（array_key）中的元素通过 iter_items 逐个产出，
+    其余字段解析后保存在 header 中。遍历结束后 header 包含全部非数组字段。
+
+    用法::
+
+        with open(path, encoding="utf-8") as f:
+            reader = StreamingJsonObject(f, "messages")
+            for item in reader.iter_items():
+                ...
+            version = reader.header.get("version")
+    """
+
+    def __init__(self, fp: TextIO, array_key: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        初始化解析器
+
+        Args:
+            fp: 以文本模式打开的文件对象
+            array_key: 需要逐个产出元素的数组字段名
+            chunk_size: 每次读取的字符数
+        """
+        self._fp = fp
+        self._array_key = array_key
+        self._chunk_size = max(1, chunk_size)
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+        self.header: Dict[str, Any] = {}
+        self.empty = False  # 文件为空（只有空白字符）
+
+    # ---- 缓冲区 ----
+
+    def _fill(self) -> bool:
+        """读取更多数据，返回是否读到了新数据"""
+        if self._eof:
+            return False
+
+        # 丢弃已解析的部分，避免缓冲区无限增长
+        if self._pos:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+
+        # 单个元素超过块大小时按倍数读取，避免重复解析的开销过大
+        chunk = self._fp.read(max(self._chunk_size, len(self._buf)))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf += chunk
+        return True
+
+    def _skip_whitespace(self) -> Optional[str]:
+        """跳过空白字符，返回下一个字符；到达文件末尾返回 None"""
+        while True:
+            buf = self._buf
+            pos = self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return None
+
+    def _error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self._buf, self._pos)
+
+    def _expect(self, char: str):
+        if self._skip_whitespace() != char:
+            raise self._error(f"Expecting '{char}'")
+        self._pos += 1
+
+    def _decode_value(self) -> Any:
+        """解析当前位置的一个 JSON 值，数据不完整时继续读取"""
+        if self._skip_whitespace() is None:
+            raise self._error("Expecting value")
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # 可能只是数据还没读完
+                if self._fill():
+                    continue
+                raise
+
+            # 数字可能被块边界截断（如 "12" 实际是 "123"，"1." 实际是 "1.5"），
+            # 后面必须跟着非数字字符才能确认解析完整
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                truncated = end >= len(self._buf) or self._buf[end] in _NUMBER_CHARS
+                if truncated and self._fill():
+                    continue
+
+            self._pos = end
+            return value
+
+    # ---- 解析 ----
+
+    def iter_items(self) -> Iterator[Any]:
+        """
+        逐个产出数组字段中的元素
+
+        Raises:
+            json.JSONDecodeError: 文件格式损坏
+        """
+        first = self._skip_whitespace()
+        if first is None:
+            self.empty = True
+            return
+        self._expect("{")
+
+        if self._skip_whitespace() == "}":
+            self._pos += 1
+            self._expect_end()
+            return
+
+        while True:
+            key = self._decode_value()
+            if not isinstance(key, str):
+                raise self._error("Expecting property name enclosed in double quotes")
+            self._expect(":")
+
+            if key == self._array_key and self._skip_whitespace() == "[":
+                self._pos += 1
+                yield from self._iter_array()
+            else:
+                self.header[key] = self._decode_value()
+
+            sep = self._skip_whitespace()
+            self._pos += 1
+            if sep == "}":
+                break
+            if sep != ",":
+                self._pos -= 1
+                raise self._error("Expecting ',' delimiter")
+
+        self._expect_end()
+
+    def _iter_array(self) -> Iterator[Any]:
+        if self._skip_whitespace() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode_value()
+
+            sep = self._skip_whitespace()
+            self._pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                self._pos -= 1
+                raise self._error("Expecting ',' delimiter")
+
+    def _expect_end(self):
+        if self._skip_whitespace() is not None:
+            raise self._error("Extra data")
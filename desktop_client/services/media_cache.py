@@ -0,0 +1,279 @@
+"""
+媒体文件缓存
+
+服务器返回的图片、语音、视频按内容（SHA-256）存放在缓存目录中：
+- 同一个文件名再次出现时直接使用缓存，不再下载
+- 不同文件名、相同内容的文件只保存一份
+- 同一个文件的并发请求只下载一次，其他请求等待同一个结果
+- 缓存总大小超过上限时按最近使用时间淘汰
+- 命中缓存只在内存中更新最近使用顺序，索引在新增、淘汰文件和 close() 时写入
+
+缓存目录结构：
+    index.json              文件名 -> 内容哈希，以及按最近使用排序的缓存文件
+    blobs/ab/abcdef....png  缓存文件
+    tmp/                    下载中的临时文件（中断后保留，下次从断点继续）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+from ..utils.atomic_write import atomic_write
+from ..utils.file_hash import hash_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+
+@dataclass
+class MediaCacheStats:
+    """缓存统计"""
+
+    hits: int = 0  # 直接使用缓存的次数
+    misses: int = 0  # 需要下载的次数
+    deduplicated: int = 0  # 等待同一文件正在进行的下载的次数
+    stored_duplicates: int = 0  # 下载后发现内容已缓存（不同文件名）的次数
+    evictions: int = 0  # 淘汰的缓存文件数
+    bytes_evicted: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+def materialize(blob_path: str, dest_path: str) -> bool:
+    """
+    将缓存文件放到目标路径
+
+    优先创建硬链接（不占用额外空间，缓存淘汰后目标文件仍然有效），
+    不支持硬链接时（例如跨磁盘）流式复制。
+
+    Returns:
+        是否成功
+    """
+    try:
+        if os.path.exists(dest_path) and os.path.samefile(blob_path, dest_path):
+            return True
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        try:
+            os.link(blob_path, tmp_path)
+        except OSError:
+            shutil.copyfile(blob_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return True
+    except OSError as e:
+        logger.debug(f"复制缓存文件失败: {e}")
+        return False
+
+
+class MediaCache:
+    """按内容寻址的媒体文件缓存"""
+
+    INDEX_FILE = "index.json"
+    PARTIAL_MAX_AGE = 24 * 3600  # 超过该时间（秒）未完成的下载临时文件会被清理
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self._dir = cache_dir
+        self._blob_dir = os.path.join(cache_dir, "blobs")
+        self._tmp_dir = os.path.join(cache_dir, "tmp")
+        self._index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        self.max_bytes = max_bytes
+        self.stats = MediaCacheStats()
+
+        self._names: Dict[str, str] = {}  # 文件名 -> 内容哈希
+        # 内容哈希 -> (扩展名, 大小)，按最近使用排序（最久未使用的在前）
+        self._blobs: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+        self._index_dirty = False  # 内存中的索引（最近使用顺序）是否有未写入的更改
+
+        os.makedirs(self._blob_dir, exist_ok=True)
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._load_index()
+        self._cleanup_partials()
+
+    @property
+    def size(self) -> int:
+        """缓存文件总大小（字节）"""
+        return self._size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        data = self.stats.to_dict()
+        data.update(entries=len(self._blobs), size_bytes=self._size, max_bytes=self.max_bytes)
+        return data
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        查找文件名对应的缓存文件
+
+        Returns:
+            缓存文件路径，未缓存时返回 None
+        """
+        digest = self._names.get(name)
+        if digest is None:
+            return None
+        entry = self._blobs.get(digest)
+        path = self._blob_path(digest, entry[0]) if entry else ""
+        if not entry or not os.path.exists(path):
+            # 缓存文件被外部删除
+            self._forget(digest)
+            self._index_dirty = True
+            return None
+        self._blobs.move_to_end(digest)
+        self._index_dirty = True
+        return path
+
+    async def fetch(
+        self, name: str, download: Callable[[str], Awaitable[bool]]
+    ) -> Optional[str]:
+        """
+        获取文件名对应的缓存文件，未缓存时下载
+
+        Args:
+            name: 服务器上的文件名
+            download: 下载函数，参数为临时文件路径，返回是否成功
+
+        Returns:
+            缓存文件路径，下载失败时返回 None
+        """
+        path = self.lookup(name)
+        if path is not None:
+            self.stats.hits += 1
+            return path
+
+        pending = self._inflight.get(name)
+        if pending is not None:
+            self.stats.deduplicated += 1
+            return await asyncio.shield(pending)
+
+        self.stats.misses += 1
+        future: "asyncio.Future[Optional[str]]" = asyncio.get_running_loop().create_future()
+        self._inflight[name] = future
+        path = None
+        try:
+            path = await self._download(name, download)
+            return path
+        finally:
+            del self._inflight[name]
+            future.set_result(path)
+
+    async def _download(
+        self, name: str, download: Callable[[str], Awaitable[bool]]
+    ) -> Optional[str]:
+        # 临时文件名由文件名决定，下载中断后下次调用从断点继续
+        tmp_path = os.path.join(self._tmp_dir, hashlib.sha1(name.encode("utf-8")).hexdigest())
+        if not await download(tmp_path) or not os.path.exists(tmp_path):
+            return None
+        digest, size = await asyncio.to_thread(hash_file, tmp_path)
+        return self._store(name, tmp_path, digest, size)
+
+    def _store(self, name: str, tmp_path: str, digest: str, size: int) -> Optional[str]:
+        """将下载完成的临时文件移入缓存"""
+        ext = os.path.splitext(name)[1].lower()[:16]
+        entry = self._blobs.get(digest)
+        if entry is not None and os.path.exists(self._blob_path(digest, entry[0])):
+            # 内容已缓存（不同文件名），丢弃新下载的文件
+            self.stats.stored_duplicates += 1
+            os.remove(tmp_path)
+        else:
+            if entry is not None:
+                self._forget(digest)
+            entry = (ext, size)
+            path = self._blob_path(digest, ext)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.debug(f"写入媒体缓存失败: {e}")
+                return None
+            self._blobs[digest] = entry
+            self._size += size
+
+        self._names[name] = digest
+        self._blobs.move_to_end(digest)
+        self._evict()
+        self._save_index()
+        return self._blob_path(digest, entry[0])
+
+    def _evict(self):
+        """淘汰最久未使用的缓存文件，直到总大小不超过上限（最新的文件总是保留）"""
+        while self._size > self.max_bytes and len(self._blobs) > 1:
+            digest, (ext, size) = next(iter(self._blobs.items()))
+            self._forget(digest)
+            try:
+                os.remove(self._blob_path(digest, ext))
+            except OSError as e:
+                logger.debug(f"删除缓存文件失败: {e}")
+            self.stats.evictions += 1
+            self.stats.bytes_evicted += size
+
+    def _forget(self, digest: str):
+        entry = self._blobs.pop(digest, None)
+        if entry is not None:
+            self._size -= entry[1]
+        for name in [n for n, d in self._names.items() if d == digest]:
+            del self._names[name]
+
+    def _blob_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self._blob_dir, digest[:2], digest + ext)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.debug(f"读取媒体缓存索引失败，重新建立: {e}")
+            return
+
+        for digest, ext, size in data.get("blobs", []):
+            if os.path.exists(self._blob_path(digest, ext)):
+                self._blobs[digest] = (ext, size)
+                self._size += size
+        self._names = {
+            name: digest for name, digest in data.get("names", {}).items() if digest in self._blobs
+        }
+
+    def close(self):
+        """写入未保存的最近使用顺序（应用退出时调用）"""
+        if self._index_dirty:
+            self._save_index()
+
+    def _save_index(self):
+        self._index_dirty = False
+        data = {
+            "version": 1,
+            "names": self._names,
+            "blobs": [[digest, ext, size] for digest, (ext, size) in self._blobs.items()],
+        }
+        try:
+            atomic_write(self._index_path, json.dumps(data, ensure_ascii=False), sync=False)
+        except OSError as e:
+            logger.debug(f"保存媒体缓存索引失败: {e}")
+
+    def _cleanup_partials(self):
+        """清理长时间未完成的下载临时文件"""
+        now = time.time()
+        for entry in os.scandir(self._tmp_dir):
+            try:
+                if now - entry.stat().st_mtime > self.PARTIAL_MAX_AGE:
+                    os.remove(entry.path)
+            except OSError as e:
+                logger.debug(f"清理临时文件失败: {e}")
@@ -8,6 +8,7 @@ import os
 import random
 import ctypes
 import logging
+from concurrent.futures import Future
 from datetime import datetime, time as dt_time
 from typing import Optional
 
@@ -30,6 +31,8 @@ try:
 except ImportError:
     HAS_PIL = False
 
+from .image_pipeline import ImagePipeline, downscale
+from .frame_worker import FrameWorker
 from .screen_capture import ScreenCaptureService
 from ..config import ProactiveDialogConfig
 
@@ -85,6 +88,8 @@ class ProactiveDialogService(QObject):
 
         # 创建截图服务
         self._screen_capture = ScreenCaptureService(save_dir=screenshot_dir)
+        # 截图处理队列：同一时间只处理一帧
+        self._frame_worker = FrameWorker()
 
         # 创建定时器
         self._timer = QTimer(self)
@@ -295,36 +300,52 @@ class ProactiveDialogService(QObject):
         return passed
 
     def _capture_and_trigger(self):
-        """截图并触发对话"""
-        try:
-            # 捕获全屏
-            image = self._screen_capture.capture_full_screen()
+        """在截图处理线程池中截图，完成后触发对话（不阻塞主线程）"""
+        future = self._frame_worker.submit(self._capture_to_file)
+        future.add_done_callback(self._on_capture_done)
+
+    def _on_capture_done(self, future: Future):
+        """截图完成回调（在截图处理线程中调用，信号以排队方式传递到主线程）"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        filepath = future.result()
+        if filepath:
+            # 发射信号
+            self.dialog_triggered.emit(filepath)
 
-            if image is None:
-                logger.error("截图失败")
-                return
+    def _capture_to_file(self) -> Optional[str]:
+        """
+        截图、压缩并保存到文件（在截图处理线程中执行）
 
-            # 压缩图片
-            compressed_image = self._compress_image(image)
+        Returns:
+            截图文件路径，失败返回 None
+        """
+        try:
+            # 捕获全屏（原图在截图会话的缓冲池中复用，只在上下文中使用）
+            with self._screen_capture.capture_frame() as image:
+                if image is None:
+                    logger.error("截图失败")
+                    return None
 
-            if compressed_image is None:
-                logger.error("图片压缩失败")
-                return
+                # 压缩图片
+                compressed_image = self._compress_image(image)
 
-            # 保存到文件
-            filename = f"proactive_{int(datetime.now().timestamp() * 1000)}.jpg"
-            filepath = os.path.join(self._screenshot_dir, filename)
+                if compressed_image is None:
+                    logger.error("图片压缩失败")
+                    return None
 
-            # 保存为 JPEG 格式（更小的文件大小）
-            compressed_image.save(filepath, "JPEG", quality=85)
+                # 按配置的编码格式保存到文件（扩展名由编码格式决定）
+                filename = f"proactive_{int(datetime.now().timestamp() * 1000)}"
+                filepath = self._pipeline().save(
+                    compressed_image, os.path.join(self._screenshot_dir, filename)
+                )
 
             logger.info(f"主动对话截图已保存: {filepath}")
-
-            # 发射信号
-            self.dialog_triggered.emit(filepath)
+            return filepath
 
         except Exception as e:
             logger.error(f"截图并触发对话失败: {e}")
+            return None
 
     def _compress_image(self, image: "Image.Image") -> Optional["Image.Image"]:
         """
@@ -357,12 +378,12 @@ class ProactiveDialogService(QObject):
                 logger.debug("图片尺寸已小于目标尺寸，无需压缩")
                 return image
 
-            # 计算新尺寸
-            new_width = int(orig_width * ratio)
-            new_height = int(orig_height * ratio)
-
-            # 使用高质量缩放
-            compressed = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # 两阶段缩小（先整数倍快速缩小，再按质量预设重采样）
+            preset = self._pipeline().preset
+            compressed = downscale(
+                image, target_width, target_height, preset.resample, preset.reducing_gap
+            )
+            new_width, new_height = compressed.size
 
             logger.debug(
                 f"图片已压缩: {orig_width}x{orig_height} -> {new_width}x{new_height}"
@@ -374,6 +395,10 @@ class ProactiveDialogService(QObject):
             logger.error(f"压缩图片失败: {e}")
             return None
 
+    def _pipeline(self) -> ImagePipeline:
+        """按当前配置创建截图处理流程（配置可能在运行时更新）"""
+        return ImagePipeline(self._config.screenshot_format, self._config.screenshot_quality)
+
     def trigger_manually(self) -> bool:
         """
         手动触发一次主动对话（用于测试）
@@ -413,4 +438,5 @@ class ProactiveDialogService(QObject):
             "time_range_enabled": self._config.time_range_enabled,
             "time_range": f"{self._config.time_range_start} - {self._config.time_range_end}",
             "in_time_range": self._check_time_range(),
+            "encoder": self._frame_worker.get_stats(),
         }
@@ -0,0 +1,200 @@
+"""
+保存调度器
+
+合并短时间内的多次保存请求：
+- 防抖：最后一次请求后等待 debounce 秒再写入
+- 最大延迟：从第一次未写入的请求算起，最多等待 max_latency 秒
+- 同一时间只有一个写入任务，写入期间的新请求在写完后再执行一次
+- 没有运行中的事件循环时回退为同步写入
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SaveStats:
+    """保存统计"""
+
+    requested: int = 0  # 保存请求次数
+    performed: int = 0  # 实际写入次数
+    failed: int = 0  # 写入失败次数
+    bytes_written: int = 0  # 写入字节数
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+class SaveScheduler:
+    """
+    保存调度器
+
+    prepare 在主线程（事件循环线程）中调用，负责捕获需要写入的数据，
+    返回的写入任务在线程池中执行，执行结果为写入的字节数。
+    """
+
+    DEFAULT_DEBOUNCE = 0.5  # 秒
+    DEFAULT_MAX_LATENCY = 3.0  # 秒
+
+    def __init__(
+        self,
+        prepare: Callable[[], Callable[[], int]],
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        """
+        初始化保存调度器
+
+        Args:
+            prepare: 准备写入任务的回调
+            debounce: 防抖时间（秒）
+            max_latency: 最大写入延迟（秒）
+            on_error: 写入失败时的回调
+        """
+        self._prepare = prepare
+        self._on_error = on_error
+        self.set_policy(debounce, max_latency)
+
+        self.stats = SaveStats()
+
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._first_request: Optional[float] = None  # 第一次未写入请求的时间
+        self._writer: Optional[asyncio.Task] = None
+        self._rerun = False  # 写入期间有新请求
+
+        # 保证同一时间只有一个写入任务在执行（包括同步写入）
+        self._write_lock = threading.Lock()
+
+    def set_policy(self, debounce: float, max_latency: float):
+        """
+        设置防抖时间和最大延迟
+
+        Args:
+            debounce: 防抖时间（秒）
+            max_latency: 最大写入延迟（秒），不小于防抖时间
+        """
+        self._debounce = max(0.0, debounce)
+        self._max_latency = max(self._debounce, max_latency)
+
+    def has_pending(self) -> bool:
+        """是否有尚未执行的写入"""
+        return self._timer is not None or self._writer is not None
+
+    def request(self, immediate: bool = False):
+        """
+        请求保存
+
+        Args:
+            immediate: 是否跳过防抖立即写入（仍在后台线程执行）
+        """
+        self.stats.requested += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None or not loop.is_running():
+            # 没有事件循环，回退到同步保存
+            self.flush()
+            return
+
+        now = time.monotonic()
+        if self._first_request is None:
+            self._first_request = now
+
+        if immediate:
+            delay = 0.0
+        else:
+            deadline = min(now + self._debounce, self._first_request + self._max_latency)
+            delay = max(0.0, deadline - now)
+
+        self._cancel_timer()
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self):
+        self._timer = None
+        self._first_request = None
+
+        if self._writer is not None:
+            # 已有写入任务在执行，写完后再执行一次
+            self._rerun = True
+            return
+
+        self._writer = asyncio.get_running_loop().create_task(self._run_writer())
+
+    async def _run_writer(self) -> bool:
+        """执行写入，写入期间有新请求时再写一次；返回最后一次写入是否成功"""
+        try:
+            while True:
+                self._rerun = False
+                job = self._prepare()
+                ok = await asyncio.to_thread(self._execute, job)
+                if not self._rerun:
+                    return ok
+        finally:
+            self._writer = None
+
+    def _execute(self, job: Callable[[], int]) -> bool:
+        """执行写入任务并更新统计"""
+        with self._write_lock:
+            try:
+                written = job()
+            except Exception as e:
+                self.stats.failed += 1
+                logger.debug(f"保存失败: {e}")
+                if self._on_error:
+                    self._on_error(e)
+                return False
+
+        self.stats.performed += 1
+        self.stats.bytes_written += written or 0
+        return True
+
+    def flush(self) -> bool:
+        """
+        立即同步写入（用于退出、切换路径等场景）
+
+        如果后台写入任务正在执行，会等待其写完后再写入。
+
+        Returns:
+            是否写入成功
+        """
+        self._cancel_timer()
+        self._first_request = None
+        # 后台任务随后再次执行也只会写入空的增量，这里不需要取消它
+        return self._execute(self._prepare())
+
+    async def flush_async(self) -> bool:
+        """
+        立即在后台线程写入，并等待写入完成
+
+        Returns:
+            是否写入成功
+        """
+        self._cancel_timer()
+        self._first_request = None
+
+        if self._writer is not None:
+            # 等待当前写入完成后再写一次，确保包含最新数据
+            self._rerun = True
+            if await asyncio.shield(self._writer):
+                return True
+            # 最后一次写入失败，数据仍未保存，重新写入
+
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._run_writer())
+        return await asyncio.shield(self._writer)
@@ -2,20 +2,16 @@
 屏幕捕获服务
 
 提供全屏截图、区域截图、窗口截图等功能。
+所有实例共用全局截图会话（CaptureSession），不会每次截图都重新建立显示连接。
 """
 
 import os
 import time
-from typing import Optional, Tuple, Callable
-from io import BytesIO
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Callable
 
-try:
-    import mss
-    import mss.tools
-
-    HAS_MSS = True
-except ImportError:
-    HAS_MSS = False
+from .capture_session import HAS_MSS, CaptureSession, get_capture_session
+from .image_pipeline import ImagePipeline
 
 try:
     from PIL import Image
@@ -28,14 +24,22 @@ except ImportError:
 class ScreenCaptureService:
     """屏幕捕获服务"""
 
-    def __init__(self, save_dir: str = "./temp/screenshots"):
+    def __init__(
+        self,
+        save_dir: str = "./temp/screenshots",
+        session: Optional[CaptureSession] = None,
+    ):
         """
         初始化屏幕捕获服务
 
         Args:
             save_dir: 截图保存目录
+            session: 截图会话，不指定则使用全局会话
         """
         self.save_dir = save_dir
+        self._session = session
+        # 保存到文件和转换为字节数据时使用无损 PNG
+        self._file_pipeline = ImagePipeline("png")
         os.makedirs(save_dir, exist_ok=True)
 
         if not HAS_MSS:
@@ -43,6 +47,13 @@ class ScreenCaptureService:
         if not HAS_PIL:
             print("警告: Pillow 库未安装，截图功能不可用")
 
+    @property
+    def session(self) -> CaptureSession:
+        """截图会话"""
+        if self._session is None or not self._session.available:
+            self._session = get_capture_session()
+        return self._session
+
     def capture_full_screen(self) -> Optional[Image.Image]:
         """
         捕获全屏
@@ -53,18 +64,43 @@ class ScreenCaptureService:
         if not HAS_MSS or not HAS_PIL:
             return None
 
-        try:
-            with mss.mss() as sct:
-                # 获取所有显示器的组合
-                monitor = sct.monitors[0]  # 0 是所有显示器的组合
-                screenshot = sct.grab(monitor)
-                return Image.frombytes(
-                    "RGB", screenshot.size, screenshot.bgra, "raw", "BGRX"
-                )
-        except Exception as e:
-            print(f"全屏截图失败: {e}")
+        # 0 是所有显示器的组合
+        image = self.session.grab(0)
+        if image is None:
+            print("全屏截图失败")
+        return image
+
+    async def capture_full_screen_async(self) -> Optional[Image.Image]:
+        """
+        在截图线程中捕获全屏，不阻塞事件循环
+
+        Returns:
+            PIL Image 对象，失败返回 None
+        """
+        if not HAS_MSS or not HAS_PIL:
             return None
 
+        image = await self.session.grab_async(0)
+        if image is None:
+            print("全屏截图失败")
+        return image
+
+    @contextmanager
+    def capture_frame(self, monitor_index: int = 0) -> Iterator[Optional[Image.Image]]:
+        """
+        截图并借用会话缓冲池中的图片，退出上下文后图片被复用
+
+        适合截图后立即缩放、编码而不保留原图的场景。
+
+        Args:
+            monitor_index: 显示器索引，0 为所有显示器的组合
+        """
+        if not HAS_MSS or not HAS_PIL:
+            yield None
+            return
+        with self.session.frame(monitor_index) as image:
+            yield image
+
     def capture_monitor(self, monitor_index: int = 1) -> Optional[Image.Image]:
         """
         捕获指定显示器
@@ -78,19 +114,13 @@ class ScreenCaptureService:
         if not HAS_MSS or not HAS_PIL:
             return None
 
-        try:
-            with mss.mss() as sct:
-                if monitor_index < 1 or monitor_index >= len(sct.monitors):
-                    print(f"显示器索引 {monitor_index} 无效")
-                    return None
-                monitor = sct.monitors[monitor_index]
-                screenshot = sct.grab(monitor)
-                return Image.frombytes(
-                    "RGB", screenshot.size, screenshot.bgra, "raw", "BGRX"
-                )
-        except Exception as e:
-            print(f"显示器截图失败: {e}")
+        if monitor_index < 1:
+            print(f"显示器索引 {monitor_index} 无效")
             return None
+        image = self.session.grab(monitor_index)
+        if image is None:
+            print(f"显示器截图失败: {monitor_index}")
+        return image
 
     def capture_region(
         self, left: int, top: int, width: int, height: int
@@ -110,16 +140,11 @@ class ScreenCaptureService:
         if not HAS_MSS or not HAS_PIL:
             return None
 
-        try:
-            with mss.mss() as sct:
-                region = {"left": left, "top": top, "width": width, "height": height}
-                screenshot = sct.grab(region)
-                return Image.frombytes(
-                    "RGB", screenshot.size, screenshot.bgra, "raw", "BGRX"
-                )
-        except Exception as e:
-            print(f"区域截图失败: {e}")
-            return None
+        region = {"left": left, "top": top, "width": width, "height": height}
+        image = self.session.grab(region)
+        if image is None:
+            print(f"区域截图失败: {region}")
+        return image
 
     def capture_full_screen_to_file(
         self, filename: Optional[str] = None
@@ -143,21 +168,25 @@ class ScreenCaptureService:
         filepath = os.path.join(self.save_dir, filename)
 
         try:
-            image.save(filepath, "PNG")
-            return filepath
+            return self._file_pipeline.save(image, filepath)
         except Exception as e:
             print(f"保存截图失败: {e}")
             return None
 
-    def capture_to_bytes(self, image: Optional[Image.Image] = None) -> Optional[bytes]:
+    def capture_to_bytes(
+        self,
+        image: Optional[Image.Image] = None,
+        pipeline: Optional[ImagePipeline] = None,
+    ) -> Optional[bytes]:
         """
         将截图转换为字节数据
 
         Args:
             image: PIL Image 对象，不指定则捕获全屏
+            pipeline: 缩放和编码流程，不指定则编码为 PNG
 
         Returns:
-            PNG 格式的字节数据，失败返回 None
+            编码后的字节数据，失败返回 None
         """
         if image is None:
             image = self.capture_full_screen()
@@ -165,9 +194,7 @@ class ScreenCaptureService:
             return None
 
         try:
-            buffer = BytesIO()
-            image.save(buffer, format="PNG")
-            return buffer.getvalue()
+            return (pipeline or self._file_pipeline).process(image).data
         except Exception as e:
             print(f"转换截图失败: {e}")
             return None
@@ -182,12 +209,11 @@ class ScreenCaptureService:
         if not HAS_MSS:
             return (1920, 1080)
 
-        try:
-            with mss.mss() as sct:
-                monitor = sct.monitors[1]  # 主显示器
-                return (monitor["width"], monitor["height"])
-        except Exception:
+        monitors = self.session.monitors()
+        if len(monitors) < 2:
             return (1920, 1080)  # 默认值
+        monitor = monitors[1]  # 主显示器
+        return (monitor["width"], monitor["height"])
 
     def get_monitors_info(self) -> list:
         """
@@ -199,21 +225,16 @@ class ScreenCaptureService:
         if not HAS_MSS:
             return []
 
-        try:
-            with mss.mss() as sct:
-                return [
-                    {
-                        "index": i,
-                        "left": m["left"],
-                        "top": m["top"],
-                        "width": m["width"],
-                        "height": m["height"],
-                    }
-                    for i, m in enumerate(sct.monitors)
-                ]
-        except Exception as e:
-            print(f"获取显示器信息失败: {e}")
-            return []
+        return [
+            {
+                "index": i,
+                "left": m["left"],
+                "top": m["top"],
+                "width": m["width"],
+                "height": m["height"],
+            }
+            for i, m in enumerate(self.session.monitors())
+        ]
 
     def capture_region_to_file(
         self,
@@ -246,8 +267,7 @@ class ScreenCaptureService:
         filepath = os.path.join(self.save_dir, filename)
 
         try:
-            image.save(filepath, "PNG")
-            return filepath
+            return self._file_pipeline.save(image, filepath)
         except Exception as e:
             print(f"保存区域截图失败: {e}")
             return None
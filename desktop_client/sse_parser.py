@@ -0,0 +1,178 @@
+"""
+增量 SSE（Server-Sent Events）解析器
+
+直接处理网络读取到的原始字节块（httpx 的 aiter_bytes），按 WHATWG
+event-stream 规范解析：
+- 行结束符可以是 CRLF / LF / CR，CRLF 被拆分在两个字节块之间时也能正确处理
+- 流开头的 UTF-8 BOM 会被去掉
+- 以冒号开头的行是注释
+- data 字段可以有多行，按换行拼接；event / id / retry 字段按规范处理
+- 空行分发事件；没有 data 的事件不分发
+
+解析器内部只维护一个可复用的 bytearray 缓冲区（只保存未接收完整的行），
+每个字节块只搜索新到达的数据中的行结束符，完整的行在 C 层一次性切分，
+很长的行分成许多小块到达时也只需要线性时间；事件数据保持为 bytes，调用方可以先用
+peek_payload_type 判断类型，只对需要的事件解码和解析 JSON。
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+_BOM = b"\xef\xbb\xbf"
+
+# 行结束符
+_EOL = re.compile(rb"\r\n|\r|\n")
+
+# AstrBot 的事件数据是以 "type" 为第一个键的 JSON 对象，
+# 只匹配第一个键，避免误读嵌套对象中的 type 字段
+_LEADING_TYPE = re.compile(rb'\s*\{\s*"type"\s*:\s*"([^"\\]*)"')
+
+
+@dataclass(slots=True)
+class SSEFrame:
+    """一个完整的 SSE 事件"""
+
+    event: str  # event 字段，默认为 "message"
+    data: bytes  # data 字段（多行以 \n 拼接）
+    id: str = ""  # 最后一个事件 ID（lastEventId）
+
+    @property
+    def text(self) -> str:
+        """以 UTF-8 解码的 data"""
+        return self.data.decode("utf-8", "replace")
+
+
+def peek_payload_type(data: bytes) -> Optional[str]:
+    """
+    不解析 JSON，读取事件数据中的 "type" 字段
+
+    Args:
+        data: 事件数据
+
+    Returns:
+        "type" 是 JSON 对象的第一个键时返回它的值，否则返回 None（需要完整解析）
+    """
+    match = _LEADING_TYPE.match(data)
+    if match is None:
+        return None
+    return match.group(1).decode("utf-8", "replace")
+
+
+class SSEParser:
+    """
+    增量 SSE 解析器
+
+    用法:
+        parser = SSEParser()
+        async for chunk in response.aiter_bytes():
+            for frame in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: List[bytes] = []
+        self._event = ""
+        self._started = False  # 是否已经处理过流开头的 BOM
+        self._skip_lf = False  # 上一块以 CR 结尾，下一块开头的 LF 属于同一个行结束符
+        self.last_event_id = ""
+        self.retry: Optional[int] = None  # 服务器建议的重连间隔（毫秒）
+
+    def feed(self, chunk: bytes) -> List[SSEFrame]:
+        """
+        输入一个字节块
+
+        Args:
+            chunk: 从网络读取的原始字节
+
+        Returns:
+            本次输入后完整的事件（可能为空）
+        """
+        buffer = self._buffer
+        # 缓冲区中已有的字节（未接收完整的行）不含行结束符，只需要搜索新数据
+        scan = len(buffer)
+        buffer += chunk
+
+        if not self._started:
+            if len(buffer) < len(_BOM) and _BOM.startswith(bytes(buffer)):
+                return []  # BOM 可能还没有接收完整
+            if buffer.startswith(_BOM):
+                del buffer[: len(_BOM)]
+            self._started = True
+            scan = 0
+
+        if self._skip_lf and buffer:
+            self._skip_lf = False
+            if buffer[0] == 0x0A:
+                del buffer[:1]
+
+        end = max(buffer.rfind(b"\n", scan), buffer.rfind(b"\r", scan))
+        if end < 0:
+            return []
+
+        # 只取出完整的行，之后的部分（未接收完整的行）留在缓冲区中
+        data = bytes(buffer[: end + 1])
+        del buffer[: end + 1]
+        if b"\r" in data:
+            lines = _EOL.split(data)
+            # CR 在末尾：先按行结束处理，下一块开头的 LF 属于同一个行结束符
+            self._skip_lf = data.endswith(b"\r")
+        else:
+            lines = data.split(b"\n")
+        lines.pop()  # 最后一个行结束符之后为空
+
+        frames: List[SSEFrame] = []
+        for line in lines:
+            if line.startswith(b"data:"):
+                # 绝大多数行都是 data 字段，直接处理
+                self._data.append(line[6:] if line[5:6] == b" " else line[5:])
+            elif line:
+                self._process_field(line)
+            elif self._data:
+                frames.append(self._dispatch())
+            else:
+                self._event = ""
+        return frames
+
+    def close(self) -> List[SSEFrame]:
+        """
+        流结束
+
+        按规范，流结束时未以空行结束的事件会被丢弃；这里只重置解析状态。
+        """
+        self._buffer.clear()
+        self._data = []
+        self._event = ""
+        self._started = False
+        self._skip_lf = False
+        return []
+
+    def _dispatch(self) -> SSEFrame:
+        data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+        frame = SSEFrame(self._event or "message", data, self.last_event_id)
+        self._data = []
+        self._event = ""
+        return frame
+
+    def _process_field(self, line: bytes):
+        if line[0] == 0x3A:  # ':' 注释
+            return
+
+        colon = line.find(b":")
+        if colon < 0:
+            field, value = line, b""
+        else:
+            field = line[:colon]
+            value = line[colon + 2 :] if line[colon + 1 : colon + 2] == b" " else line[colon + 1 :]
+
+        if field == b"data":
+            self._data.append(value)
+        elif field == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif field == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
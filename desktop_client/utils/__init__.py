@@ -8,10 +8,29 @@ from .autostart import (
     disable_autostart,
     set_autostart,
 )
+from .atomic_write import (
+    FsyncBatcher,
+    append_text,
+    atomic_open,
+    atomic_write,
+)
+from .byte_cache import ByteLRUCache, CacheStats
+from . import fast_json
+from .file_hash import hash_file
+from .markdown_stream import IncrementalMarkdownRenderer
 
 __all__ = [
     "is_autostart_enabled",
     "enable_autostart",
     "disable_autostart",
     "set_autostart",
+    "FsyncBatcher",
+    "append_text",
+    "atomic_open",
+    "atomic_write",
+    "ByteLRUCache",
+    "CacheStats",
+    "fast_json",
+    "hash_file",
+    "IncrementalMarkdownRenderer",
 ]
@@ -0,0 +1,209 @@
+"""
+崩溃安全的文件写入
+
+- atomic_write / atomic_open: 先写入同目录下的临时文件，fsync 后再 os.replace 到目标路径，
+  写入过程中崩溃或断电时目标文件要么是旧内容，要么是完整的新内容，不会被截断
+- append_text: 追加写入（用于日志文件），写入前补齐上次崩溃留下的半行
+- FsyncBatcher: 合并频繁追加写入的 fsync，每个文件在 interval 秒内最多 fsync 一次，
+  其余的推迟到下一次写入或 flush 时执行
+"""
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def fsync_directory(path: str):
+    """
+    fsync 目录，使目录中的重命名 / 新建文件落盘
+
+    Windows 不支持打开目录进行 fsync，直接跳过。
+    """
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError as e:
+        logger.debug(f"打开目录失败，跳过 fsync: {e}")
+        return
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        logger.debug(f"目录 fsync 失败: {e}")
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(
+    path: str,
+    mode: str = "w",
+    encoding: Optional[str] = "utf-8",
+    newline: Optional[str] = None,
+    sync: bool = True,
+) -> Iterator[IO]:
+    """
+    以原子替换的方式写入文件
+
+    with 代码块正常结束时把临时文件替换为目标文件；抛出异常（包括取消）时删除临时文件，
+    目标文件保持不变。
+
+    Args:
+        path: 目标路径（父目录不存在时自动创建）
+        mode: 写入模式，"w" 或 "wb"
+        encoding: 文本模式的编码
+        newline: 文本模式的换行符转换
+        sync: 替换前是否 fsync 临时文件（替换后同时 fsync 所在目录）
+
+    Yields:
+        临时文件对象
+    """
+    if mode not in ("w", "wb"):
+        raise ValueError(f"不支持的写入模式: {mode}")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        if "b" in mode:
+            f = os.fdopen(fd, mode)
+        else:
+            f = os.fdopen(fd, mode, encoding=encoding, newline=newline)
+        with f:
+            yield f
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if sync:
+        fsync_directory(directory)
+
+
+def atomic_write(
+    path: str, data, encoding: str = "utf-8", sync: bool = True
+) -> int:
+    """
+    原子写入整个文件
+
+    Args:
+        path: 目标路径
+        data: 文本（str）或二进制（bytes）内容
+        encoding: 文本编码
+        sync: 是否 fsync
+
+    Returns:
+        写入的字节数
+    """
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    with atomic_open(path, "wb", sync=sync) as f:
+        f.write(data)
+    return len(data)
+
+
+def append_text(
+    path: str,
+    data: str,
+    encoding: str = "utf-8",
+    syncer: Optional["FsyncBatcher"] = None,
+) -> int:
+    """
+    向按行组织的文件追加文本
+
+    上次写入中途崩溃时文件可能停在半行，追加前先补一个换行，
+    避免新记录与残缺记录拼接成同一行而一起被丢弃。
+
+    Args:
+        path: 文件路径（父目录不存在时自动创建）
+        data: 要追加的文本（应以换行结尾）
+        encoding: 文本编码
+        syncer: fsync 策略，为空时不 fsync（由操作系统决定何时落盘）
+
+    Returns:
+        写入的字节数
+    """
+    payload = data.encode(encoding)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "ab+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end > 0:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                payload = b"\n" + payload
+        f.write(payload)
+        f.flush()
+        if syncer is not None:
+            syncer.sync(path, f.fileno())
+    return len(payload)
+
+
+class FsyncBatcher:
+    """
+    批量 fsync
+
+    同一文件距离上次 fsync 不足 interval 秒时只标记为待同步，
+    下一次写入或 flush 时再执行；interval 为 0 时每次写入都 fsync。
+    崩溃时最多丢失最近 interval 秒内追加的数据，已写入的数据不会损坏。
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = max(0.0, interval)
+        self._last_sync: Dict[str, float] = {}
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self.syncs = 0  # 实际执行的 fsync 次数
+        self.deferred = 0  # 被推迟合并的 fsync 次数
+
+    def sync(self, path: str, fd: int):
+        """
+        写入 path 后调用（fd 为刚写入的文件描述符）
+
+        Args:
+            path: 文件路径
+            fd: 已 flush 的文件描述符
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sync.get(path, float("-inf")) < self.interval:
+                self._pending.add(path)
+                self.deferred += 1
+                return
+            self._pending.discard(path)
+            self._last_sync[path] = now
+            self.syncs += 1
+        os.fsync(fd)
+
+    def flush(self):
+        """立即 fsync 所有待同步的文件（如应用退出前）"""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            now = time.monotonic()
+            for path in pending:
+                self._last_sync[path] = now
+            self.syncs += len(pending)
+        for path in pending:
+            try:
+                with open(path, "ab") as f:
+                    os.fsync(f.fileno())
+            except OSError as e:
+                logger.debug(f"fsync 失败 {path}: {e}")
+
+    def has_pending(self) -> bool:
+        """是否有尚未 fsync 的写入"""
+        with self._lock:
+            return bool(self._pending)
@@ -0,0 +1,124 @@
+"""
+按字节数限制容量的 LRU 缓存
+
+渲染结果（HTML 字符串）大小差别很大，按条目数限制容量时，
+少量超长消息就可能占用大量内存。ByteLRUCache 按值占用的字节数计算容量，
+超出上限时淘汰最久未使用的条目。线程安全。
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+@dataclass
+class CacheStats:
+    """缓存统计"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # 因超出容量被淘汰的条目数
+    entries: int = 0
+    size_bytes: int = 0
+    max_bytes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        data = asdict(self)
+        lookups = self.hits + self.misses
+        data["hit_rate"] = self.hits / lookups if lookups else 0.0
+        return data
+
+
+class ByteLRUCache:
+    """按字节数限制容量的 LRU 缓存"""
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = sys.getsizeof):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 容量上限（字节）
+            sizeof: 计算值占用字节数的函数
+        """
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        获取缓存的值
+
+        Returns:
+            缓存的值，未命中时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """
+        写入缓存
+
+        单个值超过容量上限时不缓存。
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            if size > self._max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self._max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self._evictions += 1
+
+    def set_max_bytes(self, max_bytes: int):
+        """修改容量上限，超出部分立即淘汰"""
+        with self._lock:
+            self._max_bytes = max_bytes
+            while self._entries and self._size > self._max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self._evictions += 1
+
+    def clear(self):
+        """清空缓存（保留命中统计）"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        """是否已缓存（不影响命中统计和淘汰顺序）"""
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> CacheStats:
+        """获取缓存统计"""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size_bytes=self._size,
+                max_bytes=self._max_bytes,
+            )
@@ -0,0 +1,39 @@
+"""
+JSON 编解码
+
+安装了 orjson 时使用 orjson（解析和序列化都快数倍），否则使用标准库 json。
+两种实现的接口一致：
+- loads 接受 str / bytes，解析失败抛出 json.JSONDecodeError
+- dumps 返回 str（WebSocket 发送 str 为文本帧，bytes 为二进制帧）
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Any) -> Any:
+    """解析 JSON（str 或 bytes）"""
+    if ORJSON_AVAILABLE:
+        # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """序列化为 JSON 字符串"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            # orjson 不支持的数据（非字符串键、超出 64 位的整数等）交给标准库处理
+            pass
+    return json.dumps(obj)
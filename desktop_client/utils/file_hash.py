@@ -0,0 +1,30 @@
+"""
+文件哈希
+
+流式读取文件计算 SHA-256，内存占用与文件大小无关。
+"""
+
+import hashlib
+from typing import Tuple
+
+# 每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    """
+    流式计算文件的 SHA-256
+
+    Returns:
+        (十六进制哈希, 文件大小)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
@@ -0,0 +1,148 @@
+"""
+流式 Markdown 增量渲染
+
+流式响应每收到一个 chunk，完整文本都要重新渲染一次，文本越长越慢。
+IncrementalMarkdownRenderer 把文本按块切分：
+- 已完成的块（空行结束的段落 / 列表 / 表格，以及已闭合的围栏代码块）只渲染一次，
+  HTML 保存下来直接复用
+- 每次只重新渲染末尾尚未完成的块
+- 未闭合的围栏代码块按纯文本显示，闭合后才做语法高亮
+
+每个块单独渲染，结果与完整渲染不完全相同（例如引用式链接的定义在后面的块中、
+松散列表被切分为多个列表），流结束时应调用 finish 对完整文本渲染一次。
+
+切分规则与 Python-Markdown 的 fenced_code 扩展一致：围栏从行首开始，
+由相同的 ``` 或 ~~~ 序列（后面只能有空格）闭合。
+"""
+
+import html
+import re
+from typing import Callable, Optional
+
+# 围栏代码块的开始行
+_FENCE_OPEN = re.compile(r"(`{3,}|~{3,})")
+
+
+class IncrementalMarkdownRenderer:
+    """
+    Markdown 增量渲染器
+
+    用法:
+        renderer = IncrementalMarkdownRenderer(render_block)
+        for text in 逐渐增长的文本:
+            html = renderer.render(text)
+    """
+
+    def __init__(
+        self,
+        render_block: Callable[[str], str],
+        render_tail: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        初始化渲染器
+
+        Args:
+            render_block: 渲染已完成块的函数（Markdown -> HTML）
+            render_tail: 渲染末尾未完成块的函数，默认与 render_block 相同；
+                未完成块每次都会变化，可以传入不带缓存的版本
+        """
+        self._render_block = render_block
+        self._render_tail = render_tail or render_block
+        self.reset()
+
+    def reset(self):
+        """清空已渲染的块"""
+        self._text = ""
+        self._html = ""  # 已完成块的 HTML
+        self._offset = 0  # 未完成块在文本中的起始位置
+        self._scan = 0  # 已扫描到的位置（总在行首）
+        self._fence: Optional[str] = None  # 未闭合的围栏
+        self._pending_break = -1  # 空行之后的位置，下一行不是缩进行时在此切分
+        self.blocks_rendered = 0  # 渲染过的已完成块数量
+
+    def render(self, text: str) -> str:
+        """
+        渲染 Markdown 文本
+
+        文本是上一次文本的延续时只渲染新增的部分，否则从头渲染。
+
+        Args:
+            text: 完整的 Markdown 文本
+
+        Returns:
+            HTML 片段
+
+        Raises:
+            Exception: 渲染函数出错
+        """
+        if not text.startswith(self._text):
+            self.reset()
+        self._text = text
+        self._scan_lines(text)
+
+        tail = text[self._offset :]
+        if self._fence is not None:
+            return self._html + self._render_open_fence(tail)
+        if not tail.strip():
+            return self._html
+        return self._html + self._render_tail(tail)
+
+    def finish(self, text: str) -> str:
+        """
+        流结束：对完整文本渲染一次（与非流式渲染的结果相同），并清空已渲染的块
+
+        Args:
+            text: 完整的 Markdown 文本
+
+        Returns:
+            HTML 片段
+        """
+        self.reset()
+        return self._render_block(text)
+
+    def _scan_lines(self, text: str):
+        """扫描新接收的完整行，提交已完成的块"""
+        pos = self._scan
+        while True:
+            end = text.find("\n", pos)
+            if end < 0:
+                break
+            line = text[pos:end]
+            end += 1
+
+            if self._fence is not None:
+                if line.rstrip(" ") == self._fence:
+                    # 围栏闭合，整个代码块作为一个块
+                    self._fence = None
+                    self._commit(end)
+            elif not line.strip():
+                if self._pending_break < 0 and text[self._offset : pos].strip():
+                    self._pending_break = end
+            else:
+                match = _FENCE_OPEN.match(line)
+                if match:
+                    self._commit(pos)
+                    self._fence = match.group(1)
+                elif self._pending_break >= 0:
+                    if line[0] in " \t":
+                        # 空行之后的缩进行是列表续行 / 缩进代码，仍属于同一个块
+                        self._pending_break = -1
+                    else:
+                        self._commit(self._pending_break)
+            pos = end
+        self._scan = pos
+
+    def _commit(self, end: int):
+        """将 [offset, end) 作为已完成的块渲染"""
+        block = self._text[self._offset : end]
+        self._offset = end
+        self._pending_break = -1
+        if block.strip():
+            self._html += self._render_block(block)
+            self.blocks_rendered += 1
+
+    @staticmethod
+    def _render_open_fence(tail: str) -> str:
+        """未闭合的围栏代码块按纯文本显示"""
+        _, _, code = tail.partition("\n")
+        return f"<pre><code>{html.escape(code)}</code></pre>"
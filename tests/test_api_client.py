@@ -0,0 +1,319 @@
+"""
+API 客户端单元测试
+
+测试 SSE 传输：
+- pooled 模式复用同一个客户端，并发请求的响应流按请求 ID 隔离
+- 服务器回显的请求 ID 不一致时丢弃响应
+- isolated 模式每个请求使用独立客户端
+- 按字节块解析响应，跳过调用方不需要的事件类型
+- WebSocket 消息按类型分发，执行时间长的命令不阻塞 server_ping 响应
+- 远程截图命令的截图和编码不在事件循环中执行
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import websockets
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.api_client import (
+    REQUEST_ID_HEADER,
+    SSE_TRANSPORT_ISOLATED,
+    SSE_TRANSPORT_POOLED,
+    AstrBotApiClient,
+    WebSocketClient,
+)
+from desktop_client.handlers.remote_command_handler import RemoteCommandHandler
+from desktop_client.services import image_pipeline
+from desktop_client.services.capture_session import CaptureSession
+from desktop_client.services.screen_capture import ScreenCaptureService
+from desktop_client.sse_parser import SSEFrame
+from desktop_client.utils import fast_json
+
+
+def sse_handler(echo_id=None):
+    """模拟 /chat/send：把请求中的消息拆成多个流式事件返回，各事件之间让出控制权"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        request_id = request.headers[REQUEST_ID_HEADER]
+
+        async def stream():
+            for char in body["message"]:
+                await asyncio.sleep(0)
+                data = {"type": "plain", "data": char, "streaming": True}
+                yield f"data: {json.dumps(data)}\n\n".encode()
+            yield b'data: {"type": "end", "data": ""}\n\n'
+
+        return httpx.Response(
+            200,
+            headers={
+                "Content-Type": "text/event-stream",
+                REQUEST_ID_HEADER: echo_id or request_id,
+            },
+            content=stream(),
+        )
+
+    return handler
+
+
+def make_client(transport: str, handler) -> AstrBotApiClient:
+    client = AstrBotApiClient("http://stub", token="token", sse_transport=transport)
+    mock = httpx.MockTransport(handler)
+    if transport == SSE_TRANSPORT_POOLED:
+        client._sse_client = httpx.AsyncClient(transport=mock)
+    else:
+        client._create_sse_client = lambda: httpx.AsyncClient(transport=mock)
+    return client
+
+
+async def collect(client: AstrBotApiClient, text: str, request_id: str):
+    return [
+        event
+        async for event in client.send_message("session", text, request_id=request_id)
+    ]
+
+
+class TestSSETransport:
+    """SSE 传输测试"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("transport", [SSE_TRANSPORT_POOLED, SSE_TRANSPORT_ISOLATED])
+    async def test_concurrent_streams_are_isolated(self, transport: str):
+        """测试并发请求的事件不会串到其他请求的响应流中"""
+        client = make_client(transport, sse_handler())
+        pooled_client = client._sse_client
+
+        first, second = await asyncio.gather(
+            collect(client, "aaaa", "req_a"), collect(client, "bbbb", "req_b")
+        )
+
+        assert "".join(e.data for e in first) == "aaaa"
+        assert "".join(e.data for e in second) == "bbbb"
+        assert {e.request_id for e in first} == {"req_a"}
+        assert {e.request_id for e in second} == {"req_b"}
+        assert first[-1].event_type == second[-1].event_type == "end"
+        # pooled 模式复用同一个客户端，请求结束后不关闭
+        assert client._sse_client is pooled_client
+        assert not client._active_sse_requests
+        await client.close()
+
+    @pytest.mark.unit
+    async def test_mismatched_echo_is_rejected(self):
+        """测试服务器回显的请求 ID 不一致时返回错误事件"""
+        client = make_client(SSE_TRANSPORT_POOLED, sse_handler(echo_id="req_other"))
+
+        events = await collect(client, "hello", "req_a")
+
+        assert [e.event_type for e in events] == ["error"]
+        await client.close()
+
+    @pytest.mark.unit
+    async def test_duplicate_request_id_is_rejected(self):
+        """测试同一请求 ID 同时只能有一个响应流"""
+        client = make_client(SSE_TRANSPORT_POOLED, sse_handler())
+        stream = client.send_message("session", "hello", request_id="req_a")
+        first = await stream.__anext__()
+        assert first.data == "h"
+
+        events = await collect(client, "hello", "req_a")
+        assert [e.event_type for e in events] == ["error"]
+
+        await stream.aclose()
+        assert not client._active_sse_requests
+        await client.close()
+
+
+class TestSSEDecoding:
+    """SSE 响应解析测试"""
+
+    @pytest.mark.unit
+    async def test_unwanted_event_types_are_skipped(self):
+        """测试不需要的事件类型不会返回，end 事件总是返回"""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            body = (
+                'data: {"type": "plain", "data": "a"}\n\n'
+                'data: {"type": "agent_stats", "data": {"tokens": 3}}\n\n'
+                "data: not json\n\n"
+                'data: {"type": "plain",\ndata:  "data": "b"}\n\n'
+                'data: {"type": "end", "data": ""}\n\n'
+            )
+            return httpx.Response(
+                200, headers={"Content-Type": "text/event-stream"}, content=body.encode()
+            )
+
+        client = make_client(SSE_TRANSPORT_POOLED, handler)
+        events = [
+            event
+            async for event in client.send_message(
+                "session", "hi", request_id="req_a", event_types={"plain"}
+            )
+        ]
+
+        assert [(e.event_type, e.data) for e in events] == [
+            ("plain", "a"),
+            ("plain", "b"),
+            ("end", ""),
+        ]
+        await client.close()
+
+    @pytest.mark.unit
+    def test_empty_data_is_not_decoded(self, caplog):
+        """测试只有空 data 字段的事件直接忽略，不做 JSON 解析"""
+        client = AstrBotApiClient("http://stub", token="token")
+
+        with caplog.at_level(logging.WARNING):
+            assert client._decode_sse_frame(SSEFrame("message", b"", ""), "req_a") is None
+            assert client._decode_sse_frame(SSEFrame("message", b"\n", ""), "req_a") is None
+
+        assert not caplog.records
+
+
+class TestWebSocketDispatch:
+    """WebSocket 消息分发测试"""
+
+    @pytest.mark.unit
+    async def test_slow_command_does_not_delay_server_ping(self):
+        """测试执行时间长的命令在后台执行，server_ping 立即得到响应"""
+        replies = []
+        done = asyncio.Event()
+
+        async def server(ws):
+            await ws.send(json.dumps({"type": "command", "command": "slow", "request_id": "r1"}))
+            await ws.send(json.dumps({"type": "server_ping", "timestamp": 1}))
+            async for message in ws:
+                data = json.loads(message)
+                if data["type"] in ("server_pong", "command_result"):
+                    replies.append(data["type"])
+                if data["type"] == "command_result":
+                    done.set()
+
+        async def on_command(command, request_id, params):
+            await asyncio.sleep(0.2)
+            return {"success": True}
+
+        async with websockets.serve(server, "127.0.0.1", 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            client = WebSocketClient(
+                "http://stub",
+                token="token",
+                session_id="s",
+                on_command=on_command,
+                ws_url=f"ws://127.0.0.1:{port}/ws/client",
+            )
+            await client.start()
+            try:
+                await asyncio.wait_for(done.wait(), 5)
+            finally:
+                await client.stop()
+
+        assert replies == ["server_pong", "command_result"]
+
+    @pytest.mark.unit
+    async def test_screenshot_command_does_not_block_server_ping(self, tmp_path, monkeypatch):
+        """测试截图和编码耗时较长时，server_ping 仍然立即得到响应"""
+
+        class SlowMSS:
+            monitors = [{"left": 0, "top": 0, "width": 4, "height": 2}]
+
+            def grab(self, area):
+                time.sleep(0.5)
+                return SimpleNamespace(size=(4, 2), bgra=b"\x80" * 32)
+
+            def close(self):
+                pass
+
+        process = image_pipeline.ImagePipeline.process
+
+        def slow_process(pipeline, image):
+            time.sleep(0.5)
+            return process(pipeline, image)
+
+        monkeypatch.setattr(image_pipeline.ImagePipeline, "process", slow_process)
+        config = SimpleNamespace(storage=SimpleNamespace(image_save_path=str(tmp_path)))
+        handler = RemoteCommandHandler(config)
+        session = CaptureSession(factory=SlowMSS)
+        handler._screen_capture = ScreenCaptureService(str(tmp_path), session=session)
+
+        delays = []
+        result = {}
+        done = asyncio.Event()
+
+        async def server(ws):
+            loop = asyncio.get_running_loop()
+
+            async def ping():
+                # 分别在截图和编码期间发送
+                for delay in (0.3, 0.5):
+                    await asyncio.sleep(delay)
+                    await ws.send(json.dumps({"type": "server_ping", "timestamp": loop.time()}))
+
+            pinger = asyncio.create_task(ping())
+            await ws.send(json.dumps({"type": "command", "command": "screenshot", "request_id": "r1"}))
+            async for message in ws:
+                data = json.loads(message)
+                if data["type"] == "server_pong":
+                    delays.append(loop.time() - data["client_timestamp"])
+                elif data["type"] == "command_result":
+                    result.update(data["data"])
+                    done.set()
+            pinger.cancel()
+
+        async with websockets.serve(server, "127.0.0.1", 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            client = WebSocketClient(
+                "http://stub",
+                token="token",
+                session_id="s",
+                on_command=handler.handle_command,
+                ws_url=f"ws://127.0.0.1:{port}/ws/client",
+            )
+            await client.start()
+            try:
+                await asyncio.wait_for(done.wait(), 5)
+            finally:
+                await client.stop()
+                session.close()
+
+        assert result["success"] and (result["width"], result["height"]) == (4, 2)
+        assert len(delays) == 2
+        assert max(delays) < 0.2
+
+    @pytest.mark.unit
+    async def test_registered_handler_and_fallback(self):
+        """测试注册的处理函数优先，未注册的类型交给 on_message，非对象消息被忽略"""
+        received = []
+        client = WebSocketClient("http://stub", "token", "s", on_message=received.append)
+        custom = []
+        client.register_handler("custom", custom.append)
+
+        await client._dispatch({"type": "custom", "value": 1})
+        await client._dispatch({"type": "chat", "value": 2})
+        await client._dispatch([1, 2])
+
+        assert custom == [{"type": "custom", "value": 1}]
+        assert received == [{"type": "chat", "value": 2}]
+
+
+class TestFastJson:
+    """JSON 编解码测试"""
+
+    @pytest.mark.unit
+    def test_round_trip(self):
+        """测试编解码结果与标准库一致，不支持的数据回退到标准库"""
+        data = {"type": "desktop_state", "text": "中文", "values": [1, 2.5, None, True]}
+        assert fast_json.loads(fast_json.dumps(data)) == data
+        assert fast_json.loads(fast_json.dumps(data).encode("utf-8")) == data
+        assert json.loads(fast_json.dumps({1: 2**70})) == {"1": 2**70}
+        with pytest.raises(json.JSONDecodeError):
+            fast_json.loads("{invalid")
@@ -0,0 +1,209 @@
+"""
+原子写入与故障注入测试
+
+在子进程中执行真实的保存流程，并在写到随机字节位置时直接 os._exit 终止进程，
+模拟写入途中崩溃 / 断电，然后检查配置文件和聊天记录都能完整加载。
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from desktop_client.config import ClientConfig
+from desktop_client.services.chat_history import ChatHistoryManager
+from desktop_client.utils.atomic_write import (
+    FsyncBatcher,
+    append_text,
+    atomic_open,
+    atomic_write,
+)
+
+# 子进程被故障注入终止时的退出码
+CRASH_EXIT_CODE = 17
+
+# 每个场景注入故障的随机位置数
+FAULT_POINTS = 4
+
+# 子进程：执行一次保存，写到 fraction 比例的字节处时终止
+_CHILD = r"""
+import io, json, os, sys
+sys.path.insert(0, sys.argv[1])
+scenario, target, fraction = sys.argv[2], sys.argv[3], float(sys.argv[4])
+
+def crash_write(binary, text):
+    data = text.encode("utf-8")
+    binary.write(data[: int(len(data) * fraction)])
+    binary.flush()
+    os._exit(%(code)d)
+
+if scenario == "config":
+    from desktop_client.config import ClientConfig
+    import desktop_client.config as config_module
+
+    def dump(obj, f, **kwargs):
+        f.flush()
+        crash_write(f.buffer, json.dumps(obj, **kwargs))
+
+    config_module.json.dump = dump
+    config = ClientConfig.load(target)
+    config.session_id = "new-session"
+    config.save(target)
+else:
+    from desktop_client.services import history_store
+    from desktop_client.services.chat_history import ChatHistoryManager
+
+    if scenario == "snapshot":
+        def write_json(f, header, messages):
+            buf = io.StringIO()
+            history_store.write_messages_json.__wrapped__(buf, header, messages)
+            f.flush()
+            crash_write(f.buffer, buf.getvalue())
+
+        write_json.__wrapped__ = history_store.write_messages_json
+        history_store.write_messages_json = write_json
+        backend = "json"
+    else:
+        def append(path, data, **kwargs):
+            with open(path, "ab") as f:
+                crash_write(f, data)
+
+        history_store.append_text = append
+        backend = "journal"
+
+    manager = ChatHistoryManager(target, backend=backend)
+    manager.set_auto_save(False)
+    for i in range(10):
+        manager.add_message("assistant", f"新消息 {i}")
+    manager.save_to_file_sync()
+os._exit(0)
+""" % {"code": CRASH_EXIT_CODE}
+
+
+def run_crashing_child(scenario: str, target: Path, fraction: float):
+    """在子进程中执行保存，并在写入 fraction 比例的数据后终止"""
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, str(ROOT), scenario, str(target), str(fraction)],
+        env={**os.environ, "QT_QPA_PLATFORM": "offscreen"},
+        capture_output=True,
+        timeout=60,
+    )
+    assert result.returncode == CRASH_EXIT_CODE, result.stderr.decode(errors="replace")
+
+
+def fault_points(seed: int):
+    """确定性的随机故障位置（写入数据的比例）"""
+    rng = random.Random(seed)
+    return [round(rng.uniform(0.01, 0.99), 3) for _ in range(FAULT_POINTS)]
+
+
+class TestAtomicWrite:
+    """原子写入工具测试"""
+
+    @pytest.mark.unit
+    def test_error_keeps_original(self, tmp_path: Path):
+        """测试写入过程中抛出异常时目标文件不变，且不留下临时文件"""
+        path = tmp_path / "data.json"
+        atomic_write(str(path), "old")
+
+        with pytest.raises(RuntimeError):
+            with atomic_open(str(path)) as f:
+                f.write("new content")
+                raise RuntimeError("boom")
+
+        assert path.read_text(encoding="utf-8") == "old"
+        assert list(tmp_path.iterdir()) == [path]
+
+    @pytest.mark.unit
+    def test_append_repairs_torn_line(self, tmp_path: Path):
+        """测试追加写入前补齐上次崩溃留下的半行"""
+        path = tmp_path / "log.jsonl"
+        path.write_bytes(b'{"seq": 1}\n{"seq": 2, "op"')
+
+        append_text(str(path), '{"seq": 3}\n')
+
+        assert path.read_text(encoding="utf-8").splitlines()[-1] == '{"seq": 3}'
+
+    @pytest.mark.unit
+    def test_fsync_batching(self, tmp_path: Path, monkeypatch):
+        """测试间隔内的多次写入只 fsync 一次，flush 时补齐推迟的 fsync"""
+        calls = []
+        real_fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: calls.append(fd) or real_fsync(fd))
+
+        path = str(tmp_path / "log.jsonl")
+        syncer = FsyncBatcher(interval=60)
+        for i in range(5):
+            append_text(path, f"{i}\n", syncer=syncer)
+
+        assert (syncer.syncs, syncer.deferred, len(calls)) == (1, 4, 1)
+        assert syncer.has_pending()
+
+        syncer.flush()
+        assert len(calls) == 2
+        assert not syncer.has_pending()
+
+
+class TestFaultInjection:
+    """写入途中进程被终止的故障注入测试"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("fraction", fault_points(1))
+    def test_config_save(self, tmp_path: Path, fraction: float):
+        """测试配置保存中途崩溃后旧配置仍然完整"""
+        path = tmp_path / "config.json"
+        config = ClientConfig()
+        config.session_id = "old-session"
+        assert config.save(str(path))
+
+        run_crashing_child("config", path, fraction)
+
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f)["session_id"] == "old-session"
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("fraction", fault_points(2))
+    @pytest.mark.parametrize("scenario", ["snapshot", "journal"])
+    def test_history_save(self, tmp_path: Path, scenario: str, fraction: float):
+        """测试聊天记录保存中途崩溃后历史记录不丢失、不被当作损坏文件备份"""
+        path = tmp_path / "chat_history.json"
+        backend = "json" if scenario == "snapshot" else "journal"
+        ChatHistoryManager.reset_instance()
+        try:
+            manager = ChatHistoryManager(str(path), backend=backend)
+            manager.set_auto_save(False)
+            for i in range(20):
+                manager.add_message("user", f"旧消息 {i}")
+            assert manager.save_to_file_sync()
+            manager.close()
+
+            run_crashing_child(scenario, path, fraction)
+
+            ChatHistoryManager.reset_instance()
+            manager = ChatHistoryManager(str(path), backend=backend)
+            manager.set_auto_save(False)
+            contents = [m.content for m in manager.get_messages()]
+
+            # 旧消息全部保留；日志中完整写入的新消息按顺序保留，残缺的记录被丢弃
+            assert contents[:20] == [f"旧消息 {i}" for i in range(20)]
+            assert contents[20:] == [f"新消息 {i}" for i in range(len(contents) - 20)]
+            assert not list(tmp_path.glob("*.corrupted.*"))
+
+            # 崩溃后继续写入的记录不受残缺数据影响
+            manager.add_message("user", "恢复后的消息")
+            assert manager.save_to_file_sync()
+            manager.close()
+            ChatHistoryManager.reset_instance()
+            manager = ChatHistoryManager(str(path), backend=backend)
+            assert manager.get_last_message().content == "恢复后的消息"
+            manager.close()
+        finally:
+            ChatHistoryManager.reset_instance()
@@ -0,0 +1,158 @@
+"""
+WebSocket 二进制帧传输单元测试
+
+测试：
+- 数据拆分为二进制帧后能按 transfer_id 拼接还原
+- 根据服务端配置协商是否启用
+- 服务端支持时命令结果中的图片以二进制帧发送，不支持时回退到 Base64
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import websockets
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client import binary_frames
+from desktop_client.api_client import WebSocketClient
+
+
+class TestBinaryFrames:
+    """二进制帧编解码测试"""
+
+    @pytest.mark.unit
+    def test_round_trip(self):
+        """测试拆分为多个帧后拼接还原，帧乱序也能还原"""
+        payload = os.urandom(40 * 1024 + 7)
+        transfer, frames = binary_frames.encode_frames(payload, chunk_size=16 * 1024)
+
+        assert (transfer.size, transfer.chunks, len(frames)) == (len(payload), 3, 3)
+        assembler = binary_frames.FrameAssembler()
+        assert assembler.feed(frames[2]) is None
+        assert assembler.feed(frames[0]) is None
+        assert assembler.feed(frames[1]) == (transfer.transfer_id, payload)
+        assert assembler.pending == 0
+
+        # 空数据也是一个帧
+        transfer, frames = binary_frames.encode_frames(b"")
+        assert assembler.feed(frames[0]) == (transfer.transfer_id, b"")
+
+    @pytest.mark.unit
+    def test_invalid_frame(self):
+        """测试格式错误的帧"""
+        for frame in (b"\x00", b"\x00\x00\x00\x10{}", b"\x00\x00\x00\x02{}data"):
+            with pytest.raises(ValueError):
+                binary_frames.decode_frame(frame)
+
+    @pytest.mark.unit
+    def test_negotiate(self):
+        """测试根据服务端配置确定数据块大小"""
+        assert binary_frames.negotiate({}) is None
+        assert binary_frames.negotiate(None) is None
+        assert binary_frames.negotiate({"binary_frames": False}) is None
+        assert binary_frames.negotiate({"binary_frames": {"version": 2}}) is None
+        assert binary_frames.negotiate({"binary_frames": True}) == binary_frames.DEFAULT_CHUNK_SIZE
+        assert binary_frames.negotiate({"binary_frames": {"max_chunk_size": 64 * 1024}}) == 64 * 1024
+        assert (
+            binary_frames.negotiate({"binary_frames": {"max_chunk_size": 1}})
+            == binary_frames.MIN_CHUNK_SIZE
+        )
+
+
+async def run_screenshot_command(server_config: dict, image: bytes):
+    """客户端连接测试服务端，执行返回图片的命令，返回 (get_config 请求, 命令结果, 收到的二进制数据)"""
+    received = {}
+    transfers = {}
+    done = asyncio.Event()
+    assembler = binary_frames.FrameAssembler()
+
+    async def server(ws):
+        async for message in ws:
+            if isinstance(message, bytes):
+                completed = assembler.feed(message)
+                if completed:
+                    transfers[completed[0]] = completed[1]
+                continue
+            data = json.loads(message)
+            if data["type"] == "get_config":
+                received["get_config"] = data
+                await ws.send(json.dumps({"type": "server_config", "config": server_config}))
+                await ws.send(json.dumps({"type": "command", "command": "screenshot", "request_id": "r1"}))
+            elif data["type"] == "command_result":
+                received["result"] = data["data"]
+                done.set()
+
+    async def on_command(command, request_id, params):
+        return {"success": True, "image": image, "format": "png"}
+
+    async with websockets.serve(server, "127.0.0.1", 0, max_size=2 * 1024 * 1024) as ws_server:
+        port = ws_server.sockets[0].getsockname()[1]
+        client = WebSocketClient(
+            "http://stub",
+            token="token",
+            session_id="s",
+            on_command=on_command,
+            ws_url=f"ws://127.0.0.1:{port}/ws/client",
+        )
+        await client.start()
+        try:
+            await asyncio.wait_for(done.wait(), 5)
+            stats = client.get_connection_stats()
+        finally:
+            await client.stop()
+
+    return received, transfers, stats
+
+
+class TestBinaryTransport:
+    """WebSocketClient 二进制帧传输测试"""
+
+    @pytest.mark.unit
+    async def test_binary_frames(self):
+        """测试服务端支持时，超过服务端消息大小上限的图片分块以二进制帧发送"""
+        image = os.urandom(5 * 1024 * 1024)
+
+        received, transfers, stats = await run_screenshot_command(
+            {"binary_frames": {"version": 1, "max_chunk_size": 1024 * 1024}}, image
+        )
+
+        assert received["get_config"]["capabilities"]["binary_frames"]["version"] == 1
+        result = received["result"]
+        assert "image" not in result and "image_base64" not in result
+        transfer = result["image_transfer"]
+        assert (transfer["size"], transfer["chunks"]) == (len(image), 5)
+        assert transfers[transfer["transfer_id"]] == image
+        assert (stats["binary_frames"], stats["binary_transfers"]) == (True, 1)
+
+    @pytest.mark.unit
+    async def test_base64_fallback(self):
+        """测试服务端不支持时回退到 Base64"""
+        image = os.urandom(1024)
+
+        received, transfers, stats = await run_screenshot_command({"heartbeat_interval": 15}, image)
+
+        result = received["result"]
+        assert base64.b64decode(result["image_base64"]) == image
+        assert "image_transfer" not in result and not transfers
+        assert (stats["binary_frames"], stats["base64_fallbacks"]) == (False, 1)
+
+    @pytest.mark.unit
+    async def test_nested_fields(self):
+        """测试嵌套字段（变化区域列表）也被替换，原消息不被修改"""
+        client = WebSocketClient("http://stub", "token", "s")
+        state = {"screenshot": b"full", "screenshot_regions": [{"left": 0, "image": b"part"}]}
+
+        encoded = await client._encode_binary_fields(state)
+
+        assert encoded == {
+            "screenshot_base64": base64.b64encode(b"full").decode(),
+            "screenshot_regions": [{"left": 0, "image_base64": base64.b64encode(b"part").decode()}],
+        }
+        assert state["screenshot"] == b"full"
@@ -8,6 +8,7 @@
 - 函数结果提取
 """
 
+import asyncio
 import json
 import sys
 from pathlib import Path
@@ -28,6 +29,7 @@ from desktop_client.api_client import (
     SSEEvent,
 )
 from desktop_client.config import ClientConfig
+from desktop_client.request_scheduler import RequestPriority
 
 
 class TestInputMessage:
@@ -316,6 +318,37 @@ class TestMessageBridgeFunctionResultExtraction:
             assert result == "带空白的结果"
 
 
+class TestRequestPriority:
+    """请求优先级解析测试"""
+
+    @staticmethod
+    def _priority(**metadata) -> int:
+        msg = InputMessage(
+            msg_type="text", content="hi", session_id="s", metadata=metadata
+        )
+        return MessageBridge._request_priority(msg)
+
+    @pytest.mark.unit
+    def test_default_priority(self):
+        """测试未指定优先级"""
+        assert self._priority() == RequestPriority.USER
+        assert self._priority(proactive=True) == RequestPriority.PROACTIVE
+
+    @pytest.mark.unit
+    def test_numeric_and_named_priority(self):
+        """测试整数、数字字符串和优先级名称"""
+        assert self._priority(priority=5) == 5
+        assert self._priority(priority="15") == 15
+        assert self._priority(priority="proactive") == RequestPriority.PROACTIVE
+        assert self._priority(priority=" USER ") == RequestPriority.USER
+
+    @pytest.mark.unit
+    def test_invalid_priority_falls_back_to_normal(self):
+        """测试无法识别的优先级按 NORMAL 处理"""
+        assert self._priority(priority="high") == RequestPriority.NORMAL
+        assert self._priority(priority=None) == RequestPriority.NORMAL
+
+
 class TestMessageBridgeSSEEventHandling:
     """消息桥接器 SSE 事件处理测试"""
 
@@ -554,6 +587,37 @@ class TestMessageBridgeSSEEventHandling:
             assert received_messages[0].msg_type == "saved"
             assert received_messages[0].metadata["message_id"] == "msg_123"
 
+    @pytest.mark.unit
+    def test_drop_event_from_other_request(self, mock_qt_app, sample_config: ClientConfig):
+        """测试丢弃不属于当前请求的事件"""
+        with patch("desktop_client.bridge.AstrBotApiClient"):
+            bridge = MessageBridge(sample_config)
+
+            received_messages = []
+            bridge.message_received.connect(lambda msg: received_messages.append(msg))
+
+            event = SSEEvent(event_type="plain", data="Hello", request_id="req_other")
+            bridge._handle_sse_event(event, "session_123", "req_current")
+            assert received_messages == []
+
+            event = SSEEvent(event_type="plain", data="Hello", request_id="req_current")
+            bridge._handle_sse_event(event, "session_123", "req_current")
+            assert received_messages[0].metadata["request_id"] == "req_current"
+
+
+    @pytest.mark.unit
+    def test_route_metadata(self, mock_qt_app, sample_config: ClientConfig):
+        """测试请求的路由信息添加到发出消息的元数据中"""
+        with patch("desktop_client.bridge.AstrBotApiClient"):
+            bridge = MessageBridge(sample_config)
+
+            received_messages = []
+            bridge.message_received.connect(lambda msg: received_messages.append(msg))
+
+            event = SSEEvent(event_type="end", data="", request_id="req_a")
+            bridge._handle_sse_event(event, "session_123", "req_a", {"proactive": True})
+            assert received_messages[0].metadata == {"request_id": "req_a", "proactive": True}
+
 
 class TestMessageBridgeServerConfig:
     """消息桥接器服务器配置测试"""
@@ -695,6 +759,60 @@ class TestMessageBridgeAsync:
             assert "未连接" in received_messages[0].content
 
 
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_send_input_concurrent_sessions(
+        self, mock_qt_app, sample_config: ClientConfig
+    ):
+        """测试不同会话的请求并发执行，响应按各自的请求路由"""
+        with patch("desktop_client.bridge.AstrBotApiClient") as mock_client_cls:
+            mock_client = MagicMock()
+            mock_client.is_connected = True
+            mock_client_cls.return_value = mock_client
+            active = []
+            overlap = []
+
+            async def send(session_id, request_id, **kwargs):
+                active.append(session_id)
+                await asyncio.sleep(0.01)
+                overlap.append(len(active))
+                yield SSEEvent(event_type="plain", data=session_id, request_id=request_id)
+                yield SSEEvent(event_type="end", data="", request_id=request_id)
+                active.remove(session_id)
+
+            mock_client.send_text_message = lambda session_id, text, request_id, **kw: send(
+                session_id, request_id
+            )
+            mock_client.send_image_message = lambda session_id, image_path, request_id, **kw: send(
+                session_id, request_id
+            )
+
+            bridge = MessageBridge(sample_config)
+            received_messages = []
+            bridge.message_received.connect(lambda msg: received_messages.append(msg))
+
+            await asyncio.gather(
+                bridge.send_input(
+                    InputMessage(
+                        msg_type="image",
+                        content="/tmp/shot.png",
+                        session_id="session_proactive",
+                        metadata={"proactive": True},
+                    )
+                ),
+                bridge.send_input(
+                    InputMessage(msg_type="text", content="hi", session_id="session_user")
+                ),
+            )
+
+            assert max(overlap) == 2
+            texts = {m.content: m.metadata for m in received_messages if m.msg_type == "text"}
+            assert texts["session_proactive"]["proactive"] is True
+            assert texts["session_user"]["proactive"] is False
+            assert texts["session_proactive"]["request_id"] != texts["session_user"]["request_id"]
+            assert bridge.active_request_ids == []
+
+
 class TestSSEEvent:
     """SSEEvent 数据类测试"""
 
@@ -0,0 +1,62 @@
+"""
+按字节数限制容量的 LRU 缓存单元测试
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.utils.byte_cache import ByteLRUCache
+
+
+class TestByteLRUCache:
+    """ByteLRUCache 测试"""
+
+    @pytest.mark.unit
+    def test_evicts_least_recently_used_by_bytes(self):
+        """测试超出字节上限时淘汰最久未使用的条目"""
+        cache = ByteLRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        assert cache.get("a") == "aaaa"  # a 变为最近使用
+
+        cache.put("c", "cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "aaaa"
+        assert cache.get("c") == "cccc"
+        assert "b" not in cache and "a" in cache
+        stats = cache.get_stats()
+        assert (stats.entries, stats.size_bytes, stats.evictions) == (2, 8, 1)
+
+    @pytest.mark.unit
+    def test_hit_miss_counters(self):
+        """测试命中 / 未命中统计"""
+        cache = ByteLRUCache(max_bytes=100, sizeof=len)
+        assert cache.get("x") is None
+        cache.put("x", "value")
+        cache.get("x")
+        cache.get("x")
+
+        stats = cache.get_stats().to_dict()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    @pytest.mark.unit
+    def test_oversized_value_and_replace(self):
+        """测试超过上限的值不缓存，覆盖写入时重新计算占用"""
+        cache = ByteLRUCache(max_bytes=5, sizeof=len)
+        cache.put("big", "x" * 6)
+        assert len(cache) == 0
+
+        cache.put("k", "12345")
+        cache.put("k", "12")
+        assert cache.get_stats().size_bytes == 2
+
+        cache.set_max_bytes(1)
+        assert len(cache) == 0
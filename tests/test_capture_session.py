@@ -0,0 +1,136 @@
+"""
+截图会话单元测试
+
+使用模拟的 mss 实例测试：
+- 多次截图（包括来自不同线程的调用）只创建一个实例，并且都在同一个线程中执行
+- 借用的图片归还后被下一次截图复用
+- 截图出错时重新创建实例并重试
+- 显示器配置变化后 refresh()，之后的截图使用新的显示器范围
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.capture_session import CaptureSession
+
+
+class FakeShot:
+    def __init__(self, width: int, height: int, value: int):
+        self.size = (width, height)
+        self.bgra = bytes([value, value, value, 255]) * (width * height)
+
+
+class FakeMSS:
+    """模拟 mss 实例，记录截图所在的线程"""
+
+    def __init__(self, log: dict):
+        self.log = log
+        # 与 mss 一样，显示器列表在实例中缓存
+        self.monitors = [dict(m) for m in log["monitors"]]
+        log["created"] += 1
+
+    def grab(self, area: dict):
+        self.log["threads"].add(threading.current_thread().name)
+        if self.log["fail"]:
+            self.log["fail"] -= 1
+            raise RuntimeError("display changed")
+        self.log["grabs"] += 1
+        return FakeShot(area["width"], area["height"], self.log["grabs"])
+
+    def close(self):
+        self.log["closed"] += 1
+
+
+def make_session():
+    log = {
+        "created": 0,
+        "closed": 0,
+        "grabs": 0,
+        "fail": 0,
+        "threads": set(),
+        "monitors": [{"left": 0, "top": 0, "width": 4, "height": 2}] * 2,
+    }
+    return CaptureSession(factory=lambda: FakeMSS(log)), log
+
+
+class TestCaptureSession:
+    """CaptureSession 测试"""
+
+    @pytest.mark.unit
+    def test_single_instance_on_one_thread(self):
+        """测试多个线程的截图共用一个实例，都在截图线程中执行"""
+        session, log = make_session()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(session.grab(1))) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 4 and all(image.size == (4, 2) for image in results)
+        assert log["created"] == 1
+        assert len(log["threads"]) == 1
+        assert session.monitors()[1]["width"] == 4
+        session.close()
+        assert log["closed"] == 1
+        assert session.grab() is None
+
+    @pytest.mark.unit
+    def test_pooled_frames_are_reused(self):
+        """测试借用的图片归还后被复用，内容更新为新的截图"""
+        session, _ = make_session()
+
+        with session.frame() as first:
+            first_id = id(first)
+            assert first.getpixel((0, 0)) == (1, 1, 1)
+        with session.frame() as second:
+            assert id(second) == first_id
+            assert second.getpixel((0, 0)) == (2, 2, 2)
+        owned = session.grab()
+
+        assert id(owned) != first_id
+        stats = session.get_stats()
+        assert (stats["frames_allocated"], stats["frames_reused"]) == (2, 1)
+        assert stats["pooled_frames"] == 1
+        session.close()
+
+    @pytest.mark.unit
+    async def test_reopen_after_error(self):
+        """测试截图出错时重新创建实例并重试，连续出错时返回 None"""
+        session, log = make_session()
+
+        log["fail"] = 1
+        assert await session.grab_async() is not None
+        assert log["created"] == 2
+
+        log["fail"] = 2
+        assert session.grab() is None
+        assert session.get_stats()["failures"] == 1
+        assert session.grab(5) is None  # 无效的显示器索引
+        session.close()
+
+    @pytest.mark.unit
+    def test_refresh_after_display_change(self):
+        """测试显示器配置变化后 refresh()，下一次截图使用新的显示器范围"""
+        session, log = make_session()
+        with session.frame(0) as image:
+            assert image.size == (4, 2)
+
+        log["monitors"] = [{"left": 0, "top": 0, "width": 8, "height": 3}] * 2
+        assert session.grab(0).size == (4, 2)  # 实例缓存了旧的显示器列表
+
+        session.refresh()
+        assert session.grab(0).size == (8, 3)
+        assert session.monitors()[1]["width"] == 8
+        stats = session.get_stats()
+        assert (stats["sessions_opened"], stats["pooled_frames"]) == (2, 0)
+        assert log["closed"] == 1
+        session.close()
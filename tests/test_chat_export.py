@@ -0,0 +1,183 @@
+"""
+聊天记录导出单元测试
+
+测试各格式的流式导出、取消后的清理，以及后台导出任务的信号。
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PySide6.QtCore import QCoreApplication
+
+from desktop_client.services.chat_export import (
+    ChatExporter,
+    ChatExportTask,
+    ExportCancelled,
+    format_from_path,
+    scope_css,
+)
+from desktop_client.services.chat_history import ChatHistoryManager
+from desktop_client.services.chat_message import ChatMessage
+
+
+def make_messages(count: int):
+    return [
+        ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"消息 {i}")
+        for i in range(count)
+    ]
+
+
+class TestChatExporter:
+    """ChatExporter 测试"""
+
+    @pytest.mark.unit
+    def test_json_formats_round_trip(self, tmp_path: Path):
+        """测试 json / jsonl 导出可以还原为相同的消息"""
+        messages = make_messages(5)
+        exporter = ChatExporter()
+
+        json_path = str(tmp_path / "out.json")
+        assert exporter.export(iter(messages), json_path, "json") == 5
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        assert [ChatMessage.from_dict(d) for d in data["messages"]] == messages
+
+        jsonl_path = str(tmp_path / "out.jsonl")
+        exporter.export(iter(messages), jsonl_path, "jsonl")
+        with open(jsonl_path, encoding="utf-8") as f:
+            assert [ChatMessage.from_dict(json.loads(line)) for line in f] == messages
+
+    @pytest.mark.unit
+    def test_markdown_and_html(self, tmp_path: Path):
+        """测试 Markdown 导出和使用自定义渲染器的 HTML 导出"""
+        messages = make_messages(2) + [
+            ChatMessage(role="user", content="截图", msg_type="image", file_path="/tmp/a.png")
+        ]
+        exporter = ChatExporter(
+            renderer=lambda text, role: f"<p data-role='{role}'>{text}</p>",
+            stylesheet="<style>.x {}</style>",
+        )
+
+        md_path = tmp_path / "out.md"
+        exporter.export(iter(messages), str(md_path), "markdown")
+        md = md_path.read_text(encoding="utf-8")
+        assert "消息 1" in md and "![图片](/tmp/a.png)" in md
+
+        html_path = tmp_path / "out.html"
+        exporter.export(iter(messages), str(html_path), "html")
+        page = html_path.read_text(encoding="utf-8")
+        assert "script-src 'none'" in page
+        assert "<style>.x {}</style>" in page
+        assert "<p data-role='assistant'>消息 1</p>" in page
+        assert page.rstrip().endswith("</html>")
+
+    @pytest.mark.unit
+    def test_cancel_removes_partial_file(self, tmp_path: Path):
+        """测试取消导出后不留下临时文件，也不覆盖已有的目标文件"""
+        path = tmp_path / "out.jsonl"
+        path.write_text("old", encoding="utf-8")
+        cancel = threading.Event()
+
+        def on_progress(count: int):
+            if count == 10:
+                cancel.set()
+
+        with pytest.raises(ExportCancelled):
+            ChatExporter().export(
+                iter(make_messages(100)), str(path), "jsonl",
+                on_progress=on_progress, cancel_event=cancel,
+            )
+
+        assert path.read_text(encoding="utf-8") == "old"
+        assert list(tmp_path.iterdir()) == [path]
+
+    @pytest.mark.unit
+    def test_format_helpers(self):
+        """测试按扩展名推断格式和样式表限定范围"""
+        assert format_from_path("a/b.MD") == "markdown"
+        assert format_from_path("a/b.unknown") == "json"
+        assert scope_css("<style>body { color: red; } p, li { margin: 0; }</style>", ".m") == (
+            "<style>.m { color: red; } .m p, .m li { margin: 0; }</style>"
+        )
+        with pytest.raises(ValueError):
+            ChatExporter().export(iter([]), "out.pdf", "pdf")
+
+
+class TestChatExportTask:
+    """后台导出任务测试"""
+
+    @pytest.mark.unit
+    def test_manager_background_export(self, tmp_path: Path):
+        """测试 ChatHistoryManager.start_export 在后台线程中完成导出"""
+        ChatHistoryManager.reset_instance()
+        try:
+            manager = ChatHistoryManager(str(tmp_path / "chat_history.json"), backend="journal")
+            manager.set_auto_save(False)
+            for msg in make_messages(50):
+                manager.add_message(msg.role, msg.content)
+
+            path = str(tmp_path / "export.jsonl")
+            task = manager.start_export(path)
+            assert task.wait(5.0)
+
+            assert task.exported == 50
+            with open(path, encoding="utf-8") as f:
+                assert sum(1 for _ in f) == 50
+        finally:
+            ChatHistoryManager.reset_instance()
+
+    @pytest.mark.unit
+    def test_fast_export_reports_finished(self, tmp_path: Path):
+        """测试很快完成的导出也能收到 finished 信号（槽在任务启动前连接）"""
+        ChatHistoryManager.reset_instance()
+        app = QCoreApplication.instance() or QCoreApplication([])
+        try:
+            manager = ChatHistoryManager(str(tmp_path / "chat_history.json"), backend="journal")
+            manager.set_auto_save(False)
+            manager.add_message("user", "一条消息")
+
+            results = []
+            path = str(tmp_path / "export.md")
+            task = manager.start_export(
+                path, on_finished=lambda ok, message: results.append((ok, message))
+            )
+            assert task.wait(5.0)
+            app.processEvents()
+
+            assert results == [(True, path)]
+        finally:
+            ChatHistoryManager.reset_instance()
+
+    @pytest.mark.unit
+    def test_cancelled_task_reports_failure(self, tmp_path: Path):
+        """测试取消的任务发射 finished(False, ...) 且没有生成文件"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_messages():
+            started.set()
+            release.wait(5.0)
+            yield from make_messages(10)
+
+        app = QCoreApplication.instance() or QCoreApplication([])
+        path = tmp_path / "out.json"
+        task = ChatExportTask(slow_messages(), str(path), "json")
+        results = []
+        task.finished.connect(lambda ok, message: results.append((ok, message)))
+        task.start()
+        assert started.wait(5.0)
+        task.cancel()
+        release.set()
+        assert task.wait(5.0)
+        # 信号以队列方式投递到主线程
+        app.processEvents()
+
+        assert results == [(False, "导出已取消")]
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,641 @@
+"""
+聊天记录管理器单元测试
+
+测试 ChatHistoryManager 及其存储后端的功能：
+- 消息增删改
+- 日志存储（追加写 + 快照压缩）
+- 旧版 JSON 文件迁移
+- 增量加载 JSON 文件
+- 损坏文件处理
+"""
+
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.chat_history import ChatHistoryManager, ChatMessage
+from desktop_client.services.chat_message import EMPTY_METADATA, write_messages_json
+from desktop_client.services.history_store import (
+    HistoryStore,
+    JournalHistoryStore,
+    JsonHistoryStore,
+    JOURNAL_SUFFIX,
+    QueryableHistoryStore,
+    SqliteHistoryStore,
+)
+from desktop_client.services.json_stream import StreamingJsonObject
+
+
+@pytest.fixture
+def history_path(tmp_path: Path) -> str:
+    """聊天记录文件路径"""
+    return str(tmp_path / "chat_history.json")
+
+
+@pytest.fixture
+def make_manager(history_path: str):
+    """创建聊天记录管理器（每次都是新的单例）"""
+
+    def _make(backend: str = "journal", path: str = "") -> ChatHistoryManager:
+        ChatHistoryManager.reset_instance()
+        return ChatHistoryManager(path or history_path, backend=backend)
+
+    yield _make
+    ChatHistoryManager.reset_instance()
+
+
+def _read_journal_lines(history_path: str) -> list:
+    journal_path = history_path + JOURNAL_SUFFIX
+    if not os.path.exists(journal_path):
+        return []
+    with open(journal_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TestChatMessage:
+    """消息数据结构测试"""
+
+    @pytest.mark.unit
+    def test_compact_fields_are_shared(self):
+        """测试 role / msg_type 驻留，空元数据共享"""
+        role = "".join(["assi", "stant"])
+        a = ChatMessage.from_dict({"role": role, "content": "a"})
+        b = ChatMessage(role="assistant", content="b", metadata={})
+
+        assert a.role is b.role
+        assert a.metadata is EMPTY_METADATA and b.metadata is EMPTY_METADATA
+        assert not hasattr(a, "__dict__")
+
+    @pytest.mark.unit
+    def test_streaming_serializer_matches_to_dict(self):
+        """测试直接序列化的结果与 to_dict 一致"""
+        messages = [
+            ChatMessage(role="user", content='多行\n"引号"\t\\', timestamp=1.5),
+            ChatMessage(role="assistant", msg_type="image", metadata={"w": [1, None]}),
+        ]
+        out = io.StringIO()
+        write_messages_json(out, {"version": 2, "seq": 7}, messages)
+
+        data = json.loads(out.getvalue())
+        assert data["version"] == 2 and data["seq"] == 7
+        assert data["messages"] == [m.to_dict() for m in messages]
+        assert json.loads(messages[1].to_json()) == messages[1].to_dict()
+
+    @pytest.mark.unit
+    def test_serializer_none_and_non_finite(self):
+        """测试 None 字段写为 null，NaN / Infinity 写为 null，增量加载可以读回"""
+        messages = [
+            ChatMessage(role="user", content="a", file_path=None),
+            ChatMessage(
+                role="assistant",
+                timestamp=float("nan"),
+                metadata={"score": float("inf"), "values": [1.5, float("-inf")]},
+            ),
+        ]
+        out = io.StringIO()
+        write_messages_json(out, {"version": 2, "ratio": float("nan")}, messages)
+
+        reader = StreamingJsonObject(io.StringIO(out.getvalue()), "messages", 7)
+        items = list(reader.iter_items())
+
+        assert reader.header == {"version": 2, "ratio": None}
+        assert items[0]["file_path"] is None
+        assert items[1]["timestamp"] is None
+        assert items[1]["metadata"] == {"score": None, "values": [1.5, None]}
+        assert json.loads(messages[0].to_json(), parse_constant=pytest.fail) == items[0]
+        assert ChatMessage.from_dict(items[0]).file_path == ""
+        assert ChatMessage.from_dict(items[1]).timestamp > 0
+
+
+class TestJournalStorage:
+    """日志存储测试"""
+
+    @pytest.mark.unit
+    def test_add_message_appends_to_journal(self, make_manager, history_path):
+        """测试新增消息只追加日志，不重写快照"""
+        manager = make_manager()
+        snapshot_size = os.path.getsize(history_path)
+
+        manager.add_message("user", "你好")
+        manager.add_message("assistant", "你好！")
+
+        assert os.path.getsize(history_path) == snapshot_size
+        records = _read_journal_lines(history_path)
+        assert [r["op"] for r in records] == ["add", "add"]
+        assert records[1]["message"]["content"] == "你好！"
+
+    @pytest.mark.unit
+    def test_reload_restores_state(self, make_manager):
+        """测试重新加载后恢复增删改后的状态"""
+        manager = make_manager()
+        manager.add_message("user", "第一条")
+        msg = manager.add_message("assistant", "")
+        manager.update_message(msg.id, "流式")
+        manager.update_message(msg.id, "流式回复")
+        manager.save_to_file_sync()
+
+        reloaded = make_manager()
+        messages = reloaded.get_messages()
+        assert [m.content for m in messages] == ["第一条", "流式回复"]
+        assert messages[1].id == msg.id
+
+    @pytest.mark.unit
+    def test_streaming_updates_are_coalesced(self, make_manager, history_path):
+        """测试连续更新同一条消息只写入一条日志"""
+        manager = make_manager()
+        msg = manager.add_message("assistant", "")
+        manager.save_to_file_sync()
+
+        # 关闭自动保存，模拟防抖窗口内的连续更新
+        manager.set_auto_save(False)
+        for i in range(50):
+            manager.update_message(msg.id, "x" * i)
+        manager.save_to_file_sync()
+
+        records = _read_journal_lines(history_path)
+        assert [r["op"] for r in records] == ["add", "update"]
+        assert records[1]["content"] == "x" * 49
+
+    @pytest.mark.unit
+    def test_clear_and_trim_are_persisted(self, make_manager):
+        """测试清空和超出上限裁剪都会被持久化"""
+        manager = make_manager()
+        manager.add_message("user", "清空前")
+        manager.clear_history()
+        manager.set_max_messages(100)
+        for i in range(105):
+            manager.add_message("user", str(i))
+        manager.save_to_file_sync()
+
+        reloaded = make_manager()
+        contents = [m.content for m in reloaded.get_messages()]
+        assert len(contents) == 100
+        assert contents[0] == "5"
+        assert "清空前" not in contents
+
+    @pytest.mark.unit
+    def test_compaction_writes_snapshot(self, history_path):
+        """测试日志达到阈值后压缩为快照并清空日志"""
+        store = JournalHistoryStore(history_path, compact_threshold=10)
+        messages = []
+        for i in range(10):
+            msg = ChatMessage(role="user", content=str(i))
+            messages.append(msg)
+            store.record_add(msg)
+        store.prepare_save(messages)()
+
+        with open(history_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        assert snapshot["version"] == 2
+        assert snapshot["seq"] == 10
+        assert len(snapshot["messages"]) == 10
+        assert _read_journal_lines(history_path) == []
+
+        reloaded = JournalHistoryStore(history_path).load()
+        assert [m.content for m in reloaded] == [str(i) for i in range(10)]
+
+    @pytest.mark.unit
+    def test_stale_journal_records_are_skipped(self, history_path):
+        """测试快照已包含的日志记录在回放时被跳过（压缩中途崩溃）"""
+        msg = ChatMessage(role="user", content="快照中")
+        with open(history_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 2, "seq": 2, "messages": [msg.to_dict()]}, f)
+        with open(history_path + JOURNAL_SUFFIX, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"seq": 1, "op": "clear"}) + "\n")
+            f.write(json.dumps({"seq": 2, "op": "add", "message": msg.to_dict()}) + "\n")
+            f.write(
+                json.dumps({"seq": 3, "op": "update", "id": msg.id, "content": "新"})
+                + "\n"
+            )
+
+        store = JournalHistoryStore(history_path)
+        messages = store.load()
+
+        assert [m.content for m in messages] == ["新"]
+        # 新记录的序号必须接在已有记录之后
+        store.record_clear()
+        assert store._pending[-1][1] == 4
+
+    @pytest.mark.unit
+    def test_torn_last_line_is_ignored(self, make_manager, history_path):
+        """测试日志最后一行写到一半（崩溃）时忽略该行"""
+        manager = make_manager()
+        manager.add_message("user", "完整")
+        with open(history_path + JOURNAL_SUFFIX, "a", encoding="utf-8") as f:
+            f.write('{"seq": 2, "op": "add", "mess')
+
+        reloaded = make_manager()
+        assert [m.content for m in reloaded.get_messages()] == ["完整"]
+
+
+class TestLegacyMigration:
+    """旧版 JSON 文件兼容测试"""
+
+    @pytest.mark.unit
+    def test_migrates_version_1_file(self, make_manager, history_path):
+        """测试加载旧版 version 1 文件并迁移为快照"""
+        legacy = {
+            "version": 1,
+            "messages": [
+                ChatMessage(role="user", content="旧消息").to_dict(),
+                ChatMessage(role="assistant", content="旧回复").to_dict(),
+            ],
+        }
+        with open(history_path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        manager = make_manager()
+
+        assert [m.content for m in manager.get_messages()] == ["旧消息", "旧回复"]
+        with open(history_path, "r", encoding="utf-8") as f:
+            assert json.load(f)["version"] == 2
+
+    @pytest.mark.unit
+    def test_switch_back_to_json_backend(self, make_manager, history_path):
+        """测试切换回 json 后端时写出完整的 version 1 文件"""
+        manager = make_manager()
+        manager.add_message("user", "日志中的消息")
+        manager.set_backend("json")
+
+        with open(history_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["version"] == 1
+        assert data["messages"][0]["content"] == "日志中的消息"
+        assert not os.path.exists(history_path + JOURNAL_SUFFIX)
+
+    @pytest.mark.unit
+    def test_corrupted_snapshot_is_backed_up(self, make_manager, history_path, tmp_path):
+        """测试损坏的文件被备份，历史记录重置为空"""
+        with open(history_path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+
+        manager = make_manager()
+
+        assert manager.get_messages() == []
+        backups = list(tmp_path.glob("chat_history.json.corrupted.*"))
+        assert len(backups) == 1
+
+
+class TestStreamingLoader:
+    """增量 JSON 加载测试"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_matches_json_loads(self, chunk_size):
+        """测试任意块大小下解析结果与 json.loads 一致"""
+        doc = {
+            "version": 1,
+            "ratio": -12.5e-3,
+            "messages": [
+                {"id": "a", "content": "你好\n\"引号\" \\u4e2d", "metadata": {}},
+                {"id": "b", "content": "", "metadata": {"n": [1, 2.25, None, True]}},
+                12345,
+                [],
+            ],
+            "tail": {"seq": 99},
+        }
+        text = json.dumps(doc, ensure_ascii=False, indent=2)
+
+        reader = StreamingJsonObject(io.StringIO(text), "messages", chunk_size)
+        items = list(reader.iter_items())
+
+        assert items == doc["messages"]
+        assert reader.header == {"version": 1, "ratio": -12.5e-3, "tail": {"seq": 99}}
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "text", ['{"messages": [{"id": "a"}', '{"messages": [1 2]}', '{"a": 1} x', "[]"]
+    )
+    def test_corrupted_input_raises(self, text):
+        """测试截断或格式错误的文件抛出 JSONDecodeError"""
+        reader = StreamingJsonObject(io.StringIO(text), "messages", 4)
+        with pytest.raises(json.JSONDecodeError):
+            list(reader.iter_items())
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("backend", ["json", "journal"])
+    def test_keeps_newest_max_messages(self, make_manager, history_path, backend):
+        """测试加载时只保留最新的 max_messages 条消息"""
+        legacy = {
+            "version": 1,
+            "messages": [
+                ChatMessage(role="user", content=str(i)).to_dict() for i in range(1200)
+            ],
+        }
+        with open(history_path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        manager = make_manager(backend)
+
+        messages = manager.get_messages()
+        assert len(messages) == 1000
+        assert messages[0].content == "200"
+        assert messages[-1].content == "1199"
+
+    @pytest.mark.unit
+    def test_truncated_file_is_backed_up(self, make_manager, history_path, tmp_path):
+        """测试写到一半被截断的文件同样会被备份"""
+        with open(history_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "messages": [{"role": "user", "content": "x"}]}, f)
+        with open(history_path, "r+", encoding="utf-8") as f:
+            f.truncate(os.path.getsize(history_path) - 3)
+
+        manager = make_manager("json")
+
+        assert manager.get_messages() == []
+        assert len(list(tmp_path.glob("chat_history.json.corrupted.*"))) == 1
+
+
+class TestSqliteStorage:
+    """SQLite 存储测试"""
+
+    @pytest.mark.unit
+    def test_store_interfaces(self, history_path):
+        """测试只有可查询后端提供查询接口"""
+        with pytest.raises(TypeError):
+            HistoryStore(history_path)
+        for store_cls in (JsonHistoryStore, JournalHistoryStore):
+            store = store_cls(history_path)
+            assert not store.queryable
+            assert not isinstance(store, QueryableHistoryStore)
+            assert not hasattr(store, "query_messages")
+        assert issubclass(SqliteHistoryStore, QueryableHistoryStore)
+        assert SqliteHistoryStore.queryable
+
+    @pytest.mark.unit
+    def test_indexed_queries(self, make_manager):
+        """测试按 limit / id 查询以及消息计数"""
+        manager = make_manager("sqlite")
+        ids = [manager.add_message("user", str(i)).id for i in range(300)]
+        manager.save_to_file_sync()
+
+        assert manager.get_message_count() == 300
+        assert [m.content for m in manager.get_messages(3)] == ["297", "298", "299"]
+        assert len(manager.get_messages()) == 300
+        # 不在内存缓存中的旧消息也能按 id 查到
+        assert manager.get_message_by_id(ids[0]).content == "0"
+
+    @pytest.mark.unit
+    def test_reload_and_update(self, make_manager, history_path):
+        """测试流式更新后重新加载"""
+        manager = make_manager("sqlite")
+        msg = manager.add_message("assistant", "")
+        for i in range(10):
+            manager.update_message(msg.id, "回复" * i)
+        manager.save_to_file_sync()
+
+        reloaded = make_manager("sqlite")
+        assert reloaded.get_message_by_id(msg.id).content == "回复" * 9
+        assert os.path.exists(os.path.splitext(history_path)[0] + ".db")
+
+    @pytest.mark.unit
+    def test_max_messages_trims_database(self, make_manager):
+        """测试超出最大消息数时裁剪数据库中的旧消息"""
+        manager = make_manager("sqlite")
+        manager.set_max_messages(100)
+        for i in range(150):
+            manager.add_message("user", str(i))
+        manager.save_to_file_sync()
+
+        assert manager.get_message_count() == 100
+        assert manager.get_messages()[0].content == "50"
+
+    @pytest.mark.unit
+    def test_imports_legacy_json(self, make_manager, history_path):
+        """测试首次使用时导入已有的 JSON 聊天记录"""
+        legacy = {
+            "version": 1,
+            "messages": [ChatMessage(role="user", content="旧消息").to_dict()],
+        }
+        with open(history_path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        manager = make_manager("sqlite")
+
+        assert [m.content for m in manager.get_messages()] == ["旧消息"]
+
+    @pytest.mark.unit
+    def test_export_txt(self, make_manager, tmp_path):
+        """测试导出包含数据库中的全部消息"""
+        manager = make_manager("sqlite")
+        for i in range(250):
+            manager.add_message("user", f"消息{i}")
+
+        export_path = str(tmp_path / "export.txt")
+        assert manager.export_to_file(export_path, "txt")
+
+        with open(export_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        assert "消息0\n" in content
+        assert "消息249\n" in content
+
+
+class TestMessageIndex:
+    """消息索引测试"""
+
+    @pytest.mark.unit
+    def test_index_follows_trim_and_clear(self, make_manager):
+        """测试索引随超出上限裁剪和清空同步更新"""
+        manager = make_manager("json")
+        manager.set_max_messages(100)
+        first = manager.add_message("user", "最早的消息")
+        for i in range(100):
+            manager.add_message("user", str(i))
+
+        assert manager.get_message_by_id(first.id) is None
+        assert manager.update_message(first.id, "已被裁剪") is False
+
+        last = manager.get_last_message()
+        assert manager.update_message(last.id, "更新") is True
+        assert manager.get_message_by_id(last.id).content == "更新"
+
+        manager.clear_history()
+        assert manager.get_message_by_id(last.id) is None
+
+    @pytest.mark.unit
+    def test_index_rebuilt_on_load(self, make_manager):
+        """测试重新加载后索引可用"""
+        manager = make_manager()
+        msg = manager.add_message("user", "你好")
+        manager.save_to_file_sync()
+
+        reloaded = make_manager()
+        assert reloaded.update_message(msg.id, "改过") is True
+        assert reloaded.get_message_by_id(msg.id).content == "改过"
+
+
+class TestHistoryPaging:
+    """历史记录分页测试"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("backend", ["journal", "sqlite"])
+    def test_get_messages_before(self, make_manager, backend):
+        """测试按游标向前翻页"""
+        manager = make_manager(backend)
+        for i in range(45):
+            manager.add_message("user", str(i))
+
+        page = manager.get_messages(20)
+        assert [m.content for m in page] == [str(i) for i in range(25, 45)]
+
+        older = manager.get_messages_before(page[0].id, 20)
+        assert [m.content for m in older] == [str(i) for i in range(5, 25)]
+
+        oldest = manager.get_messages_before(older[0].id, 20)
+        assert [m.content for m in oldest] == [str(i) for i in range(5)]
+        assert manager.get_messages_before(oldest[0].id, 20) == []
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("backend", ["journal", "sqlite"])
+    def test_get_messages_around(self, make_manager, backend):
+        """测试获取目标消息前后的消息（sqlite 后端包括内存缓存之外的消息）"""
+        manager = make_manager(backend)
+        messages = [manager.add_message("user", str(i)) for i in range(300)]
+        manager.save_to_file_sync()
+
+        for target in (10, 250):
+            window = manager.get_messages_around(messages[target].id, 9)
+            assert [m.content for m in window] == [str(i) for i in range(target - 4, target + 5)]
+
+        assert [m.content for m in manager.get_messages_around(messages[1].id, 9)] == [
+            str(i) for i in range(9)
+        ]
+        newer = manager.get_messages_after(messages[295].id, 20)
+        assert [m.content for m in newer] == [str(i) for i in range(296, 300)]
+        assert manager.get_messages_around("不存在", 9) == []
+
+    @pytest.mark.unit
+    def test_unknown_cursor_returns_empty(self, make_manager):
+        """测试未知游标返回空列表"""
+        manager = make_manager()
+        manager.add_message("user", "你好")
+        assert manager.get_messages_before("不存在", 20) == []
+        assert manager.get_messages_after("不存在", 20) == []
+
+
+class TestSaveScheduler:
+    """保存调度器测试"""
+
+    @staticmethod
+    def _make_scheduler(debounce: float = 0.05, max_latency: float = 0.2):
+        from desktop_client.services.save_scheduler import SaveScheduler
+
+        writes = []
+
+        def prepare():
+            writes.append(None)
+            return lambda: 10
+
+        return SaveScheduler(prepare, debounce, max_latency), writes
+
+    @pytest.mark.unit
+    async def test_requests_are_coalesced(self):
+        """测试防抖时间内的多次请求合并为一次写入"""
+        import asyncio
+
+        scheduler, writes = self._make_scheduler()
+        for _ in range(100):
+            scheduler.request()
+        await asyncio.sleep(0.15)
+
+        assert len(writes) == 1
+        assert scheduler.stats.requested == 100
+        assert scheduler.stats.performed == 1
+        assert scheduler.stats.bytes_written == 10
+
+    @pytest.mark.unit
+    async def test_max_latency_bounds_delay(self):
+        """测试持续请求时不超过最大延迟就写入"""
+        import asyncio
+
+        scheduler, writes = self._make_scheduler(debounce=0.05, max_latency=0.1)
+        for _ in range(20):
+            scheduler.request()
+            await asyncio.sleep(0.02)
+
+        assert len(writes) >= 2
+        await asyncio.sleep(0.1)
+        assert not scheduler.has_pending()
+
+    @pytest.mark.unit
+    async def test_single_writer(self):
+        """测试同一时间只有一个写入任务"""
+        import asyncio
+        import threading
+        import time as _time
+
+        from desktop_client.services.save_scheduler import SaveScheduler
+
+        active = []
+        max_active = []
+        lock = threading.Lock()
+
+        def job():
+            with lock:
+                active.append(1)
+                max_active.append(len(active))
+            _time.sleep(0.02)
+            with lock:
+                active.pop()
+            return 1
+
+        scheduler = SaveScheduler(lambda: job, debounce=0, max_latency=0)
+        for _ in range(5):
+            scheduler.request(immediate=True)
+            await asyncio.sleep(0.005)
+        await scheduler.flush_async()
+
+        assert max(max_active) == 1
+        assert not scheduler.has_pending()
+
+    @pytest.mark.unit
+    async def test_flush_async_reports_failed_writer(self):
+        """测试正在执行的写入失败时重新写入，仍然失败时返回 False"""
+        import asyncio
+
+        from desktop_client.services.save_scheduler import SaveScheduler
+
+        results = []
+
+        def job():
+            import time as _time
+
+            _time.sleep(0.02)
+            if results.pop(0) is None:
+                raise OSError("disk full")
+            return 1
+
+        scheduler = SaveScheduler(lambda: job, debounce=0, max_latency=0)
+
+        # 正在执行的写入和随后的补写都失败，重新写入成功
+        results[:] = [None, None, 1]
+        scheduler.request(immediate=True)
+        await asyncio.sleep(0.005)
+        assert await scheduler.flush_async()
+        assert scheduler.stats.failed == 2
+
+        # 重新写入也失败
+        results[:] = [None, None, None]
+        scheduler.request(immediate=True)
+        await asyncio.sleep(0.005)
+        assert not await scheduler.flush_async()
+        assert not results and not scheduler.has_pending()
+
+    @pytest.mark.unit
+    def test_sync_fallback_without_loop(self, make_manager):
+        """测试没有事件循环时同步写入，流式更新也会被保存"""
+        manager = make_manager()
+        msg = manager.add_message("assistant", "")
+        manager.update_message(msg.id, "完整回复")
+
+        stats = manager.get_save_stats()
+        assert stats["performed"] == stats["requested"]
+        reloaded = make_manager()
+        assert reloaded.get_message_by_id(msg.id).content == "完整回复"
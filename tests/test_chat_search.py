@@ -0,0 +1,133 @@
+"""
+聊天记录全文搜索单元测试
+
+测试分词、内存倒排索引、摘要高亮，以及 ChatHistoryManager.search_messages
+在文件后端（内存索引）和 SQLite 后端（FTS5）上的行为。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.chat_history import ChatHistoryManager
+from desktop_client.services.chat_search import make_snippet, parse_query, tokenize
+
+
+@pytest.fixture
+def make_manager(tmp_path: Path):
+    """创建聊天记录管理器（每次都是新的单例）"""
+
+    def _make(backend: str = "journal") -> ChatHistoryManager:
+        ChatHistoryManager.reset_instance()
+        manager = ChatHistoryManager(str(tmp_path / "chat_history.json"), backend=backend)
+        manager.set_auto_save(False)
+        return manager
+
+    yield _make
+    ChatHistoryManager.reset_instance()
+
+
+class TestTokenizer:
+    """分词测试"""
+
+    @pytest.mark.unit
+    def test_cjk_and_latin(self):
+        """测试中文按单字和 bigram 切分，英文按单词切分并转小写"""
+        assert tokenize("Hello 天气好") == ["hello", "天", "气", "好", "天气", "气好"]
+
+    @pytest.mark.unit
+    def test_query_prefix_and_bigrams(self):
+        """测试查询中多字中文按 bigram 匹配，最后一个英文单词按前缀匹配"""
+        terms = parse_query("天气晴朗 asy")
+        assert terms.tokens == ["天气", "气晴", "晴朗"]
+        assert terms.prefix == "asy"
+
+        assert parse_query("asyncio ").prefix == ""
+
+    @pytest.mark.unit
+    def test_snippet_highlights_match(self):
+        """测试摘要以匹配位置为中心并返回高亮区间"""
+        content = "无关内容" * 30 + "今天天气晴朗" + "其他内容" * 30
+        snippet, highlights = make_snippet(content, ["天气"], width=40)
+
+        assert snippet.startswith("…") and snippet.endswith("…")
+        assert [snippet[s:e] for s, e in highlights] == ["天气"]
+
+
+@pytest.mark.parametrize("backend", ["journal", "sqlite"])
+class TestSearchMessages:
+    """ChatHistoryManager 搜索测试"""
+
+    @pytest.mark.unit
+    def test_ranked_results(self, make_manager, backend):
+        """测试只返回包含全部查询词的消息，并按相关度排序"""
+        manager = make_manager(backend)
+        manager.add_message("user", "今天天气怎么样")
+        best = manager.add_message("assistant", "天气 天气 天气，一直是好天气")
+        manager.add_message("user", "明天去爬山")
+
+        results = manager.search_messages("天气")
+
+        assert len(results) == 2
+        assert results[0].message_id == best.id
+        assert manager.search_messages("天气 爬山") == []
+
+    @pytest.mark.unit
+    def test_index_follows_updates_and_clear(self, make_manager, backend):
+        """测试流式更新、清空后索引同步"""
+        manager = make_manager(backend)
+        msg = manager.add_message("assistant", "")
+        for chunk in ["Python", "Python 的 asyncio", "Python 的 asyncio 事件循环"]:
+            manager.update_message(msg.id, chunk)
+
+        assert [r.message_id for r in manager.search_messages("事件循环")] == [msg.id]
+        assert [r.message_id for r in manager.search_messages("asy")] == [msg.id]
+
+        manager.update_message(msg.id, "内容已替换")
+        assert manager.search_messages("asyncio") == []
+
+        manager.clear_history()
+        assert manager.search_messages("替换") == []
+
+    @pytest.mark.unit
+    def test_trimmed_messages_are_not_found(self, make_manager, backend):
+        """测试超出最大消息数被裁剪的消息不再出现在搜索结果中"""
+        manager = make_manager(backend)
+        manager.set_max_messages(100)
+        manager.add_message("user", "最早的独特消息")
+        for i in range(100):
+            manager.add_message("user", f"消息 {i}")
+        manager.save_to_file_sync()
+
+        assert manager.search_messages("独特") == []
+        assert len(manager.search_messages("消息", limit=5)) == 5
+
+
+class TestBackgroundIndexing:
+    """加载历史记录后在后台线程中建立索引"""
+
+    @pytest.mark.unit
+    def test_search_does_not_wait_for_index(self, make_manager):
+        """测试加载大量消息后搜索不等待全部建立索引，建立完成后结果完整"""
+        manager = make_manager()
+        for i in range(1000):
+            manager.add_message("user", f"第 {i} 条消息，内容关于天气和爬山")
+        manager.save_to_file_sync()
+        manager = make_manager()
+
+        assert manager.is_search_indexing()
+        start = time.perf_counter()
+        manager.search_messages("天气", limit=0)
+        assert time.perf_counter() - start < 0.5
+
+        assert manager._search_index.wait(10)
+        assert not manager.is_search_indexing()
+        assert len(manager.search_messages("天气", limit=0)) == 1000
+        # 建立索引期间添加的消息也能搜索到
+        msg = manager.add_message("user", "独特的新消息")
+        assert [r.message_id for r in manager.search_messages("独特")] == [msg.id]
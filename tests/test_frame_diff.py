@@ -0,0 +1,167 @@
+"""
+截图变化检测单元测试
+
+测试：
+- 画面未变化时跳过，部分变化时只给出变化区域，大面积变化时上报完整截图
+- 相邻的变化块合并为矩形
+- 部分上报只更新上报区域的参考帧，其他区域的缓慢变化仍会被检测到
+- 编码失败时不更新参考帧，下一帧重新上报这次变化
+- 桌面监控按检测结果上报完整截图、变化区域或不含截图的状态
+"""
+
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.desktop_monitor import DesktopMonitorService
+from desktop_client.services.frame_diff import (
+    CHANGE_FULL,
+    CHANGE_NONE,
+    CHANGE_PARTIAL,
+    FrameDiffer,
+    merge_tiles,
+)
+
+
+def make_frame(boxes=(), size=(1600, 900)) -> Image.Image:
+    """灰色背景的截图，boxes 中的区域画成白色"""
+    image = Image.new("RGB", size, (40, 40, 40))
+    draw = ImageDraw.Draw(image)
+    for box in boxes:
+        draw.rectangle(box, fill=(255, 255, 255))
+    return image
+
+
+def detect(differ: FrameDiffer, image: Image.Image):
+    """检测变化并提交（模拟编码上报成功）"""
+    change = differ.compare(image)
+    differ.commit(change)
+    return change
+
+
+class TestFrameDiffer:
+    """FrameDiffer 测试"""
+
+    @pytest.mark.unit
+    def test_unchanged_partial_and_full(self):
+        """测试未变化、部分变化和大面积变化的检测结果"""
+        differ = FrameDiffer(grid=(16, 9), keyframe_interval=0)
+
+        assert detect(differ, make_frame()).kind == CHANGE_FULL  # 第一帧
+        assert detect(differ, make_frame()).kind == CHANGE_NONE
+
+        # 左上角一块（100x100 像素）变化
+        change = detect(differ, make_frame([(0, 0, 99, 99)]))
+        assert change.kind == CHANGE_PARTIAL
+        assert change.regions == [(0.0, 0.0, 1 / 16, 1 / 9)]
+
+        # 与上一次上报的画面相同
+        assert detect(differ, make_frame([(0, 0, 99, 99)])).kind == CHANGE_NONE
+        assert detect(differ, make_frame([(0, 0, 1599, 899)])).kind == CHANGE_FULL
+        assert detect(differ, make_frame(size=(800, 450))).kind == CHANGE_FULL
+
+        stats = differ.get_stats()
+        assert (stats["unchanged"], stats["partial"], stats["full"]) == (2, 1, 3)
+        assert stats["skipped_ratio"] == pytest.approx(2 / 6)
+
+    @pytest.mark.unit
+    def test_keyframe_interval(self):
+        """测试连续上报部分区域后强制上报完整截图"""
+        differ = FrameDiffer(keyframe_interval=2)
+        detect(differ, make_frame())
+
+        kinds = [detect(differ, make_frame([(0, 0, 99, 99 + i)])).kind for i in range(0, 300, 100)]
+
+        assert kinds == [CHANGE_PARTIAL, CHANGE_FULL, CHANGE_PARTIAL]
+
+    @pytest.mark.unit
+    def test_drift_outside_partial_regions(self):
+        """测试部分上报后，未上报区域中低于阈值的变化逐渐累积并被检测到"""
+        differ = FrameDiffer(grid=(16, 9), keyframe_interval=0)
+        detect(differ, make_frame())
+
+        def frame(level: int, box_on: bool) -> Image.Image:
+            image = make_frame([(0, 0, 99, 99)] if box_on else [])
+            ImageDraw.Draw(image).rectangle((1500, 800, 1599, 899), fill=(40 + level,) * 3)
+            return image
+
+        # 右下角每帧变亮 4（低于阈值），同时左上角交替变化触发部分上报
+        kinds = []
+        for i in range(1, 5):
+            change = detect(differ, frame(4 * i, i % 2 == 1))
+            kinds.append(change.kind)
+            if (15 / 16, 8 / 9, 1 / 16, 1 / 9) in change.regions:
+                break
+
+        assert kinds[0] == CHANGE_PARTIAL
+        assert change.regions[-1] == (15 / 16, 8 / 9, 1 / 16, 1 / 9)
+
+    @pytest.mark.unit
+    def test_merge_tiles(self):
+        """测试相邻块合并，不相邻的块分开"""
+        tiles = {(0, 0), (1, 0), (1, 1), (5, 5)}
+        assert merge_tiles(tiles) == [(0, 0, 2, 2), (5, 5, 1, 1)]
+
+
+class FakeCapture:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    @contextmanager
+    def capture_frame(self):
+        yield self.frames.pop(0)
+
+
+class TestDesktopMonitorChanges:
+    """桌面监控变化检测测试"""
+
+    @pytest.mark.unit
+    async def test_capture_modes(self):
+        """测试依次上报完整截图、跳过未变化的画面、只上报变化区域"""
+        capture = FakeCapture(
+            [make_frame(), make_frame(), make_frame([(0, 0, 99, 99)])]
+        )
+        monitor = DesktopMonitorService(
+            screen_capture_service=capture, screenshot_width=800, screenshot_height=450
+        )
+
+        full = await monitor._capture_screenshot()
+        unchanged = await monitor._capture_screenshot()
+        partial = await monitor._capture_screenshot()
+
+        assert full["mode"] == CHANGE_FULL and full["width"] == 800 and full["data"]
+        assert unchanged == {"mode": CHANGE_NONE}
+        assert partial["mode"] == CHANGE_PARTIAL
+        region = partial["regions"][0]
+        assert (region["left"], region["top"], region["width"], region["height"]) == (0, 0, 50, 50)
+        assert monitor.get_status()["frames"]["sent_ratio"] == pytest.approx(2 / 3)
+
+    @pytest.mark.unit
+    async def test_encode_failure_is_retried(self, monkeypatch):
+        """测试编码失败时不更新参考帧，下一帧重新上报这次变化"""
+        changed = make_frame([(0, 0, 99, 99)])
+        capture = FakeCapture([make_frame(), changed, changed])
+        monitor = DesktopMonitorService(
+            screen_capture_service=capture, screenshot_width=800, screenshot_height=450
+        )
+        assert (await monitor._capture_screenshot())["mode"] == CHANGE_FULL
+
+        encode = monitor._encode
+        failures = [RuntimeError("encoder error")]
+
+        def flaky_encode(image):
+            if failures:
+                raise failures.pop()
+            return encode(image)
+
+        monkeypatch.setattr(monitor, "_encode", flaky_encode)
+
+        assert await monitor._capture_screenshot() is None
+        retried = await monitor._capture_screenshot()
+        assert retried["mode"] == CHANGE_PARTIAL and retried["regions"]
@@ -0,0 +1,83 @@
+"""
+截图处理线程池单元测试
+
+测试：
+- 同一使用方同时只处理一帧，处理期间只保留最新提交的一帧，更早的帧被丢弃
+- 处理出错时异常返回给调用方，后续帧继续处理
+- 处理期间事件循环不被阻塞
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.frame_worker import FrameWorker
+
+
+class TestFrameWorker:
+    """FrameWorker 测试"""
+
+    @pytest.mark.unit
+    def test_latest_frame_wins(self):
+        """测试处理期间提交的帧只保留最新的一帧"""
+        worker = FrameWorker(ThreadPoolExecutor(max_workers=4))
+        release = threading.Event()
+        running = []
+
+        def job(name):
+            def run():
+                running.append(name)
+                if name == "first":
+                    release.wait(5)
+                return name
+
+            return run
+
+        futures = [worker.submit(job(name)) for name in ("first", "stale", "latest")]
+        assert worker.busy
+        release.set()
+
+        assert [f.result(5) for f in futures] == ["first", None, "latest"]
+        assert running == ["first", "latest"]
+        stats = worker.get_stats()
+        assert (stats["completed"], stats["dropped"], stats["busy"]) == (2, 1, False)
+
+    @pytest.mark.unit
+    def test_failure_is_reported(self):
+        """测试处理出错时异常返回给调用方，之后的帧正常处理"""
+        worker = FrameWorker()
+
+        def fail():
+            raise ValueError("encode failed")
+
+        with pytest.raises(ValueError):
+            worker.submit(fail).result(5)
+        assert worker.submit(lambda: 42).result(5) == 42
+        assert worker.get_stats()["failed"] == 1
+
+    @pytest.mark.unit
+    async def test_event_loop_not_blocked(self):
+        """测试处理帧时事件循环继续运行"""
+        worker = FrameWorker()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        result = await worker.run(lambda: time.sleep(0.2) or "encoded")
+        task.cancel()
+
+        assert result == "encoded"
+        assert ticks >= 5
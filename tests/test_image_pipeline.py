@@ -0,0 +1,71 @@
+"""
+截图缩放与编码单元测试
+
+测试：
+- 两阶段缩小得到与直接缩小相同的尺寸，小图不放大
+- 各编码格式和质量预设的输出可以正确解码
+- 保存文件时扩展名与编码格式一致
+"""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.services.image_pipeline import (
+    CODECS,
+    PRESETS,
+    ImagePipeline,
+    downscale,
+)
+
+
+def make_image(size=(3840, 2160), mode="RGB") -> Image.Image:
+    return Image.linear_gradient("L").resize(size).convert(mode)
+
+
+class TestImagePipeline:
+    """ImagePipeline 测试"""
+
+    @pytest.mark.unit
+    def test_downscale(self):
+        """测试两阶段缩小的尺寸和画面内容，小图原样返回"""
+        image = make_image()
+        small = downscale(image, 800, 600)
+        direct = image.resize(small.size, Image.Resampling.LANCZOS)
+
+        assert small.size == (800, 450)
+        # 渐变画面的平均亮度与直接缩小基本一致
+        assert abs(sum(small.convert("L").tobytes()) - sum(direct.convert("L").tobytes())) < 800 * 450
+        tiny = make_image((640, 360))
+        assert downscale(tiny, 800, 600) is tiny
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("codec", list(CODECS))
+    @pytest.mark.parametrize("preset", list(PRESETS))
+    def test_encode_round_trip(self, codec: str, preset: str):
+        """测试各编码格式和质量预设的输出可以解码，尺寸正确"""
+        pipeline = ImagePipeline(codec, preset, max_width=800, max_height=600)
+
+        encoded = pipeline.process(make_image(mode="RGBA"))
+
+        decoded = Image.open(BytesIO(encoded.data))
+        assert decoded.format == CODECS[codec][0]
+        assert decoded.size == (encoded.width, encoded.height) == (800, 450)
+        assert encoded.mime_type == CODECS[codec][1]
+
+    @pytest.mark.unit
+    def test_save_and_fallback(self, tmp_path: Path):
+        """测试保存时替换扩展名，无效的格式和预设使用默认值"""
+        pipeline = ImagePipeline("bmp", "unknown")
+        assert (pipeline.codec, pipeline.preset_name) == ("jpeg", "balanced")
+
+        path = ImagePipeline("webp").save(make_image((64, 64)), str(tmp_path / "shot.png"))
+
+        assert path == str(tmp_path / "shot.webp")
+        assert Image.open(path).format == "WEBP"
@@ -0,0 +1,132 @@
+"""
+流式 Markdown 增量渲染单元测试
+
+测试已完成的块只渲染一次、未闭合的围栏代码块不做高亮、
+缩进续行不被切分，以及文本不是延续时从头渲染。
+"""
+
+import sys
+from pathlib import Path
+
+import markdown
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.utils.markdown_stream import IncrementalMarkdownRenderer
+
+REPLY = (
+    "# 标题\n"
+    "\n"
+    "第一段，\n"
+    "第一段第二行。\n"
+    "\n"
+    "```python\n"
+    "def f():\n"
+    "\n"
+    "    return 1 < 2\n"
+    "```\n"
+    "| a | b |\n"
+    "|---|---|\n"
+    "| 1 | 2 |\n"
+    "\n"
+    "- 列表\n"
+    "\n"
+    "    续行\n"
+    "\n"
+    "结尾\n"
+)
+
+
+def to_html(text: str) -> str:
+    return markdown.markdown(text, extensions=["fenced_code", "tables"])
+
+
+class RecordingRenderer:
+    """记录每次渲染的块"""
+
+    def __init__(self):
+        self.blocks = []
+        self.tails = []
+
+    def block(self, text: str) -> str:
+        self.blocks.append(text)
+        return to_html(text)
+
+    def tail(self, text: str) -> str:
+        self.tails.append(text)
+        return to_html(text)
+
+
+def stream(renderer: IncrementalMarkdownRenderer, text: str, step: int = 3):
+    results = []
+    for end in range(step, len(text) + step, step):
+        results.append(renderer.render(text[:end]))
+    return results
+
+
+class TestIncrementalMarkdownRenderer:
+    """IncrementalMarkdownRenderer 测试"""
+
+    @pytest.mark.unit
+    def test_completed_blocks_rendered_once(self):
+        """测试流式渲染时每个已完成的块只渲染一次"""
+        recorder = RecordingRenderer()
+        renderer = IncrementalMarkdownRenderer(recorder.block, recorder.tail)
+
+        final = stream(renderer, REPLY)[-1]
+
+        assert recorder.blocks == [
+            "# 标题\n\n",
+            "第一段，\n第一段第二行。\n\n",
+            "```python\ndef f():\n\n    return 1 < 2\n```\n",
+            "| a | b |\n|---|---|\n| 1 | 2 |\n\n",
+            "- 列表\n\n    续行\n\n",
+        ]
+        assert renderer.blocks_rendered == 5
+        assert recorder.tails[-1] == "结尾\n"
+        assert final == "".join(to_html(b) for b in recorder.blocks) + to_html("结尾\n")
+        assert "<table>" in final
+        assert "续行" in final and "<pre><code>    续行" not in final
+
+    @pytest.mark.unit
+    def test_open_fence_is_not_highlighted(self):
+        """测试未闭合的围栏代码块按纯文本显示，闭合后才交给渲染函数"""
+        recorder = RecordingRenderer()
+        renderer = IncrementalMarkdownRenderer(recorder.block, recorder.tail)
+
+        html = renderer.render("```python\nif a < b:\n\n    pass\n")
+
+        assert html == "<pre><code>if a &lt; b:\n\n    pass\n</code></pre>"
+        assert recorder.blocks == [] and recorder.tails == []
+
+        renderer.render("```python\nif a < b:\n\n    pass\n````\n```\n")
+        assert recorder.blocks == ["```python\nif a < b:\n\n    pass\n````\n```\n"]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "见[文档][doc]。\n\n更多说明\n\n[doc]: https://example.com\n",
+            "1. 第一项\n\n2. 第二项\n\n3. 第三项\n",
+        ],
+    )
+    def test_finish_matches_full_render(self, text: str):
+        """测试流结束时的结果与完整渲染相同（跨块的引用式链接、松散列表）"""
+        renderer = IncrementalMarkdownRenderer(to_html)
+        streamed = stream(renderer, text)[-1]
+
+        assert streamed != to_html(text)
+        assert renderer.finish(text) == to_html(text)
+        assert renderer.blocks_rendered == 0
+
+    @pytest.mark.unit
+    def test_non_continuation_resets(self):
+        """测试文本不是上一次文本的延续时从头渲染"""
+        renderer = IncrementalMarkdownRenderer(to_html)
+        renderer.render("第一段\n\n第二段\n")
+        assert renderer.blocks_rendered == 1
+
+        assert renderer.render("另一条消息") == to_html("另一条消息")
+        assert renderer.blocks_rendered == 0
@@ -0,0 +1,251 @@
+"""
+媒体下载和媒体缓存单元测试
+
+测试：
+- 下载中断后通过 Range 请求从断点继续
+- 之前留下的 .part 文件只在有校验信息时续传，续传位置不一致时从头下载
+- 同一文件的并发请求只下载一次，再次请求直接使用缓存
+- 不同文件名、相同内容只保存一份
+- 超出容量时按最近使用淘汰，索引在重新打开后保留
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.api_client import PARTIAL_SUFFIX, VALIDATOR_SUFFIX, AstrBotApiClient
+from desktop_client.services.media_cache import MediaCache, materialize
+from desktop_client.utils.file_hash import hash_file
+
+PAYLOAD = bytes(range(256)) * 1024  # 256 KB
+
+
+def range_handler(payload: bytes, fail_after: int = -1, ignore_range: bool = False):
+    """
+    模拟 /chat/get_file：支持 Range，第一次响应在 fail_after 字节后中断
+
+    ignore_range 为 True 时对 Range 请求返回 206，但 Content-Range 从 0 开始
+    """
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        start = 0
+        status = 200
+        headers = {"ETag": '"v1"'}
+        if "Range" in request.headers:
+            if not ignore_range:
+                start = int(request.headers["Range"].split("=")[1].rstrip("-"))
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{len(payload) - 1}/{len(payload)}"
+        body = payload[start:]
+        headers["Content-Length"] = str(len(body))
+        broken = len(requests) == 1 and fail_after >= 0
+
+        async def stream():
+            for i in range(0, len(body), 16 * 1024):
+                if broken and i >= fail_after:
+                    raise httpx.ReadError("connection reset")
+                yield body[i : i + 16 * 1024]
+
+        return httpx.Response(
+            status,
+            headers=headers,
+            content=stream(),
+        )
+
+    return handler, requests
+
+
+def make_client(handler) -> AstrBotApiClient:
+    client = AstrBotApiClient("http://stub", token="token")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+class TestStreamingDownload:
+    """流式下载测试"""
+
+    @pytest.mark.unit
+    async def test_resume_after_interruption(self, tmp_path: Path):
+        """测试下载中断后从断点继续，文件内容完整"""
+        handler, requests = range_handler(PAYLOAD, fail_after=64 * 1024)
+        client = make_client(handler)
+        save_path = str(tmp_path / "video.mp4")
+
+        assert await client.download_file("video.mp4", save_path)
+
+        assert Path(save_path).read_bytes() == PAYLOAD
+        assert not os.path.exists(save_path + PARTIAL_SUFFIX)
+        assert len(requests) == 2
+        assert "Range" not in requests[0].headers
+        assert requests[1].headers["Range"] == f"bytes={64 * 1024}-"
+        assert requests[1].headers["If-Range"] == '"v1"'
+        await client.close()
+
+    @pytest.mark.unit
+    async def test_resume_leftover_part(self, tmp_path: Path):
+        """测试续传之前留下的 .part 文件时使用保存的 ETag 作为 If-Range"""
+        handler, requests = range_handler(PAYLOAD)
+        client = make_client(handler)
+        save_path = str(tmp_path / "video.mp4")
+        Path(save_path + PARTIAL_SUFFIX).write_bytes(PAYLOAD[:1000])
+        Path(save_path + PARTIAL_SUFFIX + VALIDATOR_SUFFIX).write_text('"v1"')
+
+        assert await client.download_file("video.mp4", save_path)
+
+        assert Path(save_path).read_bytes() == PAYLOAD
+        assert len(requests) == 1
+        assert requests[0].headers["Range"] == "bytes=1000-"
+        assert requests[0].headers["If-Range"] == '"v1"'
+        assert not os.path.exists(save_path + PARTIAL_SUFFIX + VALIDATOR_SUFFIX)
+        await client.close()
+
+    @pytest.mark.unit
+    async def test_leftover_part_without_validator(self, tmp_path: Path):
+        """测试没有校验信息的 .part 文件不续传，从头下载"""
+        handler, requests = range_handler(PAYLOAD)
+        client = make_client(handler)
+        save_path = str(tmp_path / "video.mp4")
+        Path(save_path + PARTIAL_SUFFIX).write_bytes(b"x" * 1000)
+
+        assert await client.download_file("video.mp4", save_path)
+
+        assert Path(save_path).read_bytes() == PAYLOAD
+        assert len(requests) == 1
+        assert "Range" not in requests[0].headers
+        await client.close()
+
+    @pytest.mark.unit
+    async def test_content_range_mismatch(self, tmp_path: Path):
+        """测试 206 响应的 Content-Range 与续传位置不一致时从头下载，不拼接新旧内容"""
+        handler, requests = range_handler(PAYLOAD, ignore_range=True)
+        client = make_client(handler)
+        save_path = str(tmp_path / "video.mp4")
+        Path(save_path + PARTIAL_SUFFIX).write_bytes(b"x" * 1000)
+        Path(save_path + PARTIAL_SUFFIX + VALIDATOR_SUFFIX).write_text('"v1"')
+
+        assert await client.download_file("video.mp4", save_path)
+
+        assert Path(save_path).read_bytes() == PAYLOAD
+        assert len(requests) == 2
+        assert "Range" not in requests[1].headers
+        await client.close()
+
+    @pytest.mark.unit
+    async def test_http_error_returns_false(self, tmp_path: Path):
+        """测试服务器返回错误时下载失败，不生成目标文件"""
+        client = make_client(lambda request: httpx.Response(404))
+        save_path = str(tmp_path / "missing.png")
+
+        assert not await client.download_file("missing.png", save_path)
+        assert not os.path.exists(save_path)
+        await client.close()
+
+
+class TestMediaCache:
+    """MediaCache 测试"""
+
+    @staticmethod
+    def downloader(contents: dict, calls: list):
+        async def download(name: str, path: str) -> bool:
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            Path(path).write_bytes(contents[name])
+            return True
+
+        return download
+
+    @pytest.mark.unit
+    async def test_concurrent_requests_download_once(self, tmp_path: Path):
+        """测试同一文件的并发请求只下载一次，之后直接使用缓存"""
+        cache = MediaCache(str(tmp_path / "cache"))
+        calls = []
+        download = self.downloader({"a.png": b"image-a"}, calls)
+
+        paths = await asyncio.gather(
+            *(cache.fetch("a.png", lambda p: download("a.png", p)) for _ in range(3))
+        )
+        again = await cache.fetch("a.png", lambda p: download("a.png", p))
+
+        assert calls == ["a.png"]
+        assert len(set(paths)) == 1 and again == paths[0]
+        assert Path(again).read_bytes() == b"image-a"
+        assert Path(again).name == hash_file(again)[0] + ".png"
+        stats = cache.get_stats()
+        assert (stats["misses"], stats["deduplicated"], stats["hits"]) == (1, 2, 1)
+
+    @pytest.mark.unit
+    async def test_same_content_stored_once(self, tmp_path: Path):
+        """测试不同文件名、相同内容只保存一份"""
+        cache = MediaCache(str(tmp_path / "cache"))
+        calls = []
+        download = self.downloader({"a.png": b"same", "b.png": b"same"}, calls)
+
+        first = await cache.fetch("a.png", lambda p: download("a.png", p))
+        second = await cache.fetch("b.png", lambda p: download("b.png", p))
+
+        assert first == second
+        assert cache.size == 4
+        assert cache.get_stats()["stored_duplicates"] == 1
+
+    @pytest.mark.unit
+    async def test_lru_eviction_and_persistence(self, tmp_path: Path):
+        """测试超出容量时淘汰最久未使用的文件，重新打开后索引仍然有效"""
+        cache_dir = str(tmp_path / "cache")
+        cache = MediaCache(cache_dir, max_bytes=10)
+        contents = {"a": b"aaaa", "b": b"bbbb", "c": b"cccc"}
+        download = self.downloader(contents, [])
+
+        path_a = await cache.fetch("a", lambda p: download("a", p))
+        await cache.fetch("b", lambda p: download("b", p))
+        assert cache.lookup("a") == path_a  # a 变为最近使用
+        await cache.fetch("c", lambda p: download("c", p))
+
+        assert cache.lookup("b") is None
+        assert cache.get_stats()["evictions"] == 1
+
+        reopened = MediaCache(cache_dir, max_bytes=10)
+        assert reopened.lookup("a") == path_a
+        assert reopened.lookup("c") is not None
+        assert reopened.size == 8
+
+    @pytest.mark.unit
+    async def test_hits_do_not_rewrite_index(self, tmp_path: Path):
+        """测试命中缓存不写入索引，最近使用顺序在 close() 时保存"""
+        cache_dir = str(tmp_path / "cache")
+        cache = MediaCache(cache_dir, max_bytes=10)
+        download = self.downloader({"a": b"aaaa", "b": b"bbbb", "c": b"cccc"}, [])
+        await cache.fetch("a", lambda p: download("a", p))
+        await cache.fetch("b", lambda p: download("b", p))
+
+        index = Path(cache_dir) / MediaCache.INDEX_FILE
+        saved = index.read_bytes()
+        for _ in range(5):
+            assert await cache.fetch("a", lambda p: download("a", p)) is not None
+        assert index.read_bytes() == saved  # 写入的话 a 会排到 b 之后
+
+        cache.close()
+        reopened = MediaCache(cache_dir, max_bytes=10)
+        await reopened.fetch("c", lambda p: download("c", p))
+        # a 最近使用过，淘汰的是 b
+        assert reopened.lookup("a") is not None and reopened.lookup("b") is None
+
+    @pytest.mark.unit
+    def test_materialize(self, tmp_path: Path):
+        """测试缓存文件放到目标路径，重复放置不报错"""
+        blob = tmp_path / "blob"
+        blob.write_bytes(b"data")
+        dest = str(tmp_path / "out" / "image.png")
+        os.makedirs(os.path.dirname(dest))
+
+        assert materialize(str(blob), dest)
+        assert materialize(str(blob), dest)
+        assert Path(dest).read_bytes() == b"data"
@@ -0,0 +1,91 @@
+"""
+请求调度器单元测试
+
+测试同一会话的请求依次执行、不同会话并发执行，
+等待中的请求按优先级排序，以及请求出错时不影响后续请求。
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.request_scheduler import RequestPriority, RequestScheduler
+
+
+def recorder(log: list, name: str, delay: float = 0.01):
+    async def run():
+        log.append(f"{name}:start")
+        await asyncio.sleep(delay)
+        log.append(f"{name}:end")
+        return name
+
+    return run
+
+
+class TestRequestScheduler:
+    """RequestScheduler 测试"""
+
+    @pytest.mark.unit
+    async def test_sessions_run_concurrently_and_in_order(self):
+        """测试同一会话依次执行，不同会话并发执行"""
+        scheduler = RequestScheduler()
+        log = []
+
+        results = await asyncio.gather(
+            scheduler.submit("a", recorder(log, "a1")),
+            scheduler.submit("a", recorder(log, "a2")),
+            scheduler.submit("b", recorder(log, "b1")),
+        )
+
+        assert results == ["a1", "a2", "b1"]
+        assert log.index("a1:end") < log.index("a2:start")
+        assert log.index("b1:start") < log.index("a1:end")
+        assert scheduler.get_stats()["max_concurrent"] == 2
+        assert scheduler.pending_count() == 0
+
+    @pytest.mark.unit
+    async def test_user_input_beats_queued_proactive(self):
+        """测试用户输入排在已在等待的主动对话请求之前（正在执行的请求不被打断）"""
+        scheduler = RequestScheduler()
+        log = []
+
+        running = asyncio.ensure_future(
+            scheduler.submit("s", recorder(log, "first"), RequestPriority.PROACTIVE)
+        )
+        await asyncio.sleep(0)
+        proactive = asyncio.ensure_future(
+            scheduler.submit("s", recorder(log, "proactive"), RequestPriority.PROACTIVE)
+        )
+        user = asyncio.ensure_future(
+            scheduler.submit("s", recorder(log, "user"), RequestPriority.USER)
+        )
+        await asyncio.gather(running, proactive, user)
+
+        assert [entry for entry in log if entry.endswith(":start")] == [
+            "first:start",
+            "user:start",
+            "proactive:start",
+        ]
+        assert scheduler.get_stats()["reordered"] == 1
+
+    @pytest.mark.unit
+    async def test_failure_does_not_block_session(self):
+        """测试请求出错时异常返回给调用方，后续请求继续执行"""
+        scheduler = RequestScheduler()
+
+        async def fail():
+            raise ValueError("boom")
+
+        failed = asyncio.ensure_future(scheduler.submit("s", fail))
+        ok = asyncio.ensure_future(scheduler.submit("s", recorder([], "ok")))
+
+        with pytest.raises(ValueError):
+            await failed
+        assert await ok == "ok"
+        stats = scheduler.get_stats()
+        assert (stats["failed"], stats["completed"]) == (1, 1)
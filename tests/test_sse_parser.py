@@ -0,0 +1,94 @@
+"""
+SSE 解析器单元测试
+
+测试按任意位置拆分字节块时的增量解析，以及 event-stream 规范中的
+多行 data、event / id / retry 字段、注释、BOM 和各种行结束符。
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.sse_parser import SSEFrame, SSEParser, peek_payload_type
+
+STREAM = (
+    "\ufeff: 注释行\r\n"
+    "retry: 3000\r\n"
+    'data: {"type": "plain", "data": "你好"}\r\n'
+    "\r\n"
+    "event: update\r"
+    "id: 7\r"
+    "data: 第一行\r"
+    "data:第二行\r"
+    "\r"
+    "id\n"
+    "data\n"
+    "\n"
+    "data: 没有结束的事件\n"
+).encode("utf-8")
+
+EXPECTED = [
+    SSEFrame("message", '{"type": "plain", "data": "你好"}'.encode(), ""),
+    SSEFrame("update", "第一行\n第二行".encode(), "7"),
+    SSEFrame("message", b"", ""),
+]
+
+
+def parse_in_chunks(data: bytes, size: int):
+    parser = SSEParser()
+    frames = []
+    for i in range(0, len(data), size):
+        frames.extend(parser.feed(data[i : i + size]))
+    return parser, frames
+
+
+class TestSSEParser:
+    """SSEParser 测试"""
+
+    @pytest.mark.unit
+    def test_spec_fields(self):
+        """测试多行 data、event / id / retry、注释、BOM 和 CR / CRLF / LF 行结束符"""
+        parser, frames = parse_in_chunks(STREAM, len(STREAM))
+
+        assert frames == EXPECTED
+        assert parser.retry == 3000
+        assert parser.last_event_id == ""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 7])
+    def test_arbitrary_chunk_boundaries(self, size: int):
+        """测试字节块在任意位置（包括 CRLF 和多字节字符中间）拆分时结果相同"""
+        _, frames = parse_in_chunks(STREAM, size)
+        assert frames == EXPECTED
+
+    @pytest.mark.unit
+    def test_event_without_data_is_not_dispatched(self):
+        """测试没有 data 字段的事件不会分发，event 类型不会泄漏到下一个事件"""
+        parser = SSEParser()
+        assert parser.feed(b"event: ping\n\n") == []
+        assert parser.feed(b"data: x\n\n") == [SSEFrame("message", b"x", "")]
+
+    @pytest.mark.unit
+    def test_long_line_in_small_chunks(self):
+        """测试很长的行分成许多小块到达、CRLF 被拆分在两块之间时正确解析"""
+        line = b"data: " + b"x" * 100_000 + b"\r"
+        parser = SSEParser()
+        frames = []
+        for i in range(0, len(line), 64):
+            frames.extend(parser.feed(line[i : i + 64]))
+
+        assert frames == []
+        assert parser.feed(b"\n\r\n") == [SSEFrame("message", b"x" * 100_000, "")]
+        assert len(parser._buffer) == 0
+
+    @pytest.mark.unit
+    def test_peek_payload_type(self):
+        """测试只读取第一个键的 type"""
+        assert peek_payload_type(b'{"type": "plain", "data": "x"}') == "plain"
+        assert peek_payload_type(b' { "type":"end"}') == "end"
+        assert peek_payload_type(b'{"data": {"type": "plain"}, "type": "x"}') is None
+        assert peek_payload_type(b"not json") is None
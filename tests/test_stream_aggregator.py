@@ -0,0 +1,130 @@
+"""
+流式响应聚合器单元测试
+
+测试流式 chunk 按请求合并、按间隔刷新，结束 / 错误消息立即发送且顺序不变。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.bridge import OutputMessage
+from desktop_client.handlers.stream_aggregator import StreamAggregator
+
+
+@pytest.fixture
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def chunk(text: str, request_id: str = "req_a", chain_type: str = "normal") -> OutputMessage:
+    return OutputMessage(
+        msg_type="text",
+        content=text,
+        session_id="session",
+        streaming=True,
+        metadata={"request_id": request_id, "chain_type": chain_type},
+    )
+
+
+def make_aggregator(interval_ms: int = 1000):
+    aggregator = StreamAggregator(interval_ms=interval_ms)
+    received = []
+    aggregator.message_ready.connect(received.append)
+    return aggregator, received
+
+
+class TestStreamAggregator:
+    """StreamAggregator 测试"""
+
+    @pytest.mark.unit
+    def test_chunks_are_coalesced_per_request(self, app):
+        """测试同一请求的 chunk 合并为一次更新，不同请求分开发送"""
+        aggregator, received = make_aggregator()
+        for text in ("你", "好", "，"):
+            aggregator.push(chunk(text))
+        aggregator.push(chunk("思考", chain_type="reasoning"))
+        aggregator.push(chunk("b", request_id="req_b"))
+        aggregator.push(chunk("世界"))
+
+        assert received == []
+        assert aggregator.has_pending()
+
+        aggregator.flush()
+        assert [(m.metadata["request_id"], m.content) for m in received] == [
+            ("req_a", "你好，世界"),
+            ("req_a", "思考"),
+            ("req_b", "b"),
+        ]
+        assert received[1].metadata["chain_type"] == "reasoning"
+
+        stats = aggregator.get_stats()
+        assert stats["chunks_received"] == 6
+        assert stats["updates_emitted"] == 3
+        assert stats["coalesce_ratio"] == 2.0
+
+    @pytest.mark.unit
+    def test_end_and_error_flush_immediately(self, app):
+        """测试结束和错误消息先发送缓存的 chunk 再立即转发"""
+        aggregator, received = make_aggregator()
+        aggregator.push(chunk("a"))
+        aggregator.push(chunk("b"))
+        aggregator.push(OutputMessage(msg_type="end", content="", session_id="session"))
+        aggregator.push(chunk("c", request_id="req_b"))
+        aggregator.push(OutputMessage(msg_type="error", content="x", session_id="session"))
+
+        assert [(m.msg_type, m.content) for m in received] == [
+            ("text", "ab"),
+            ("end", ""),
+            ("text", "c"),
+            ("error", "x"),
+        ]
+        assert not aggregator.has_pending()
+        assert aggregator.get_stats()["passthrough"] == 2
+
+    @pytest.mark.unit
+    def test_timer_flushes_pending_chunks(self, app):
+        """测试定时器到期后发送缓存的 chunk"""
+        aggregator, received = make_aggregator(interval_ms=5)
+        aggregator.push(chunk("a"))
+        aggregator.push(chunk("b"))
+
+        deadline = time.monotonic() + 2
+        while not received and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+
+        assert [m.content for m in received] == ["ab"]
+        assert aggregator.get_stats()["flushes"] == 1
+
+    @pytest.mark.unit
+    def test_default_interval_follows_display(self, app):
+        """测试间隔为 0 时使用显示帧时长"""
+        aggregator = StreamAggregator(interval_ms=0)
+        assert aggregator.get_interval() == StreamAggregator.DEFAULT_INTERVAL_MS
+
+    @pytest.mark.unit
+    def test_interval_resolved_after_app_exists(self, app, monkeypatch):
+        """测试在 QApplication（屏幕）可用之前构造时，刷新间隔在第一次使用时获取"""
+        from PySide6.QtGui import QGuiApplication
+
+        class Screen:
+            def refreshRate(self):
+                return 120.0
+
+        monkeypatch.setattr(QGuiApplication, "primaryScreen", staticmethod(lambda: None))
+        aggregator, received = make_aggregator(interval_ms=0)
+        assert aggregator.get_interval() == StreamAggregator.DEFAULT_INTERVAL_MS
+
+        monkeypatch.setattr(QGuiApplication, "primaryScreen", staticmethod(lambda: Screen()))
+        aggregator.push(chunk("a"))
+
+        assert aggregator._timer.interval() == 8
+        assert aggregator.get_interval() == 8
+        aggregator.flush()
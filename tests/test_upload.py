@@ -0,0 +1,157 @@
+"""
+文件上传单元测试
+
+测试：
+- 上传大文件时从磁盘流式发送，内存占用不随文件大小增长（本地 HTTP 服务器）
+- 同一内容只上传一次
+- 多个附件并发上传，同时进行的上传数量有上限
+"""
+
+import asyncio
+import hashlib
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 确保可以导入 desktop_client
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from desktop_client.api_client import UPLOAD_CONCURRENCY, AstrBotApiClient
+
+LARGE_FILE_SIZE = 500 * 1024 * 1024
+
+
+async def start_stub_server():
+    """
+    本地 /chat/post_file 服务器：按块读取请求体并计算哈希，不保存内容
+
+    Returns:
+        (server, 端口, 收到的请求体哈希列表)
+    """
+    received = []
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        digest = hashlib.sha256()
+        remaining = length
+        while remaining:
+            chunk = await reader.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+        received.append((length, digest.hexdigest()))
+
+        body = json.dumps(
+            {"status": "ok", "data": {"attachment_id": f"att_{len(received)}"}}
+        ).encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+        )
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, port, received
+
+
+class TestStreamingUpload:
+    """流式上传测试"""
+
+    @pytest.mark.slow
+    async def test_large_upload_memory_stays_flat(self, tmp_path: Path):
+        """测试上传 500 MB 文件时内存峰值不随文件大小增长"""
+        path = tmp_path / "large.bin"
+        with open(path, "wb") as f:
+            f.truncate(LARGE_FILE_SIZE)  # 稀疏文件，不占用磁盘空间
+
+        server, port, received = await start_stub_server()
+        client = AstrBotApiClient(f"http://127.0.0.1:{port}", token="token")
+        try:
+            tracemalloc.start()
+            success, result = await client.upload_file(str(path))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+
+        assert success and result == {"attachment_id": "att_1"}
+        length, _ = received[0]
+        assert length > LARGE_FILE_SIZE  # multipart 请求体包含完整文件
+        assert peak < 16 * 1024 * 1024
+
+
+class TestUploadScheduling:
+    """上传去重和并发测试"""
+
+    @staticmethod
+    def make_client(handler) -> AstrBotApiClient:
+        client = AstrBotApiClient("http://stub", token="token")
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return client
+
+    @pytest.mark.unit
+    async def test_same_content_uploaded_once(self, tmp_path: Path):
+        """测试相同内容（包括并发请求和不同路径）只上传一次"""
+        uploads = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await request.aread()
+            uploads.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"status": "ok", "data": {"attachment_id": "att"}})
+
+        first = tmp_path / "a.png"
+        second = tmp_path / "b.png"
+        first.write_bytes(b"same image")
+        second.write_bytes(b"same image")
+        client = self.make_client(handler)
+
+        results = await client.upload_files([str(first), str(first)])
+        again = await client.upload_file(str(second))
+
+        assert len(uploads) == 1
+        assert results == [(True, {"attachment_id": "att"})] * 2
+        assert again == (True, {"attachment_id": "att"})
+        await client.close()
+
+    @pytest.mark.unit
+    async def test_concurrency_is_bounded(self, tmp_path: Path):
+        """测试多个附件并发上传，同时进行的上传数量不超过上限"""
+        active = 0
+        max_active = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal active, max_active
+            await request.aread()
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            name = request.content.split(b'filename="')[1].split(b'"')[0].decode()
+            return httpx.Response(200, json={"status": "ok", "data": {"attachment_id": name}})
+
+        paths = []
+        for i in range(UPLOAD_CONCURRENCY * 2):
+            path = tmp_path / f"{i}.png"
+            path.write_bytes(f"image {i}".encode())
+            paths.append(str(path))
+        client = self.make_client(handler)
+
+        results = await client.upload_files(paths)
+
+        assert [r[1]["attachment_id"] for r in results] == [f"{i}.png" for i in range(len(paths))]
+        assert max_active == UPLOAD_CONCURRENCY
+        await client.close()